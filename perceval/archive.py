@@ -21,13 +21,21 @@
 #     Jesus M. Gonzalez-Barahona <jgb@gsyc.es>
 #
 
+import datetime
 import hashlib
+import importlib
 import json
 import logging
 import os
 import pickle
 import sqlite3
+import struct
+import threading
+import time
 import uuid
+import zlib
+
+import requests
 
 from grimoirelab_toolkit.datetime import (datetime_utcnow,
                                           datetime_to_utc,
@@ -56,7 +64,29 @@ class Archive:
     initialized calling to `init_metadata` method after creating
     a new archive.
 
+    By default, every call to `store` writes and commits its entry
+    right away. Writes can be buffered setting `batch_size` and/or
+    `batch_interval`. Staged entries will be written in a single
+    transaction when `batch_size` entries are waiting or when
+    `batch_interval` seconds have passed since the last commit,
+    whatever happens first. Buffered archives use the write-ahead
+    log journal mode. Call `flush` to write any pending entry.
+
+    Entries can be stored and retrieved from several threads, since
+    the access to the archive file is serialized.
+
+    Archived data is serialized with a versioned codec (see
+    `encode_data`). HTTP responses and HTTP errors are stored as
+    their status, headers, URL and encoding plus a compressed body,
+    instead of pickling the whole object. Entries written by older
+    versions of Perceval, using pickle protocol 0, can still be
+    retrieved and can be rewritten with `compact`.
+
     :param archive_path: path where this archive is stored
+    :param batch_size: maximum number of entries staged before
+        committing them
+    :param batch_interval: maximum number of seconds to wait before
+        committing staged entries
 
     :raises ArchiveError: when the archive does not exist or is invalid
     """
@@ -81,9 +111,22 @@ class Archive:
                            "backend_params BLOB, " \
                            "created_on TEXT)"
 
-    def __init__(self, archive_path):
+    DEFAULT_BATCH_SIZE = 1
+
+    # Storage codec
+    CODEC_MAGIC = b'\x00PCV'
+    CODEC_VERSION = 1
+    CODEC_HEADER = struct.Struct('>4sBcI')
+    CODEC_RESPONSE = b'R'
+    CODEC_ERROR = b'E'
+    CODEC_OBJECT = b'O'
+    COMPACT_CHUNK_SIZE = 1000
+
+    def __init__(self, archive_path, batch_size=DEFAULT_BATCH_SIZE, batch_interval=None):
         if not os.path.exists(archive_path):
             raise ArchiveError(cause="archive %s does not exist" % (archive_path))
+        if batch_size < 1:
+            raise ArchiveError(cause="batch size must be greater than 0; %s given" % batch_size)
 
         self.archive_path = archive_path
         self.origin = None
@@ -93,16 +136,33 @@ class Archive:
         self.backend_params = None
         self.created_on = None
 
-        self._db = sqlite3.connect(self.archive_path)
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+
+        self._pending = []
+        self._pending_hashcodes = set()
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+
+        self._db = sqlite3.connect(self.archive_path, check_same_thread=False)
 
         self._verify_archive()
         self._load_metadata()
 
+        if self.is_buffered:
+            self._set_buffered_journal()
+
     def __del__(self):
         conn = getattr(self, '_db', None)
         if conn:
             conn.close()
 
+    @property
+    def is_buffered(self):
+        """Whether writes are staged and committed in batches"""
+
+        return self.batch_size > 1 or self.batch_interval is not None
+
     def init_metadata(self, origin, backend_name, backend_version,
                       category, backend_params):
         """Init metadata information.
@@ -167,28 +227,40 @@ class Archive:
         hashcode = self.make_hashcode(uri, payload, headers)
         payload_dump = pickle.dumps(payload, 0)
         headers_dump = pickle.dumps(headers, 0)
-        data_dump = pickle.dumps(data, 0)
+        data_dump = self.encode_data(data)
 
         logger.debug("Archiving %s with %s %s %s in %s",
                      hashcode, uri, payload, headers, self.archive_path)
 
-        try:
-            cursor = self._db.cursor()
-            insert_stmt = "INSERT INTO " + self.ARCHIVE_TABLE + " (" \
-                          "id, hashcode, uri, payload, headers, data) " \
-                          "VALUES(?,?,?,?,?,?)"
-            cursor.execute(insert_stmt, (None, hashcode, uri,
-                                         payload_dump, headers_dump, data_dump))
-            self._db.commit()
-            cursor.close()
-        except sqlite3.IntegrityError as e:
-            msg = "data storage error; cause: duplicated entry %s" % hashcode
-            raise ArchiveError(cause=msg)
-        except sqlite3.DatabaseError as e:
-            msg = "data storage error; cause: %s" % str(e)
-            raise ArchiveError(cause=msg)
+        with self._lock:
+            if hashcode in self._pending_hashcodes:
+                msg = "data storage error; cause: duplicated entry %s" % hashcode
+                raise ArchiveError(cause=msg)
+
+            self._pending.append((None, hashcode, uri,
+                                  payload_dump, headers_dump, data_dump))
+            self._pending_hashcodes.add(hashcode)
+
+            elapsed = time.monotonic() - self._last_flush
 
-        logger.debug("%s data archived in %s", hashcode, self.archive_path)
+            if len(self._pending) >= self.batch_size or \
+                    (self.batch_interval is not None and elapsed >= self.batch_interval):
+                self.flush()
+            else:
+                logger.debug("%s data staged in %s", hashcode, self.archive_path)
+
+    def flush(self):
+        """Write the staged entries in the archive.
+
+        Pending entries are inserted and committed within a single
+        transaction. When one of them is already archived, the rest
+        of the entries are stored anyway and an exception is raised
+        at the end of the process.
+
+        :raises ArchiveError: when an error occurs storing the entries
+        """
+        with self._lock:
+            self._write_pending()
 
     def retrieve(self, uri, payload, headers):
         """Retrieve a raw item from the archive.
@@ -209,36 +281,93 @@ class Archive:
         logger.debug("Retrieving entry %s with %s %s %s in %s",
                      hashcode, uri, payload, headers, self.archive_path)
 
-        self._db.row_factory = sqlite3.Row
+        with self._lock:
+            self.flush()
 
-        try:
-            cursor = self._db.cursor()
-            select_stmt = "SELECT data " \
-                          "FROM " + self.ARCHIVE_TABLE + " " \
-                          "WHERE hashcode = ?"
-            cursor.execute(select_stmt, (hashcode,))
-            row = cursor.fetchone()
-            cursor.close()
-        except sqlite3.DatabaseError as e:
-            msg = "data retrieval error; cause: %s" % str(e)
-            raise ArchiveError(cause=msg)
+            self._db.row_factory = sqlite3.Row
+
+            try:
+                cursor = self._db.cursor()
+                select_stmt = "SELECT data " \
+                              "FROM " + self.ARCHIVE_TABLE + " " \
+                              "WHERE hashcode = ?"
+                cursor.execute(select_stmt, (hashcode,))
+                row = cursor.fetchone()
+                cursor.close()
+            except sqlite3.DatabaseError as e:
+                msg = "data retrieval error; cause: %s" % str(e)
+                raise ArchiveError(cause=msg)
 
         if row:
-            found = pickle.loads(row['data'])
+            found = self.decode_data(row['data'])
         else:
             msg = "entry %s not found in archive %s" % (hashcode, self.archive_path)
             raise ArchiveError(cause=msg)
 
         return found
 
+    def compact(self):
+        """Rewrite the entries of the archive using the current codec.
+
+        Entries serialized with pickle protocol 0 or with previous
+        versions of the codec are decoded and encoded again. Once
+        they are rewritten, the archive file is vacuumed to reclaim
+        the free disk space.
+
+        :returns: the number of rewritten entries
+
+        :raises ArchiveError: when an error occurs rewriting the entries
+        """
+        self.flush()
+
+        logger.debug("Compacting archive %s", self.archive_path)
+
+        nrewritten = 0
+
+        try:
+            cursor = self._db.cursor()
+            cursor.execute("SELECT id FROM " + self.ARCHIVE_TABLE)
+            ids = [row[0] for row in cursor.fetchall()]
+
+            select_stmt = "SELECT data FROM " + self.ARCHIVE_TABLE + " WHERE id = ?"
+            update_stmt = "UPDATE " + self.ARCHIVE_TABLE + " SET data = ? WHERE id = ?"
+
+            for i, entry_id in enumerate(ids, 1):
+                cursor.execute(select_stmt, (entry_id,))
+                data_dump = cursor.fetchone()[0]
+
+                if not self._is_current_codec(data_dump):
+                    data = self.decode_data(data_dump)
+                    cursor.execute(update_stmt, (self.encode_data(data), entry_id))
+                    nrewritten += 1
+
+                if i % self.COMPACT_CHUNK_SIZE == 0:
+                    self._db.commit()
+
+            self._db.commit()
+            cursor.execute("VACUUM")
+            cursor.close()
+        except sqlite3.DatabaseError as e:
+            msg = "archive compaction error; cause: %s" % str(e)
+            raise ArchiveError(cause=msg)
+
+        logger.debug("Archive %s compacted; %s entries rewritten",
+                     self.archive_path, nrewritten)
+
+        return nrewritten
+
     @classmethod
-    def create(cls, archive_path):
+    def create(cls, archive_path, batch_size=DEFAULT_BATCH_SIZE, batch_interval=None):
         """Create a brand new archive.
 
          Call this method to create a new and empty archive. It will initialize
          the storage file in the path defined by `archive_path`.
 
         :param archive_path: absolute path where the archive file will be created
+        :param batch_size: maximum number of entries staged before
+            committing them
+        :param batch_interval: maximum number of seconds to wait before
+            committing staged entries
 
         :raises ArchiveError: when the archive file already exists
         """
@@ -257,7 +386,7 @@ class Archive:
         conn.close()
 
         logger.debug("Creating archive %s", archive_path)
-        archive = cls(archive_path)
+        archive = cls(archive_path, batch_size=batch_size, batch_interval=batch_interval)
         logger.debug("Achive %s was created", archive_path)
 
         return archive
@@ -282,6 +411,204 @@ class Archive:
         hashcode = hashlib.sha1(content.encode('utf-8'))
         return hashcode.hexdigest()
 
+    @classmethod
+    def encode_data(cls, data):
+        """Serialize data to be stored in an archive.
+
+        The encoded data starts with a header that includes a magic
+        string, the version of the codec, the type of the content and
+        the length of its metadata. HTTP responses are encoded as a
+        JSON document with their status, headers, URL and encoding,
+        followed by their body compressed with zlib. HTTP errors
+        with a response attached are encoded in the same way, adding
+        the class and arguments of the exception. Any other object
+        is pickled and compressed.
+
+        :param data: data to encode
+
+        :returns: the encoded data
+        """
+        meta = None
+
+        if isinstance(data, requests.Response):
+            kind = cls.CODEC_RESPONSE
+            meta = cls._response_to_meta(data)
+            body = data.content
+        elif isinstance(data, requests.RequestException) and \
+                isinstance(data.response, requests.Response):
+            kind = cls.CODEC_ERROR
+            meta = cls._response_to_meta(data.response)
+            meta['error'] = {
+                'module': data.__class__.__module__,
+                'class': data.__class__.__qualname__,
+                'args': data.args
+            }
+            body = data.response.content
+
+        if meta is not None:
+            try:
+                meta_dump = json.dumps(meta, sort_keys=True).encode('utf-8')
+            except (TypeError, ValueError):
+                meta = None
+
+        if meta is None:
+            kind = cls.CODEC_OBJECT
+            meta_dump = b''
+            body = pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+
+        header = cls.CODEC_HEADER.pack(cls.CODEC_MAGIC, cls.CODEC_VERSION,
+                                       kind, len(meta_dump))
+
+        return header + meta_dump + zlib.compress(body or b'')
+
+    @classmethod
+    def decode_data(cls, data_dump):
+        """Deserialize data stored in an archive.
+
+        Data encoded with `encode_data` is rebuilt into a response,
+        an exception or a generic object, depending on its type.
+        Data stored by older versions of Perceval, pickled using
+        the protocol 0, is unpickled.
+
+        :param data_dump: encoded data
+
+        :returns: the decoded data
+
+        :raises ArchiveError: when the data cannot be decoded
+        """
+        if not cls._is_codec(data_dump):
+            return pickle.loads(data_dump)
+
+        hsize = cls.CODEC_HEADER.size
+        _, version, kind, meta_len = cls.CODEC_HEADER.unpack(data_dump[:hsize])
+
+        if version > cls.CODEC_VERSION:
+            msg = "unsupported archive codec version %s" % version
+            raise ArchiveError(cause=msg)
+
+        meta_dump = data_dump[hsize:hsize + meta_len]
+        body = zlib.decompress(data_dump[hsize + meta_len:])
+
+        if kind == cls.CODEC_OBJECT:
+            return pickle.loads(body)
+
+        meta = json.loads(meta_dump.decode('utf-8'))
+        response = cls._meta_to_response(meta, body)
+
+        if kind == cls.CODEC_RESPONSE:
+            return response
+        elif kind == cls.CODEC_ERROR:
+            error = meta['error']
+            module = importlib.import_module(error['module'])
+            klass = module
+            for name in error['class'].split('.'):
+                klass = getattr(klass, name)
+            return klass(*error['args'], response=response)
+        else:
+            msg = "unknown archive codec data type %s" % kind
+            raise ArchiveError(cause=msg)
+
+    @staticmethod
+    def _response_to_meta(response):
+        """Extract the fields of a response that will be archived"""
+
+        elapsed = response.elapsed.total_seconds() if response.elapsed else None
+
+        meta = {
+            'status_code': response.status_code,
+            'reason': response.reason,
+            'url': response.url,
+            'encoding': response.encoding,
+            'headers': list(response.headers.items()),
+            'elapsed': elapsed
+        }
+        return meta
+
+    @staticmethod
+    def _meta_to_response(meta, body):
+        """Build a response object from its archived fields"""
+
+        response = requests.Response()
+        response.status_code = meta['status_code']
+        response.reason = meta['reason']
+        response.url = meta['url']
+        response.encoding = meta['encoding']
+        response.headers = requests.structures.CaseInsensitiveDict(meta['headers'])
+        response._content = body
+        response._content_consumed = True
+
+        if meta['elapsed'] is not None:
+            response.elapsed = datetime.timedelta(seconds=meta['elapsed'])
+
+        return response
+
+    @classmethod
+    def _is_codec(cls, data_dump):
+        """Check whether data was serialized with the archive codec"""
+
+        return bytes(data_dump[:len(cls.CODEC_MAGIC)]) == cls.CODEC_MAGIC
+
+    @classmethod
+    def _is_current_codec(cls, data_dump):
+        """Check whether data was serialized with the current codec version"""
+
+        if not cls._is_codec(data_dump):
+            return False
+
+        version = data_dump[len(cls.CODEC_MAGIC)]
+        return version == cls.CODEC_VERSION
+
+    def _write_pending(self):
+        """Insert the staged entries within a single transaction"""
+
+        if not self._pending:
+            self._last_flush = time.monotonic()
+            return
+
+        pending = self._pending
+        self._pending = []
+        self._pending_hashcodes = set()
+        self._last_flush = time.monotonic()
+
+        duplicated = None
+
+        try:
+            cursor = self._db.cursor()
+            insert_stmt = "INSERT INTO " + self.ARCHIVE_TABLE + " (" \
+                          "id, hashcode, uri, payload, headers, data) " \
+                          "VALUES(?,?,?,?,?,?)"
+            for row in pending:
+                try:
+                    cursor.execute(insert_stmt, row)
+                except sqlite3.IntegrityError:
+                    duplicated = duplicated or row[1]
+            self._db.commit()
+            cursor.close()
+        except sqlite3.DatabaseError as e:
+            msg = "data storage error; cause: %s" % str(e)
+            raise ArchiveError(cause=msg)
+
+        if duplicated:
+            msg = "data storage error; cause: duplicated entry %s" % duplicated
+            raise ArchiveError(cause=msg)
+
+        logger.debug("%s entries archived in %s", len(pending), self.archive_path)
+
+    def _set_buffered_journal(self):
+        """Use WAL journaling and relaxed synchronization for buffered writes"""
+
+        try:
+            cursor = self._db.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.close()
+        except sqlite3.DatabaseError as e:
+            msg = "invalid archive file; cause: %s" % str(e)
+            raise ArchiveError(cause=msg)
+
+        logger.debug("Buffered writes enabled for archive %s; batch size: %s, interval: %s",
+                     self.archive_path, self.batch_size, self.batch_interval)
+
     def _verify_archive(self):
         """Check whether the archive is valid or not.
 
@@ -345,6 +672,177 @@ class Archive:
         return row[0]
 
 
+class ArchiveCatalog:
+    """Index of the archives handled by an archive manager.
+
+    The catalog is a SQLite database that stores, for each archive,
+    its path - relative to the directory of the manager - and the
+    metadata needed to search it: origin, backend name, category
+    and creation date. Thanks to it, archives do not have to be
+    opened to know whether they match a search.
+
+    Archives are registered when they are created, before their
+    metadata is initialized. Metadata of these entries is filled
+    in the next time they are resolved (see `resolve`).
+
+    :param dirpath: path where the archives are stored
+    :param catalog_path: path to the catalog database
+
+    :raises ArchiveManagerError: when the catalog cannot be opened
+    """
+
+    CATALOG_TABLE = "catalog"
+
+    CATALOG_CREATE_STMT = "CREATE TABLE IF NOT EXISTS " + CATALOG_TABLE + " ( " \
+                          "archive_path TEXT PRIMARY KEY, " \
+                          "origin TEXT, " \
+                          "backend_name TEXT, " \
+                          "category TEXT, " \
+                          "created_on REAL)"
+
+    CATALOG_INDEX_STMT = "CREATE INDEX IF NOT EXISTS catalog_search ON " + CATALOG_TABLE + " " \
+                         "(origin, backend_name, category, created_on)"
+
+    DB_TIMEOUT = 60
+
+    def __init__(self, dirpath, catalog_path):
+        self.dirpath = dirpath
+        self.catalog_path = catalog_path
+
+        try:
+            self._db = sqlite3.connect(self.catalog_path, timeout=self.DB_TIMEOUT)
+            cursor = self._db.cursor()
+            cursor.execute(self.CATALOG_CREATE_STMT)
+            cursor.execute(self.CATALOG_INDEX_STMT)
+            self._db.commit()
+            cursor.close()
+        except sqlite3.DatabaseError as e:
+            msg = "invalid catalog file %s; cause: %s" % (self.catalog_path, str(e))
+            raise ArchiveManagerError(cause=msg)
+
+    def __del__(self):
+        conn = getattr(self, '_db', None)
+        if conn:
+            conn.close()
+
+    def add(self, archive_path, origin=None, backend_name=None,
+            category=None, created_on=None):
+        """Register an archive in the catalog.
+
+        :param archive_path: path to the archive
+        :param origin: data origin
+        :param backend_name: backend used to fetch data
+        :param category: type of the items fetched by the backend
+        :param created_on: creation date of the archive
+        """
+        created_ts = created_on.timestamp() if created_on else None
+        stmt = "INSERT OR REPLACE INTO " + self.CATALOG_TABLE + " " \
+               "(archive_path, origin, backend_name, category, created_on) " \
+               "VALUES (?, ?, ?, ?, ?)"
+        self._execute(stmt, (self._relpath(archive_path), origin,
+                             backend_name, category, created_ts))
+
+    def remove(self, archive_path):
+        """Remove an archive from the catalog.
+
+        :param archive_path: path to the archive
+        """
+        stmt = "DELETE FROM " + self.CATALOG_TABLE + " WHERE archive_path = ?"
+        self._execute(stmt, (self._relpath(archive_path),))
+
+    def clear(self):
+        """Remove every entry from the catalog"""
+
+        self._execute("DELETE FROM " + self.CATALOG_TABLE, ())
+
+    def resolve(self):
+        """Fill the metadata of the entries registered without it.
+
+        Archives are opened to read their metadata. Entries whose
+        archive no longer exists or is invalid are removed. Archives
+        that were not initialized yet are kept as they are.
+        """
+        select_stmt = "SELECT archive_path FROM " + self.CATALOG_TABLE + " " \
+                      "WHERE origin IS NULL"
+
+        for (relpath,) in self._fetchall(select_stmt, ()):
+            archive_path = os.path.join(self.dirpath, relpath)
+
+            try:
+                archive = Archive(archive_path)
+            except ArchiveError:
+                logger.debug("Removing %s from the catalog; archive not found or invalid",
+                             archive_path)
+                self.remove(archive_path)
+                continue
+
+            if archive.origin is None:
+                continue
+
+            self.add(archive_path, archive.origin, archive.backend_name,
+                     archive.category, archive.created_on)
+
+    def search(self, origin, backend_name, category, archived_after):
+        """Search archives in the catalog.
+
+        :param origin: data origin
+        :param backend_name: backed used to fetch data
+        :param category: type of the items fetched by the backend
+        :param archived_after: get archives created on or after this date
+
+        :returns: a list with the paths of the archives that match the
+            search criteria, sorted by their date of creation
+        """
+        self.resolve()
+
+        select_stmt = "SELECT archive_path FROM " + self.CATALOG_TABLE + " " \
+                      "WHERE origin = ? AND backend_name = ? AND category = ? " \
+                      "AND created_on >= ? " \
+                      "ORDER BY created_on, archive_path"
+        params = (origin, backend_name, category,
+                  datetime_to_utc(archived_after).timestamp())
+
+        archives = []
+
+        for (relpath,) in self._fetchall(select_stmt, params):
+            archive_path = os.path.join(self.dirpath, relpath)
+
+            if not os.path.exists(archive_path):
+                logger.debug("Removing %s from the catalog; archive not found",
+                             archive_path)
+                self.remove(archive_path)
+                continue
+
+            archives.append(archive_path)
+
+        return archives
+
+    def _relpath(self, archive_path):
+        return os.path.relpath(archive_path, self.dirpath)
+
+    def _execute(self, stmt, params):
+        try:
+            cursor = self._db.cursor()
+            cursor.execute(stmt, params)
+            self._db.commit()
+            cursor.close()
+        except sqlite3.DatabaseError as e:
+            msg = "catalog %s error; cause: %s" % (self.catalog_path, str(e))
+            raise ArchiveManagerError(cause=msg)
+
+    def _fetchall(self, stmt, params):
+        try:
+            cursor = self._db.cursor()
+            cursor.execute(stmt, params)
+            rows = cursor.fetchall()
+            cursor.close()
+        except sqlite3.DatabaseError as e:
+            msg = "catalog %s error; cause: %s" % (self.catalog_path, str(e))
+            raise ArchiveManagerError(cause=msg)
+
+        return rows
+
+
 class ArchiveManager:
     """Manager for handling archives in Perceval.
 
@@ -354,17 +852,44 @@ class ArchiveManager:
     be the name of the subdirectory; the remaining bytes, the archive
     name.
 
+    New archives will buffer their writes when `batch_size` or
+    `batch_interval` are set. See `Archive` for more information.
+
+    Archives are indexed in a catalog (see `ArchiveCatalog`), stored
+    in the same directory, which is used to search them. The catalog
+    is updated when archives are created or removed through the
+    manager. When it is created for the first time, or when it gets
+    out of sync with the files on disk, call `rebuild_catalog`. From
+    the command line, the catalog is rebuilt with the
+    `--rebuild-archive-catalog` argument.
+
     :param: dirpath: path where the archives are stored
+    :param batch_size: maximum number of entries staged before
+        committing them
+    :param batch_interval: maximum number of seconds to wait before
+        committing staged entries
     """
 
     STORAGE_EXT = '.sqlite3'
+    JOURNAL_EXTS = ['-wal', '-shm', '-journal']
+    CATALOG_NAME = '.catalog'
 
-    def __init__(self, dirpath):
+    def __init__(self, dirpath, batch_size=Archive.DEFAULT_BATCH_SIZE, batch_interval=None):
         self.dirpath = dirpath
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
 
         if not os.path.exists(self.dirpath):
             os.makedirs(self.dirpath)
 
+        catalog_path = os.path.join(self.dirpath, self.CATALOG_NAME)
+        is_new_catalog = not os.path.exists(catalog_path)
+
+        self.catalog = ArchiveCatalog(self.dirpath, catalog_path)
+
+        if is_new_catalog:
+            self.rebuild_catalog()
+
     def create_archive(self):
         """Create a new archive.
 
@@ -387,17 +912,21 @@ class ArchiveManager:
             os.makedirs(archive_dir)
 
         try:
-            archive = Archive.create(archive_path)
+            archive = Archive.create(archive_path,
+                                     batch_size=self.batch_size,
+                                     batch_interval=self.batch_interval)
         except ArchiveError as e:
             raise ArchiveManagerError(cause=str(e))
 
+        self.catalog.add(archive_path)
+
         return archive
 
     def remove_archive(self, archive_path):
         """Remove an archive.
 
         This method deletes from the filesystem the archive stored
-        in `archive_path`.
+        in `archive_path`, together with its journal files, if any.
 
         :param archive_path: path to the archive
 
@@ -410,6 +939,76 @@ class ArchiveManager:
             raise ArchiveManagerError(cause=str(e))
 
         os.remove(archive_path)
+        self.catalog.remove(archive_path)
+
+        for ext in self.JOURNAL_EXTS:
+            journal_path = archive_path + ext
+            if os.path.exists(journal_path):
+                os.remove(journal_path)
+
+    def compact_archive(self, archive_path):
+        """Compact an archive.
+
+        This method rewrites in place the entries of the archive stored
+        in `archive_path` using the current storage codec, reclaiming
+        the disk space used by entries serialized with older formats.
+
+        :param archive_path: path to the archive
+
+        :returns: the number of rewritten entries
+
+        :raises ArchiveManangerError: when an error occurs compacting the
+            archive
+        """
+        try:
+            archive = Archive(archive_path)
+            nrewritten = archive.compact()
+        except ArchiveError as e:
+            raise ArchiveManagerError(cause=str(e))
+
+        return nrewritten
+
+    def compact_archives(self):
+        """Compact every archive stored by this manager.
+
+        Invalid archives are ignored.
+
+        :returns: the number of rewritten entries
+        """
+        nrewritten = 0
+
+        for archive_path in self._search_files():
+            try:
+                nrewritten += self.compact_archive(archive_path)
+            except ArchiveManagerError as e:
+                logger.warning("Ignoring %s archive due to: %s", archive_path, str(e))
+
+        return nrewritten
+
+    def rebuild_catalog(self):
+        """Rebuild the catalog of archives.
+
+        The catalog is emptied and filled again with the archives
+        found on the directory of the manager. Invalid archives
+        are ignored.
+
+        :returns: the number of archives registered in the catalog
+        """
+        logger.debug("Rebuilding catalog of archives in %s", self.dirpath)
+
+        self.catalog.clear()
+
+        narchives = 0
+
+        for archive_path, archive in self._search_archives():
+            self.catalog.add(archive_path, archive.origin, archive.backend_name,
+                             archive.category, archive.created_on)
+            narchives += 1
+
+        logger.debug("Catalog of archives in %s rebuilt; %s archives found",
+                     self.dirpath, narchives)
+
+        return narchives
 
     def search(self, origin, backend_name, category, archived_after):
         """Search archives.
@@ -430,15 +1029,12 @@ class ArchiveManager:
 
         :returns: a list with archive names which match the search criteria
         """
-        archives = self._search_archives(origin, backend_name,
-                                         category, archived_after)
-        archives = [(fp, date) for fp, date in archives]
-        archives = [fp for fp, _ in sorted(archives, key=lambda x: x[1])]
-
+        archives = self.catalog.search(origin, backend_name,
+                                       category, archived_after)
         return archives
 
-    def _search_archives(self, origin, backend_name, category, archived_after):
-        """Search archives using filters."""
+    def _search_archives(self):
+        """Search the valid archives stored under the base path."""
 
         for archive_path in self._search_files():
             try:
@@ -446,20 +1042,14 @@ class ArchiveManager:
             except ArchiveError:
                 continue
 
-            match = archive.origin == origin and \
-                archive.backend_name == backend_name and \
-                archive.category == category and \
-                archive.created_on >= archived_after
-
-            if not match:
-                continue
-
-            yield archive_path, archive.created_on
+            yield archive_path, archive
 
     def _search_files(self):
         """Retrieve the file paths stored under the base path."""
 
         for root, _, files in os.walk(self.dirpath):
             for filename in files:
+                if filename.startswith(self.CATALOG_NAME):
+                    continue
                 location = os.path.join(root, filename)
                 yield location
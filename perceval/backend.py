@@ -26,12 +26,15 @@
 
 import argparse
 import collections
+import concurrent.futures
 import hashlib
 import importlib
 import json
 import logging
+import multiprocessing
 import os
 import pkgutil
+import queue
 import sys
 
 from grimoirelab_toolkit.introspect import find_signature_parameters
@@ -49,6 +52,16 @@ logger = logging.getLogger(__name__)
 ARCHIVES_DEFAULT_PATH = '~/.perceval/archives/'
 DEFAULT_SEARCH_FIELD = 'item_id'
 
+# Parallel replay of archives
+REPLAY_CHUNK_SIZE = 100
+REPLAY_QUEUE_SIZE = 10
+REPLAY_POLL_TIMEOUT = 1
+
+_REPLAY_ITEMS = 'items'
+_REPLAY_DONE = 'done'
+_REPLAY_ARCHIVE_ERROR = 'archive_error'
+_REPLAY_FAILURE = 'failure'
+
 OriginUniqueField = collections.namedtuple('OriginUniqueField', 'name type')
 
 
@@ -223,14 +236,19 @@ class Backend:
 
         self.client = self._init_client()
 
-        for item in self.fetch_items(category, **kwargs):
-            if filter_classified:
-                item = self.filter_classified_data(item)
+        try:
+            for item in self.fetch_items(category, **kwargs):
+                if filter_classified:
+                    item = self.filter_classified_data(item)
 
-            metadata_item = self.metadata(item, filter_classified=filter_classified)
-            self.summary.update(metadata_item)
+                metadata_item = self.metadata(item, filter_classified=filter_classified)
+                self.summary.update(metadata_item)
 
-            yield metadata_item
+                yield metadata_item
+        finally:
+            # Write entries staged by buffered archives
+            if self.archive:
+                self.archive.flush()
 
     def fetch_from_archive(self):
         """Fetch the questions from an archive.
@@ -515,6 +533,8 @@ class BackendCommandArgumentParser:
             raise AttributeError("fetch-archive and no-archive arguments are not compatible")
         if self._archive and parsed_args.fetch_archive and not parsed_args.category:
             raise AttributeError("fetch-archive needs a category to work with")
+        if self._archive and parsed_args.rebuild_archive_catalog and parsed_args.no_archive:
+            raise AttributeError("rebuild-archive-catalog and no-archive arguments are not compatible")
 
         # Set aliases
         for alias, arg in self.aliases.items():
@@ -550,6 +570,19 @@ class BackendCommandArgumentParser:
                            help="fetch data from the archives")
         group.add_argument('--archived-since', dest='archived_since', default='1970-01-01',
                            help="retrieve items archived since the given date")
+        group.add_argument('--rebuild-archive-catalog', dest='rebuild_archive_catalog', action='store_true',
+                           help="register the archives found on the archive path before using them")
+        group.add_argument('--archive-batch-size', dest='archive_batch_size',
+                           type=int, default=Archive.DEFAULT_BATCH_SIZE,
+                           help="number of entries committed together to the archive")
+        group.add_argument('--archive-batch-interval', dest='archive_batch_interval',
+                           type=float, default=None,
+                           help="max seconds to wait before committing archive entries")
+        group.add_argument('--archive-workers', dest='archive_workers',
+                           type=int, default=None,
+                           help="number of processes used to fetch data from the archives")
+        group.add_argument('--archive-unordered', dest='archive_ordered', action='store_false',
+                           help="do not keep the order of the archives when using several workers")
 
     def _set_output_arguments(self):
         """Activate output arguments parsing"""
@@ -608,12 +641,16 @@ class BackendCommand:
         filter_classified = backend_args.pop('filter_classified', False)
         fetch_archive = self.archive_manager and self.parsed_args.fetch_archive
         archived_since = backend_args.pop('archived_since', None)
+        archive_workers = backend_args.pop('archive_workers', None)
+        archive_ordered = backend_args.pop('archive_ordered', True)
 
         with BackendItemsGenerator(self.BACKEND, backend_args, category,
                                    filter_classified=filter_classified,
                                    manager=self.archive_manager,
                                    fetch_archive=fetch_archive,
-                                   archived_after=archived_since) as big:
+                                   archived_after=archived_since,
+                                   archive_workers=archive_workers,
+                                   archive_ordered=archive_ordered) as big:
             try:
                 for item in big.items:
                     if self.json_line:
@@ -650,7 +687,12 @@ class BackendCommand:
             else:
                 archive_path = self.parsed_args.archive_path
 
-            manager = ArchiveManager(archive_path)
+            manager = ArchiveManager(archive_path,
+                                     batch_size=self.parsed_args.archive_batch_size,
+                                     batch_interval=self.parsed_args.archive_batch_interval)
+
+            if self.parsed_args.rebuild_archive_catalog:
+                manager.rebuild_catalog()
 
         self.archive_manager = manager
 
@@ -721,10 +763,16 @@ class BackendItemsGenerator:
     :param manager: archive manager where the items will be retrieved
     :param fetch_archive: If enabled, items are fetched from archives
     :param archived_after: return items archived after this date
+    :param archive_workers: number of processes used to fetch items
+        from archives; when it is not set, archives are read one
+        after another in this process
+    :param archive_ordered: when several workers are used, return
+        the items following the creation order of the archives
     """
     def __init__(self, backend_class, backend_args, category,
                  filter_classified=False, manager=None,
-                 fetch_archive=False, archived_after=None):
+                 fetch_archive=False, archived_after=None,
+                 archive_workers=None, archive_ordered=True):
         init_args = find_signature_parameters(backend_class.__init__,
                                               backend_args)
 
@@ -737,7 +785,10 @@ class BackendItemsGenerator:
                                  manager=manager)
         else:
             self.backend = backend_class(**init_args)
-            items = self.__fetch_from_archive(category, manager, archived_after)
+            items = self.__fetch_from_archive(category, manager, archived_after,
+                                              init_args=init_args,
+                                              workers=archive_workers,
+                                              ordered=archive_ordered)
 
         self.items = items
 
@@ -793,16 +844,23 @@ class BackendItemsGenerator:
                 manager.remove_archive(archive_path)
             raise e
 
-    def __fetch_from_archive(self, category, manager, archived_after):
+    def __fetch_from_archive(self, category, manager, archived_after,
+                             init_args=None, workers=None, ordered=True):
         """Fetch items from an archive manager.
 
         Generator to get the items of a category (previously fetched
         by the backend) from an archive manager. Only those items
         archived after the given date will be returned.
 
+        When `workers` is set, archives are read in parallel using
+        that number of processes (see `fetch_from_archive`).
+
         :param category: category of the items to retrieve
         :param manager: archive manager where the items will be retrieved
         :param archived_after: return items archived after this date
+        :param init_args: arguments needed to initialize the backend
+        :param workers: number of processes used to read the archives
+        :param ordered: return the items following the order of the archives
 
         :returns: a generator of archived items
         """
@@ -811,6 +869,15 @@ class BackendItemsGenerator:
                                    category,
                                    archived_after)
 
+        if workers:
+            self.backend._summary = Summary()
+            items = _fetch_from_archives_in_parallel(self.backend.__class__, init_args,
+                                                     filepaths, workers, ordered=ordered,
+                                                     summary=self.backend.summary)
+            for item in items:
+                yield item
+            return
+
         for filepath in filepaths:
             self.backend.archive = Archive(filepath)
             items = self.backend.fetch_from_archive()
@@ -952,7 +1019,7 @@ def fetch(backend_class, backend_args, category, filter_classified=False,
 
 
 def fetch_from_archive(backend_class, backend_args, manager,
-                       category, archived_after):
+                       category, archived_after, workers=None, ordered=True):
     """Fetch items from an archive manager.
 
     Generator to get the items of a category (previously fetched
@@ -962,11 +1029,21 @@ def fetch_from_archive(backend_class, backend_args, manager,
     The parameters needed to initialize `backend` and get the
     items are given using `backend_args` dict parameter.
 
+    Archives are read one after another unless `workers` is set.
+    In that case, archives are distributed among a pool of `workers`
+    processes, which send back their items through bounded queues.
+    By default, items are returned following the creation order of
+    the archives; set `ordered` to `False` to get them as soon as
+    any worker produces them. As in the sequential mode, archives
+    that raise an `ArchiveError` are ignored.
+
     :param backend_class: backend class to retrive items
     :param backend_args: dict of arguments needed to retrieve the items
     :param manager: archive manager where the items will be retrieved
     :param category: category of the items to retrieve
     :param archived_after: return items archived after this date
+    :param workers: number of processes used to read the archives
+    :param ordered: return the items following the order of the archives
 
     :returns: a generator of archived items
     """
@@ -979,6 +1056,13 @@ def fetch_from_archive(backend_class, backend_args, manager,
                                category,
                                archived_after)
 
+    if workers:
+        items = _fetch_from_archives_in_parallel(backend_class, init_args,
+                                                 filepaths, workers, ordered=ordered)
+        for item in items:
+            yield item
+        return
+
     for filepath in filepaths:
         backend.archive = Archive(filepath)
         items = backend.fetch_from_archive()
@@ -990,6 +1074,153 @@ def fetch_from_archive(backend_class, backend_args, manager,
             logger.warning("Ignoring %s archive due to: %s", filepath, str(e))
 
 
+def _fetch_from_archives_in_parallel(backend_class, init_args, filepaths,
+                                     workers, ordered=True, summary=None):
+    """Fetch items from a list of archives using a pool of processes.
+
+    Each archive is read by a worker process, which sends its items
+    in chunks through a bounded queue. At most `workers` archives are
+    read at the same time. When `ordered` is set, each archive has
+    its own queue and these queues are consumed following the order
+    of `filepaths`; otherwise, all the workers share the same queue.
+    When the generator is closed or a worker fails, the workers are
+    told to stop and their queues are emptied, so none of them keeps
+    waiting to send its items.
+
+    :param backend_class: backend class to retrieve items
+    :param init_args: dict of arguments needed to initialize the backend
+    :param filepaths: list of archive paths
+    :param workers: number of worker processes
+    :param ordered: return the items following the order of `filepaths`
+    :param summary: summary updated with the items returned
+
+    :returns: a generator of archived items
+    """
+    pending = collections.deque(filepaths)
+    inflight = collections.deque()
+
+    with multiprocessing.Manager() as mp_manager, \
+            concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        shared_queue = None if ordered else mp_manager.Queue(REPLAY_QUEUE_SIZE * workers)
+        stop = mp_manager.Event()
+
+        def submit_next():
+            filepath = pending.popleft()
+            items_queue = shared_queue or mp_manager.Queue(REPLAY_QUEUE_SIZE)
+            future = executor.submit(_replay_archive, backend_class, init_args,
+                                     filepath, items_queue, stop)
+            inflight.append((filepath, items_queue, future))
+
+        try:
+            for _ in range(min(workers, len(pending))):
+                submit_next()
+
+            while inflight:
+                if ordered:
+                    _, items_queue, future = inflight[0]
+                    futures = [future]
+                else:
+                    items_queue = shared_queue
+                    futures = [future for _, _, future in inflight]
+
+                filepath, kind, content = _get_replay_message(items_queue, futures)
+
+                if kind == _REPLAY_ITEMS:
+                    for item in content:
+                        if summary:
+                            summary.update(item)
+                        yield item
+                    continue
+
+                if kind == _REPLAY_ARCHIVE_ERROR:
+                    logger.warning("Ignoring %s archive due to: %s", filepath, content)
+                elif kind == _REPLAY_FAILURE:
+                    raise content
+
+                if ordered:
+                    inflight.popleft()
+                else:
+                    for i, (fp, _, _) in enumerate(inflight):
+                        if fp == filepath:
+                            del inflight[i]
+                            break
+                if pending:
+                    submit_next()
+        finally:
+            stop.set()
+
+            for _, items_queue, future in inflight:
+                future.cancel()
+                _drain_queue(items_queue)
+
+
+def _drain_queue(items_queue):
+    """Remove the messages waiting in a queue"""
+
+    while True:
+        try:
+            items_queue.get_nowait()
+        except queue.Empty:
+            return
+
+
+def _get_replay_message(items_queue, futures):
+    """Wait for the next message sent by the replay workers.
+
+    While waiting, the futures of the workers are checked to
+    detect whether any of them died without notifying it.
+    """
+    while True:
+        try:
+            return items_queue.get(timeout=REPLAY_POLL_TIMEOUT)
+        except queue.Empty:
+            for future in futures:
+                if future.done() and future.exception():
+                    raise future.exception()
+
+
+def _replay_archive(backend_class, init_args, filepath, items_queue, stop):
+    """Read the items of an archive within a worker process.
+
+    Items are sent in chunks of `REPLAY_CHUNK_SIZE` using `items_queue`.
+    A final message notifies whether the archive was read successfully,
+    it raised an `ArchiveError` or it failed due to any other error.
+    The worker gives up when `stop` is set.
+    """
+    def send(message):
+        while not stop.is_set():
+            try:
+                items_queue.put(message, timeout=REPLAY_POLL_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    chunk = []
+
+    try:
+        backend = backend_class(**init_args)
+        backend.archive = Archive(filepath)
+
+        for item in backend.fetch_from_archive():
+            chunk.append(item)
+
+            if len(chunk) >= REPLAY_CHUNK_SIZE:
+                if not send((filepath, _REPLAY_ITEMS, chunk)):
+                    return
+                chunk = []
+    except ArchiveError as e:
+        result = (filepath, _REPLAY_ARCHIVE_ERROR, str(e))
+    except Exception as e:
+        result = (filepath, _REPLAY_FAILURE, e)
+    else:
+        result = (filepath, _REPLAY_DONE, None)
+
+    if chunk and not send((filepath, _REPLAY_ITEMS, chunk)):
+        return
+    send(result)
+
+
 def find_backends(top_package):
     """Find available backends.
 
@@ -24,12 +24,15 @@
 #     Harshal Mittal <harshalmittal4@gmail.com>
 #
 
+import collections
+import concurrent.futures
 import csv
 import datetime
+import html.parser
+import itertools
 import logging
 import re
 
-import bs4
 import dateutil.tz
 
 from grimoirelab_toolkit.datetime import str_to_datetime
@@ -39,11 +42,12 @@ from ...backend import (Backend,
                         BackendCommandArgumentParser)
 from ...client import HttpClient
 from ...errors import BackendError, ParseError
-from ...utils import DEFAULT_DATETIME, xml_to_dict
+from ...utils import DEFAULT_DATETIME, xml_iterparse
 
 CATEGORY_BUG = "bug"
 MAX_BUGS = 200  # Maximum number of bugs per query
 MAX_BUGS_CSV = 10000  # Maximum number of bugs per CSV query
+DEFAULT_MAX_WORKERS = 1
 
 logger = logging.getLogger(__name__)
 
@@ -60,11 +64,14 @@ class Bugzilla(Backend):
     :param user: Bugzilla user
     :param password: Bugzilla user password
     :param max_bugs: maximum number of bugs requested on the same query
+    :param max_bugs_csv: maximum number of bugs requested on CSV queries
     :param tag: label used to mark the data
     :param archive: archive to store/retrieve items
     :param ssl_verify: enable/disable SSL verification
+    :param max_workers: number of threads used to fetch the activity
+        of the bugs
     """
-    version = '0.12.0'
+    version = '0.13.0'
 
     CATEGORIES = [CATEGORY_BUG]
     EXTRA_SEARCH_FIELDS = {
@@ -74,7 +81,8 @@ class Bugzilla(Backend):
 
     def __init__(self, url, user=None, password=None,
                  max_bugs=MAX_BUGS, max_bugs_csv=MAX_BUGS_CSV,
-                 tag=None, archive=None, ssl_verify=True):
+                 tag=None, archive=None, ssl_verify=True,
+                 max_workers=DEFAULT_MAX_WORKERS):
         origin = url
 
         super().__init__(origin, tag=tag, archive=archive, ssl_verify=ssl_verify)
@@ -84,6 +92,7 @@ class Bugzilla(Backend):
         self.max_bugs_csv = max_bugs_csv
         self.client = None
         self.max_bugs = max(1, max_bugs)
+        self.max_workers = max(1, max_workers)
 
     def fetch(self, category=CATEGORY_BUG, from_date=DEFAULT_DATETIME):
         """Fetch the bugs from the repository.
@@ -118,26 +127,37 @@ class Bugzilla(Backend):
         logger.info("Looking for bugs: '%s' updated from '%s'",
                     self.url, str(from_date))
 
-        buglist = [bug for bug in self.__fetch_buglist(from_date)]
+        # The list of bugs is consumed in chunks while it is fetched,
+        # so the full list is never kept in memory
+        buglist = self.__fetch_buglist(from_date)
+
+        if self.max_workers > 1:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+        else:
+            executor = None
 
         nbugs = 0
-        tbugs = len(buglist)
 
-        for i in range(0, tbugs, self.max_bugs):
-            chunk = buglist[i:i + self.max_bugs]
-            bugs_ids = [b['bug_id'] for b in chunk]
+        try:
+            while True:
+                chunk = [bug for bug in itertools.islice(buglist, self.max_bugs)]
 
-            logger.info("Fetching bugs: %s/%s", i, tbugs)
-            bugs = self.__fetch_and_parse_bugs_details(bugs_ids)
+                if not chunk:
+                    break
 
-            for bug in bugs:
-                bug_id = bug['bug_id'][0]['__text__']
-                bug['activity'] = self.__fetch_and_parse_bug_activity(bug_id)
-                nbugs += 1
-                yield bug
+                bugs_ids = [b['bug_id'] for b in chunk]
+
+                logger.info("Fetching bugs: %s-%s", nbugs, nbugs + len(chunk))
+                bugs = self.__fetch_and_parse_bugs_details(bugs_ids)
 
-        logger.info("Fetch process completed: %s/%s bugs fetched",
-                    nbugs, tbugs)
+                for bug in self.__fetch_bugs_activity(bugs, executor):
+                    nbugs += 1
+                    yield bug
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
+
+        logger.info("Fetch process completed: %s bugs fetched", nbugs)
 
     @classmethod
     def has_archiving(cls):
@@ -211,7 +231,8 @@ class Bugzilla(Backend):
 
         This method returns a generator which parses the given XML,
         producing an iterator of dictionaries. Each dictionary stores
-        the information related to a parsed bug.
+        the information related to a parsed bug. Bugs are returned as
+        soon as they are parsed.
 
         If the given XML is invalid or does not contains any bug, the
         method will raise a ParseError exception.
@@ -223,15 +244,16 @@ class Bugzilla(Backend):
         :raises ParseError: raised when an error occurs parsing
             the given XML stream
         """
-        bugs = xml_to_dict(raw_xml)
+        nbugs = 0
+
+        for bug in xml_iterparse(raw_xml, 'bug'):
+            nbugs += 1
+            yield bug
 
-        if 'bug' not in bugs:
+        if not nbugs:
             cause = "No bugs found. XML stream seems to be invalid."
             raise ParseError(cause=cause)
 
-        for bug in bugs['bug']:
-            yield bug
-
     @staticmethod
     def parse_bug_activity(raw_html):
         """Parse a Bugzilla bug activity HTML stream.
@@ -250,63 +272,57 @@ class Bugzilla(Backend):
         :raises ParseError: raised when an error occurs parsing
             the given HTML stream
         """
-        def is_activity_empty(bs):
-            EMPTY_ACTIVITY = "No changes have been made to this (?:bug|issue) yet."
-            tag = bs.find(text=re.compile(EMPTY_ACTIVITY))
-            return tag is not None
-
-        def find_activity_table(bs):
-            # The first table with 5 columns is the table of activity
-            tables = bs.find_all('table')
-
-            for tb in tables:
-                nheaders = len(tb.tr.find_all('th', recursive=False))
-                if nheaders == 5:
-                    return tb
-            raise ParseError(cause="Table of bug activity not found.")
-
-        def remove_tags(bs):
-            HTML_TAGS_TO_REMOVE = ['a', 'i', 'span']
-
-            for tag in bs.find_all(HTML_TAGS_TO_REMOVE):
-                tag.replaceWith(tag.text)
-
-        def format_text(bs):
-            strings = [s.strip(' \n\t') for s in bs.stripped_strings]
-            s = ' '.join(strings)
+        def format_text(cell):
+            strings = [s.strip().strip(' \n\t') for s in cell['strings']]
+            s = ' '.join([s for s in strings if s])
             return s
 
         # Parsing starts here
-        bs = bs4.BeautifulSoup(raw_html, 'html.parser')
+        activity_parser = _BugActivityParser()
+        activity_parser.feed(raw_html)
+        activity_parser.close()
 
-        if is_activity_empty(bs):
+        if activity_parser.empty:
             fields = []
         else:
-            activity_tb = find_activity_table(bs)
-            remove_tags(activity_tb)
-            fields = activity_tb.find_all('td')
+            activity_tb = activity_parser.activity_table()
+
+            if not activity_tb:
+                raise ParseError(cause="Table of bug activity not found.")
+            fields = activity_tb['cells']
 
-        while fields:
+        nfields = len(fields)
+        i = 0
+
+        while i < nfields:
             # First two fields: 'Who' and 'When'.
-            who = fields.pop(0)
-            when = fields.pop(0)
+            who = fields[i]
 
             # The attribute 'rowspan' of 'who' field tells how many
             # changes were made on the same date.
-            n = int(who.get('rowspan'))
+            try:
+                n = int(who['attrs'].get('rowspan'))
+            except (TypeError, ValueError):
+                raise ParseError(cause="Invalid number of changes on bug activity.")
+
+            if i + 2 + n * 3 > nfields:
+                raise ParseError(cause="Bug activity table is truncated.")
+
+            who = format_text(who)
+            when = format_text(fields[i + 1])
+            i += 2
 
             # Next fields are split into chunks of three elements:
             # 'What', 'Removed' and 'Added'. These chunks share
             # 'Who' and 'When' values.
+
             for _ in range(n):
-                what = fields.pop(0)
-                removed = fields.pop(0)
-                added = fields.pop(0)
-                event = {'Who': format_text(who),
-                         'When': format_text(when),
-                         'What': format_text(what),
-                         'Removed': format_text(removed),
-                         'Added': format_text(added)}
+                event = {'Who': who,
+                         'When': when,
+                         'What': format_text(fields[i]),
+                         'Removed': format_text(fields[i + 1]),
+                         'Added': format_text(fields[i + 2])}
+                i += 3
                 yield event
 
     def _init_client(self, from_archive=False):
@@ -320,17 +336,15 @@ class Bugzilla(Backend):
         buglist = self.__fetch_and_parse_buglist_page(from_date)
 
         while buglist:
-            bug = buglist.pop(0)
-            last_date = bug['changeddate']
-            yield bug
+            yield from buglist
 
             # Bugzilla does not support pagination. Due to this,
             # the next list of bugs is requested adding one second
             # to the last date obtained.
-            if not buglist:
-                from_date = str_to_datetime(last_date)
-                from_date += datetime.timedelta(seconds=1)
-                buglist = self.__fetch_and_parse_buglist_page(from_date)
+            last_date = buglist[-1]['changeddate']
+            from_date = str_to_datetime(last_date)
+            from_date += datetime.timedelta(seconds=1)
+            buglist = self.__fetch_and_parse_buglist_page(from_date)
 
     def __fetch_and_parse_buglist_page(self, from_date):
         logger.debug("Fetching and parsing buglist page from %s", str(from_date))
@@ -343,6 +357,35 @@ class Bugzilla(Backend):
         raw_bugs = self.client.bugs(*bug_ids)
         return self.parse_bugs_details(raw_bugs)
 
+    def __fetch_bugs_activity(self, bugs, executor=None):
+        """Set the activity of the bugs, keeping their order.
+
+        When a pool of threads is given, the activity of the bugs
+        is requested concurrently as soon as they are parsed.
+        """
+        if not executor:
+            for bug in bugs:
+                bug_id = bug['bug_id'][0]['__text__']
+                bug['activity'] = self.__fetch_and_parse_bug_activity(bug_id)
+                yield bug
+            return
+
+        pending = collections.deque()
+
+        try:
+            for bug in bugs:
+                bug_id = bug['bug_id'][0]['__text__']
+                future = executor.submit(self.__fetch_and_parse_bug_activity, bug_id)
+                pending.append((bug, future))
+
+            while pending:
+                bug, future = pending.popleft()
+                bug['activity'] = future.result()
+                yield bug
+        finally:
+            for _, future in pending:
+                future.cancel()
+
     def __fetch_and_parse_bug_activity(self, bug_id):
         logger.debug("Fetching and parsing bug #%s activity", bug_id)
         raw_activity = self.client.bug_activity(bug_id)
@@ -373,6 +416,9 @@ class BugzillaCommand(BackendCommand):
         group.add_argument('--max-bugs-csv', dest='max_bugs_csv',
                            type=int, default=MAX_BUGS_CSV,
                            help="Maximum number of bugs requested on CSV queries")
+        group.add_argument('--max-workers', dest='max_workers',
+                           type=int, default=DEFAULT_MAX_WORKERS,
+                           help="Number of threads used to fetch the activity of the bugs")
 
         # Required arguments
         parser.parser.add_argument('url',
@@ -600,3 +646,147 @@ class BugzillaClient(HttpClient):
         else:
             cause = "Bugzilla client could not determine the server version"
             raise BackendError(cause=cause)
+
+
+class _BugActivityParser(html.parser.HTMLParser):
+    """Scanner of the tables of a Bugzilla bug activity HTML page.
+
+    Instead of building the tree of the whole document, this parser
+    only keeps the stack of open elements. For each table found, it
+    stores its cells (`td` elements), including the ones of nested
+    tables, and the number of headers of its first row. The text of
+    a cell is kept as a list of strings where the text of each `a`,
+    `i` or `span` element is joined into a single string.
+
+    It also checks whether the page says the bug has no activity.
+    """
+    EMPTY_ACTIVITY_REGEX = re.compile("No changes have been made to this (?:bug|issue) yet.")
+
+    INLINE_TAGS = frozenset(['a', 'i', 'span'])
+    RAW_TEXT_TAGS = frozenset(['script', 'style'])
+    VOID_TAGS = frozenset(['area', 'base', 'br', 'col', 'embed', 'hr',
+                           'img', 'input', 'link', 'meta', 'param',
+                           'source', 'track', 'wbr'])
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.empty = False
+        self.tables = []
+        self._elements = []
+        self._open_tables = []
+        self._open_cells = []
+        self._text = []
+
+    def activity_table(self):
+        """Return the first table with five headers on its first row"""
+
+        for table in self.tables:
+            if table['nheaders'] == 5:
+                return table
+        return None
+
+    def handle_starttag(self, tag, attrs):
+        self.__flush_text()
+
+        if tag in self.VOID_TAGS:
+            return
+
+        parent = self._elements[-1] if self._elements else None
+        element = {'tag': tag}
+
+        if tag == 'table':
+            table = {'row': None, 'nheaders': 0, 'cells': [], 'inline': 0}
+            self.tables.append(table)
+            self._open_tables.append(table)
+        elif tag == 'tr':
+            for table in self._open_tables:
+                if table['row'] is None:
+                    table['row'] = element
+        elif tag == 'th':
+            for table in self._open_tables:
+                if parent is not None and table['row'] is parent:
+                    table['nheaders'] += 1
+        elif tag == 'td':
+            cell = {'attrs': dict(attrs), 'strings': [], 'inline': 0, 'buffer': []}
+            for table in self._open_tables:
+                if not table['inline']:
+                    table['cells'].append(cell)
+            self._open_cells.append(cell)
+        elif tag in self.INLINE_TAGS:
+            for table in self._open_tables:
+                table['inline'] += 1
+            for cell in self._open_cells:
+                cell['inline'] += 1
+
+        self._elements.append(element)
+
+    def handle_endtag(self, tag):
+        self.__flush_text()
+
+        # Close the most recent element with this tag and the
+        # elements opened after it; ignore the tag when there
+        # is not any open element to close.
+        for pos in range(len(self._elements) - 1, -1, -1):
+            if self._elements[pos]['tag'] == tag:
+                break
+        else:
+            return
+
+        while len(self._elements) > pos:
+            self.__close_element(self._elements.pop())
+
+    def handle_data(self, data):
+        # The parser can split a piece of text into several calls
+        self._text.append(data)
+
+    def handle_comment(self, data):
+        self.__flush_text()
+
+    def handle_decl(self, decl):
+        self.__flush_text()
+
+    def handle_pi(self, data):
+        self.__flush_text()
+
+    def close(self):
+        super().close()
+        self.__flush_text()
+
+        while self._elements:
+            self.__close_element(self._elements.pop())
+
+    def __flush_text(self):
+        if not self._text:
+            return
+
+        text = ''.join(self._text)
+        self._text = []
+
+        if not self.empty and self.EMPTY_ACTIVITY_REGEX.search(text):
+            self.empty = True
+
+        if self._elements and self._elements[-1]['tag'] in self.RAW_TEXT_TAGS:
+            return
+
+        for cell in self._open_cells:
+            if cell['inline']:
+                cell['buffer'].append(text)
+            else:
+                cell['strings'].append(text)
+
+    def __close_element(self, element):
+        tag = element['tag']
+
+        if tag == 'table':
+            self._open_tables.pop()
+        elif tag == 'td':
+            self._open_cells.pop()
+        elif tag in self.INLINE_TAGS:
+            for table in self._open_tables:
+                table['inline'] -= 1
+            for cell in self._open_cells:
+                cell['inline'] -= 1
+
+                if not cell['inline']:
+                    cell['strings'].append(''.join(cell['buffer']))
+                    cell['buffer'] = []
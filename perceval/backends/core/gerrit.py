@@ -26,8 +26,11 @@
 
 import json
 import logging
+import os
 import re
+import shutil
 import subprocess
+import tempfile
 import time
 
 from grimoirelab_toolkit.datetime import datetime_to_utc
@@ -43,6 +46,7 @@ CATEGORY_REVIEW = "review"
 
 MAX_REVIEWS = 500  # Maximum number of reviews per query
 PORT = '29418'
+SSH_CONTROL_PERSIST = 60  # Seconds the shared SSH connection is kept open when idle
 
 logger = logging.getLogger(__name__)
 
@@ -62,8 +66,10 @@ class Gerrit(Backend):
     :param tag: label used to mark the data
     :param archive: archive to store/retrieve items
     :param blacklist_ids: exclude the reviews while fetching
+    :param ssh_multiplexing: reuse the same SSH connection for all
+        the commands and parse the reviews while they are received
     """
-    version = '0.13.0'
+    version = '0.14.0'
 
     CATEGORIES = [CATEGORY_REVIEW]
     EXTRA_SEARCH_FIELDS = {
@@ -75,7 +81,8 @@ class Gerrit(Backend):
     def __init__(self, hostname,
                  user=None, port=PORT, max_reviews=MAX_REVIEWS,
                  disable_host_key_check=False,
-                 tag=None, archive=None, blacklist_ids=None):
+                 tag=None, archive=None, blacklist_ids=None,
+                 ssh_multiplexing=False):
         origin = hostname
 
         super().__init__(origin, tag=tag, archive=archive, blacklist_ids=blacklist_ids)
@@ -85,6 +92,7 @@ class Gerrit(Backend):
         self.max_reviews = max(1, max_reviews)
         self.blacklist_ids = blacklist_ids
         self.disable_host_key_check = disable_host_key_check
+        self.ssh_multiplexing = ssh_multiplexing
         self.archive = archive
         self.client = None
 
@@ -117,13 +125,16 @@ class Gerrit(Backend):
         """
         from_date = kwargs['from_date']
 
-        if self.client.version[0] == 2 and self.client.version[1] == 8:
-            fetcher = self._fetch_gerrit28(from_date)
-        else:
-            fetcher = self._fetch_gerrit(from_date)
+        try:
+            if self.client.version[0] == 2 and self.client.version[1] == 8:
+                fetcher = self._fetch_gerrit28(from_date)
+            else:
+                fetcher = self._fetch_gerrit(from_date)
 
-        for review in fetcher:
-            yield review
+            for review in fetcher:
+                yield review
+        finally:
+            self.client.close()
 
     @classmethod
     def has_archiving(cls):
@@ -173,23 +184,46 @@ class Gerrit(Backend):
     def parse_reviews(raw_data):
         """Parse a Gerrit reviews list."""
 
-        # Join isolated reviews in JSON in array for parsing
-        items_raw = "[" + raw_data.replace("\n", ",") + "]"
-        items_raw = items_raw.replace(",]", "]")
-        items = json.loads(items_raw)
         reviews = []
 
-        for item in items:
-            if 'project' in item.keys():
-                reviews.append(item)
+        for raw_line in raw_data.split("\n"):
+            review = Gerrit.parse_review(raw_line)
+
+            if review:
+                reviews.append(review)
 
         return reviews
 
+    @staticmethod
+    def parse_review(raw_line):
+        """Parse a line of the output of a Gerrit query.
+
+        Each line of the output is a JSON document. The last one
+        does not contain a review but the stats of the query; in
+        that case, or when the line is empty, it returns `None`.
+
+        :param raw_line: JSON line to parse
+
+        :returns: the parsed review or `None`
+        """
+        raw_line = raw_line.strip()
+
+        if not raw_line:
+            return None
+
+        item = json.loads(raw_line)
+
+        if 'project' not in item:
+            return None
+
+        return item
+
     def _init_client(self, from_archive=False):
 
         return GerritClient(self.hostname, self.user, self.max_reviews,
                             self.blacklist_ids, self.disable_host_key_check,
-                            self.port, self.archive, from_archive)
+                            self.port, self.archive, from_archive,
+                            ssh_multiplexing=self.ssh_multiplexing)
 
     def _fetch_gerrit28(self, from_date=DEFAULT_DATETIME):
         """ Specific fetch for gerrit 2.8 version.
@@ -202,30 +236,19 @@ class Gerrit(Backend):
         from_ut = datetime_to_utc(from_date)
         from_ut = from_ut.timestamp()
 
-        filter_open = "status:open"
-        filter_closed = "status:closed"
-
-        last_item_open = self.client.next_retrieve_group_item()
-        last_item_closed = self.client.next_retrieve_group_item()
-        reviews_open = self._get_reviews(last_item_open, filter_open)
-        reviews_closed = self._get_reviews(last_item_closed, filter_closed)
-        last_nreviews_open = len(reviews_open)
-        last_nreviews_closed = len(reviews_closed)
-
-        while reviews_open or reviews_closed:
-            if reviews_open and reviews_closed:
-                if reviews_open[0]['lastUpdated'] >= reviews_closed[0]['lastUpdated']:
-                    review_open = reviews_open.pop(0)
-                    review = review_open
-                else:
-                    review_closed = reviews_closed.pop(0)
-                    review = review_closed
-            elif reviews_closed:
-                review_closed = reviews_closed.pop(0)
-                review = review_closed
-            else:
-                review_open = reviews_open.pop(0)
+        reviews_open = self._fetch_reviews_pages("status:open")
+        reviews_closed = self._fetch_reviews_pages("status:closed")
+        review_open = next(reviews_open, None)
+        review_closed = next(reviews_closed, None)
+
+        while review_open or review_closed:
+            if review_open and (not review_closed or
+                                review_open['lastUpdated'] >= review_closed['lastUpdated']):
                 review = review_open
+                is_open = True
+            else:
+                review = review_closed
+                is_open = False
 
             updated = review['lastUpdated']
             if updated <= from_ut:
@@ -234,50 +257,77 @@ class Gerrit(Backend):
             else:
                 yield review
 
-            if not reviews_open and last_nreviews_open >= self.max_reviews:
-                last_item_open = self.client.next_retrieve_group_item(last_item_open, review_open)
-                reviews_open = self._get_reviews(last_item_open, filter_open)
-                last_nreviews_open = len(reviews_open)
-            if not reviews_closed and last_nreviews_closed >= self.max_reviews:
-                last_item_closed = self.client.next_retrieve_group_item(last_item_closed, review_closed)
-                reviews_closed = self._get_reviews(last_item_closed, filter_closed)
-                last_nreviews_closed = len(reviews_closed)
+            if is_open:
+                review_open = next(reviews_open, None)
+            else:
+                review_closed = next(reviews_closed, None)
+
+        reviews_open.close()
+        reviews_closed.close()
+
+    def _fetch_reviews_pages(self, filter_):
+        """Get the reviews of the given filter page after page (gerrit 2.8)"""
+
+        last_item = self.client.next_retrieve_group_item()
+
+        while True:
+            nreviews = 0
+            review = None
+
+            for review in self._get_reviews(last_item, filter_):
+                nreviews += 1
+                yield review
+
+            if nreviews < self.max_reviews:
+                break
+
+            last_item = self.client.next_retrieve_group_item(last_item, review)
 
     def _fetch_gerrit(self, from_date=DEFAULT_DATETIME):
         last_item = self.client.next_retrieve_group_item()
-        reviews = self._get_reviews(last_item)
-        last_nreviews = len(reviews)
 
         # Convert date to Unix time
         from_ut = datetime_to_utc(from_date)
         from_ut = from_ut.timestamp()
 
-        while reviews:
-            review = reviews.pop(0)
-            try:
-                last_item += 1
-            except Exception:
-                pass  # last_item is a string in old gerrits
-            updated = review['lastUpdated']
-            if updated <= from_ut:
-                logger.debug("No more updates for %s" % (self.hostname))
+        while True:
+            nreviews = 0
+            review = None
+
+            for review in self._get_reviews(last_item):
+                nreviews += 1
+                try:
+                    last_item += 1
+                except Exception:
+                    pass  # last_item is a string in old gerrits
+                updated = review['lastUpdated']
+                if updated <= from_ut:
+                    logger.debug("No more updates for %s" % (self.hostname))
+                    return
+                else:
+                    yield review
+
+            if nreviews < self.max_reviews:
                 break
-            else:
-                yield review
 
-            if not reviews and last_nreviews >= self.max_reviews:
-                logger.debug("GETTING MORE REVIEWS %i >= %i " % (last_nreviews, self.max_reviews))
-                last_item = self.client.next_retrieve_group_item(last_item, review)
-                reviews = self._get_reviews(last_item)
-                last_nreviews = len(reviews)
+            logger.debug("GETTING MORE REVIEWS %i >= %i " % (nreviews, self.max_reviews))
+            last_item = self.client.next_retrieve_group_item(last_item, review)
 
     def _get_reviews(self, last_item, filter_=None):
+        """Get the reviews of a page as soon as they are received"""
+
         task_init = time.time()
-        raw_data = self.client.reviews(last_item, filter_)
-        reviews = self.parse_reviews(raw_data)
-        logger.info("Received %i reviews in %.2fs" % (len(reviews),
+        nreviews = 0
+
+        for raw_line in self.client.reviews_lines(last_item, filter_):
+            review = self.parse_review(raw_line)
+
+            if review:
+                nreviews += 1
+                yield review
+
+        logger.info("Received %i reviews in %.2fs" % (nreviews,
                                                       time.time() - task_init))
-        return reviews
 
 
 class GerritClient():
@@ -298,6 +348,9 @@ class GerritClient():
     :param port: SSH port
     :param archive: collect issues already retrieved from an archive
     :param from_archive: it tells whether to write/read the archive
+    :param ssh_multiplexing: when set, commands share the same SSH
+        connection (using OpenSSH `ControlMaster`) and the output
+        of the queries is read while it is received
     """
     VERSION_REGEX = re.compile(r'gerrit version (\d+)\.(\d+).*')
     CMD_GERRIT = 'gerrit'
@@ -307,7 +360,7 @@ class GerritClient():
 
     def __init__(self, repository, user=None, max_reviews=MAX_REVIEWS, blacklist_reviews=None,
                  disable_host_key_check=False, port=PORT,
-                 archive=None, from_archive=False):
+                 archive=None, from_archive=False, ssh_multiplexing=False):
         self.gerrit_user = user
         self.max_reviews = max_reviews
 
@@ -318,6 +371,8 @@ class GerritClient():
         self.port = port
         self.archive = archive
         self.from_archive = from_archive
+        self.ssh_multiplexing = ssh_multiplexing
+        self._control_path = None
 
         ssh_opts = ''
         if disable_host_key_check:
@@ -329,8 +384,25 @@ class GerritClient():
         else:
             self.gerrit_cmd = "ssh %s %s@%s" % (ssh_opts, self.gerrit_user, self.repository)
 
+        self.ssh_cmd = self.gerrit_cmd
         self.gerrit_cmd += " %s " % (GerritClient.CMD_GERRIT)
 
+    def close(self):
+        """Close the shared SSH connection, if any."""
+
+        if not self._control_path:
+            return
+
+        cmd = "ssh -o ControlPath=%s -O exit %s" % (self._control_path, self.ssh_cmd[len("ssh "):])
+
+        try:
+            subprocess.call(cmd, shell=True,
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL)
+        finally:
+            shutil.rmtree(os.path.dirname(self._control_path), ignore_errors=True)
+            self._control_path = None
+
     @property
     def version(self):
         """Return the Gerrit server version."""
@@ -373,6 +445,26 @@ class GerritClient():
 
         return raw_data
 
+    def reviews_lines(self, last_item, filter_=None):
+        """Get the reviews starting from last_item, line by line.
+
+        Each line of the output of the query is a JSON document. When
+        SSH multiplexing is enabled, lines are returned while they are
+        received from the server; otherwise, they are returned once the
+        whole output of the command is available.
+        """
+        cmd = self._get_gerrit_cmd(last_item, filter_)
+
+        logger.debug("Getting reviews with command: %s", cmd)
+
+        if self.ssh_multiplexing and not self.from_archive:
+            lines = self.__execute_stream(cmd)
+        else:
+            lines = self.__execute(cmd).splitlines()
+
+        for line in lines:
+            yield str(line, "UTF-8")
+
     def next_retrieve_group_item(self, last_item=None, entry=None):
         """Return the item to start from in next reviews group."""
 
@@ -437,7 +529,7 @@ class GerritClient():
 
         while retries < self.MAX_RETRIES:
             try:
-                result = subprocess.check_output(cmd, shell=True)
+                result = subprocess.check_output(self.__remote_cmd(cmd), shell=True)
                 break
             except subprocess.CalledProcessError as ex:
                 logger.error("gerrit cmd %s failed: %s", cmd, ex)
@@ -456,6 +548,78 @@ class GerritClient():
 
         return result
 
+    def __execute_stream(self, cmd):
+        """Execute gerrit command returning its output line by line.
+
+        When the command fails, it is run again skipping the lines
+        already returned. The whole output is stored in the archive
+        once the command finishes; if the lines are not consumed to
+        the end, the rest of the output is read before storing it.
+        """
+        lines = []
+        retries = 0
+        result = None
+
+        while retries < self.MAX_RETRIES:
+            nlines = 0
+            proc = subprocess.Popen(self.__remote_cmd(cmd), shell=True,
+                                    stdout=subprocess.PIPE)
+            try:
+                for line in proc.stdout:
+                    nlines += 1
+
+                    # Skip lines returned on previous attempts
+                    if nlines <= len(lines):
+                        continue
+
+                    lines.append(line)
+                    yield line
+
+                proc.wait()
+            except GeneratorExit:
+                if self.archive:
+                    lines.extend(proc.stdout)
+                    proc.wait()
+                    self.archive.store(self.sanitize_for_archive(cmd), None, None, b''.join(lines))
+                raise
+            finally:
+                if proc.poll() is None:
+                    proc.kill()
+                proc.wait()
+                proc.stdout.close()
+
+            if proc.returncode == 0:
+                result = b''.join(lines)
+                break
+
+            logger.error("gerrit cmd %s failed: returned %s", cmd, proc.returncode)
+            time.sleep(self.RETRY_WAIT * retries)
+            retries += 1
+
+        if result is None:
+            result = RuntimeError(cmd + " failed " + str(self.MAX_RETRIES) + " times. Giving up!")
+
+        if self.archive:
+            self.archive.store(self.sanitize_for_archive(cmd), None, None, result)
+
+        if isinstance(result, RuntimeError):
+            raise result
+
+    def __remote_cmd(self, cmd):
+        """Add the options to share the SSH connection to the command"""
+
+        if not self.ssh_multiplexing:
+            return cmd
+
+        if not self._control_path:
+            control_dir = tempfile.mkdtemp(prefix='perceval_gerrit_')
+            self._control_path = os.path.join(control_dir, '%C')
+
+        ssh_opts = "-o ControlMaster=auto -o ControlPath=%s -o ControlPersist=%s " % \
+            (self._control_path, SSH_CONTROL_PERSIST)
+
+        return "ssh " + ssh_opts + cmd[len("ssh "):]
+
     def _get_gerrit_cmd(self, last_item, filter_=None):
 
         if filter_ and filter_ not in ['status:open', 'status:closed']:
@@ -520,6 +684,8 @@ class GerritCommand(BackendCommand):
         group.add_argument('--ssh-port', dest='port',
                            default=PORT, type=int,
                            help="Set SSH port of the Gerrit server")
+        group.add_argument('--ssh-multiplexing', dest='ssh_multiplexing', action='store_true',
+                           help="Reuse the same SSH connection for all the commands")
 
         # Required arguments
         parser.parser.add_argument('hostname',
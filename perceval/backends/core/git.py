@@ -27,6 +27,7 @@
 #
 
 import collections
+import concurrent.futures
 import io
 import logging
 import os
@@ -47,6 +48,11 @@ from ...utils import DEFAULT_DATETIME, DEFAULT_LAST_DATETIME
 
 CATEGORY_COMMIT = 'commit'
 
+# Number of processes used to parse the log
+DEFAULT_MAX_WORKERS = 1
+# Number of commits parsed by each worker at once
+SHARD_SIZE = 1000
+
 logger = logging.getLogger(__name__)
 
 
@@ -66,20 +72,24 @@ class Git(Backend):
     :param gitpath: path to the repository or to the log file
     :param tag: label used to mark the data
     :param archive: archive to store/retrieve items
+    :param max_workers: number of processes used to read and parse
+        the commits of a repository
 
     :raises RepositoryError: raised when there was an error cloning or
         updating the repository.
     """
-    version = '0.12.0'
+    version = '0.13.0'
 
     CATEGORIES = [CATEGORY_COMMIT]
 
-    def __init__(self, uri, gitpath, tag=None, archive=None):
+    def __init__(self, uri, gitpath, tag=None, archive=None,
+                 max_workers=DEFAULT_MAX_WORKERS):
         origin = uri
 
         super().__init__(origin, tag=tag, archive=archive)
         self.uri = uri
         self.gitpath = gitpath
+        self.max_workers = max_workers
 
     def fetch(self, category=CATEGORY_COMMIT, from_date=DEFAULT_DATETIME, to_date=DEFAULT_LAST_DATETIME,
               branches=None, latest_items=False, no_update=False):
@@ -107,6 +117,11 @@ class Git(Backend):
         when the commits are fetched from a Git log file or when
         `latest_items` flag is set.
 
+        When the backend has more than one worker, the list of commits
+        to fetch is split in shards of `SHARD_SIZE` commits which are
+        read and parsed in parallel. Commits are returned in the same
+        order as when they are fetched by a single process.
+
         The class raises a `RepositoryError` exception when an error
         occurs accessing the repository.
 
@@ -235,7 +250,7 @@ class Git(Backend):
         """
         with open(filepath, 'r', errors='surrogateescape',
                   newline=os.linesep) as f:
-            parser = GitParser(f)
+            parser = GitParser(f, fast=True)
 
             for commit in parser.parse():
                 yield commit
@@ -253,7 +268,7 @@ class Git(Backend):
         :raises ParseError: raised when the format of the Git log
             is invalid
         """
-        parser = GitParser(iterator)
+        parser = GitParser(iterator, fast=True)
 
         for commit in parser.parse():
             yield commit
@@ -306,6 +321,11 @@ class Git(Backend):
         if not no_update:
             repo.update()
 
+        if self.max_workers > 1:
+            hashes = repo.rev_list(branches, from_date=from_date, to_date=to_date,
+                                   reverse=True)
+            return _fetch_commits_in_shards(repo, hashes, self.max_workers)
+
         gitlog = repo.log(from_date, to_date, branches)
         return self.parse_git_log_from_iter(gitlog)
 
@@ -317,6 +337,9 @@ class Git(Backend):
         if not hashes:
             return []
 
+        if self.max_workers > 1:
+            return _fetch_commits_in_shards(repo, hashes, self.max_workers)
+
         gitshow = repo.show(hashes)
         return self.parse_git_log_from_iter(gitshow)
 
@@ -376,6 +399,10 @@ class GitCommand(BackendCommand):
                                    action='store_true',
                                    help="Fetch all commits without updating the repository")
 
+        group.add_argument('--max-workers', dest='max_workers',
+                           default=DEFAULT_MAX_WORKERS, type=int,
+                           help="number of processes used to parse the commits")
+
         # Required arguments
         parser.parser.add_argument('uri',
                                    help="URI of the Git log repository")
@@ -383,6 +410,57 @@ class GitCommand(BackendCommand):
         return parser
 
 
+def _fetch_commits_in_shards(repo, hashes, workers):
+    """Fetch a list of commits using a pool of processes.
+
+    The list of `hashes` is split in shards of `SHARD_SIZE` commits.
+    Each worker runs `git show` for a shard and parses its output.
+    The commits are returned following the order of `hashes`, while
+    at most two shards per worker are waiting to be consumed.
+
+    :param repo: Git repository
+    :param hashes: iterator of hashes of the commits to fetch
+    :param workers: number of worker processes
+
+    :returns: a generator of commits
+    """
+    def shards():
+        shard = []
+        for sha in hashes:
+            shard.append(sha)
+            if len(shard) >= SHARD_SIZE:
+                yield shard
+                shard = []
+        if shard:
+            yield shard
+
+    inflight = collections.deque()
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+
+    try:
+        for shard in shards():
+            inflight.append(executor.submit(_fetch_commits_shard,
+                                            repo.uri, repo.dirpath, shard))
+            if len(inflight) >= 2 * workers:
+                yield from inflight.popleft().result()
+
+        while inflight:
+            yield from inflight.popleft().result()
+    finally:
+        for future in inflight:
+            future.cancel()
+        executor.shutdown()
+
+
+def _fetch_commits_shard(uri, dirpath, hashes):
+    """Fetch and parse a shard of commits within a worker process"""
+
+    repo = GitRepository(uri, dirpath)
+    gitshow = repo.show(hashes)
+
+    return [commit for commit in Git.parse_git_log_from_iter(gitshow)]
+
+
 class GitParser:
     """Git log parser.
 
@@ -471,7 +549,13 @@ class GitParser:
         git log --raw --numstat --pretty=fuller --decorate=full \
                 --parents -M -C -c --remotes=origin --all
 
+    The parser has a fast mode, intended for large logs, that produces
+    the same commits. Instead of trying every pattern on each line, it
+    chooses the pattern to apply from the state and the first chars of
+    the line, and it builds the commits in place.
+
     :param stream: a file object which stores the log
+    :param fast: parse the log using the fast mode
     """
     COMMIT_PATTERN = r"""^commit[ \t](?P<commit>[a-f0-9]{40})
                      (?:[ \t](?P<parents>[a-f0-9][a-f0-9 \t]+))?
@@ -511,8 +595,9 @@ class GitParser:
     # Git trailers
     TRAILERS = ['Signed-off-by']
 
-    def __init__(self, stream):
+    def __init__(self, stream, fast=False):
         self.stream = stream
+        self.fast = fast
         self.nline = 0
         self.state = self.INIT
 
@@ -531,6 +616,10 @@ class GitParser:
     def parse(self):
         """Parse the Git log stream."""
 
+        if self.fast:
+            yield from self._parse_fast()
+            return
+
         for line in self.stream:
             line = line.rstrip('\n')
             parsed = False
@@ -550,6 +639,149 @@ class GitParser:
             logger.debug("Commit %s parsed", commit['commit'])
             yield commit
 
+    def _parse_fast(self):
+        """Parse the Git log stream using the fast mode."""
+
+        commit_match = self.GIT_COMMIT_REGEXP.match
+        header_match = self.GIT_HEADER_TRAILER_REGEXP.match
+        action_match = self.GIT_ACTION_REGEXP.match
+        stats_match = self.GIT_STATS_REGEXP.match
+        parse_data_list = self.__parse_data_list
+        get_old_filepath = self.__get_old_filepath
+
+        trailers = tuple(trailer + ':' for trailer in self.TRAILERS)
+
+        COMMIT, HEADER, MESSAGE, FILE = self.COMMIT, self.HEADER, self.MESSAGE, self.FILE
+
+        state = self.state
+        nline = self.nline
+        commit = None
+        message = None
+        files = None
+
+        try:
+            for line in self.stream:
+                line = line.rstrip('\n')
+                nline += 1
+
+                # Lines not matching the current state are parsed
+                # again on the next one
+                while True:
+                    if state == MESSAGE:
+                        if not line:
+                            state = FILE
+                            break
+
+                        msg_line = line[4:]
+
+                        if len(line) < 4 or not line[:4].isspace() or '\n' in msg_line:
+                            logger.debug("Invalid message format on line %s. Skipping.", nline)
+                            state = FILE
+                            continue
+
+                        if message is None:
+                            # Keep the position of the message among the fields
+                            commit['message'] = None
+                            message = [msg_line]
+                        else:
+                            message.append(msg_line)
+
+                        if msg_line.startswith(trailers):
+                            m = header_match(msg_line)
+                            if m:
+                                commit.setdefault(m.group('name'), []).append(m.group('value'))
+                        break
+                    elif state == FILE:
+                        if not line:
+                            state = COMMIT
+                        else:
+                            if line[0] == ':':
+                                m = action_match(line)
+                            else:
+                                m = stats_match(line)
+
+                            if m:
+                                if line[0] == ':':
+                                    _, modes, indexes, action, filename, newfile = m.groups()
+
+                                    data = files.get(filename, None)
+                                    if data is None:
+                                        data = files[filename] = {}
+
+                                    # Values are split by a single space or tab
+                                    data['modes'] = modes.split() if '\t' not in modes else parse_data_list(modes)
+                                    data['indexes'] = indexes.split() if '\t' not in indexes else parse_data_list(indexes)
+                                    data['action'] = action
+                                    data['file'] = filename
+
+                                    if newfile is not None:
+                                        data['newfile'] = newfile
+                                    else:
+                                        data.pop('newfile', None)
+                                else:
+                                    added, removed, filename = m.groups()
+
+                                    if '{' in filename or ' => ' in filename:
+                                        filename = get_old_filepath(filename)
+
+                                    data = files.get(filename, None)
+                                    if data is None:
+                                        data = files[filename] = {'file': filename}
+
+                                    data['added'] = added
+                                    data['removed'] = removed
+                                break
+
+                            logger.debug("Invalid action format on line %s. Skipping.", nline)
+                            state = COMMIT
+
+                        yield self.__complete_commit(commit, message, files)
+
+                        commit = None
+                        message = None
+
+                        if not line:
+                            break
+                    elif state == HEADER:
+                        if not line:
+                            state = MESSAGE
+                            break
+
+                        m = header_match(line)
+                        if not m:
+                            msg = "invalid header format on line %s" % (str(nline))
+                            raise ParseError(cause=msg)
+
+                        commit[m.group('name')] = m.group('value')
+                        break
+                    elif state == COMMIT:
+                        m = commit_match(line)
+                        if not m:
+                            msg = "commit expected on line %s" % (str(nline))
+                            raise ParseError(cause=msg)
+
+                        sha, parents, refs = m.groups()
+                        commit = {
+                            'commit': sha,
+                            'parents': parse_data_list(parents),
+                            'refs': parse_data_list(refs, sep=',')
+                        }
+                        files = {}
+                        state = HEADER
+                        break
+                    else:
+                        # Only one empty line is allowed at the beginning
+                        state = COMMIT
+                        if not line:
+                            break
+
+            # Return the last commit, if any
+            if commit:
+                yield self.__complete_commit(commit, message, files)
+        finally:
+            self.nline = nline
+            self.state = state
+
     def _build_commit(self):
         def remove_none_values(d):
             return {k: v for k, v in d.items() if v is not None}
@@ -700,6 +932,17 @@ class GitParser:
         self.commit_files[filename]['added'] = data['added']
         self.commit_files[filename]['removed'] = data['removed']
 
+    def __complete_commit(self, commit, message, files):
+        """Add the message and the files to a commit parsed in fast mode"""
+
+        if message is not None:
+            commit['message'] = '\n'.join(message)
+        commit['files'] = [files[filename] for filename in sorted(files)]
+
+        logger.debug("Commit %s parsed", commit['commit'])
+
+        return commit
+
     def __parse_data_list(self, data, sep=' '):
         if data:
             lst = data.strip().split(sep)
@@ -950,7 +1193,7 @@ class GitRepository:
 
         return commits
 
-    def rev_list(self, branches=None):
+    def rev_list(self, branches=None, from_date=None, to_date=None, reverse=False):
         """Read the list commits from the repository
 
         The list of branches is a list of strings, with the names of the
@@ -963,7 +1206,15 @@ class GitRepository:
 
             git rev-list --topo-order
 
+        When `from_date` or `to_date` are given, only the commits
+        within those dates are listed. Set `reverse` to list the
+        commits in the same order `log` returns them.
+
         :param branches: names of branches to fetch from (default: None)
+        :param from_date: list commits newer than a specific
+            date (inclusive)
+        :param to_date: list commits older than a specific date
+        :param reverse: list the commits in reverse order
 
         :raises EmptyRepositoryError: when the repository is empty and
             the action cannot be performed
@@ -976,6 +1227,17 @@ class GitRepository:
 
         cmd_rev_list = ['git', 'rev-list', '--topo-order']
 
+        if reverse:
+            cmd_rev_list.append('--reverse')
+
+        if from_date:
+            dt = from_date.strftime("%Y-%m-%d %H:%M:%S %z")
+            cmd_rev_list.append('--since=' + dt)
+
+        if to_date:
+            dt = to_date.strftime("%Y-%m-%d %H:%M:%S %z")
+            cmd_rev_list.append('--until=' + dt)
+
         if branches is None:
             cmd_rev_list.extend(['--branches', '--tags', '--remotes=origin'])
         elif len(branches) == 0:
@@ -29,8 +29,13 @@
 #     JJMerchante <jj.merchante@gmail.com>
 #
 
+import collections
+import concurrent.futures
 import json
 import logging
+import re
+import threading
+import time
 
 import requests
 from grimoirelab_toolkit.datetime import (datetime_to_utc,
@@ -42,7 +47,9 @@ from ...backend import (Backend,
                         BackendCommand,
                         BackendCommandArgumentParser,
                         DEFAULT_SEARCH_FIELD)
+from ...cache import DiskCache, LRUCache
 from ...client import HttpClient, RateLimitHandler
+from ...errors import RateLimitError
 from ...utils import DEFAULT_DATETIME, DEFAULT_LAST_DATETIME
 
 CATEGORY_ISSUE = "issue"
@@ -55,8 +62,8 @@ GITHUB_API_URL = "https://api.github.com"
 # Range before sleeping until rate limit reset
 MIN_RATE_LIMIT = 10
 MAX_RATE_LIMIT = 500
-# Use this factor of the current token's remaining API points before switching to the next token
-TOKEN_USAGE_BEFORE_SWITCH = 0.1
+# Seconds to wait for tokens whose reset time is not known
+TOKEN_RESET_WAIT = 60
 
 MAX_CATEGORY_ITEMS_PER_PAGE = 100
 PER_PAGE = 100
@@ -65,6 +72,16 @@ PER_PAGE = 100
 DEFAULT_SLEEP_TIME = 1
 MAX_RETRIES = 5
 
+# Number of threads used to fetch the data related to an item
+DEFAULT_MAX_WORKERS = 1
+
+# Max number of users kept in memory and seconds they are valid on disk
+DEFAULT_USER_CACHE_SIZE = LRUCache.DEFAULT_MAX_SIZE
+DEFAULT_USER_CACHE_TTL = DiskCache.DEFAULT_TTL
+
+# Number of locks shared by the requests of users and organizations
+USER_LOCK_STRIPES = 64
+
 TARGET_ISSUE_FIELDS = ['user', 'assignee', 'assignees', 'comments', 'reactions']
 TARGET_PULL_FIELDS = ['user', 'review_comments', 'requested_reviewers', "merged_by", "commits"]
 
@@ -103,8 +120,16 @@ class GitHub(Backend):
     :param sleep_time: time to sleep in case
         of connection problems
     :param ssl_verify: enable/disable SSL verification
+    :param max_workers: number of threads used to fetch the data
+        related to an issue or pull request (e.g., comments, reviews,
+        users) and the pages of a list at the same time; by default,
+        they are fetched one after another
+
+    The number of requests made with each token and their rate limits
+    are added to the summary of the fetch process, under the `tokens`
+    key of its extras.
     """
-    version = '0.25.1'
+    version = '0.29.2'
 
     CATEGORIES = [CATEGORY_ISSUE, CATEGORY_PULL_REQUEST, CATEGORY_REPO]
 
@@ -126,7 +151,9 @@ class GitHub(Backend):
                  tag=None, archive=None,
                  sleep_for_rate=False, min_rate_to_sleep=MIN_RATE_LIMIT,
                  max_retries=MAX_RETRIES, sleep_time=DEFAULT_SLEEP_TIME,
-                 max_items=MAX_CATEGORY_ITEMS_PER_PAGE, ssl_verify=True):
+                 max_items=MAX_CATEGORY_ITEMS_PER_PAGE, ssl_verify=True,
+                 max_workers=DEFAULT_MAX_WORKERS, user_cache_size=DEFAULT_USER_CACHE_SIZE,
+                 user_cache_path=None, user_cache_ttl=DEFAULT_USER_CACHE_TTL):
         if api_token is None:
             api_token = []
         origin = base_url if base_url else GITHUB_URL
@@ -144,10 +171,15 @@ class GitHub(Backend):
         self.max_retries = max_retries
         self.sleep_time = sleep_time
         self.max_items = max_items
+        self.max_workers = max_workers
+        self.user_cache_size = user_cache_size
+        self.user_cache_path = user_cache_path
+        self.user_cache_ttl = user_cache_ttl
 
         self.client = None
         self.exclude_user_data = False
         self._users = {}  # internal users cache
+        self._executor = None
 
     def search_fields(self, item):
         """Add search fields to an item.
@@ -221,7 +253,10 @@ class GitHub(Backend):
         else:
             items = self.__fetch_repo_info()
 
-        return items
+        if self.max_workers > 1 and category != CATEGORY_REPO:
+            items = self.__run_with_executor(items)
+
+        return self.__track_client_stats(items)
 
     @classmethod
     def has_archiving(cls):
@@ -291,7 +326,9 @@ class GitHub(Backend):
         return GitHubClient(self.owner, self.repository, self.api_token, self.base_url,
                             self.sleep_for_rate, self.min_rate_to_sleep,
                             self.sleep_time, self.max_retries, self.max_items,
-                            self.archive, from_archive, self.ssl_verify)
+                            self.archive, from_archive, self.ssl_verify,
+                            self.user_cache_size, self.user_cache_path, self.user_cache_ttl,
+                            max_workers=self.max_workers)
 
     def __fetch_issues(self, from_date, to_date):
         """Fetch the issues"""
@@ -306,22 +343,26 @@ class GitHub(Backend):
                     return
 
                 self.__init_extra_issue_fields(issue)
+
+                tasks = []
                 for field in TARGET_ISSUE_FIELDS:
 
                     if not issue[field]:
                         continue
 
                     if field == 'user':
-                        issue[field + '_data'] = self.__get_user(issue[field]['login'])
+                        tasks.append((field, self.__get_user, issue[field]['login']))
                     elif field == 'assignee':
-                        issue[field + '_data'] = self.__get_issue_assignee(issue[field])
+                        tasks.append((field, self.__get_issue_assignee, issue[field]))
                     elif field == 'assignees':
-                        issue[field + '_data'] = self.__get_issue_assignees(issue[field])
+                        tasks.append((field, self.__get_issue_assignees, issue[field]))
                     elif field == 'comments':
-                        issue[field + '_data'] = self.__get_issue_comments(issue['number'])
+                        tasks.append((field, self.__get_issue_comments, issue['number']))
                     elif field == 'reactions':
-                        issue[field + '_data'] = \
-                            self.__get_issue_reactions(issue['number'], issue['reactions']['total_count'])
+                        tasks.append((field, self.__get_issue_reactions,
+                                      issue['number'], issue['reactions']['total_count']))
+
+                self.__fill_item_fields(issue, tasks)
 
                 yield issue
 
@@ -337,22 +378,24 @@ class GitHub(Backend):
 
             self.__init_extra_pull_fields(pull)
 
-            pull['reviews_data'] = self.__get_pull_reviews(pull['number'])
+            tasks = [('reviews', self.__get_pull_reviews, pull['number'])]
 
             for field in TARGET_PULL_FIELDS:
                 if not pull[field]:
                     continue
 
                 if field == 'user':
-                    pull[field + '_data'] = self.__get_user(pull[field]['login'])
+                    tasks.append((field, self.__get_user, pull[field]['login']))
                 elif field == 'merged_by':
-                    pull[field + '_data'] = self.__get_user(pull[field]['login'])
+                    tasks.append((field, self.__get_user, pull[field]['login']))
                 elif field == 'review_comments':
-                    pull[field + '_data'] = self.__get_pull_review_comments(pull['number'])
+                    tasks.append((field, self.__get_pull_review_comments, pull['number']))
                 elif field == 'requested_reviewers':
-                    pull[field + '_data'] = self.__get_pull_requested_reviewers(pull['number'])
+                    tasks.append((field, self.__get_pull_requested_reviewers, pull['number']))
                 elif field == 'commits':
-                    pull[field + '_data'] = self.__get_pull_commits(pull['number'])
+                    tasks.append((field, self.__get_pull_commits, pull['number']))
+
+            self.__fill_item_fields(pull, tasks)
 
             yield pull
 
@@ -367,6 +410,49 @@ class GitHub(Backend):
 
         yield repo
 
+    def __track_client_stats(self, items):
+        """Add the users cache and tokens usage to the summary"""
+
+        try:
+            yield from items
+        finally:
+            if self.summary:
+                if self.summary.extras is None:
+                    self.summary.extras = {}
+                self.summary.extras['user_cache'] = self.client.user_cache_stats
+                self.summary.extras['tokens'] = self.client.tokens_stats
+
+    def __run_with_executor(self, items):
+        """Keep a pool of threads alive while the items are generated"""
+
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+
+        try:
+            for item in items:
+                yield item
+        finally:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __fill_item_fields(self, item, tasks):
+        """Set the data related to an item.
+
+        Each task is a tuple with the name of the field, the function
+        that obtains its data and the arguments of that function. The
+        result of each task is stored in `<field>_data`. When a pool of
+        threads is available, tasks run concurrently; otherwise, they
+        run one after another. In both cases, the fields are set in
+        the same order the tasks were given.
+        """
+        if self._executor:
+            results = [self._executor.submit(task[1], *task[2:]) for task in tasks]
+            results = [future.result() for future in results]
+        else:
+            results = [task[1](*task[2:]) for task in tasks]
+
+        for task, result in zip(tasks, results):
+            item[task[0] + '_data'] = result
+
     def __get_issue_reactions(self, issue_number, total_count):
         """Get issue reactions"""
 
@@ -589,23 +675,53 @@ class GitHubClient(HttpClient, RateLimitHandler):
     :param archive: collect issues already retrieved from an archive
     :param from_archive: it tells whether to write/read the archive
     :param ssl_verify: enable/disable SSL verification
+    :param user_cache_size: max number of users and organizations
+        kept in memory
+    :param user_cache_path: path to the database where users and
+        organizations are stored for further executions; when it is
+        not set, they are only kept in memory
+    :param user_cache_ttl: number of seconds the users and
+        organizations stored in the database are valid
+    :param max_workers: max number of pages of a list requested
+        at the same time
+
+    The client can be shared by several threads. Tokens are handed out
+    by a `GitHubTokenPool` on each request, so threads making requests
+    at the same time use different tokens, and they only sleep when the
+    rate limit of every token is exhausted. The rate limit of each token
+    is updated with the headers of its responses. Users and organizations
+    being fetched by one thread are not requested again by the others.
+
+    The database of users can be shared by several processes. It is
+    not used when the client reads from or writes to an archive, so
+    archives always contain every user they need. For the same reason,
+    the number of users in memory is not limited while archiving.
+
+    When `max_workers` is greater than one, the pages of a list are
+    prefetched once the first one tells which is the last page. See
+    `fetch_items` for more details.
     """
     EXTRA_STATUS_FORCELIST = [403, 500, 502, 503]
 
-    _users = {}       # users cache
-    _users_orgs = {}  # users orgs cache
-
     def __init__(self, owner, repository, tokens,
                  base_url=None, sleep_for_rate=False, min_rate_to_sleep=MIN_RATE_LIMIT,
                  sleep_time=DEFAULT_SLEEP_TIME, max_retries=MAX_RETRIES,
-                 max_items=MAX_CATEGORY_ITEMS_PER_PAGE, archive=None, from_archive=False, ssl_verify=True):
+                 max_items=MAX_CATEGORY_ITEMS_PER_PAGE, archive=None, from_archive=False, ssl_verify=True,
+                 user_cache_size=DEFAULT_USER_CACHE_SIZE, user_cache_path=None,
+                 user_cache_ttl=DEFAULT_USER_CACHE_TTL, max_workers=DEFAULT_MAX_WORKERS):
         self.owner = owner
         self.repository = repository
         self.tokens = tokens
         self.n_tokens = len(self.tokens)
-        self.current_token = None
-        self.last_rate_limit_checked = None
         self.max_items = max_items
+        self.max_workers = max(1, max_workers)
+
+        self._rate_limit_lock = threading.RLock()
+        self._local = threading.local()
+        self._locks = [threading.Lock() for _ in range(USER_LOCK_STRIPES)]
+
+        self._users, self._users_orgs = self._init_user_caches(user_cache_size, user_cache_path,
+                                                               user_cache_ttl, archive, from_archive)
 
         if base_url:
             base_url = urijoin(base_url, 'api', 'v3')
@@ -618,9 +734,8 @@ class GitHubClient(HttpClient, RateLimitHandler):
                          archive=archive, from_archive=from_archive, ssl_verify=ssl_verify)
         super().setup_rate_limit_handler(sleep_for_rate=sleep_for_rate, min_rate_to_sleep=min_rate_to_sleep)
 
-        # Choose best API token (with maximum API points remaining)
-        if not self.from_archive:
-            self._choose_best_api_token()
+        self._token_pool = GitHubTokenPool(self.tokens, self.min_rate_to_sleep,
+                                           sleep_for_rate=self.sleep_for_rate)
 
     def calculate_time_to_reset(self):
         """Calculate the seconds to reset the token requests, by obtaining the different
@@ -781,40 +896,60 @@ class GitHubClient(HttpClient, RateLimitHandler):
         """Get the user information and update the user cache"""
         user = None
 
-        if login in self._users:
-            return self._users[login]
+        with self._get_lock(('user', login)):
+            user = self._users.get(login)
+            if user is not None:
+                return user
 
-        url_user = urijoin(self.base_url, 'users', login)
+            url_user = urijoin(self.base_url, 'users', login)
 
-        logger.debug("Getting info for %s" % url_user)
+            logger.debug("Getting info for %s" % url_user)
 
-        r = self.fetch(url_user)
-        user = r.text
-        self._users[login] = user
+            r = self.fetch(url_user)
+            user = r.text
+            self._users.set(login, user)
 
         return user
 
     def user_orgs(self, login):
         """Get the user public organizations"""
-        if login in self._users_orgs:
-            return self._users_orgs[login]
 
-        url = urijoin(self.base_url, 'users', login, 'orgs')
-        try:
-            r = self.fetch(url)
-            orgs = r.text
-        except requests.exceptions.HTTPError as error:
-            # 404 not found is wrongly received sometimes
-            if error.response.status_code == 404:
-                logger.error("Can't get github login orgs: %s", error)
-                orgs = '[]'
-            else:
-                raise error
+        with self._get_lock(('user_orgs', login)):
+            orgs = self._users_orgs.get(login)
+            if orgs is not None:
+                return orgs
+
+            url = urijoin(self.base_url, 'users', login, 'orgs')
+            try:
+                r = self.fetch(url)
+                orgs = r.text
+            except requests.exceptions.HTTPError as error:
+                # 404 not found is wrongly received sometimes
+                if error.response.status_code == 404:
+                    logger.error("Can't get github login orgs: %s", error)
+                    orgs = '[]'
+                else:
+                    raise error
 
-        self._users_orgs[login] = orgs
+            self._users_orgs.set(login, orgs)
 
         return orgs
 
+    @property
+    def user_cache_stats(self):
+        """Hits and misses of the users and organizations caches"""
+
+        return {
+            'users': self._users.stats,
+            'users_orgs': self._users_orgs.stats
+        }
+
+    @property
+    def tokens_stats(self):
+        """Requests made with each token and their rate limits"""
+
+        return self._token_pool.stats
+
     def fetch(self, url, payload=None, headers=None, method=HttpClient.GET, stream=False, auth=None):
         """Fetch the data from a given URL.
 
@@ -827,22 +962,59 @@ class GitHubClient(HttpClient, RateLimitHandler):
 
         :returns a response object
         """
-        if not self.from_archive:
-            self.sleep_for_rate_limit()
+        if self.from_archive:
+            return super().fetch(url, payload, headers, method, stream, auth)
 
-        response = super().fetch(url, payload, headers, method, stream, auth)
+        if not self.n_tokens:
+            with self._rate_limit_lock:
+                self.sleep_for_rate_limit()
 
-        if not self.from_archive:
-            if self._need_check_tokens():
-                self._choose_best_api_token()
-            else:
+            response = super().fetch(url, payload, headers, method, stream, auth)
+
+            with self._rate_limit_lock:
                 self.update_rate_limit(response)
 
+            return response
+
+        token = self._token_pool.acquire()
+
+        headers = dict(headers) if headers else {}
+        headers['Authorization'] = 'token ' + token
+
+        response = None
+
+        try:
+            response = super().fetch(url, payload, headers, method, stream, auth)
+        except requests.exceptions.HTTPError as error:
+            # Failed requests also consume points
+            response = error.response
+            raise error
+        finally:
+            remaining, reset_ts = self._read_rate_limit(response)
+            self._token_pool.release(token, remaining=remaining, reset_ts=reset_ts)
+
+        with self._rate_limit_lock:
+            self.update_rate_limit(response)
+
         return response
 
     def fetch_items(self, path, payload):
-        """Return the items from github API using links pagination"""
-
+        """Return the items from github API using links pagination.
+
+        Pages are always requested following the `next` links. When
+        `max_workers` is greater than one, the link to the last page
+        of the first response is used to request the rest of pages in
+        advance, up to `max_workers` at the same time and without
+        exceeding the remaining rate limit. A prefetched page is only
+        used when its URL matches the `next` link, and it is archived
+        when it is used, so the pages returned and the archived
+        requests are the same in both cases.
+
+        When the pagination stops early (i.e., the generator is closed),
+        the pages requested in advance are not archived, but the ones
+        that were already running are completed, spending their rate
+        limit points.
+        """
         page = 0  # current page
         last_page = None  # last page
         url_next = urijoin(self.base_url, 'repos', self.owner, self.repository, path)
@@ -853,119 +1025,153 @@ class GitHubClient(HttpClient, RateLimitHandler):
         items = response.text
         page += 1
 
+        prefetcher = None
+
         if 'last' in response.links:
             last_url = response.links['last']['url']
             last_page = last_url.split('&page=')[1].split('&')[0]
             last_page = int(last_page)
             logger.debug("Page: %i/%i" % (page, last_page))
 
-        while items:
-            yield items
+            if self.max_workers > 1 and last_page - page > 1:
+                urls = [re.sub(r'&page=\d+', '&page=%s' % n, last_url, count=1)
+                        for n in range(page + 1, last_page + 1)]
+                prefetcher = _PagePrefetcher(self, urls, payload)
+
+        try:
+            while items:
+                yield items
 
-            items = None
+                items = None
 
-            if 'next' in response.links:
-                url_next = response.links['next']['url']
-                response = self.fetch(url_next, payload=payload)
-                page += 1
+                if 'next' in response.links:
+                    url_next = response.links['next']['url']
 
-                items = response.text
-                logger.debug("Page: %i/%i" % (page, last_page))
+                    if prefetcher:
+                        response = prefetcher.fetch(url_next)
+                    else:
+                        response = self.fetch(url_next, payload=payload)
+                    page += 1
 
-    def _get_token_rate_limit(self, token):
-        """Return token's remaining API points"""
+                    items = response.text
+                    logger.debug("Page: %i/%i" % (page, last_page))
+        finally:
+            if prefetcher:
+                prefetcher.close()
+
+    def _prefetch_page(self, url, payload):
+        """Request a page without storing it in the archive.
+
+        :returns: a tuple with the response, or the HTTP error raised,
+            and the archive entries of the request, which should be
+            stored with `_store_prefetched` when the page is used
+        """
+        self._local.deferred = []
 
-        rate_url = urijoin(self.base_url, "rate_limit")
-        self.session.headers.update({'Authorization': 'token ' + token})
-        remaining = 0
         try:
-            headers = super().fetch(rate_url).headers
-            if self.rate_limit_header in headers:
-                remaining = int(headers[self.rate_limit_header])
+            response = self.fetch(url, payload=payload)
         except requests.exceptions.HTTPError as error:
-            logger.warning("Rate limit not initialized: %s", error)
-        return remaining
-
-    def _get_tokens_rate_limits(self):
-        """Return array of all tokens remaining API points"""
-
-        remainings = [0] * self.n_tokens
-        # Turn off archiving when checking rates, because that would cause
-        # archive key conflict (the same URLs giving different responses)
-        arch = self.archive
-        self.archive = None
-        for idx, token in enumerate(self.tokens):
-            # Pass flag to skip disabling archiving because this function doies it
-            remainings[idx] = self._get_token_rate_limit(token)
-        # Restore archiving to whatever state it was
-        self.archive = arch
-        logger.debug("Remaining API points: {}".format(remainings))
-        return remainings
-
-    def _choose_best_api_token(self):
-        """Check all API tokens defined and choose one with most remaining API points"""
-
-        # Return if no tokens given
-        if self.n_tokens == 0:
-            return
-
-        # If multiple tokens given, choose best
-        token_idx = 0
-        if self.n_tokens > 1:
-            remainings = self._get_tokens_rate_limits()
-            token_idx = remainings.index(max(remainings))
-            logger.debug("Remaining API points: {}, choosen index: {}".format(remainings, token_idx))
-
-        # If we have any tokens - use best of them
-        self.current_token = self.tokens[token_idx]
-        self.session.headers.update({'Authorization': 'token ' + self.current_token})
-        # Update rate limit data for the current token
-        self._update_current_rate_limit()
-
-    def _need_check_tokens(self):
-        """Check if we need to switch GitHub API tokens"""
-
-        if self.n_tokens <= 1 or self.rate_limit is None:
-            return False
-        elif self.last_rate_limit_checked is None:
-            self.last_rate_limit_checked = self.rate_limit
-            return True
-
-        # If approaching minimum rate limit for sleep
-        approaching_limit = float(self.min_rate_to_sleep) * (1.0 + TOKEN_USAGE_BEFORE_SWITCH) + 1
-        if self.rate_limit <= approaching_limit:
-            self.last_rate_limit_checked = self.rate_limit
-            return True
-
-        # Only switch token when used predefined factor of the current token's remaining API points
-        ratio = float(self.rate_limit) / float(self.last_rate_limit_checked)
-        if ratio < 1.0 - TOKEN_USAGE_BEFORE_SWITCH:
-            self.last_rate_limit_checked = self.rate_limit
-            return True
-        elif ratio > 1.0:
-            self.last_rate_limit_checked = self.rate_limit
-            return False
+            response = error
+        finally:
+            entries = self._local.deferred
+            self._local.deferred = None
+
+        return response, entries
+
+    def _store_prefetched(self, entries):
+        """Store the archive entries of a prefetched page"""
+
+        for entry in entries:
+            super()._store_in_archive(*entry)
+
+    def _store_in_archive(self, url, payload, headers, data):
+        """Store a response in the archive unless it is being prefetched"""
+
+        deferred = getattr(self._local, 'deferred', None)
+
+        if deferred is not None:
+            deferred.append((url, payload, headers, data))
         else:
-            return False
+            super()._store_in_archive(url, payload, headers, data)
 
-    def _update_current_rate_limit(self):
-        """Update rate limits data for the current token"""
+    def _max_prefetched_pages(self):
+        """Max number of pages that can be requested in advance"""
 
-        url = urijoin(self.base_url, "rate_limit")
-        try:
-            # Turn off archiving when checking rates, because that would cause
-            # archive key conflict (the same URLs giving different responses)
-            arch = self.archive
-            self.archive = None
-            response = super().fetch(url)
-            self.archive = arch
-            self.update_rate_limit(response)
-            self.last_rate_limit_checked = self.rate_limit
-        except requests.exceptions.HTTPError as error:
-            if error.response.status_code == 404:
-                logger.warning("Rate limit not initialized: %s", error)
-            else:
-                raise error
+        if self.from_archive:
+            return self.max_workers
+
+        if self.n_tokens:
+            budget = self._token_pool.budget
+        else:
+            with self._rate_limit_lock:
+                budget = None if self.rate_limit is None else self.rate_limit - self.min_rate_to_sleep
+
+        if budget is None:
+            return self.max_workers
+
+        return max(1, min(self.max_workers, budget))
+
+    @staticmethod
+    def sanitize_for_archive(url, headers, payload):
+        """Sanitize the headers of a HTTP request by removing the token
+        before storing/retrieving archived items
+
+        :param: url: HTTP url request
+        :param: headers: HTTP headers request
+        :param: payload: HTTP payload request
+
+        :returns url, the sanitized headers and payload
+        """
+        if not headers:
+            return url, headers, payload
+
+        headers = {k: v for k, v in headers.items() if k != 'Authorization'}
+
+        # Requests without other headers are archived as before
+        # tokens were sent on each request
+        return url, headers or None, payload
+
+    def _read_rate_limit(self, response):
+        """Return the remaining API points and reset time of a response"""
+
+        remaining, reset_ts = None, None
+
+        if response is None:
+            return remaining, reset_ts
+
+        if self.rate_limit_header in response.headers:
+            remaining = int(response.headers[self.rate_limit_header])
+        if self.rate_limit_reset_header in response.headers:
+            reset_ts = int(response.headers[self.rate_limit_reset_header])
+
+        return remaining, reset_ts
+
+    @staticmethod
+    def _init_user_caches(cache_size, cache_path, cache_ttl, archive, from_archive):
+        """Init the caches of users and organizations"""
+
+        if archive and not from_archive:
+            cache_size = None
+
+        if cache_path and archive:
+            logger.info("Users cache %s not used with archives", cache_path)
+            cache_path = None
+
+        users_store = DiskCache(cache_path, namespace='users', ttl=cache_ttl) if cache_path else None
+        orgs_store = DiskCache(cache_path, namespace='users_orgs', ttl=cache_ttl) if cache_path else None
+
+        users = LRUCache(max_size=cache_size, store=users_store)
+        users_orgs = LRUCache(max_size=cache_size, store=orgs_store)
+
+        return users, users_orgs
+
+    def _get_lock(self, key):
+        """Return the lock that protects the access to a resource.
+
+        Resources share a fixed number of locks, so the memory used
+        by them does not grow with the number of resources.
+        """
+        return self._locks[hash(key) % len(self._locks)]
 
     def _set_extra_headers(self):
         """Set extra headers for session"""
@@ -975,6 +1181,223 @@ class GitHubClient(HttpClient, RateLimitHandler):
         return headers
 
 
+class GitHubTokenPool:
+    """Pool of GitHub API tokens.
+
+    The pool keeps the remaining API points of each token and the time
+    when they are reset, as they are sent by the server on the headers
+    of the responses. A token is acquired before each request and
+    released with the rate limit of its response.
+
+    Tokens are handed out weighted by the points they have left above
+    `min_rate_to_sleep`, discounting the requests in process, so the
+    requests made at the same time by several threads are spread among
+    the tokens. Tokens whose points are not known are handed out first.
+    When no token has points left, the pool sleeps until the first one
+    is reset or, when `sleep_for_rate` is not set, it raises
+    a `RateLimitError` exception. Tokens whose reset time is not known
+    are tried again after `TOKEN_RESET_WAIT` seconds.
+
+    :param tokens: list of GitHub auth tokens
+    :param min_rate_to_sleep: minimum number of points a token
+        keeps before the pool stops handing it out
+    :param sleep_for_rate: sleep until a token is reset
+    """
+    def __init__(self, tokens, min_rate_to_sleep, sleep_for_rate=False):
+        self.tokens = list(tokens)
+        self.min_rate_to_sleep = min_rate_to_sleep
+        self.sleep_for_rate = sleep_for_rate
+
+        self._remaining = [None] * len(self.tokens)
+        self._reset_ts = [None] * len(self.tokens)
+        self._in_process = [0] * len(self.tokens)
+        self._requests = [0] * len(self.tokens)
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Get a token to make a request.
+
+        :returns: a token
+
+        :raises RateLimitError: when the points of every token are
+            exhausted and the pool does not sleep
+        """
+        while True:
+            with self._lock:
+                index = self._choose()
+
+                if index is not None:
+                    self._in_process[index] += 1
+                    self._requests[index] += 1
+                    return self.tokens[index]
+
+                known_ts = [ts for ts in self._reset_ts if ts is not None]
+                reset_ts = min(known_ts) if known_ts else None
+
+            if reset_ts is not None:
+                seconds_to_reset = self._time_to_reset(reset_ts)
+            else:
+                seconds_to_reset = TOKEN_RESET_WAIT
+            cause = "GitHub tokens rate limit exhausted."
+
+            if not self.sleep_for_rate:
+                raise RateLimitError(cause=cause, seconds_to_reset=seconds_to_reset)
+
+            logger.info("%s Waiting %i secs for rate limit reset.", cause, seconds_to_reset)
+            time.sleep(seconds_to_reset)
+
+            with self._lock:
+                self._reset(reset_ts)
+
+    def release(self, token, remaining=None, reset_ts=None):
+        """Give back an acquired token, updating its rate limit.
+
+        :param token: token to release
+        :param remaining: remaining points of the token; when it is
+            `None` the current value is kept
+        :param reset_ts: time when the points of the token are reset
+        """
+        index = self.tokens.index(token)
+
+        with self._lock:
+            self._in_process[index] -= 1
+            self._update(index, remaining, reset_ts)
+
+    @property
+    def budget(self):
+        """Number of points left in the pool; `None` when it is not known"""
+
+        with self._lock:
+            if not self.tokens or None in self._remaining:
+                return None
+
+            return sum(max(0, self._available(index)) for index in range(len(self.tokens)))
+
+    @property
+    def stats(self):
+        """Requests made with each token and their rate limits"""
+
+        with self._lock:
+            return [{'requests': requests, 'remaining': remaining, 'reset': reset_ts}
+                    for requests, remaining, reset_ts in zip(self._requests, self._remaining, self._reset_ts)]
+
+    def _update(self, index, remaining, reset_ts):
+        if remaining is not None:
+            self._remaining[index] = remaining
+        if reset_ts is not None:
+            self._reset_ts[index] = reset_ts
+
+    def _available(self, index):
+        return self._remaining[index] - self._in_process[index] - self.min_rate_to_sleep
+
+    def _choose(self):
+        best = None
+        best_weight = None
+
+        for index in range(len(self.tokens)):
+            if self._remaining[index] is None:
+                weight = (1, -self._in_process[index])
+            elif self._available(index) > 0:
+                weight = (0, self._available(index))
+            else:
+                continue
+
+            if best_weight is None or weight > best_weight:
+                best, best_weight = index, weight
+
+        return best
+
+    def _reset(self, reset_ts):
+        """Forget the points of the tokens reset at the given time.
+
+        When `reset_ts` is `None`, only the points of the tokens whose
+        reset time is not known are forgotten.
+        """
+        for index in range(len(self.tokens)):
+            token_ts = self._reset_ts[index]
+
+            if token_ts is None or (reset_ts is not None and token_ts <= reset_ts):
+                self._remaining[index] = None
+
+    @staticmethod
+    def _time_to_reset(reset_ts):
+        now = datetime_utcnow().replace(microsecond=0).timestamp()
+        return max(0, reset_ts - (now + 1))
+
+
+class _PagePrefetcher:
+    """Request the pages of a list in advance.
+
+    Pages are requested, in order, by a pool of threads, keeping up
+    to the number of pages allowed by the client in process. Pages
+    are stored in the archive only when they are requested with
+    `fetch`; pages prefetched before the requested one are discarded.
+    When the URL of the requested page was not prefetched, all the
+    pending pages are discarded and the rest are requested by the
+    client one by one.
+
+    Discarded pages that were already running are completed, but
+    they are never archived.
+
+    :param client: GitHub client
+    :param urls: list with the URLs of the pages
+    :param payload: payload of the requests
+    """
+    def __init__(self, client, urls, payload):
+        self.client = client
+        self.urls = collections.deque(urls)
+        self.payload = payload
+        self.pending = collections.deque()
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=client.max_workers)
+
+    def fetch(self, url):
+        """Get the response of the page in `url`"""
+
+        self._submit()
+
+        if url not in [pending_url for pending_url, _ in self.pending]:
+            logger.debug("Page %s not prefetched; pending pages discarded", url)
+            self._discard()
+            return self.client.fetch(url, payload=self.payload)
+
+        while True:
+            pending_url, future = self.pending.popleft()
+
+            if pending_url == url:
+                response, entries = future.result()
+                self.client._store_prefetched(entries)
+
+                if isinstance(response, Exception):
+                    raise response
+                return response
+
+            future.cancel()
+
+    def close(self):
+        """Discard the pending pages and stop the threads.
+
+        The method waits for the pages that are being requested.
+        """
+
+        self._discard()
+        self.executor.shutdown(wait=True)
+
+    def _submit(self):
+        window = self.client._max_prefetched_pages()
+
+        while self.urls and len(self.pending) < window:
+            url = self.urls.popleft()
+            future = self.executor.submit(self.client._prefetch_page, url, self.payload)
+            self.pending.append((url, future))
+
+    def _discard(self):
+        self.urls.clear()
+
+        while self.pending:
+            _, future = self.pending.popleft()
+            future.cancel()
+
+
 class GitHubCommand(BackendCommand):
     """Class to run GitHub backend from the command line."""
 
@@ -1016,6 +1439,18 @@ class GitHubCommand(BackendCommand):
         group.add_argument('--sleep-time', dest='sleep_time',
                            default=DEFAULT_SLEEP_TIME, type=int,
                            help="sleeping time between API call retries")
+        group.add_argument('--max-workers', dest='max_workers',
+                           default=DEFAULT_MAX_WORKERS, type=int,
+                           help="number of threads used to fetch the data of each item "
+                                "and the pages of lists")
+        group.add_argument('--user-cache-size', dest='user_cache_size',
+                           default=DEFAULT_USER_CACHE_SIZE, type=int,
+                           help="max number of users kept in memory")
+        group.add_argument('--user-cache-path', dest='user_cache_path',
+                           help="database where users are stored for further executions")
+        group.add_argument('--user-cache-ttl', dest='user_cache_ttl',
+                           default=DEFAULT_USER_CACHE_TTL, type=int,
+                           help="seconds the stored users are valid")
 
         # Positional arguments
         parser.parser.add_argument('owner',
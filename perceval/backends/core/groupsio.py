@@ -28,7 +28,7 @@ import requests
 from grimoirelab_toolkit.datetime import datetime_to_utc
 from grimoirelab_toolkit.uris import urijoin
 
-from .mbox import MBox, MailingList, CATEGORY_MESSAGE
+from .mbox import MBox, MailingList, CATEGORY_MESSAGE, DEFAULT_PARSE_WORKERS
 from ...backend import (BackendCommand,
                         BackendCommandArgumentParser,
                         DEFAULT_SEARCH_FIELD)
@@ -67,14 +67,17 @@ class Groupsio(MBox):
     :param tag: label used to mark the data
     :param archive: archive to store/retrieve items
     :param ssl_verify: enable/disable SSL verification
+    :param parse_workers: number of processes parsing messages
     """
-    version = '0.4.1'
+    version = '0.5.0'
 
     CATEGORIES = [CATEGORY_MESSAGE]
 
-    def __init__(self, group_name, dirpath, email, password, tag=None, archive=None, ssl_verify=True):
+    def __init__(self, group_name, dirpath, email, password, tag=None, archive=None, ssl_verify=True,
+                 parse_workers=DEFAULT_PARSE_WORKERS):
         url = urijoin(GROUPSIO_URL, 'g', group_name)
-        super().__init__(url, dirpath, tag=tag, archive=archive, ssl_verify=ssl_verify)
+        super().__init__(url, dirpath, tag=tag, archive=archive, ssl_verify=ssl_verify,
+                         parse_workers=parse_workers)
         self.email = email
         self.password = password
         self.group_name = group_name
@@ -335,6 +338,9 @@ class GroupsioCommand(BackendCommand):
         group = parser.parser.add_argument_group('Groupsio arguments')
         group.add_argument('--mboxes-path', dest='mboxes_path',
                            help="Path where mbox files will be stored")
+        group.add_argument('--parse-workers', dest='parse_workers',
+                           type=int, default=DEFAULT_PARSE_WORKERS,
+                           help="Number of processes parsing messages")
 
         # Required arguments
         parser.parser.add_argument('group_name', help="Name of the group on Groups.io")
@@ -29,17 +29,24 @@ import os
 import dateutil.parser
 import dateutil.relativedelta
 import dateutil.tz
+import requests
 
 from grimoirelab_toolkit.datetime import datetime_to_utc, datetime_utcnow
 from grimoirelab_toolkit.uris import urijoin
 
-from .mbox import MBox, MailingList, CATEGORY_MESSAGE
+from .mbox import (MBox,
+                   MBoxDownloader,
+                   MailingList,
+                   CATEGORY_MESSAGE,
+                   DEFAULT_PARSE_WORKERS)
 from ...backend import (BackendCommand,
                         BackendCommandArgumentParser)
 from ...client import HttpClient
 from ...utils import (DEFAULT_DATETIME,
                       months_range)
 
+DEFAULT_MAX_WORKERS = 1
+
 logger = logging.getLogger(__name__)
 
 
@@ -56,14 +63,19 @@ class HyperKitty(MBox):
     :param tag: label used to mark the data
     :param archive: archive to store/retrieve items
     :param ssl_verify: enable/disable SSL verification
+    :param max_workers: number of mbox files downloaded at the same time
+    :param parse_workers: number of processes parsing messages
     """
-    version = '0.6.0'
+    version = '0.8.1'
 
     CATEGORIES = [CATEGORY_MESSAGE]
 
-    def __init__(self, url, dirpath, tag=None, archive=None, ssl_verify=True):
-        super().__init__(url, dirpath, tag=tag, archive=archive, ssl_verify=ssl_verify)
+    def __init__(self, url, dirpath, tag=None, archive=None, ssl_verify=True,
+                 max_workers=DEFAULT_MAX_WORKERS, parse_workers=DEFAULT_PARSE_WORKERS):
+        super().__init__(url, dirpath, tag=tag, archive=archive, ssl_verify=ssl_verify,
+                         parse_workers=parse_workers)
         self.url = url
+        self.max_workers = max(1, max_workers)
 
     def fetch(self, category=CATEGORY_MESSAGE, from_date=DEFAULT_DATETIME):
         """Fetch the messages from the HyperKitty mailing list archiver.
@@ -99,7 +111,8 @@ class HyperKitty(MBox):
         logger.info("Looking for messages from '%s' since %s",
                     self.url, str(from_date))
 
-        mailing_list = HyperKittyList(self.url, self.dirpath)
+        mailing_list = HyperKittyList(self.url, self.dirpath,
+                                      max_workers=self.max_workers)
         mailing_list.fetch(from_date=from_date)
 
         messages = self._fetch_and_parse_messages(mailing_list, from_date)
@@ -137,13 +150,19 @@ class HyperKittyList(MailingList):
     or greater. Previous versions do not export messages in MBox
     format.
 
+    Archives that did not change since the last time they were
+    fetched are not downloaded again.
+
     :param url: URL to the HyperKitty archiver for this list
     :param dirpath: path to the local mboxes archives
     :param ssl_verify: enable/disable SSL verification
+    :param max_workers: number of archives downloaded at the same time
     """
-    def __init__(self, url, dirpath, ssl_verify=True):
+    def __init__(self, url, dirpath, ssl_verify=True, max_workers=DEFAULT_MAX_WORKERS):
         super().__init__(url, dirpath)
         self.client = HttpClient(url, ssl_verify=ssl_verify)
+        self.downloader = MBoxDownloader(self.client, dirpath,
+                                         max_workers=max_workers)
 
     def fetch(self, from_date=DEFAULT_DATETIME):
         """Fetch the mbox files from the remote archiver.
@@ -160,7 +179,7 @@ class HyperKittyList(MailingList):
             are compared
 
         :returns: a list of tuples, storing the links and paths of the
-            fetched archives
+            downloaded archives
         """
         logger.info("Downloading mboxes from '%s' to since %s",
                     self.client.base_url, str(from_date))
@@ -174,15 +193,9 @@ class HyperKittyList(MailingList):
 
         months = months_range(from_date, to_end)
 
-        fetched = []
-
-        if not os.path.exists(self.dirpath):
-            os.makedirs(self.dirpath)
-
-        tmbox = 0
+        archives = []
 
         for dts in months:
-            tmbox += 1
             start, end = dts[0], dts[1]
             filename = start.strftime("%Y-%m.mbox.gz")
             filepath = os.path.join(self.dirpath, filename)
@@ -194,12 +207,13 @@ class HyperKittyList(MailingList):
                 'end': end.strftime("%Y-%m-%d")
             }
 
-            success = self._download_archive(url, params, filepath)
+            archives.append((url, params, filepath))
 
-            if success:
-                fetched.append((url, filepath))
+        downloaded = self.downloader.map(self._download_archive, archives)
+        fetched = [(url, filepath)
+                   for (url, _, filepath), success in zip(archives, downloaded) if success]
 
-        logger.info("%s/%s MBoxes downloaded", len(fetched), tmbox)
+        logger.info("%s/%s MBoxes downloaded", len(fetched), len(archives))
 
         return fetched
 
@@ -238,18 +252,18 @@ class HyperKittyList(MailingList):
         return dt
 
     def _download_archive(self, url, params, filepath):
-        r = self.client.fetch(url, payload=params, stream=True)
-
         try:
-            with open(filepath, 'wb') as fd:
-                fd.write(r.raw.read())
+            downloaded = self.downloader.download(url, filepath, payload=params)
+        except requests.exceptions.RequestException as e:
+            raise e
         except OSError as e:
             logger.warning("Ignoring %s archive due to: %s", url, str(e))
             return False
 
-        logger.debug("%s archive downloaded and stored in %s", url, filepath)
+        if downloaded:
+            logger.debug("%s archive downloaded and stored in %s", url, filepath)
 
-        return True
+        return downloaded
 
 
 class HyperKittyCommand(BackendCommand):
@@ -280,6 +294,12 @@ class HyperKittyCommand(BackendCommand):
         group = parser.parser.add_argument_group('HyperKitty arguments')
         group.add_argument('--mboxes-path', dest='mboxes_path',
                            help="Path where mbox files will be stored")
+        group.add_argument('--max-workers', dest='max_workers',
+                           type=int, default=DEFAULT_MAX_WORKERS,
+                           help="Number of mbox files downloaded at the same time")
+        group.add_argument('--parse-workers', dest='parse_workers',
+                           type=int, default=DEFAULT_PARSE_WORKERS,
+                           help="Number of processes parsing messages")
 
         # Required arguments
         parser.parser.add_argument('url',
@@ -24,6 +24,7 @@
 #     Harshal Mittal <harshalmittal4@gmail.com>
 #
 
+import concurrent.futures
 import json
 import logging
 
@@ -38,10 +39,11 @@ from ...backend import (Backend,
                         BackendCommand,
                         BackendCommandArgumentParser)
 from ...client import HttpClient
-from ...utils import DEFAULT_DATETIME
+from ...utils import DEFAULT_DATETIME, ordered_futures
 
 CATEGORY_ISSUE = "issue"
 MAX_RESULTS = 100  # Maximum number of results per query
+DEFAULT_MAX_WORKERS = 1
 
 logger = logging.getLogger(__name__)
 
@@ -103,8 +105,9 @@ class Jira(Backend):
     :param tag: label used to mark the data
     :param archive: archive to store/retrieve items
     :param ssl_verify: enable/disable SSL verification
+    :param max_workers: number of threads used to fetch pages and comments
     """
-    version = '0.14.0'
+    version = '0.15.0'
 
     CATEGORIES = [CATEGORY_ISSUE]
     EXTRA_SEARCH_FIELDS = {
@@ -117,7 +120,8 @@ class Jira(Backend):
     def __init__(self, url, project=None,
                  user=None, password=None,
                  cert=None, max_results=MAX_RESULTS,
-                 tag=None, archive=None, ssl_verify=True):
+                 tag=None, archive=None, ssl_verify=True,
+                 max_workers=DEFAULT_MAX_WORKERS):
         origin = url
 
         super().__init__(origin, tag=tag, archive=archive, ssl_verify=ssl_verify)
@@ -127,6 +131,7 @@ class Jira(Backend):
         self.password = password
         self.cert = cert
         self.max_results = max_results
+        self.max_workers = max(1, max_workers)
         self.client = None
 
     def fetch(self, category=CATEGORY_ISSUE, from_date=DEFAULT_DATETIME):
@@ -163,22 +168,28 @@ class Jira(Backend):
         logger.info("Looking for issues at site '%s', in project '%s' and updated from '%s'",
                     self.url, self.project, str(from_date))
 
-        whole_pages = self.client.get_issues(from_date)
+        whole_pages = self.client.get_issues(from_date, decode=True)
 
         fields = json.loads(self.client.get_fields())
         custom_fields = filter_custom_fields(fields)
 
-        for whole_page in whole_pages:
-            issues = self.parse_issues(whole_page)
-            for issue in issues:
-                mapping = map_custom_field(custom_fields, issue['fields'])
-                for k, v in mapping.items():
-                    issue['fields'][k] = v
+        if self.max_workers > 1:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+        else:
+            executor = None
 
-                comments_data = self.__get_issue_comments(issue['id'])
-                issue['comments_data'] = comments_data
+        try:
+            for whole_page in whole_pages:
+                issues = whole_page['issues']
+                for issue in self.__fetch_issues_comments(issues, executor):
+                    mapping = map_custom_field(custom_fields, issue['fields'])
+                    for k, v in mapping.items():
+                        issue['fields'][k] = v
 
-                yield issue
+                    yield issue
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
 
     @classmethod
     def has_archiving(cls):
@@ -249,18 +260,40 @@ class Jira(Backend):
 
         return JiraClient(self.url, self.project, self.user, self.password,
                           self.cert, self.max_results,
-                          self.archive, from_archive, self.ssl_verify)
+                          self.archive, from_archive, self.ssl_verify,
+                          max_workers=self.max_workers)
+
+    def __fetch_issues_comments(self, issues, executor=None):
+        """Set the comments of the issues, keeping their order.
+
+        When a pool of threads is given, the comments of the issues
+        of the page are requested concurrently.
+        """
+        if not executor:
+            for issue in issues:
+                issue['comments_data'] = self.__get_issue_comments(issue['id'])
+                yield issue
+            return
+
+        comments = ordered_futures(executor,
+                                   lambda issue: self.__get_issue_comments(issue['id']),
+                                   issues, 2 * self.max_workers)
+
+        try:
+            for issue, future in comments:
+                issue['comments_data'] = future.result()
+                yield issue
+        finally:
+            comments.close()
 
     def __get_issue_comments(self, issue_id):
         """Get issue comments"""
 
         comments = []
-        page_comments = self.client.get_comments(issue_id)
+        page_comments = self.client.get_comments(issue_id, decode=True)
 
         for page_comment in page_comments:
-            raw_comments = json.loads(page_comment)
-
-            comments.extend(raw_comments['comments'])
+            comments.extend(page_comment['comments'])
 
         return comments
 
@@ -280,6 +313,7 @@ class JiraClient(HttpClient):
     :param archive: an archive to store/read fetched data
     :param from_archive: it tells whether to write/read the archive
     :param ssl_verify: enable/disable SSL verification
+    :param max_workers: max number of pages requested concurrently
 
     :raises HTTPError: when an error occurs doing the request
     """
@@ -291,28 +325,37 @@ class JiraClient(HttpClient):
     COMMENT = 'comment'
 
     def __init__(self, url, project, user, password, cert, max_results=MAX_RESULTS,
-                 archive=None, from_archive=False, ssl_verify=True):
+                 archive=None, from_archive=False, ssl_verify=True,
+                 max_workers=DEFAULT_MAX_WORKERS):
         super().__init__(url, archive=archive, from_archive=from_archive, ssl_verify=ssl_verify)
         self.project = project
         self.user = user
         self.password = password
         self.cert = cert
         self.max_results = max_results
+        self.max_workers = max(1, max_workers)
 
         if not from_archive:
             self.__init_session()
 
-    def get_items(self, from_date, url, expand_fields=True):
+    def get_items(self, from_date, url, expand_fields=True, decode=False):
         """Retrieve all the items from a given date.
 
+        The first page of items tells the total number of items and
+        the size of the pages, so the rest of pages are known in advance.
+        When `max_workers` is greater than one, the pages are requested
+        concurrently, keeping up to twice that number of them in flight.
+        Pages are always returned in order.
+
         :param url: endpoint API url
         :param from_date: obtain items updated since this date
         :param expand_fields: if True, it includes the expand fields in the payload
+        :param decode: if True, pages are returned already decoded
+            instead of as raw JSON strings
         """
         start_at = 0
 
         req = self.fetch(url, payload=self.__build_payload(start_at, from_date, expand_fields))
-        issues = req.text
 
         data = req.json()
         titems = data['total']
@@ -321,35 +364,43 @@ class JiraClient(HttpClient):
         start_at += min(nitems, titems)
         self.__log_status(start_at, titems, url)
 
-        while issues:
-            yield issues
-            issues = None
+        if not req.text:
+            return
+
+        yield data if decode else req.text
+
+        if nitems <= 0:
+            return
 
-            if data['startAt'] + nitems < titems:
-                req = self.fetch(url, payload=self.__build_payload(start_at, from_date, expand_fields))
+        offsets = range(data['startAt'] + nitems, titems, nitems)
 
-                data = req.json()
-                start_at += nitems
-                issues = req.text
-                self.__log_status(start_at, titems, url)
+        for start_at, issues in self.__fetch_pages(url, offsets, from_date, expand_fields, decode):
+            self.__log_status(start_at + nitems, titems, url)
+
+            if not issues:
+                break
+
+            yield issues
 
-    def get_issues(self, from_date):
+    def get_issues(self, from_date, decode=False):
         """Retrieve all the issues from a given date.
 
         :param from_date: obtain issues updated since this date
+        :param decode: if True, pages are returned already decoded
         """
         url = urijoin(self.base_url, self.RESOURCE, self.VERSION_API, 'search')
-        issues = self.get_items(from_date, url)
+        issues = self.get_items(from_date, url, decode=decode)
 
         return issues
 
-    def get_comments(self, issue_id):
+    def get_comments(self, issue_id, decode=False):
         """Retrieve all the comments of a given issue.
 
         :param issue_id: ID of the issue
+        :param decode: if True, pages are returned already decoded
         """
         url = urijoin(self.base_url, self.RESOURCE, self.VERSION_API, self.ISSUE, issue_id, self.COMMENT)
-        comments = self.get_items(DEFAULT_DATETIME, url, expand_fields=False)
+        comments = self.get_items(DEFAULT_DATETIME, url, expand_fields=False, decode=decode)
 
         return comments
 
@@ -361,6 +412,30 @@ class JiraClient(HttpClient):
 
         return req.text
 
+    def __fetch_pages(self, url, offsets, from_date, expand_fields, decode=False):
+        """Fetch the pages starting at the given offsets, in order"""
+
+        def fetch_page(start_at):
+            req = self.fetch(url, payload=self.__build_payload(start_at, from_date, expand_fields))
+
+            if decode and req.text:
+                return req.json()
+            return req.text
+
+        if self.max_workers == 1 or len(offsets) < 2:
+            for start_at in offsets:
+                yield start_at, fetch_page(start_at)
+            return
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pages = ordered_futures(executor, fetch_page, offsets, 2 * self.max_workers)
+
+            try:
+                for start_at, future in pages:
+                    yield start_at, future.result()
+            finally:
+                pages.close()
+
     def __build_jql_query(self, from_date):
         AND_OP = 'AND'
         UPDATED_OP = 'updated >'
@@ -438,6 +513,9 @@ class JiraCommand(BackendCommand):
         group.add_argument('--max-results', dest='max_results',
                            type=int, default=MAX_RESULTS,
                            help="Maximum number of results requested in the same query")
+        group.add_argument('--max-workers', dest='max_workers',
+                           type=int, default=DEFAULT_MAX_WORKERS,
+                           help="Number of threads used to fetch pages and comments")
 
         # Required arguments
         parser.parser.add_argument('url',
@@ -22,8 +22,11 @@
 #     Harshal Mittal <harshalmittal4@gmail.com>
 #
 
+import concurrent.futures
 import json
 import logging
+import threading
+
 import requests
 
 from grimoirelab_toolkit.datetime import (datetime_to_utc,
@@ -35,7 +38,7 @@ from ...backend import (Backend,
                         BackendCommandArgumentParser,
                         DEFAULT_SEARCH_FIELD)
 from ...client import HttpClient
-from ...utils import DEFAULT_DATETIME
+from ...utils import DEFAULT_DATETIME, ordered_futures
 
 CATEGORY_ISSUE = "issue"
 
@@ -45,6 +48,10 @@ LAUNCHPAD_API_URL = 'https://api.launchpad.net/1.0'
 TARGET_ISSUE_FIELDS = ['bug_link', 'owner_link', 'assignee_link']
 ITEMS_PER_PAGE = 75
 SLEEP_TIME = 300
+DEFAULT_MAX_WORKERS = 1
+
+# Number of locks shared by the requests of users
+USER_LOCK_STRIPES = 64
 
 logger = logging.getLogger(__name__)
 
@@ -62,14 +69,17 @@ class Launchpad(Backend):
     :param tag: label used to mark the data
     :param archive: archive to store/retrieve items
     :param ssl_verify: enable/disable SSL verification
+    :param max_workers: number of threads used to fetch the data
+        of the issues of a page
     """
-    version = '0.8.0'
+    version = '0.9.1'
 
     CATEGORIES = [CATEGORY_ISSUE]
 
     def __init__(self, distribution, package=None,
                  items_per_page=ITEMS_PER_PAGE, sleep_time=SLEEP_TIME,
-                 tag=None, archive=None, ssl_verify=True):
+                 tag=None, archive=None, ssl_verify=True,
+                 max_workers=DEFAULT_MAX_WORKERS):
 
         origin = urijoin(LAUNCHPAD_URL, distribution)
 
@@ -78,6 +88,7 @@ class Launchpad(Backend):
         self.package = package
         self.items_per_page = items_per_page
         self.sleep_time = sleep_time
+        self.max_workers = max(1, max_workers)
 
         self.client = None
         self._users = {}  # internal users cache
@@ -138,9 +149,18 @@ class Launchpad(Backend):
 
         nissues = 0
 
-        for issue in self._fetch_issues(from_date):
-            yield issue
-            nissues += 1
+        if self.max_workers > 1:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+        else:
+            executor = None
+
+        try:
+            for issue in self._fetch_issues(from_date, executor=executor):
+                yield issue
+                nissues += 1
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
 
         logger.info("Fetch process completed: %s issues fetched", nissues)
 
@@ -213,7 +233,7 @@ class Launchpad(Backend):
 
         return bug_link.split('/')[-1]
 
-    def _fetch_issues(self, from_date):
+    def _fetch_issues(self, from_date, executor=None):
         """Fetch the issues from a project (distribution/package)"""
 
         issues_groups = self.client.issues(start=from_date)
@@ -221,26 +241,51 @@ class Launchpad(Backend):
         for raw_issues in issues_groups:
 
             issues = json.loads(raw_issues)['entries']
+            for issue in self.__fetch_issues_data(issues, executor):
+                yield issue
+
+    def __fetch_issues_data(self, issues, executor=None):
+        """Set the data of the issues of a page, keeping their order.
+
+        When a pool of threads is given, the data of the issues
+        of the page are requested concurrently.
+        """
+        if not executor:
             for issue in issues:
-                issue = self.__init_extra_issue_fields(issue)
-                issue_id = self.__extract_issue_id(issue['bug_link'])
+                yield self.__fetch_issue_extra_data(issue)
+            return
 
-                for field in TARGET_ISSUE_FIELDS:
+        issues_data = ordered_futures(executor, self.__fetch_issue_extra_data,
+                                      issues, 2 * self.max_workers)
 
-                    if not issue[field]:
-                        continue
+        try:
+            for _, future in issues_data:
+                yield future.result()
+        finally:
+            issues_data.close()
 
-                    if field == 'bug_link':
-                        issue['bug_data'] = self.__fetch_issue_data(issue_id)
-                        issue['activity_data'] = [activity for activity in self.__fetch_issue_activities(issue_id)]
-                        issue['messages_data'] = [message for message in self.__fetch_issue_messages(issue_id)]
-                        issue['attachments_data'] = [attachment for attachment in self.__fetch_issue_attachments(issue_id)]
-                    elif field == 'assignee_link':
-                        issue['assignee_data'] = self.__fetch_user_data('{ASSIGNEE}', issue[field])
-                    elif field == 'owner_link':
-                        issue['owner_data'] = self.__fetch_user_data('{OWNER}', issue[field])
+    def __fetch_issue_extra_data(self, issue):
+        """Get the data, collections and users of an issue"""
 
-                yield issue
+        issue = self.__init_extra_issue_fields(issue)
+        issue_id = self.__extract_issue_id(issue['bug_link'])
+
+        for field in TARGET_ISSUE_FIELDS:
+
+            if not issue[field]:
+                continue
+
+            if field == 'bug_link':
+                issue['bug_data'] = self.__fetch_issue_data(issue_id)
+                issue['activity_data'] = [activity for activity in self.__fetch_issue_activities(issue_id)]
+                issue['messages_data'] = [message for message in self.__fetch_issue_messages(issue_id)]
+                issue['attachments_data'] = [attachment for attachment in self.__fetch_issue_attachments(issue_id)]
+            elif field == 'assignee_link':
+                issue['assignee_data'] = self.__fetch_user_data('{ASSIGNEE}', issue[field])
+            elif field == 'owner_link':
+                issue['owner_data'] = self.__fetch_user_data('{OWNER}', issue[field])
+
+        return issue
 
     def __fetch_issue_data(self, issue_id):
         """Get data associated to an issue"""
@@ -318,6 +363,8 @@ class LaunchpadClient(HttpClient):
         self.package = package
         self.items_per_page = items_per_page
 
+        self._locks = [threading.Lock() for _ in range(USER_LOCK_STRIPES)]
+
         extra_headers = self.__define_headers()
         super().__init__(LAUNCHPAD_API_URL, sleep_time=sleep_time, extra_headers=extra_headers,
                          archive=archive, from_archive=from_archive, ssl_verify=ssl_verify)
@@ -330,28 +377,36 @@ class LaunchpadClient(HttpClient):
         return self.__fetch_items(path=path, payload=payload)
 
     def user(self, user_name):
-        """Get the user data by URL"""
+        """Get the user data by URL.
 
+        Users are requested only once; when several threads ask
+        for the same user at the same time, only one of them
+        requests it while the others wait for its data.
+        """
         user = None
 
         if user_name in self._users:
             return self._users[user_name]
 
-        url_user = self.__get_url("~" + user_name)
+        with self._get_lock(user_name):
+            if user_name in self._users:
+                return self._users[user_name]
 
-        logger.info("Getting info for %s" % (url_user))
+            url_user = self.__get_url("~" + user_name)
 
-        try:
-            raw_user = self.__send_request(url_user)
-            user = raw_user
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code in [404, 410]:
-                logger.warning("Data is not available - %s", url_user)
-                user = '{}'
-            else:
-                raise e
+            logger.info("Getting info for %s" % (url_user))
+
+            try:
+                raw_user = self.__send_request(url_user)
+                user = raw_user
+            except requests.exceptions.HTTPError as e:
+                if e.response.status_code in [404, 410]:
+                    logger.warning("Data is not available - %s", url_user)
+                    user = '{}'
+                else:
+                    raise e
 
-        self._users[user_name] = user
+            self._users[user_name] = user
 
         return user
 
@@ -380,6 +435,14 @@ class LaunchpadClient(HttpClient):
 
         return raw_items
 
+    def _get_lock(self, user_name):
+        """Return the lock that protects the request of a user.
+
+        Users share a fixed number of locks, so the memory used
+        by them does not grow with the number of users.
+        """
+        return self._locks[hash(user_name) % len(self._locks)]
+
     def __get_url_project(self):
         """Build URL project"""
 
@@ -492,6 +555,9 @@ class LaunchpadCommand(BackendCommand):
                            help="Items per page")
         group.add_argument('--sleep-time', dest='sleep_time',
                            help="Sleep time in case of connection lost")
+        group.add_argument('--max-workers', dest='max_workers',
+                           type=int, default=DEFAULT_MAX_WORKERS,
+                           help="Number of threads used to fetch the data of the issues")
 
         # Required arguments
         parser.parser.add_argument('distribution',
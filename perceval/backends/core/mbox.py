@@ -26,10 +26,14 @@
 
 # Note: some of this code was taken from the MailingListStats project
 
+import concurrent.futures
+import functools
+import json
 import logging
 import mailbox
+import mmap
 import os
-import tempfile
+import threading
 
 import gzip
 import bz2
@@ -44,10 +48,19 @@ from ...backend import (Backend,
                         BackendCommandArgumentParser)
 from ...utils import (DEFAULT_DATETIME,
                       check_compressed_file_type,
-                      message_to_dict)
+                      message_to_dict,
+                      ordered_futures)
 
 CATEGORY_MESSAGE = "message"
 
+MBOX_METADATA_DIR = '.perceval'
+MBOX_DOWNLOADS_FILE = 'downloads.json'
+MBOX_INDEX_FILE = 'index.json'
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+READ_CHUNK_SIZE = 1024 * 1024
+DEFAULT_PARSE_WORKERS = 1
+PARSE_BATCH_SIZE = 100
+
 logger = logging.getLogger(__name__)
 
 
@@ -59,26 +72,39 @@ class MBox(Backend):
     the mbox files are stored. The origin of the data will be set to to
     the value of `uri`.
 
+    The offset, Message-ID and date of the messages of each mbox are
+    stored in an index (see `MBoxIndex`). Messages sent before
+    `from_date` are skipped on the next fetches, without parsing them,
+    while their mboxes do not change.
+
+    Messages can be parsed by a pool of `parse_workers` processes.
+    Each one receives batches of raw messages, as they are read from
+    the mboxes, and returns them parsed and validated. Messages are
+    returned in the same order they are stored.
+
     :param uri: URI of the mboxes; typically, the URL of their
         mailing list
     :param dirpath: directory path where the mboxes are stored
     :param tag: label used to mark the data
     :param archive: archive to store/retrieve items
     :param ssl_verify: enable/disable SSL verification
+    :param parse_workers: number of processes parsing messages
     """
-    version = '0.13.0'
+    version = '0.16.1'
 
     CATEGORIES = [CATEGORY_MESSAGE]
 
     DATE_FIELD = 'Date'
     MESSAGE_ID_FIELD = 'Message-ID'
 
-    def __init__(self, uri, dirpath, tag=None, archive=None, ssl_verify=True):
+    def __init__(self, uri, dirpath, tag=None, archive=None, ssl_verify=True,
+                 parse_workers=DEFAULT_PARSE_WORKERS):
         origin = uri
 
         super().__init__(origin, tag=tag, archive=archive, ssl_verify=ssl_verify)
         self.uri = uri
         self.dirpath = dirpath
+        self.parse_workers = max(1, parse_workers)
 
     def fetch(self, category=CATEGORY_MESSAGE, from_date=DEFAULT_DATETIME):
         """Fetch the messages from a set of mbox files.
@@ -174,16 +200,17 @@ class MBox(Backend):
         """Parse a mbox file.
 
         This method parses a mbox file and returns an iterator of dictionaries.
-        Each one of this contains an email message.
+        Each one of this contains an email message. The file can be
+        compressed using any of the formats supported by `MBoxArchive`.
 
         :param filepath: path of the mbox to parse
 
         :returns : generator of messages; each message is stored in a
             dictionary of type `requests.structures.CaseInsensitiveDict`
         """
-        mbox = _MBox(filepath, create=False)
+        mbox = MBoxArchive(filepath)
 
-        for msg in mbox:
+        for msg in mbox.messages():
             message = message_to_dict(msg)
             yield message
 
@@ -194,93 +221,165 @@ class MBox(Backend):
         """Fetch and parse the messages from a mailing list"""
 
         from_date = datetime_to_utc(from_date)
+        from_ts = from_date.timestamp()
 
         nmsgs, imsgs, tmsgs = (0, 0, 0)
 
-        for mbox in mailing_list.mboxes:
-            tmp_path = None
+        index = MBoxIndex(mailing_list.dirpath)
+        index.load()
 
-            try:
-                tmp_path = self._copy_mbox(mbox)
+        executor = None
 
-                for message in self.parse_mbox(tmp_path):
-                    tmsgs += 1
+        if self.parse_workers > 1:
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.parse_workers)
 
-                    if not self._validate_message(message):
-                        imsgs += 1
-                        continue
+        try:
+            for mbox in mailing_list.mboxes:
+                try:
+                    signature = index.signature(mbox)
+                    entries = index.get(mbox, signature)
+
+                    if entries is None:
+                        indexed = []
+                        ranges = None
+                    else:
+                        # Only the messages sent since the given date are read
+                        indexed = None
+                        ranges = [(offset, length) for offset, length, _, ts in entries
+                                  if ts is not None and ts >= from_ts]
+                        invalid = len([entry for entry in entries if entry[3] is None])
+                        tmsgs += invalid
+                        imsgs += invalid
+
+                        logger.debug("Mbox %s indexed; %s/%s messages to parse",
+                                     mbox.filepath, len(ranges), len(entries))
+
+                    raw_messages = mbox.read_messages(ranges=ranges)
+
+                    if executor:
+                        messages = self._parse_mbox_parallel(raw_messages, executor)
+                    else:
+                        messages = self._parse_mbox(raw_messages)
+
+                    for offset, length, message, dt in messages:
+                        if indexed is not None:
+                            indexed.append(self._index_entry(offset, length, message, dt))
+
+                        tmsgs += 1
+
+                        if not dt:
+                            imsgs += 1
+                            continue
+
+                        # Ignore those messages sent before the given date
+                        if dt < from_date:
+                            logger.debug("Message %s sent before %s; skipped",
+                                         message['unixfrom'], str(from_date))
+                            tmsgs -= 1
+                            continue
+
+                        # Convert 'CaseInsensitiveDict' to dict
+                        message = self._casedict_to_dict(message)
+
+                        nmsgs += 1
+                        logger.debug("Message %s parsed", message['unixfrom'])
+
+                        yield message
+
+                    if indexed is not None:
+                        index.update(mbox, signature, indexed)
+                except (OSError, EOFError) as e:
+                    logger.warning("Ignoring %s mbox due to: %s", mbox.filepath, str(e))
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
+            index.save()
 
-                    # Ignore those messages sent before the given date
-                    dt = str_to_datetime(message[MBox.DATE_FIELD])
+        logger.info("Done. %s/%s messages fetched; %s ignored",
+                    nmsgs, tmsgs, imsgs)
 
-                    if dt < from_date:
-                        logger.debug("Message %s sent before %s; skipped",
-                                     message['unixfrom'], str(from_date))
-                        tmsgs -= 1
-                        continue
+    def _parse_mbox(self, raw_messages):
+        """Parse raw messages, returning them together with their dates"""
 
-                    # Convert 'CaseInsensitiveDict' to dict
-                    message = self._casedict_to_dict(message)
+        for offset, raw_message in raw_messages:
+            message, dt = self._parse_raw_message(raw_message)
+            yield offset, len(raw_message), message, dt
 
-                    nmsgs += 1
-                    logger.debug("Message %s parsed", message['unixfrom'])
+    def _parse_mbox_parallel(self, raw_messages, executor):
+        """Parse raw messages using a pool of processes.
 
-                    yield message
-            except (OSError, EOFError) as e:
-                logger.warning("Ignoring %s mbox due to: %s", mbox.filepath, str(e))
-            except Exception as e:
-                if tmp_path and os.path.exists(tmp_path):
-                    os.remove(tmp_path)
-                raise e
-            finally:
-                if tmp_path and os.path.exists(tmp_path):
-                    os.remove(tmp_path)
+        Raw messages are sent to the pool in batches of `PARSE_BATCH_SIZE`,
+        keeping up to twice `parse_workers` batches in process.
+        """
+        parse_batch = functools.partial(_parse_raw_messages, type(self))
+        batches = ordered_futures(executor, parse_batch,
+                                  _batches(raw_messages, PARSE_BATCH_SIZE),
+                                  2 * self.parse_workers)
 
-        logger.info("Done. %s/%s messages fetched; %s ignored",
-                    nmsgs, tmsgs, imsgs)
+        try:
+            for _, future in batches:
+                yield from future.result()
+        finally:
+            batches.close()
 
-    def _copy_mbox(self, mbox):
-        """Copy the contents of a mbox to a temporary file"""
+    @classmethod
+    def _index_entry(cls, offset, length, message, dt):
+        """Build the index entry of a message"""
+
+        if not dt:
+            return [offset, length, None, None]
+
+        return [offset, length, message[cls.MESSAGE_ID_FIELD], dt.timestamp()]
 
-        tmp_path = tempfile.mktemp(prefix='perceval_')
+    @classmethod
+    def _parse_raw_message(cls, raw_message):
+        """Parse a raw message, returning it together with its date"""
+
+        message = message_to_dict(_MBoxReader.make_message(raw_message))
 
-        with mbox.container as f_in:
-            with open(tmp_path, mode='wb') as f_out:
-                for l in f_in:
-                    f_out.write(l)
-        return tmp_path
+        return message, cls._check_message(message)
 
-    def _validate_message(self, message):
+    @classmethod
+    def _check_message(cls, message):
+        """Return the date of a message or `None` when it is not valid"""
+
+        if not cls._validate_message(message):
+            return None
+
+        return str_to_datetime(message[cls.DATE_FIELD])
+
+    @classmethod
+    def _validate_message(cls, message):
         """Check if the given message has the mandatory fields"""
 
         # This check is "case insensitive" because we're
         # using 'CaseInsensitiveDict' from requests.structures
         # module to store the contents of a message.
-        if self.MESSAGE_ID_FIELD not in message:
+        if cls.MESSAGE_ID_FIELD not in message:
             logger.warning("Field 'Message-ID' not found in message %s; ignoring",
                            message['unixfrom'])
             return False
 
-        if not message[self.MESSAGE_ID_FIELD]:
+        if not message[cls.MESSAGE_ID_FIELD]:
             logger.warning("Field 'Message-ID' is empty in message %s; ignoring",
                            message['unixfrom'])
             return False
 
-        if self.DATE_FIELD not in message:
+        if cls.DATE_FIELD not in message:
             logger.warning("Field 'Date' not found in message %s; ignoring",
                            message['unixfrom'])
             return False
 
-        if not message[self.DATE_FIELD]:
+        if not message[cls.DATE_FIELD]:
             logger.warning("Field 'Date' is empty in message %s; ignoring",
                            message['unixfrom'])
             return False
 
         try:
-            str_to_datetime(message[self.DATE_FIELD])
+            str_to_datetime(message[cls.DATE_FIELD])
         except InvalidDateError:
             logger.warning("Invalid date %s in message %s; ignoring",
-                           message[self.DATE_FIELD], message['unixfrom'])
+                           message[cls.DATE_FIELD], message['unixfrom'])
             return False
 
         return True
@@ -301,6 +400,49 @@ class MBox(Backend):
         return msg
 
 
+def _batches(iterable, size):
+    """Group the items of an iterable in lists of `size` items.
+
+    When the iterable fails, the items read before the error
+    are returned before raising it.
+    """
+    batch = []
+
+    try:
+        for item in iterable:
+            batch.append(item)
+
+            if len(batch) == size:
+                yield batch
+                batch = []
+    except Exception:
+        if batch:
+            yield batch
+        raise
+
+    if batch:
+        yield batch
+
+
+def _parse_raw_messages(backend_class, raw_messages):
+    """Parse a batch of raw messages on a worker process.
+
+    :param backend_class: class of the backend; it defines how
+        messages are validated
+    :param raw_messages: list of `(offset, raw_message)` tuples
+
+    :returns: a list of `(offset, length, message, date)` tuples;
+        date is `None` for those messages that are not valid
+    """
+    messages = []
+
+    for offset, raw_message in raw_messages:
+        message, dt = backend_class._parse_raw_message(raw_message)
+        messages.append((offset, len(raw_message), message, dt))
+
+    return messages
+
+
 class _MBox(mailbox.mbox):
     """Wrapper of `mailbox.mbox` to catch unhandled errors"""
 
@@ -309,9 +451,17 @@ class _MBox(mailbox.mbox):
 
         start, stop = self._lookup(key)
         self._file.seek(start)
-        from_line = self._file.readline().replace(mailbox.linesep, b'')
+        from_line = self._file.readline()
         string = self._file.read(stop - self._file.tell())
-        msg = self._message_factory(string.replace(mailbox.linesep, b'\n'))
+
+        return self.make_message(from_line, string)
+
+    @staticmethod
+    def make_message(from_line, string):
+        """Build a message from its 'From ' line and its contents."""
+
+        from_line = from_line.replace(mailbox.linesep, b'')
+        msg = mailbox.mboxMessage(string.replace(mailbox.linesep, b'\n'))
 
         try:
             msg.set_from(from_line[5:].decode('ascii'))
@@ -327,6 +477,116 @@ class _MBox(mailbox.mbox):
         return msg
 
 
+class _MBoxReader:
+    """Iterator over the messages of a mbox stream.
+
+    Messages are split on the lines starting with 'From ', following
+    the same rules of `mailbox.mbox`, while the stream is read in
+    chunks. Memory maps are split in place.
+
+    :param fd: binary file object or memory map with the contents
+        of the mbox
+    """
+    FROM_LINE = b'From '
+    SEPARATOR = b'\nFrom '
+
+    def __init__(self, fd):
+        self.fd = fd
+
+    def __iter__(self):
+        raw_messages = self.raw_messages()
+
+        for raw_message in raw_messages:
+            yield self.make_message(raw_message)
+
+    def raw_messages(self):
+        """Iterate over the raw contents of the messages"""
+
+        for _, raw_message in self.read_messages():
+            yield raw_message
+
+    def read_messages(self):
+        """Iterate over the raw messages together with their offsets"""
+
+        if isinstance(self.fd, mmap.mmap):
+            return self._split_buffer(self.fd)
+        else:
+            return self._split_stream(self.fd)
+
+    def _split_buffer(self, buf):
+        if buf[:len(self.FROM_LINE)] == self.FROM_LINE:
+            start = 0
+        else:
+            start = buf.find(self.SEPARATOR)
+            if start < 0:
+                return
+            start += 1
+
+        while True:
+            end = buf.find(self.SEPARATOR, start)
+
+            if end < 0:
+                yield start, buf[start:]
+                return
+
+            yield start, buf[start:end + 1]
+            start = end + 1
+
+    def _split_stream(self, fd):
+        # The beginning of the stream is handled as a new line,
+        # so the first 'From ' line is found like the rest
+        buf = bytearray(b'\n')
+        base = -1
+        start = -1
+        pos = 0
+
+        while True:
+            end = buf.find(self.SEPARATOR, pos)
+
+            if end >= 0:
+                if start >= 0:
+                    yield base + start, bytes(buf[start:end + 1])
+                start = end + 1
+                pos = start
+                continue
+
+            chunk = fd.read(READ_CHUNK_SIZE)
+
+            if not chunk:
+                break
+
+            # Keep the contents of the current message and the
+            # bytes where a separator split between chunks can be
+            pos = max(pos, len(buf) - len(self.SEPARATOR) + 1)
+            cut = start if start >= 0 else pos
+
+            del buf[:cut]
+            base += cut
+            pos -= cut
+            start = 0 if start >= 0 else -1
+
+            buf += chunk
+
+        if start >= 0:
+            yield base + start, bytes(buf[start:])
+
+    @staticmethod
+    def make_message(raw_message):
+        """Build a message from its raw contents"""
+
+        # Like in `mailbox.mbox`, the empty line before the
+        # next 'From ' line is not part of the message
+        if raw_message.endswith(b'\n\n'):
+            raw_message = raw_message[:-1]
+
+        nl = raw_message.find(b'\n') + 1
+
+        if nl == 0:
+            nl = len(raw_message)
+
+        return _MBox.make_message(raw_message[:nl], raw_message[nl:])
+
+
 class MBoxCommand(BackendCommand):
     """Class to run MBox backend from the command line."""
 
@@ -346,6 +606,11 @@ class MBoxCommand(BackendCommand):
         parser.parser.add_argument('dirpath',
                                    help="Path to the mbox directory")
 
+        # Optional arguments
+        parser.parser.add_argument('--parse-workers', dest='parse_workers',
+                                   type=int, default=DEFAULT_PARSE_WORKERS,
+                                   help="Number of processes parsing messages")
+
         return parser
 
 
@@ -387,12 +652,76 @@ class MBoxArchive(object):
     def is_compressed(self):
         return self._compressed is not None
 
+    def messages(self):
+        """Read the messages stored in the archive.
+
+        Messages are split while the archive is read, without copying
+        it to a temporary file. Compressed archives are uncompressed
+        on the fly and plain ones are mapped in memory.
+
+        :returns: a generator of `mailbox.mboxMessage` objects
+        """
+        for raw_message in self.raw_messages():
+            yield _MBoxReader.make_message(raw_message)
+
+    def raw_messages(self):
+        """Read the raw contents of the messages stored in the archive.
+
+        :returns: a generator of bytes objects; each one stores
+            a message, starting by its 'From ' line
+        """
+        for _, raw_message in self.read_messages():
+            yield raw_message
+
+    def read_messages(self, ranges=None):
+        """Read the raw messages stored in the archive with their offsets.
+
+        Offsets are given on the uncompressed contents of the archive.
+        When `ranges` is set, only the messages stored on those ranges
+        are read. Plain archives are read directly from the given
+        offsets; compressed ones are uncompressed and split as usual
+        but the rest of messages are discarded.
+
+        :param ranges: list of `(offset, length)` tuples of the
+            messages to read
+
+        :returns: a generator of `(offset, raw_message)` tuples
+        """
+        if ranges is not None and not ranges:
+            return
+
+        if self.is_compressed():
+            with self.container as fd:
+                messages = _MBoxReader(fd).read_messages()
+
+                if ranges is None:
+                    yield from messages
+                else:
+                    offsets = {offset for offset, _ in ranges}
+                    for offset, raw_message in messages:
+                        if offset in offsets:
+                            yield offset, raw_message
+            return
+
+        with open(self.filepath, mode='rb') as fd:
+            # Empty files cannot be mapped
+            if os.fstat(fd.fileno()).st_size == 0:
+                return
+
+            with mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                if ranges is None:
+                    yield from _MBoxReader(buf).read_messages()
+                else:
+                    for offset, length in ranges:
+                        yield offset, buf[offset:offset + length]
+
 
 class MailingList(object):
     """Manage mailing lists archives.
 
     This class gives access to the local mboxes archives that a
-    mailing list manages.
+    mailing list manages. The `MBOX_METADATA_DIR` directory, where
+    the index and the downloads of the mboxes are stored, is skipped.
 
     :param uri: URI of the mailing lists, usually its URL address
     :param dirpath: path to the mboxes archives
@@ -417,7 +746,9 @@ class MailingList(object):
             except OSError as e:
                 logger.warning("Ignoring %s mbox due to: %s", self.dirpath, str(e))
         else:
-            for root, _, files in os.walk(self.dirpath):
+            for root, dirs, files in os.walk(self.dirpath):
+                dirs[:] = [d for d in dirs if d != MBOX_METADATA_DIR]
+
                 for filename in sorted(files):
                     try:
                         location = os.path.join(root, filename)
@@ -425,3 +756,280 @@ class MailingList(object):
                     except OSError as e:
                         logger.warning("Ignoring %s mbox due to: %s", filename, str(e))
         return archives
+
+
+class MBoxIndex:
+    """Index of the messages stored in the mboxes of a directory.
+
+    For each mbox, the index keeps the offset, length, Message-ID and
+    date of its messages, in the same order they are stored. Messages
+    that are not valid are indexed with no Message-ID nor date. The
+    entries of a mbox are only used while its size and modification
+    time match the ones it had when it was indexed.
+
+    The index is stored in the `MBOX_METADATA_DIR` directory of the
+    mboxes directory, in the `MBOX_INDEX_FILE` file.
+
+    :param dirpath: path to the mboxes archives
+    """
+    def __init__(self, dirpath):
+        self.dirpath = dirpath
+        self.mboxes = {}
+        self._modified = False
+
+    @property
+    def index_path(self):
+        """Path to the file where the index is stored"""
+
+        return _metadata_path(self.dirpath, MBOX_INDEX_FILE)
+
+    @staticmethod
+    def signature(mbox):
+        """Get the size and modification time of a mbox.
+
+        :param mbox: `MBoxArchive` object
+
+        :raises OSError: when the mbox cannot be accessed
+        """
+        stat = os.stat(mbox.filepath)
+
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def get(self, mbox, signature):
+        """Get the entries of a mbox.
+
+        :param mbox: `MBoxArchive` object
+        :param signature: current signature of the mbox
+
+        :returns: a list of `[offset, length, message_id, timestamp]`
+            entries; `None` when the mbox is not indexed or it
+            changed since it was indexed
+        """
+        indexed = self.mboxes.get(mbox.filepath, None)
+
+        if not indexed or indexed['signature'] != signature:
+            return None
+
+        return indexed['messages']
+
+    def update(self, mbox, signature, entries):
+        """Set the entries of a mbox.
+
+        :param mbox: `MBoxArchive` object
+        :param signature: signature of the mbox when it was read
+        :param entries: list of `[offset, length, message_id, timestamp]`
+            entries
+        """
+        self.mboxes[mbox.filepath] = {
+            'signature': signature,
+            'messages': entries
+        }
+        self._modified = True
+
+    def load(self):
+        """Read the index from its file"""
+
+        try:
+            with open(self.index_path, 'r') as fd:
+                self.mboxes = json.load(fd)
+        except FileNotFoundError:
+            self.mboxes = {}
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring %s index file due to: %s",
+                           self.index_path, str(e))
+            self.mboxes = {}
+
+    def save(self):
+        """Write the index to its file when it was modified"""
+
+        if not self._modified:
+            return
+
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            with open(self.index_path, 'w') as fd:
+                json.dump(self.mboxes, fd)
+            self._modified = False
+        except OSError as e:
+            logger.warning("Index file %s not saved due to: %s",
+                           self.index_path, str(e))
+
+
+class MBoxDownloader:
+    """Download the mbox archives of a mailing list incrementally.
+
+    Archives are requested sending the validators (`ETag` and
+    `Last-Modified` headers) received the last time they were
+    downloaded, so those that did not change are not downloaded
+    again. When the server does not send any validator, an archive
+    is considered unchanged when its `Content-Length` matches the
+    size of the local copy. The validators are stored in the
+    `MBOX_METADATA_DIR` directory of the mboxes directory, in the
+    `MBOX_DOWNLOADS_FILE` file.
+
+    Archives are streamed to disk in chunks, using the pooled
+    session of `client`, and up to `max_workers` of them are
+    downloaded at the same time.
+
+    :param client: HTTP client used to download the archives
+    :param dirpath: path to the local mboxes archives
+    :param max_workers: number of archives downloaded at the same time
+    """
+    def __init__(self, client, dirpath, max_workers=1):
+        self.client = client
+        self.dirpath = dirpath
+        self.max_workers = max(1, max_workers)
+        self.downloads = {}
+        self._lock = threading.Lock()
+
+    @property
+    def downloads_path(self):
+        """Path to the file where the validators are stored"""
+
+        return _metadata_path(self.dirpath, MBOX_DOWNLOADS_FILE)
+
+    def map(self, func, archives):
+        """Call `func` for each archive.
+
+        Up to `max_workers` archives are processed at the same time.
+        The validators of the downloads are saved at the end of the
+        process, even when it fails.
+
+        :param func: function that downloads an archive
+        :param archives: list of archives; each one is a tuple
+            with the arguments of `func`
+
+        :returns: the list of the results of `func`, sorted
+            as `archives`
+        """
+        if not os.path.exists(self.dirpath):
+            os.makedirs(self.dirpath)
+
+        self._load()
+
+        try:
+            if self.max_workers == 1 or len(archives) < 2:
+                return [func(*archive) for archive in archives]
+
+            with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                return list(executor.map(lambda archive: func(*archive), archives))
+        finally:
+            self._save()
+
+    def download(self, url, filepath, payload=None, write=None):
+        """Download an archive when it changed since the last download.
+
+        :param url: URL of the archive
+        :param filepath: path where the archive will be stored
+        :param payload: parameters of the request
+        :param write: function to write the response into `filepath`;
+            by default, `write_archive`
+
+        :returns: `True` when the archive was downloaded; `False`
+            when it did not change
+
+        :raises HTTPError: when an error occurs requesting the archive
+        :raises OSError: when the archive cannot be stored
+        """
+        filename = os.path.basename(filepath)
+
+        with self._lock:
+            download = self.downloads.get(filename, None)
+
+        if download and (download['url'] != url or not os.path.exists(filepath)):
+            download = None
+
+        headers = {}
+
+        if download and download['etag']:
+            headers['If-None-Match'] = download['etag']
+        if download and download['last_modified']:
+            headers['If-Modified-Since'] = download['last_modified']
+
+        r = self.client.fetch(url, payload=payload, headers=headers, stream=True)
+
+        if download and self._is_unchanged(download, r, filepath):
+            r.close()
+            logger.debug("%s archive not modified; skipping", url)
+            return False
+
+        with self._lock:
+            self.downloads.pop(filename, None)
+
+        write = write or self.write_archive
+        write(r, filepath)
+
+        validators = {
+            'url': url,
+            'etag': r.headers.get('ETag', None),
+            'last_modified': r.headers.get('Last-Modified', None),
+            'content_length': r.headers.get('Content-Length', None)
+        }
+
+        if validators['etag'] or validators['last_modified'] or validators['content_length']:
+            with self._lock:
+                self.downloads[filename] = validators
+
+        return True
+
+    @staticmethod
+    def write_archive(r, filepath):
+        """Stream the raw content of a response to a file.
+
+        :param r: response of the request
+        :param filepath: path where the content will be stored
+        """
+        with open(filepath, 'wb') as fd:
+            for chunk in r.raw.stream(DOWNLOAD_CHUNK_SIZE, decode_content=False):
+                fd.write(chunk)
+
+    @staticmethod
+    def _is_unchanged(download, r, filepath):
+        if r.status_code == 304:
+            return True
+
+        etag = r.headers.get('ETag', None)
+        last_modified = r.headers.get('Last-Modified', None)
+
+        if etag or last_modified:
+            return etag == download['etag'] and last_modified == download['last_modified']
+
+        content_length = r.headers.get('Content-Length', None)
+
+        return content_length is not None and \
+            content_length == download['content_length'] and \
+            int(content_length) == os.path.getsize(filepath)
+
+    def _load(self):
+        try:
+            with open(self.downloads_path, 'r') as fd:
+                self.downloads = json.load(fd)
+        except FileNotFoundError:
+            self.downloads = {}
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring %s downloads file due to: %s",
+                           self.downloads_path, str(e))
+            self.downloads = {}
+
+    def _save(self):
+        try:
+            with self._lock:
+                data = json.dumps(self.downloads, indent=4, sort_keys=True)
+            os.makedirs(os.path.dirname(self.downloads_path), exist_ok=True)
+            with open(self.downloads_path, 'w') as fd:
+                fd.write(data)
+        except OSError as e:
+            logger.warning("Downloads file %s not saved due to: %s",
+                           self.downloads_path, str(e))
+
+
+def _metadata_path(dirpath, filename):
+    """Path to a metadata file of the mboxes stored in `dirpath`.
+
+    When `dirpath` is a mbox file, the metadata is stored in
+    the directory of that file.
+    """
+    if os.path.isfile(dirpath):
+        dirpath = os.path.dirname(dirpath)
+
+    return os.path.join(dirpath, MBOX_METADATA_DIR, filename)
@@ -24,6 +24,7 @@
 #     Harshal Mittal <harshalmittal4@gmail.com>
 #
 
+import concurrent.futures
 import json
 import logging
 
@@ -39,13 +40,14 @@ from ...backend import (Backend,
                         BackendCommandArgumentParser)
 from ...client import HttpClient
 from ...errors import BackendError
-from ...utils import DEFAULT_DATETIME
+from ...utils import DEFAULT_DATETIME, ordered_futures
 
 CATEGORY_PAGE = 'page'
 
 logger = logging.getLogger(__name__)
 
 MAX_RECENT_DAYS = 30  # max number of days included in MediaWiki recent changes
+DEFAULT_MAX_WORKERS = 1
 
 
 class MediaWiki(Backend):
@@ -75,16 +77,19 @@ class MediaWiki(Backend):
     :param tag: label used to mark the data
     :param archive: archive to store/retrieve items
     :param ssl_verify: enable/disable SSL verification
+    :param max_workers: number of threads used to fetch the revisions of the pages
     """
-    version = '0.11.0'
+    version = '0.12.0'
 
     CATEGORIES = [CATEGORY_PAGE]
 
-    def __init__(self, url, tag=None, archive=None, ssl_verify=True):
+    def __init__(self, url, tag=None, archive=None, ssl_verify=True,
+                 max_workers=DEFAULT_MAX_WORKERS):
         origin = url
 
         super().__init__(origin, tag=tag, archive=archive, ssl_verify=ssl_verify)
         self.url = url
+        self.max_workers = max(1, max_workers)
         self.client = None
 
     def fetch(self, category=CATEGORY_PAGE, from_date=DEFAULT_DATETIME, reviews_api=False):
@@ -123,18 +128,27 @@ class MediaWiki(Backend):
         mediawiki_version = self.client.get_version()
         logger.info("MediaWiki version: %s", mediawiki_version)
 
-        if reviews_api:
-            if (mediawiki_version[0] == 1 and mediawiki_version[1] >= 27) or mediawiki_version[0] > 1:
-                fetcher = self.__fetch_1_27(from_date)
-            else:
-                logger.warning("Reviews API only available in MediaWiki >= 1.27")
-                logger.warning("Using the Pages API instead")
-                fetcher = self.__fetch_pre1_27(from_date)
+        if self.max_workers > 1:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
         else:
-            fetcher = self.__fetch_pre1_27(from_date)
+            executor = None
+
+        try:
+            if reviews_api:
+                if (mediawiki_version[0] == 1 and mediawiki_version[1] >= 27) or mediawiki_version[0] > 1:
+                    fetcher = self.__fetch_1_27(from_date, executor)
+                else:
+                    logger.warning("Reviews API only available in MediaWiki >= 1.27")
+                    logger.warning("Using the Pages API instead")
+                    fetcher = self.__fetch_pre1_27(from_date, executor)
+            else:
+                fetcher = self.__fetch_pre1_27(from_date, executor)
 
-        for page_reviews in fetcher:
-            yield page_reviews
+            for page_reviews in fetcher:
+                yield page_reviews
+        finally:
+            if executor:
+                executor.shutdown(wait=True)
 
     @classmethod
     def has_archiving(cls):
@@ -204,7 +218,7 @@ class MediaWiki(Backend):
 
         return namespaces_contents
 
-    def __fetch_1_27(self, from_date=None):
+    def __fetch_1_27(self, from_date=None, executor=None):
         """Fetch the pages from the backend url for MediaWiki >=1.27
 
         The method retrieves, from a MediaWiki url, the
@@ -217,7 +231,7 @@ class MediaWiki(Backend):
 
         npages = 0  # number of pages processed
         tpages = 0  # number of total pages
-        pages_done = []  # pages already retrieved in reviews API
+        pages_done = set()  # pages already retrieved in reviews API
 
         namespaces_contents = self.__get_namespaces_contents()
 
@@ -227,6 +241,7 @@ class MediaWiki(Backend):
             data_json = json.loads(raw_pages)
             arvcontinue = data_json['continue']['arvcontinue'] if 'continue' in data_json else None
             pages_json = data_json['query']['allrevisions']
+            pages = []
             for page in pages_json:
 
                 if page['pageid'] in pages_done:
@@ -234,9 +249,10 @@ class MediaWiki(Backend):
                     continue
 
                 tpages += 1
-                pages_done.append(page['pageid'])
-                page_reviews = self.__get_page_reviews(page)
+                pages_done.add(page['pageid'])
+                pages.append(page)
 
+            for page, page_reviews in self.__fetch_pages_reviews(pages, executor):
                 if not page_reviews:
                     logger.warning("Revisions not found in %s [page id: %s], page skipped",
                                    page['title'], page['pageid'])
@@ -247,12 +263,60 @@ class MediaWiki(Backend):
 
         logger.info("Total number of pages: %i, skipped %i", tpages, tpages - npages)
 
+    def __fetch_pages_reviews(self, pages, executor=None):
+        """Get the revisions of a batch of pages, keeping their order.
+
+        When a pool of threads is given, the revisions of the pages
+        of the batch are requested concurrently.
+
+        :returns: a generator of `(page, page_reviews)` tuples
+        """
+        if not executor:
+            for page in pages:
+                yield page, self.__get_page_reviews(page)
+            return
+
+        reviews = ordered_futures(executor, self.__get_page_reviews,
+                                  pages, 2 * self.max_workers)
+
+        try:
+            for page, future in reviews:
+                yield page, future.result()
+        finally:
+            reviews.close()
+
     def __get_page_reviews(self, page):
-        revisions_raw = self.client.get_revisions(page['pageid'])
-        page_reviews = self.__build_page_reviews(page, json.loads(revisions_raw))
+        pageid = str(page['pageid'])
+        reviews = None
+        rvcontinue = None
+
+        while True:
+            revisions_raw = self.client.get_revisions(page['pageid'], rvcontinue=rvcontinue)
+            revisions_json = json.loads(revisions_raw)
+
+            if reviews is None:
+                reviews = revisions_json
+            else:
+                revisions = revisions_json['query']['pages'].get(pageid, {}).get('revisions', None)
+                if revisions:
+                    reviews['query']['pages'][pageid].setdefault('revisions', []).extend(revisions)
+
+            if 'query-continue' in revisions_json:
+                # < 1.27
+                rvcontinue = revisions_json['query-continue']['revisions'].get('rvcontinue', None)
+            elif 'continue' in revisions_json:
+                # >= 1.27
+                rvcontinue = revisions_json['continue'].get('rvcontinue', None)
+            else:
+                rvcontinue = None
+
+            if not rvcontinue or pageid not in reviews['query']['pages']:
+                break
+
+        page_reviews = self.__build_page_reviews(page, reviews)
         return page_reviews
 
-    def __fetch_pre1_27(self, from_date=None):
+    def __fetch_pre1_27(self, from_date=None, executor=None):
         """Fetch the pages from the backend url.
 
         The method retrieves, from a MediaWiki url, the
@@ -265,7 +329,7 @@ class MediaWiki(Backend):
             # Use recent changes API to get the pages from date
             npages = 0  # number of pages processed
             tpages = 0  # number of total pages
-            pages_done = []  # pages already retrieved in reviews API
+            pages_done = set()  # pages already retrieved in reviews API
 
             rccontinue = ''
             hole_created = True  # To detect that incremental is not complete
@@ -283,6 +347,7 @@ class MediaWiki(Backend):
                     rccontinue = None
 
                 pages_json = data_json['query']['recentchanges']
+                pages = []
                 for page in pages_json:
 
                     page_ts = dateutil.parser.parse(page['timestamp'])
@@ -302,9 +367,10 @@ class MediaWiki(Backend):
                         continue
 
                     tpages += 1
-                    pages_done.append(page['pageid'])
-                    page_reviews = self.__get_page_reviews(page)
+                    pages_done.add(page['pageid'])
+                    pages.append(page)
 
+                for page, page_reviews in self.__fetch_pages_reviews(pages, executor):
                     if not page_reviews:
                         logger.warning("Revisions not found in %s [page id: %s], page skipped",
                                        page['title'], page['pageid'])
@@ -320,7 +386,7 @@ class MediaWiki(Backend):
             # Use get all pages API to get pages
             npages = 0  # number of pages processed
             tpages = 0  # number of total pages
-            pages_done = []  # pages already retrieved in reviews API
+            pages_done = set()  # pages already retrieved in reviews API
 
             for ns in namespaces_contents:
                 apcontinue = ''  # pagination for getting pages
@@ -337,6 +403,7 @@ class MediaWiki(Backend):
                     else:
                         apcontinue = None
                     pages_json = data_json['query']['allpages']
+                    pages = []
                     for page in pages_json:
 
                         if page['pageid'] in pages_done:
@@ -344,9 +411,10 @@ class MediaWiki(Backend):
                             continue
 
                         tpages += 1
-                        pages_done.append(page['pageid'])
-                        page_reviews = self.__get_page_reviews(page)
+                        pages_done.add(page['pageid'])
+                        pages.append(page)
 
+                    for page, page_reviews in self.__fetch_pages_reviews(pages, executor):
                         if not page_reviews:
                             logger.warning("Revisions not found in %s [page id: %s], page skipped",
                                            page['title'], page['pageid'])
@@ -486,8 +554,8 @@ class MediaWikiClient(HttpClient):
 
         return self.call(params)
 
-    def get_revisions(self, pageid, last_date=None):
-        # TODO: Iterate if more than self.max reviews (500)
+    def get_revisions(self, pageid, last_date=None, rvcontinue=None):
+        """Retrieve the revisions of a page starting from rvcontinue."""
 
         if last_date:
             last_date_str = last_date.isoformat()
@@ -500,7 +568,9 @@ class MediaWikiClient(HttpClient):
             "rvlimit": self.limit,
             "format": "json"
         }
-        if last_date:
+        if rvcontinue:
+            params['rvcontinue'] = rvcontinue
+        elif last_date:
             params['rvstart'] = last_date_str
 
         return self.call(params)
@@ -551,6 +621,9 @@ class MediaWikiCommand(BackendCommand):
         group = parser.parser.add_argument_group('MediaWiki arguments')
         group.add_argument('--reviews-api', action='store_true',
                            help="Use the experimental Reviews API in MediaWiki >= 1.27")
+        group.add_argument('--max-workers', dest='max_workers',
+                           type=int, default=DEFAULT_MAX_WORKERS,
+                           help="Number of threads used to fetch the revisions of the pages")
 
         # Required arguments
         parser.parser.add_argument('url',
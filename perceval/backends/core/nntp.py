@@ -22,10 +22,13 @@
 #     Harshal Mittal <harshalmittal4@gmail.com>
 #
 
+import concurrent.futures
+import functools
 import io
 import logging
 import nntplib
 import email
+import threading
 
 from grimoirelab_toolkit.datetime import str_to_datetime
 
@@ -33,10 +36,11 @@ from ...backend import (Backend,
                         BackendCommand,
                         BackendCommandArgumentParser)
 from ...errors import ArchiveError, ParseError
-from ...utils import message_to_dict
+from ...utils import message_to_dict, ordered_futures
 
 CATEGORY_ARTICLE = "article"
 DEFAULT_OFFSET = 1
+DEFAULT_MAX_WORKERS = 1
 
 # Hack to avoid "line too long" errors
 nntplib._MAXLINE = 4096
@@ -51,24 +55,33 @@ class NNTP(Backend):
     using NNTP. It is initialized giving the host and the name of the
     news group.
 
+    Articles can be fetched and parsed by a pool of `max_workers`
+    threads, each one using its own connection to the server. They
+    are returned in the same order of the group overview, so the
+    offset of the last article returned is always a safe point to
+    resume the fetch process.
+
     :param host: host
     :param group: name of the group
     :param tag: label used to mark the data
     :param archive: archive to store/retrieve items
+    :param max_workers: number of articles fetched at the same time
     """
-    version = '0.6.0'
+    version = '0.7.0'
 
     CATEGORIES = [CATEGORY_ARTICLE]
     EXTRA_SEARCH_FIELDS = {
         'newsgroups': ['Newsgroups']
     }
 
-    def __init__(self, host, group, tag=None, archive=None):
+    def __init__(self, host, group, tag=None, archive=None,
+                 max_workers=DEFAULT_MAX_WORKERS):
         origin = host + '-' + group
 
         super().__init__(origin, tag=tag, archive=archive)
         self.host = host
         self.group = group
+        self.max_workers = max(1, max_workers)
         self.client = None
 
     def fetch(self, category=CATEGORY_ARTICLE, offset=DEFAULT_OFFSET):
@@ -117,10 +130,11 @@ class NNTP(Backend):
 
         logger.debug("Total number of articles to fetch: %s", tarts)
 
-        for article_id, _ in overview:
+        article_ids = [article_id for article_id, _ in overview]
+
+        for article_id, fetch_article in self.__fetch_articles(article_ids):
             try:
-                article_raw = self.client.article(article_id)
-                article = self.__parse_article(article_raw)
+                article = fetch_article()
             except ParseError:
                 logger.warning("Error parsing %s article; skipping",
                                article_id)
@@ -223,7 +237,35 @@ class NNTP(Backend):
     def _init_client(self, from_archive=False):
         """Init client"""
 
-        return NNTTPClient(self.host, self.archive, from_archive)
+        return NNTTPClient(self.host, self.archive, from_archive,
+                           max_workers=self.max_workers)
+
+    def __fetch_articles(self, article_ids):
+        """Return the articles fetchers in the order of `article_ids`.
+
+        With several workers, up to twice `max_workers` articles are
+        fetched and parsed in the background while the previous ones
+        are consumed.
+        """
+        if self.max_workers == 1:
+            for article_id in article_ids:
+                yield article_id, functools.partial(self.__fetch_article, article_id)
+            return
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers)
+        articles = ordered_futures(executor, self.__fetch_article,
+                                   article_ids, 2 * self.max_workers)
+
+        try:
+            for article_id, future in articles:
+                yield article_id, future.result
+        finally:
+            articles.close()
+            executor.shutdown(wait=True)
+
+    def __fetch_article(self, article_id):
+        article_raw = self.client.article(article_id)
+        return self.__parse_article(article_raw)
 
     def __parse_article(self, info):
         reader = io.BytesIO(b'\n'.join(info['lines']))
@@ -249,20 +291,33 @@ class NNTP(Backend):
 class NNTTPClient():
     """NNTP client
 
+    When `max_workers` is greater than one, articles can be requested
+    from several threads at the same time. Each thread opens its own
+    connection to the server, selecting the last group requested with
+    `group`. Archive entries are written according to the batch
+    settings of the archive.
+
     :param host: host
-    :param group: name of the group
     :param archive: an archive to store/read fetched data
     :param from_archive: it tells whether to write/read the archive
+    :param max_workers: number of threads fetching articles
     """
 
     GROUP = "group"
     ARTICLE = "article"
     OVER = "over"
 
-    def __init__(self, host, archive=None, from_archive=False):
+    def __init__(self, host, archive=None, from_archive=False,
+                 max_workers=DEFAULT_MAX_WORKERS):
         self.host = host
         self.archive = archive
         self.from_archive = from_archive
+        self.max_workers = max(1, max_workers)
+
+        self._group = None
+        self._local = threading.local()
+        self._handlers = []
+        self._lock = threading.Lock()
 
         if not self.from_archive:
             self.handler = nntplib.NNTP(self.host)
@@ -276,6 +331,7 @@ class NNTTPClient():
 
         :param group_name: name of the group
         """
+        self._group = group_name
         return self._fetch("group", group_name)
 
     def over(self, offset):
@@ -310,7 +366,7 @@ class NNTTPClient():
 
         :param article_id: id of the article to fetch
         """
-        fetched_data = self.handler.article(article_id)
+        fetched_data = self._get_handler().article(article_id)
         data = {
             'number': fetched_data[1].number,
             'message_id': fetched_data[1].message_id,
@@ -341,6 +397,25 @@ class NNTTPClient():
 
         return data
 
+    def _get_handler(self):
+        """Return the connection to the server of the current thread"""
+
+        if self.max_workers == 1:
+            return self.handler
+
+        handler = getattr(self._local, 'handler', None)
+
+        if not handler:
+            handler = nntplib.NNTP(self.host)
+            if self._group:
+                handler.group(self._group)
+            self._local.handler = handler
+
+            with self._lock:
+                self._handlers.append(handler)
+
+        return handler
+
     def _fetch_from_archive(self, method, args):
         """Fetch data from the archive
 
@@ -360,6 +435,13 @@ class NNTTPClient():
     def quit(self):
         self.handler.quit()
 
+        with self._lock:
+            handlers = self._handlers
+            self._handlers = []
+
+        for handler in handlers:
+            handler.quit()
+
 
 class NNTPCommand(BackendCommand):
     """Class to run NNTP backend from the command line."""
@@ -380,4 +462,9 @@ class NNTPCommand(BackendCommand):
         parser.parser.add_argument('group',
                                    help="Name of the NNTP group")
 
+        # Optional arguments
+        parser.parser.add_argument('--max-workers', dest='max_workers',
+                                   type=int, default=DEFAULT_MAX_WORKERS,
+                                   help="Number of articles fetched at the same time")
+
         return parser
@@ -30,6 +30,7 @@ from grimoirelab_toolkit.datetime import datetime_to_utc
 from ...backend import (Backend,
                         BackendCommand,
                         BackendCommandArgumentParser)
+from ...cache import DiskCache, LRUCache
 from ...client import HttpClient
 from ...errors import BaseError
 from ...utils import DEFAULT_DATETIME
@@ -38,6 +39,9 @@ CATEGORY_TASK = "task"
 
 DEFAULT_SLEEP_TIME = 1
 MAX_RETRIES = 5
+PHIDS_CHUNK_SIZE = 100
+DEFAULT_PHIDS_CACHE_SIZE = LRUCache.DEFAULT_MAX_SIZE
+DEFAULT_PHIDS_CACHE_TTL = DiskCache.DEFAULT_TTL
 
 logger = logging.getLogger(__name__)
 
@@ -59,13 +63,23 @@ class Phabricator(Backend):
     :param sleep_time: time (in seconds) to sleep in case
         of connection problems
     :param ssl_verify: enable/disable SSL verification
+    :param phids_chunk_size: max number of PHIDs requested at once
+    :param phids_cache_size: max number of users and projects
+        kept in memory
+    :param phids_cache_path: path to the database where users and
+        projects are stored for further executions; when it is
+        not set, they are only kept in memory
+    :param phids_cache_ttl: number of seconds the users and
+        projects stored in the database are valid
     """
-    version = '0.13.0'
+    version = '0.14.1'
 
     CATEGORIES = [CATEGORY_TASK]
 
     def __init__(self, url, api_token, tag=None, archive=None,
-                 max_retries=MAX_RETRIES, sleep_time=DEFAULT_SLEEP_TIME, ssl_verify=True):
+                 max_retries=MAX_RETRIES, sleep_time=DEFAULT_SLEEP_TIME, ssl_verify=True,
+                 phids_chunk_size=PHIDS_CHUNK_SIZE, phids_cache_size=DEFAULT_PHIDS_CACHE_SIZE,
+                 phids_cache_path=None, phids_cache_ttl=DEFAULT_PHIDS_CACHE_TTL):
         origin = url
 
         super().__init__(origin, tag=tag, archive=archive, ssl_verify=ssl_verify)
@@ -75,9 +89,13 @@ class Phabricator(Backend):
 
         self.max_retries = max_retries
         self.sleep_time = sleep_time
+        self.phids_chunk_size = max(1, phids_chunk_size)
+        self.phids_cache_size = phids_cache_size
+        self.phids_cache_path = phids_cache_path
+        self.phids_cache_ttl = phids_cache_ttl
 
-        self._users = {}
-        self._projects = {}
+        self._users = None
+        self._projects = None
 
     def fetch(self, category=CATEGORY_TASK, from_date=DEFAULT_DATETIME):
         """Fetch the tasks from the server.
@@ -230,6 +248,8 @@ class Phabricator(Backend):
     def _init_client(self, from_archive=False):
         """Init client"""
 
+        self._users, self._projects = self.__init_phids_caches()
+
         return ConduitClient(self.url, self.api_token,
                              self.max_retries, self.sleep_time,
                              self.archive, from_archive, self.ssl_verify)
@@ -242,8 +262,7 @@ class Phabricator(Backend):
             if not tasks:
                 break
 
-            tasks_ids = [t['id'] for t in tasks]
-            tasks_trans = self.__fetch_and_parse_tasks_transactions(*tasks_ids)
+            tasks_trans = self.__fetch_and_parse_tasks_transactions(tasks)
 
             for task in tasks:
                 # Task check point
@@ -266,9 +285,144 @@ class Phabricator(Backend):
 
                 yield task
 
+    def __init_phids_caches(self):
+        """Init the caches of users and projects.
+
+        The caches are not limited when the backend writes to or reads
+        from an archive, so the same PHIDs are requested in both cases.
+        """
+        cache_size = self.phids_cache_size
+        cache_path = self.phids_cache_path
+
+        if self.archive:
+            cache_size = None
+
+        if cache_path and self.archive:
+            logger.info("PHIDs cache %s not used with archives", cache_path)
+            cache_path = None
+
+        users_store = None
+        projects_store = None
+
+        if cache_path:
+            users_store = DiskCache(cache_path, namespace='users', ttl=self.phids_cache_ttl)
+            projects_store = DiskCache(cache_path, namespace='projects', ttl=self.phids_cache_ttl)
+
+        users = LRUCache(max_size=cache_size, store=users_store)
+        projects = LRUCache(max_size=cache_size, store=projects_store)
+
+        return users, projects
+
+    def __prefetch_phids(self, tasks, tasks_trans):
+        """Fetch in bulk the users and projects of a page of tasks.
+
+        The PHIDs of the users and projects referenced by the tasks
+        and their transactions that are not cached are requested in
+        chunks of `phids_chunk_size`, so the items can be decorated
+        afterwards without requesting them one by one.
+        """
+        users_ids, projects_ids = self.__collect_phids(tasks, tasks_trans)
+
+        users_ids = [phid for phid in users_ids if self._users.get(phid) is None]
+        projects_ids = [phid for phid in projects_ids if self._projects.get(phid) is None]
+
+        # Real users are fetched with the users API; the rest
+        # of the PHIDs (e.g., bots and projects) with the PHIDs API
+        real_users_ids = [phid for phid in users_ids if phid.startswith('PHID-USER-')]
+        other_ids = [phid for phid in users_ids if not phid.startswith('PHID-USER-')]
+        other_ids.extend(phid for phid in projects_ids if phid not in other_ids)
+
+        for chunk in self.__chunks(real_users_ids):
+            users = {user['phid']: user for user in self.__fetch_and_parse_users(*chunk)}
+
+            for user_id in chunk:
+                user = users.get(user_id, None)
+                if user is None:
+                    logger.warning("User %s not found on the server. Setting empty data",
+                                   user_id)
+                self._users.set(user_id, json.dumps(user))
+
+        for chunk in self.__chunks(other_ids):
+            phids = {phid['phid']: phid for phid in self.__fetch_and_parse_phids(*chunk)}
+
+            for phid in chunk:
+                value = json.dumps(phids.get(phid, None))
+
+                if phid in users_ids:
+                    if phid not in phids:
+                        logger.warning("User %s not found on the server. Setting empty data",
+                                       phid)
+                    self._users.set(phid, value)
+                if phid in projects_ids:
+                    self._projects.set(phid, value)
+
+    def __collect_phids(self, tasks, tasks_trans):
+        """Collect the PHIDs of users and projects to resolve"""
+
+        users_ids = {}
+        projects_ids = {}
+
+        def add_user(phid):
+            if phid:
+                users_ids[phid] = None
+
+        def add_project(phid):
+            if phid:
+                projects_ids[phid] = None
+
+        for task in tasks:
+            add_user(task['fields']['authorPHID'])
+            add_user(task['fields']['ownerPHID'])
+
+            for project_id in task['attachments']['projects']['projectPHIDs']:
+                add_project(project_id)
+
+        for trans in tasks_trans.values():
+            for tt in trans:
+                add_user(tt['authorPHID'])
+
+                ttype = tt['transactionType']
+                values = [tt['newValue'], tt['oldValue']]
+
+                if ttype == 'reassign':
+                    for value in values:
+                        add_user(value)
+                elif ttype == 'core:columns':
+                    for value in values:
+                        for e in value or []:
+                            add_project(e['boardPHID'])
+                elif ttype == 'core:subscribers':
+                    for value in values:
+                        for e in value or []:
+                            if not e:
+                                continue
+                            elif e.startswith('PHID-PROJ'):
+                                add_project(e)
+                            elif e.startswith('PHID-USER'):
+                                add_user(e)
+                elif ttype in ['core:edit-policy', 'core:view-policy']:
+                    for value in values:
+                        if value and value.startswith('PHID-PROJ'):
+                            add_project(value)
+                elif ttype == 'core:edge':
+                    for value in values:
+                        if isinstance(value, dict):
+                            value = [content['dst'] for content in value.values()
+                                     if 'dst' in content and content['dst']]
+                        for e in value or []:
+                            if e.startswith('PHID-PROJ'):
+                                add_project(e)
+
+        return list(users_ids), list(projects_ids)
+
+    def __chunks(self, phids):
+        for i in range(0, len(phids), self.phids_chunk_size):
+            yield phids[i:i + self.phids_chunk_size]
+
     def __get_or_fetch_user(self, user_id):
-        if user_id in self._users:
-            return self._users[user_id]
+        raw_user = self._users.get(user_id)
+        if raw_user is not None:
+            return json.loads(raw_user)
 
         logger.debug("User %s not found on client cache; fetching it", user_id)
 
@@ -286,12 +440,13 @@ class Phabricator(Backend):
         else:
             user = users[0]
 
-        self._users[user_id] = user
+        self._users.set(user_id, json.dumps(user))
         return user
 
     def __get_or_fetch_project(self, project_id):
-        if project_id in self._projects:
-            return self._projects[project_id]
+        raw_project = self._projects.get(project_id)
+        if raw_project is not None:
+            return json.loads(raw_project)
 
         logger.debug("Project %s not found on client cache; fetching it", project_id)
 
@@ -300,15 +455,18 @@ class Phabricator(Backend):
         if phids:
             project = phids[0]
 
-        self._projects[project_id] = project
+        self._projects.set(project_id, json.dumps(project))
         return project
 
-    def __fetch_and_parse_tasks_transactions(self, *tasks_ids):
+    def __fetch_and_parse_tasks_transactions(self, tasks):
         logger.debug("Fetching and parsing tasks transactions")
 
+        tasks_ids = [t['id'] for t in tasks]
         raw_json = self.client.transactions(*tasks_ids)
         tasks_trans = self.parse_tasks_transactions(raw_json)
 
+        self.__prefetch_phids(tasks, tasks_trans)
+
         for trans in tasks_trans.values():
             for tt in trans:
                 author_id = tt['authorPHID']
@@ -634,6 +792,17 @@ class PhabricatorCommand(BackendCommand):
         group.add_argument('--sleep-time', dest='sleep_time',
                            default=DEFAULT_SLEEP_TIME, type=int,
                            help="sleeping time between API call retries")
+        group.add_argument('--phids-chunk-size', dest='phids_chunk_size',
+                           default=PHIDS_CHUNK_SIZE, type=int,
+                           help="max number of users and projects requested at once")
+        group.add_argument('--phids-cache-size', dest='phids_cache_size',
+                           default=DEFAULT_PHIDS_CACHE_SIZE, type=int,
+                           help="max number of users and projects kept in memory")
+        group.add_argument('--phids-cache-path', dest='phids_cache_path',
+                           help="database where users and projects are stored for further executions")
+        group.add_argument('--phids-cache-ttl', dest='phids_cache_ttl',
+                           default=DEFAULT_PHIDS_CACHE_TTL, type=int,
+                           help="seconds the stored users and projects are valid")
 
         # Required arguments
         parser.parser.add_argument('url',
@@ -37,9 +37,14 @@ import requests
 from grimoirelab_toolkit.datetime import datetime_to_utc
 from grimoirelab_toolkit.uris import urijoin
 
-from .mbox import MBox, MailingList, CATEGORY_MESSAGE
+from .mbox import (MBox,
+                   MBoxDownloader,
+                   MailingList,
+                   CATEGORY_MESSAGE,
+                   DEFAULT_PARSE_WORKERS)
 from ...backend import (BackendCommand,
                         BackendCommandArgumentParser)
+from ...client import HttpClient
 from ...utils import DEFAULT_DATETIME
 
 PIPERMAIL_COMPRESSED_TYPES = ['.gz', '.bz2', '.zip',
@@ -50,6 +55,8 @@ PIPERMAIL_TYPES = PIPERMAIL_COMPRESSED_TYPES + PIPERMAIL_ACCEPTED_TYPES
 
 MOD_MBOX_THREAD_STR = "/thread"
 
+DEFAULT_MAX_WORKERS = 1
+
 logger = logging.getLogger(__name__)
 
 
@@ -66,14 +73,19 @@ class Pipermail(MBox):
     :param tag: label used to mark the data
     :param archive: archive to store/retrieve items
     :param ssl_verify: enable/disable SSL verification
+    :param max_workers: number of mbox files downloaded at the same time
+    :param parse_workers: number of processes parsing messages
     """
-    version = '0.11.0'
+    version = '0.13.1'
 
     CATEGORIES = [CATEGORY_MESSAGE]
 
-    def __init__(self, url, dirpath, tag=None, archive=None, ssl_verify=True):
-        super().__init__(url, dirpath, tag=tag, archive=archive, ssl_verify=ssl_verify)
+    def __init__(self, url, dirpath, tag=None, archive=None, ssl_verify=True,
+                 max_workers=DEFAULT_MAX_WORKERS, parse_workers=DEFAULT_PARSE_WORKERS):
+        super().__init__(url, dirpath, tag=tag, archive=archive, ssl_verify=ssl_verify,
+                         parse_workers=parse_workers)
         self.url = url
+        self.max_workers = max(1, max_workers)
 
     def fetch(self, category=CATEGORY_MESSAGE, from_date=DEFAULT_DATETIME):
         """Fetch the messages from the Pipermail archiver.
@@ -103,7 +115,8 @@ class Pipermail(MBox):
         logger.info("Looking for messages from '%s' since %s",
                     self.url, str(from_date))
 
-        mailing_list = PipermailList(self.url, self.dirpath, self.ssl_verify)
+        mailing_list = PipermailList(self.url, self.dirpath, self.ssl_verify,
+                                     max_workers=self.max_workers)
         mailing_list.fetch(from_date=from_date)
 
         messages = self._fetch_and_parse_messages(mailing_list, from_date)
@@ -158,6 +171,12 @@ class PipermailCommand(BackendCommand):
         group = parser.parser.add_argument_group('Pipermail arguments')
         group.add_argument('--mboxes-path', dest='mboxes_path',
                            help="Path where mbox files will be stored")
+        group.add_argument('--max-workers', dest='max_workers',
+                           type=int, default=DEFAULT_MAX_WORKERS,
+                           help="Number of mbox files downloaded at the same time")
+        group.add_argument('--parse-workers', dest='parse_workers',
+                           type=int, default=DEFAULT_PARSE_WORKERS,
+                           help="Number of processes parsing messages")
 
         # Required arguments
         parser.parser.add_argument('url',
@@ -171,16 +190,21 @@ class PipermailList(MailingList):
 
     This class gives access to remote and local mboxes archives
     from a mailing list stored by Pipermail. This class also allows
-    to keep them in sync.
+    to keep them in sync, downloading only those archives that
+    changed since the last time they were fetched.
 
     :param url: URL to the Pipermail archiver for this list
     :param dirpath: path to the local mboxes archives
     :param ssl_verify: enable/disable SSL verification
+    :param max_workers: number of archives downloaded at the same time
     """
-    def __init__(self, url, dirpath, ssl_verify=True):
+    def __init__(self, url, dirpath, ssl_verify=True, max_workers=DEFAULT_MAX_WORKERS):
         super().__init__(url, dirpath)
         self.url = url
         self.ssl_verify = ssl_verify
+        self.client = HttpClient(url, ssl_verify=ssl_verify)
+        self.downloader = MBoxDownloader(self.client, dirpath,
+                                         max_workers=max_workers)
 
     def fetch(self, from_date=DEFAULT_DATETIME):
         """Fetch the mbox files from the remote archiver.
@@ -192,7 +216,9 @@ class PipermailList(MailingList):
         Pipermail archives usually have on their file names the date of
         the archives stored following the schema year-month. When `from_date`
         property is called, it will return the mboxes which their year
-        and month are equal or after that date.
+        and month are equal or after that date. Archives that did not
+        change since the last time they were fetched are not downloaded
+        again and they are not included in the returned list.
 
         :param from_date: fetch archives that store messages
             equal or after the given date; only year and month values
@@ -207,15 +233,11 @@ class PipermailList(MailingList):
 
         from_date = datetime_to_utc(from_date)
 
-        r = requests.get(self.url, verify=self.ssl_verify)
-        r.raise_for_status()
+        r = self.client.fetch(self.url)
 
         links = self._parse_archive_links(r.text)
 
-        fetched = []
-
-        if not os.path.exists(self.dirpath):
-            os.makedirs(self.dirpath)
+        archives = []
 
         for l in links:
             filename = os.path.basename(l)
@@ -227,10 +249,10 @@ class PipermailList(MailingList):
                 from_date < mbox_dt):
 
                 filepath = os.path.join(self.dirpath, filename)
-                success = self._download_archive(l, filepath)
+                archives.append((l, filepath))
 
-                if success:
-                    fetched.append((l, filepath))
+        downloaded = self.downloader.map(self._download_archive, archives)
+        fetched = [archive for archive, success in zip(archives, downloaded) if success]
 
         logger.info("%s/%s MBoxes downloaded", len(fetched), len(links))
 
@@ -299,9 +321,8 @@ class PipermailList(MailingList):
 
     def _download_archive(self, url, filepath):
         try:
-            r = requests.get(url, stream=True, verify=self.ssl_verify)
-            r.raise_for_status()
-            self._write_archive(r, filepath)
+            downloaded = self.downloader.download(url, filepath,
+                                                  write=self._write_archive)
         except requests.exceptions.HTTPError as e:
             if e.response.status_code == 403:
                 logger.warning("Ignoring %s archive due to: %s", url, str(e))
@@ -312,11 +333,11 @@ class PipermailList(MailingList):
             logger.warning("Ignoring %s archive due to: %s", url, str(e))
             return False
 
-        logger.debug("%s archive downloaded and stored in %s", url, filepath)
+        if downloaded:
+            logger.debug("%s archive downloaded and stored in %s", url, filepath)
 
-        return True
+        return downloaded
 
     @staticmethod
     def _write_archive(r, filepath):
-        with open(filepath, 'wb') as fd:
-            fd.write(r.raw.read())
+        MBoxDownloader.write_archive(r, filepath)
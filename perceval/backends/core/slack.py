@@ -22,8 +22,13 @@
 #     Harshal Mittal <harshalmittal4@gmail.com>
 #
 
+import collections
+import concurrent.futures
 import json
 import logging
+import queue
+import threading
+import time
 
 from grimoirelab_toolkit.datetime import datetime_to_utc, datetime_utcnow
 from grimoirelab_toolkit.uris import urijoin
@@ -31,6 +36,7 @@ from grimoirelab_toolkit.uris import urijoin
 from ...backend import (Backend,
                         BackendCommand,
                         BackendCommandArgumentParser)
+from ...cache import DiskCache
 from ...client import HttpClient
 from ...errors import BaseError
 from ...utils import DEFAULT_DATETIME
@@ -40,6 +46,25 @@ CATEGORY_MESSAGE = "message"
 SLACK_URL = 'https://slack.com/'
 MAX_ITEMS = 1000
 FLOAT_FORMAT = '{:.6f}'
+DEFAULT_USER_CACHE_TTL = DiskCache.DEFAULT_TTL
+
+DEFAULT_MAX_WORKERS = 1
+
+# Number of locks shared by the requests of users
+USER_LOCK_STRIPES = 64
+
+# Key of the cache entry that tells when the users directory was stored
+USERS_DIRECTORY_KEY = '__users.list__'
+
+# Parameters to send the items of the channels fetched concurrently
+CHANNELS_QUEUE_SIZE = 10
+CHANNELS_CHUNK_SIZE = 100
+CHANNELS_POLL_TIMEOUT = 1
+
+_CHANNEL_ITEMS = 'items'
+_CHANNEL_DONE = 'done'
+_CHANNEL_ERROR = 'error'
+_CHANNEL_FAILURE = 'failure'
 
 logger = logging.getLogger(__name__)
 
@@ -60,8 +85,13 @@ class Slack(Backend):
     :param tag: label used to mark the data
     :param archive: archive to store/retrieve items
     :param ssl_verify: enable/disable SSL verification
+    :param user_cache_path: path to the database where users are
+        stored for further executions; when it is not set, they
+        are only kept in memory
+    :param user_cache_ttl: number of seconds the users stored in
+        the database are valid
     """
-    version = '0.9.0'
+    version = '0.11.2'
 
     CATEGORIES = [CATEGORY_MESSAGE]
     EXTRA_SEARCH_FIELDS = {
@@ -70,25 +100,42 @@ class Slack(Backend):
     }
 
     def __init__(self, channel, api_token, max_items=MAX_ITEMS,
-                 tag=None, archive=None, ssl_verify=True):
+                 tag=None, archive=None, ssl_verify=True,
+                 user_cache_path=None, user_cache_ttl=DEFAULT_USER_CACHE_TTL):
         origin = urijoin(SLACK_URL, channel)
 
         super().__init__(origin, tag=tag, archive=archive, ssl_verify=ssl_verify)
         self.channel = channel
         self.api_token = api_token
         self.max_items = max_items
+        self.user_cache_path = user_cache_path
+        self.user_cache_ttl = user_cache_ttl
         self.client = None
 
-        self._users = {}
+        self._users = None
+
+        # Client and users shared with other channels; see `SlackChannels`
+        self._shared_client = None
+        self._shared_users = None
 
-    def fetch(self, category=CATEGORY_MESSAGE, from_date=DEFAULT_DATETIME):
+    def fetch(self, category=CATEGORY_MESSAGE, from_date=DEFAULT_DATETIME,
+              prefetch_users=False):
         """Fetch the messages from the channel.
 
         This method fetches the messages stored on the channel that were
         sent since the given date.
 
+        When `prefetch_users` is set, the users directory of the
+        workspace is loaded with a few paginated requests before
+        fetching the messages, so the data of the users who sent
+        them is not requested one by one. If the users database
+        (see `user_cache_path`) already stores a valid copy of the
+        directory, it is not requested again.
+
         :param category: the category of items to fetch
         :param from_date: obtain messages sent since this date
+        :param prefetch_users: load the users directory before
+            fetching the messages
 
         :returns: a generator of messages
         """
@@ -98,7 +145,8 @@ class Slack(Backend):
         from_date = datetime_to_utc(from_date)
         latest = datetime_utcnow().timestamp()
 
-        kwargs = {'from_date': from_date, 'latest': latest}
+        kwargs = {'from_date': from_date, 'latest': latest,
+                  'prefetch_users': prefetch_users}
         items = super().fetch(category, **kwargs)
 
         return items
@@ -113,10 +161,19 @@ class Slack(Backend):
         """
         from_date = kwargs['from_date']
         latest = kwargs['latest']
+        prefetch_users = kwargs.get('prefetch_users', False)
 
         logger.info("Fetching messages of '%s' channel from %s",
                     self.channel, str(from_date))
 
+        if self._shared_users:
+            self._users = self._shared_users
+        else:
+            self._users = SlackUsers(self.client, store=self.__init_users_store())
+
+        if prefetch_users:
+            self._users.prefetch()
+
         raw_info = self.client.channel_info(self.channel)
 
         channel_info = self.parse_channel_info(raw_info)
@@ -146,7 +203,7 @@ class Slack(Backend):
                     user_id = message['comment']['user']
 
                 if user_id:
-                    message['user_data'] = self.__get_or_fetch_user(user_id)
+                    message['user_data'] = self._users.get(user_id)
 
                 message['channel_info'] = channel_info
                 yield message
@@ -248,6 +305,20 @@ class Slack(Backend):
         result = json.loads(raw_history)
         return result['messages'], result['has_more']
 
+    @staticmethod
+    def parse_users(raw_users):
+        """Parse a users list JSON stream.
+
+        This method parses a JSON stream, containing a page of
+        the users directory, and returns a list with the parsed data.
+
+        :param raw_users: JSON string to parse
+
+        :returns: a list of dicts with the parsed users' information
+        """
+        result = json.loads(raw_users)
+        return result['members']
+
     @staticmethod
     def parse_user(raw_user):
         """Parse a user's info JSON stream.
@@ -265,21 +336,371 @@ class Slack(Backend):
     def _init_client(self, from_archive=False):
         """Init client"""
 
+        if self._shared_client and not from_archive:
+            return self._shared_client
+
         return SlackClient(self.api_token, self.max_items, self.archive,
                            from_archive, self.ssl_verify)
 
-    def __get_or_fetch_user(self, user_id):
-        if user_id in self._users:
-            return self._users[user_id]
+    def __init_users_store(self):
+        """Open the database of users, when it is used"""
+
+        if not self.user_cache_path:
+            return None
+
+        if self.archive:
+            logger.info("Users cache %s not used with archives", self.user_cache_path)
+            return None
+
+        return DiskCache(self.user_cache_path, namespace='users', ttl=self.user_cache_ttl)
+
+
+class SlackUsers:
+    """Users of a Slack workspace.
+
+    Users are requested on demand and kept in memory. Optionally,
+    they are also stored in a `store` (i.e., a `DiskCache`), so
+    other executions can read them from there. The whole directory
+    of users can be loaded at once calling `prefetch`.
+
+    The users can be shared by several threads.
+
+    :param client: Slack client used to request the users
+    :param store: database where users are stored
+    """
+    def __init__(self, client, store=None):
+        self.client = client
+        self.store = store
+        self.prefetched = False
+
+        self._users = {}
+        self._lock = threading.Lock()
+        self._locks = [threading.Lock() for _ in range(USER_LOCK_STRIPES)]
+
+    def __contains__(self, user_id):
+        return user_id in self._users
+
+    def get(self, user_id):
+        """Get the data of a user, requesting it when it is not found"""
+
+        user = self._users.get(user_id, None)
+        if user is not None:
+            return user
+
+        with self._get_lock(user_id):
+            if user_id in self._users:
+                return self._users[user_id]
 
-        logger.debug("User %s not found on client cache; fetching it", user_id)
+            raw_user = self.store.get(user_id) if self.store else None
 
-        raw_user = self.client.user(user_id)
-        user = self.parse_user(raw_user)
+            if raw_user is not None:
+                user = json.loads(raw_user)
+                self._users[user_id] = user
+                return user
+
+            logger.debug("User %s not found on client cache; fetching it", user_id)
+
+            raw_user = self.client.user(user_id)
+            user = Slack.parse_user(raw_user)
+
+            self._users[user_id] = user
+
+            if self.store:
+                self.store.set(user_id, json.dumps(user))
 
-        self._users[user_id] = user
         return user
 
+    def prefetch(self):
+        """Load the users directory of the workspace.
+
+        The directory is requested only once. It is not requested
+        either when the store has a valid copy of it.
+        """
+        with self._lock:
+            if self.prefetched:
+                return
+
+            if self.store and self.store.get(USERS_DIRECTORY_KEY) is not None:
+                logger.info("Users directory found on cache %s; prefetch skipped",
+                            self.store.cache_path)
+                self.prefetched = True
+                return
+
+            logger.info("Prefetching users directory")
+
+            nusers = 0
+
+            for raw_users in self.client.users():
+                users = Slack.parse_users(raw_users)
+
+                for user in users:
+                    self._users[user['id']] = user
+
+                if self.store:
+                    self.store.set_many((user['id'], json.dumps(user)) for user in users)
+
+                nusers += len(users)
+
+            if self.store:
+                self.store.set(USERS_DIRECTORY_KEY, str(datetime_utcnow().timestamp()))
+
+            self.prefetched = True
+
+        logger.info("Users directory prefetched: %s users", nusers)
+
+    def _get_lock(self, user_id):
+        """Return the lock that protects the request of a user.
+
+        Users share a fixed number of locks, so the memory used
+        by them does not grow with the number of users.
+        """
+        return self._locks[hash(user_id) % len(self._locks)]
+
+
+class SlackChannels:
+    """Fetch the messages of several Slack channels.
+
+    The channels are fetched by a pool of `max_workers` threads.
+    All of them share the same client, so its HTTP session is reused,
+    and the same users, so each user is requested once. Requests are
+    throttled by a `SlackRateGovernor`, which keeps the calls to each
+    API method within the rate limit of its tier.
+
+    Each channel is fetched by a `Slack` backend, so the items and
+    the way the history is paginated are the same. Items are returned
+    following the order of `channels`; the items of a channel are
+    returned after all the items of the previous one. Channels that
+    raise a `SlackClientError` (e.g., the channel was not found) are
+    ignored. The summary of each fetched channel is available in
+    `summaries`.
+
+    Archives are not supported.
+
+    :param channels: list of channel identifiers
+    :param api_token: token or key needed to use the API
+    :param max_items: maximum number of message requested on the same query
+    :param tag: label used to mark the data; when it is not set,
+        the items of each channel are marked with its origin
+    :param ssl_verify: enable/disable SSL verification
+    :param user_cache_path: path to the database where users are
+        stored for further executions
+    :param user_cache_ttl: number of seconds the users stored in
+        the database are valid
+    :param max_workers: number of channels fetched at the same time
+    :param governor: rate governor of the requests; when it is not
+        set, a governor with the default rates is used
+    """
+    def __init__(self, channels, api_token, max_items=MAX_ITEMS,
+                 tag=None, ssl_verify=True,
+                 user_cache_path=None, user_cache_ttl=DEFAULT_USER_CACHE_TTL,
+                 max_workers=DEFAULT_MAX_WORKERS, governor=None):
+        self.channels = list(channels)
+        self.api_token = api_token
+        self.max_items = max_items
+        self.tag = tag
+        self.ssl_verify = ssl_verify
+        self.user_cache_path = user_cache_path
+        self.user_cache_ttl = user_cache_ttl
+        self.max_workers = max(1, max_workers)
+        self.governor = governor or SlackRateGovernor()
+        self.summaries = {}
+
+    def fetch(self, category=CATEGORY_MESSAGE, from_date=DEFAULT_DATETIME,
+              prefetch_users=False):
+        """Fetch the messages from the channels.
+
+        :param category: the category of items to fetch
+        :param from_date: obtain messages sent since this date
+        :param prefetch_users: load the users directory before
+            fetching the messages
+
+        :returns: a generator of messages
+        """
+        client = SlackClient(self.api_token, self.max_items,
+                             ssl_verify=self.ssl_verify, governor=self.governor)
+
+        store = None
+        if self.user_cache_path:
+            store = DiskCache(self.user_cache_path, namespace='users', ttl=self.user_cache_ttl)
+
+        users = SlackUsers(client, store=store)
+
+        self.summaries = {}
+
+        pending = collections.deque(self.channels)
+        inflight = collections.deque()
+        stop = threading.Event()
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+
+            def submit_next():
+                channel = pending.popleft()
+
+                backend = Slack(channel, self.api_token, max_items=self.max_items,
+                                tag=self.tag, ssl_verify=self.ssl_verify)
+                backend._shared_client = client
+                backend._shared_users = users
+
+                items_queue = queue.Queue(CHANNELS_QUEUE_SIZE)
+                future = executor.submit(_fetch_channel, backend, items_queue, stop,
+                                         category=category, from_date=from_date,
+                                         prefetch_users=prefetch_users)
+                inflight.append((backend, items_queue, future))
+
+            try:
+                for _ in range(min(self.max_workers, len(pending))):
+                    submit_next()
+
+                while inflight:
+                    backend, items_queue, future = inflight[0]
+                    kind, content = _get_channel_message(items_queue, future)
+
+                    if kind == _CHANNEL_ITEMS:
+                        for item in content:
+                            yield item
+                        continue
+
+                    inflight.popleft()
+                    self.summaries[backend.channel] = backend.summary
+
+                    if kind == _CHANNEL_ERROR:
+                        logger.warning("Ignoring channel %s due to: %s", backend.channel, content)
+                    elif kind == _CHANNEL_FAILURE:
+                        raise content
+
+                    if pending:
+                        submit_next()
+            finally:
+                stop.set()
+
+                if store:
+                    store.close()
+
+
+def _fetch_channel(backend, items_queue, stop, **kwargs):
+    """Fetch the items of a channel within a worker thread.
+
+    Items are sent in chunks of `CHANNELS_CHUNK_SIZE` using `items_queue`.
+    A final message notifies whether the channel was fetched successfully,
+    it raised a `SlackClientError` or it failed due to any other error.
+    The worker gives up when `stop` is set.
+    """
+    def send(message):
+        while not stop.is_set():
+            try:
+                items_queue.put(message, timeout=CHANNELS_POLL_TIMEOUT)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    chunk = []
+
+    try:
+        for item in backend.fetch(**kwargs):
+            chunk.append(item)
+
+            if len(chunk) >= CHANNELS_CHUNK_SIZE:
+                if not send((_CHANNEL_ITEMS, chunk)):
+                    return
+                chunk = []
+    except SlackClientError as e:
+        result = (_CHANNEL_ERROR, str(e))
+    except Exception as e:
+        result = (_CHANNEL_FAILURE, e)
+    else:
+        result = (_CHANNEL_DONE, None)
+
+    if chunk and not send((_CHANNEL_ITEMS, chunk)):
+        return
+    send(result)
+
+
+def _get_channel_message(items_queue, future):
+    """Wait for the next message sent by a channel worker.
+
+    While waiting, the future of the worker is checked to detect
+    whether it died without notifying it. A worker that finished
+    normally already sent its last message, so it is read from
+    the queue.
+    """
+    while True:
+        try:
+            return items_queue.get(timeout=CHANNELS_POLL_TIMEOUT)
+        except queue.Empty:
+            if future.done() and future.exception():
+                raise future.exception()
+
+
+class SlackRateGovernor:
+    """Keep the requests to each Slack API method within its rate limit.
+
+    Slack groups its API methods in tiers; the number of requests
+    per minute allowed for a method depends on its tier. The governor
+    has a token bucket for each method, which holds up to a minute of
+    requests and is refilled at the rate of the method. Before each
+    request, `acquire` takes a token from the bucket of the method,
+    sleeping until there is one available.
+
+    The governor can be shared by several threads.
+
+    :param rates: dict with the number of requests per minute
+        allowed for some methods; they override the rates of
+        their tiers
+    """
+    TIER_RATES = {
+        1: 1,
+        2: 20,
+        3: 50,
+        4: 100
+    }
+    METHOD_TIERS = {
+        'channels.history': 3,
+        'channels.info': 3,
+        'conversations.members': 4,
+        'users.info': 4,
+        'users.list': 2
+    }
+    DEFAULT_TIER = 3
+
+    def __init__(self, rates=None):
+        self.rates = {method: self.TIER_RATES[tier] for method, tier in self.METHOD_TIERS.items()}
+        if rates:
+            self.rates.update(rates)
+
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def rate(self, method):
+        """Number of requests per minute allowed for a method"""
+
+        return self.rates.get(method, self.TIER_RATES[self.DEFAULT_TIER])
+
+    def acquire(self, method):
+        """Take a token to request a method, waiting when there is none.
+
+        :param method: API method to request
+
+        :returns: the number of seconds waited
+        """
+        rate = self.rate(method)
+
+        with self._lock:
+            now = time.monotonic()
+            tokens, last_ts = self._buckets.get(method, (rate, now))
+            tokens = min(rate, tokens + (now - last_ts) * rate / 60) - 1
+            self._buckets[method] = (tokens, now)
+
+        # Tokens are reserved in advance, so the balance can be
+        # negative; the time to wait is the time to refill it
+        wait = -tokens * 60 / rate if tokens < 0 else 0
+
+        if wait > 0:
+            logger.debug("Rate of %s method exhausted; waiting %.2f seconds", method, wait)
+            time.sleep(wait)
+
+        return wait
+
 
 class SlackClientError(BaseError):
     """Raised when an error occurs using the Slack client"""
@@ -298,6 +719,9 @@ class SlackClient(HttpClient):
     :param archive: an archive to store/read fetched data
     :param from_archive: it tells whether to write/read the archive
     :param ssl_verify: enable/disable SSL verification
+    :param governor: rate governor of the requests (i.e., a
+        `SlackRateGovernor`); when it is not set, the requests
+        are not throttled
     """
     URL = urijoin(SLACK_URL, 'api', '%(resource)s')
 
@@ -306,18 +730,23 @@ class SlackClient(HttpClient):
     RCHANNEL_INFO = 'channels.info'
     RCHANNEL_HISTORY = 'channels.history'
     RUSER_INFO = 'users.info'
+    RUSERS_LIST = 'users.list'
 
     PCHANNEL = 'channel'
     PCOUNT = 'count'
+    PCURSOR = 'cursor'
+    PLIMIT = 'limit'
     POLDEST = 'oldest'
     PLATEST = 'latest'
     PTOKEN = 'token'
     PUSER = 'user'
 
-    def __init__(self, api_token, max_items=MAX_ITEMS, archive=None, from_archive=False, ssl_verify=True):
+    def __init__(self, api_token, max_items=MAX_ITEMS, archive=None, from_archive=False, ssl_verify=True,
+                 governor=None):
         super().__init__(SLACK_URL, archive=archive, from_archive=from_archive, ssl_verify=ssl_verify)
         self.api_token = api_token
         self.max_items = max_items
+        self.governor = governor
 
     def conversation_members(self, conversation):
         """Fetch the number of members in a conversation, which is a supertype for public and
@@ -392,6 +821,29 @@ class SlackClient(HttpClient):
 
         return response
 
+    def users(self):
+        """Fetch the users directory of the workspace.
+
+        :returns: a generator of pages of users
+        """
+        resource = self.RUSERS_LIST
+
+        params = {
+            self.PLIMIT: self.max_items
+        }
+
+        while True:
+            raw_response = self._fetch(resource, params)
+            yield raw_response
+
+            response = json.loads(raw_response)
+            next_cursor = response.get('response_metadata', {}).get('next_cursor', None)
+
+            if not next_cursor:
+                break
+
+            params[self.PCURSOR] = next_cursor
+
     @staticmethod
     def sanitize_for_archive(url, headers, payload):
         """Sanitize payload of a HTTP request by removing the token information
@@ -423,6 +875,9 @@ class SlackClient(HttpClient):
         logger.debug("Slack client requests: %s params: %s",
                      resource, str(params))
 
+        if self.governor and not self.from_archive:
+            self.governor.acquire(resource)
+
         r = self.fetch(url, payload=params, headers=headers)
 
         # Check for possible API errors
@@ -482,6 +937,14 @@ class SlackCommand(BackendCommand):
         group.add_argument('--max-items', dest='max_items',
                            type=int, default=MAX_ITEMS,
                            help="Maximum number of items requested on the same query")
+        group.add_argument('--prefetch-users', dest='prefetch_users',
+                           action='store_true',
+                           help="Load the users directory before fetching the messages")
+        group.add_argument('--user-cache-path', dest='user_cache_path',
+                           help="database where users are stored for further executions")
+        group.add_argument('--user-cache-ttl', dest='user_cache_ttl',
+                           default=DEFAULT_USER_CACHE_TTL, type=int,
+                           help="seconds the stored users are valid")
 
         # Required arguments
         parser.parser.add_argument('channel',
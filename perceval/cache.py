@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import collections
+import logging
+import sqlite3
+import threading
+import time
+
+from .errors import CacheError
+
+
+logger = logging.getLogger(__name__)
+
+
+class LRUCache:
+    """In-memory cache with a least recently used eviction policy.
+
+    The cache keeps, at most, `max_size` entries in memory. When
+    the limit is reached, the least recently used entry is evicted.
+    Set `max_size` to `None` to have an unbounded cache.
+
+    Optionally, a second level `store` (i.e., a `DiskCache`) can be
+    given. Entries not found in memory are looked up in the store,
+    and every entry set in the cache is also written to it.
+
+    The cache counts the number of hits and misses of the lookups.
+    It can be shared by several threads.
+
+    :param max_size: maximum number of entries kept in memory
+    :param store: second level store of the cache
+
+    :raises CacheError: when `max_size` is not a positive number
+    """
+    DEFAULT_MAX_SIZE = 10000
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, store=None):
+        if max_size is not None and max_size < 1:
+            msg = "invalid cache size; %s must be greater than 0" % str(max_size)
+            raise CacheError(cause=msg)
+
+        self.max_size = max_size
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = collections.OrderedDict()
+        self._lock = threading.RLock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def stats(self):
+        """Number of hits and misses of the cache"""
+
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def get(self, key, default=None):
+        """Get the value of an entry.
+
+        When the entry is not in memory, the method looks it up in
+        the store, if any. Entries found there are kept in memory
+        for future lookups.
+
+        :param key: key of the entry
+        :param default: value returned when the entry is not found
+
+        :returns: the value of the entry or `default` when it is not found
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            value = self.store.get(key) if self.store else None
+
+            if value is None:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self._add_entry(key, value)
+
+        return value
+
+    def set(self, key, value):
+        """Set the value of an entry.
+
+        :param key: key of the entry
+        :param value: value of the entry
+        """
+        with self._lock:
+            self._add_entry(key, value)
+
+            if self.store:
+                self.store.set(key, value)
+
+    def clear(self):
+        """Remove the entries kept in memory and reset the counters"""
+
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _add_entry(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+
+        if self.max_size and len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+
+class DiskCache:
+    """Persistent cache stored in a SQLite database.
+
+    Entries are stored within a namespace, so several caches
+    can share the same database file. Values must be strings.
+
+    Entries expire after `ttl` seconds; expired entries are not
+    returned and they are removed from the database when found
+    or when `purge` is called. When `ttl` is `None`, entries
+    never expire.
+
+    The database can be shared by several processes at the same
+    time. Its journal mode is set to WAL, so readers are not
+    blocked by writers.
+
+    :param cache_path: path to the database file
+    :param namespace: namespace of the entries
+    :param ttl: number of seconds the entries are valid
+
+    :raises CacheError: when the database cannot be accessed
+    """
+    DEFAULT_TTL = 86400  # one day
+    TIMEOUT = 30
+
+    CACHE_CREATE_STMT = "CREATE TABLE IF NOT EXISTS cache ( " \
+                        "namespace TEXT NOT NULL, " \
+                        "key TEXT NOT NULL, " \
+                        "value TEXT NOT NULL, " \
+                        "stored_on REAL NOT NULL, " \
+                        "PRIMARY KEY (namespace, key))"
+
+    def __init__(self, cache_path, namespace='default', ttl=DEFAULT_TTL):
+        self.cache_path = cache_path
+        self.namespace = namespace
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+
+        try:
+            self._db = sqlite3.connect(cache_path,
+                                       timeout=self.TIMEOUT,
+                                       check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            with self._db:
+                self._db.execute(self.CACHE_CREATE_STMT)
+        except sqlite3.DatabaseError as e:
+            msg = "cache '%s' cannot be opened; %s" % (cache_path, str(e))
+            raise CacheError(cause=msg)
+
+        logger.debug("Cache %s:%s initialized", self.cache_path, self.namespace)
+
+    def get(self, key, default=None):
+        """Get the value of a non-expired entry.
+
+        :param key: key of the entry
+        :param default: value returned when the entry is not found
+            or when it expired
+
+        :returns: the value of the entry or `default`
+        """
+        query = "SELECT value, stored_on FROM cache WHERE namespace = ? AND key = ?"
+
+        with self._lock:
+            try:
+                cursor = self._db.execute(query, (self.namespace, key))
+                row = cursor.fetchone()
+                cursor.close()
+
+                if not row:
+                    return default
+
+                value, stored_on = row
+
+                if self._is_expired(stored_on):
+                    with self._db:
+                        self._db.execute("DELETE FROM cache WHERE namespace = ? AND key = ? AND stored_on = ?",
+                                         (self.namespace, key, stored_on))
+                    return default
+            except sqlite3.DatabaseError as e:
+                msg = "cache entry '%s' cannot be retrieved; %s" % (key, str(e))
+                raise CacheError(cause=msg)
+
+        return value
+
+    def set(self, key, value):
+        """Set the value of an entry, overwriting any previous value.
+
+        :param key: key of the entry
+        :param value: value of the entry
+        """
+        insert_stmt = "INSERT OR REPLACE INTO cache (namespace, key, value, stored_on) VALUES (?, ?, ?, ?)"
+
+        with self._lock:
+            try:
+                with self._db:
+                    self._db.execute(insert_stmt, (self.namespace, key, value, time.time()))
+            except sqlite3.DatabaseError as e:
+                msg = "cache entry '%s' cannot be stored; %s" % (key, str(e))
+                raise CacheError(cause=msg)
+
+    def set_many(self, entries):
+        """Set the values of several entries in a single transaction.
+
+        :param entries: iterable of `(key, value)` tuples
+
+        :returns: the number of entries stored
+        """
+        insert_stmt = "INSERT OR REPLACE INTO cache (namespace, key, value, stored_on) VALUES (?, ?, ?, ?)"
+
+        stored_on = time.time()
+        rows = [(self.namespace, key, value, stored_on) for key, value in entries]
+
+        with self._lock:
+            try:
+                with self._db:
+                    self._db.executemany(insert_stmt, rows)
+            except sqlite3.DatabaseError as e:
+                msg = "cache entries cannot be stored; %s" % str(e)
+                raise CacheError(cause=msg)
+
+        return len(rows)
+
+    def purge(self):
+        """Remove the expired entries of the namespace.
+
+        :returns: the number of entries removed
+        """
+        if self.ttl is None:
+            return 0
+
+        delete_stmt = "DELETE FROM cache WHERE namespace = ? AND stored_on < ?"
+
+        with self._lock:
+            try:
+                with self._db:
+                    cursor = self._db.execute(delete_stmt, (self.namespace, time.time() - self.ttl))
+                    nrows = cursor.rowcount
+            except sqlite3.DatabaseError as e:
+                msg = "cache '%s' cannot be purged; %s" % (self.cache_path, str(e))
+                raise CacheError(cause=msg)
+
+        logger.debug("%s expired entries purged from cache %s:%s",
+                     nrows, self.cache_path, self.namespace)
+
+        return nrows
+
+    def close(self):
+        """Close the connection to the database"""
+
+        with self._lock:
+            self._db.close()
+
+    def _is_expired(self, stored_on):
+        return self.ttl is not None and time.time() - stored_on > self.ttl
@@ -181,15 +181,19 @@ class HttpClient:
             response.raise_for_status()
         except Exception as e:
             if self.archive:
-                url, headers, payload = self.sanitize_for_archive(url, headers, payload)
-                self.archive.store(url, payload, headers, e)
+                self._store_in_archive(url, payload, headers, e)
             raise e
 
         if self.archive:
-            url, headers, payload = self.sanitize_for_archive(url, headers, payload)
-            self.archive.store(url, payload, headers, response)
+            self._store_in_archive(url, payload, headers, response)
         return response
 
+    def _store_in_archive(self, url, payload, headers, data):
+        """Store the response, or the error, of a request in the archive"""
+
+        url, headers, payload = self.sanitize_for_archive(url, headers, payload)
+        self.archive.store(url, payload, headers, data)
+
     def _create_http_session(self):
         """Create a http session and initialize the retry object."""
 
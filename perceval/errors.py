@@ -32,11 +32,17 @@ class BaseError(Exception):
 
     def __init__(self, **kwargs):
         super().__init__()
+        self.kwargs = kwargs
         self.msg = self.message % kwargs
 
     def __str__(self):
         return self.msg
 
+    def __reduce__(self):
+        # Errors are rebuilt from their arguments when they
+        # are sent between processes
+        return (_rebuild_error, (self.__class__, self.kwargs))
+
 
 class ArchiveError(BaseError):
     """Generic error for archive objects"""
@@ -92,3 +98,15 @@ class BackendCommandArgumentParserError(BaseError):
     """Generic error for BackendCommandArgumentParser"""
 
     message = "%(cause)s"
+
+
+class CacheError(BaseError):
+    """Generic error for caches"""
+
+    message = "%(cause)s"
+
+
+def _rebuild_error(cls, kwargs):
+    """Create an error of the class `cls` with the arguments `kwargs`"""
+
+    return cls(**kwargs)
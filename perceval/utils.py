@@ -24,12 +24,12 @@
 #     Harshal Mittal <harshalmittal4@gmail.com>
 #
 
+import collections
 import datetime
 import email
 import logging
 import mailbox
 import re
-import sys
 
 import xml.etree.ElementTree
 
@@ -49,6 +49,20 @@ DEFAULT_DATETIME = datetime.datetime(1970, 1, 1, 0, 0, 0,
 DEFAULT_LAST_DATETIME = datetime.datetime(2100, 1, 1, 0, 0, 0,
                                           tzinfo=dateutil.tz.tzutc())
 
+# Control and invalid XML characters; C1 controls take two
+# bytes (0xC2 and the control code) on UTF-8 encoded streams
+INVALID_XML_CHARS = [(0x00, 0x08), (0x0B, 0x1F),
+                     (0x7F, 0x84), (0x86, 0x9F)]
+INVALID_XML_CHARS_TABLE = {c: ' '
+                           for (low, high) in INVALID_XML_CHARS
+                           for c in range(low, high + 1)}
+INVALID_XML_BYTES_TABLE = bytes(ord(' ') if c < 0x80 and c in INVALID_XML_CHARS_TABLE else c
+                                for c in range(0x100))
+INVALID_XML_C1_BYTES_REGEX = re.compile(b'\xc2[\x80-\x84\x86-\x9f]')
+
+# Number of chars fed at once to the XML streaming parser
+XML_PARSER_CHUNK_SIZE = 65536
+
 
 def check_compressed_file_type(filepath):
     """Check if filename is a compressed file supported by the tool.
@@ -105,6 +119,46 @@ def months_range(from_date, to_date):
         pos = x
 
 
+def ordered_futures(executor, func, iterable, window):
+    """Run a function over the items of an iterable on a pool, keeping their order.
+
+    Items are read from `iterable` and submitted to `executor` lazily,
+    keeping at most `window` of them in flight. The pairs
+    `(item, future)` are returned in the order of `iterable`, so
+    callers get the results, or the errors, calling `future.result()`.
+    When the iterable fails, the futures of the items read before
+    the error are returned before raising it. Pending futures are
+    cancelled when the generator is closed.
+
+    :param executor: `concurrent.futures.Executor` that runs `func`
+    :param func: function called with each item
+    :param iterable: items to process
+    :param window: maximum number of items submitted and not
+        returned yet
+
+    :returns: a generator of `(item, future)` tuples
+    """
+    pending = collections.deque()
+
+    try:
+        try:
+            for item in iterable:
+                pending.append((item, executor.submit(func, item)))
+
+                if len(pending) >= window:
+                    yield pending.popleft()
+        except Exception:
+            while pending:
+                yield pending.popleft()
+            raise
+
+        while pending:
+            yield pending.popleft()
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
 def message_to_dict(msg):
     """Convert an email message into a dictionary.
 
@@ -201,27 +255,18 @@ def remove_invalid_xml_chars(raw_xml):
     lawlesst's on GitHub Gist (https://gist.github.com/lawlesst/4110923),
     that is based on the previous answer.
 
+    The stream can be a `str` or a UTF-8 encoded `bytes` object. In
+    the latter case, the result is also a `bytes` object.
+
     :param xml: XML stream
 
     :returns: a purged XML stream
     """
-    illegal_unichrs = [(0x00, 0x08), (0x0B, 0x1F),
-                       (0x7F, 0x84), (0x86, 0x9F)]
-
-    illegal_ranges = ['%s-%s' % (chr(low), chr(high))
-                      for (low, high) in illegal_unichrs
-                      if low < sys.maxunicode]
-
-    illegal_xml_re = re.compile('[%s]' % ''.join(illegal_ranges))
-
-    purged_xml = ''
-
-    for c in raw_xml:
-        if illegal_xml_re.search(c) is not None:
-            c = ' '
-        purged_xml += c
-
-    return purged_xml
+    if isinstance(raw_xml, bytes):
+        purged_xml = raw_xml.translate(INVALID_XML_BYTES_TABLE)
+        return INVALID_XML_C1_BYTES_REGEX.sub(b' ', purged_xml)
+    else:
+        return raw_xml.translate(INVALID_XML_CHARS_TABLE)
 
 
 def xml_to_dict(raw_xml):
@@ -243,31 +288,94 @@ def xml_to_dict(raw_xml):
     :raises ParseError: raised when an error occurs parsing the given
         XML stream
     """
-    def node_to_dict(node):
-        d = {}
-        d.update(node.items())
+    purged_xml = remove_invalid_xml_chars(raw_xml)
+
+    try:
+        tree = xml.etree.ElementTree.fromstring(purged_xml)
+    except xml.etree.ElementTree.ParseError as e:
+        cause = "XML stream %s" % (str(e))
+        raise ParseError(cause=cause)
+
+    d = _xml_node_to_dict(tree)
+
+    return d
+
+
+def xml_iterparse(raw_xml, tag):
+    """Convert the elements of a XML stream into dictionaries.
 
-        text = getattr(node, 'text', None)
+    This function parses the XML stream incrementally, yielding the
+    dictionary of each `tag` element as soon as the element is closed.
+    Parsed elements are discarded, so only one of them is kept in
+    memory at the same time. Elements nested within another `tag`
+    element are returned as part of the outer one.
 
-        if text is not None:
-            d['__text__'] = text
+    Dictionaries have the same format as the ones created by
+    `xml_to_dict`.
 
-        childs = {}
-        for child in node:
-            childs.setdefault(child.tag, []).append(node_to_dict(child))
+    Take into account errors are found while the stream is parsed,
+    so some elements can be returned before a `ParseError` is raised.
 
-        d.update(childs.items())
+    :param raw_xml: XML stream
+    :param tag: name of the elements to convert
+
+    :returns: a generator of dicts with the data of the elements
+
+    :raises ParseError: raised when an error occurs parsing the given
+        XML stream
+    """
+    def read_events(parser, purged_xml):
+        for i in range(0, len(purged_xml), XML_PARSER_CHUNK_SIZE):
+            parser.feed(purged_xml[i:i + XML_PARSER_CHUNK_SIZE])
+            yield from parser.read_events()
 
-        return d
+        parser.close()
+        yield from parser.read_events()
 
     purged_xml = remove_invalid_xml_chars(raw_xml)
+    parser = xml.etree.ElementTree.XMLPullParser(events=('start', 'end'))
+
+    nodes = []
+    nopen = 0
 
     try:
-        tree = xml.etree.ElementTree.fromstring(purged_xml)
+        for event, node in read_events(parser, purged_xml):
+            if event == 'start':
+                nodes.append(node)
+                if node.tag == tag:
+                    nopen += 1
+                continue
+
+            nodes.pop()
+
+            if node.tag != tag:
+                continue
+
+            nopen -= 1
+
+            if nopen == 0:
+                yield _xml_node_to_dict(node)
+
+                if nodes:
+                    nodes[-1].remove(node)
     except xml.etree.ElementTree.ParseError as e:
         cause = "XML stream %s" % (str(e))
         raise ParseError(cause=cause)
 
-    d = node_to_dict(tree)
+
+def _xml_node_to_dict(node):
+    d = {}
+    d.update(node.items())
+
+    text = getattr(node, 'text', None)
+
+    if text is not None:
+        d['__text__'] = text
+
+    childs = {}
+    for child in node:
+        childs.setdefault(child.tag, []).append(_xml_node_to_dict(child))
+
+    d.update(childs.items())
 
     return d
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Benchmark of the GitParser modes on a synthetic Git log.
+
+Usage:
+    python bench_git_parser.py [--commits N] [--files N] [--repeat N]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from perceval.backends.core.git import GitParser
+
+
+MERGE_COMMIT_RATIO = 0.1
+RENAME_FILE_RATIO = 0.1
+
+
+def generate_log(ncommits, nfiles, seed=0):
+    """Generate the lines of a Git log with `ncommits` commits"""
+
+    rnd = random.Random(seed)
+    lines = ['\n']
+
+    for n in range(ncommits):
+        sha = '%040x' % rnd.getrandbits(160)
+        parents = ['%040x' % rnd.getrandbits(160)]
+        is_merge = rnd.random() < MERGE_COMMIT_RATIO
+
+        if is_merge:
+            parents.append('%040x' % rnd.getrandbits(160))
+
+        lines.append('commit %s %s\n' % (sha, ' '.join(parents)))
+        if is_merge:
+            lines.append('Merge: %s %s\n' % (parents[0][:7], parents[1][:7]))
+        lines.append('Author:     John Smith <jsmith@example.com>\n')
+        lines.append('AuthorDate: Tue Aug 14 14:30:13 2012 -0300\n')
+        lines.append('Commit:     John Smith <jsmith@example.com>\n')
+        lines.append('CommitDate: Tue Aug 14 14:30:13 2012 -0300\n')
+        lines.append('\n')
+        lines.append('    Commit number %s\n' % n)
+        lines.append('    \n')
+        for _ in range(rnd.randint(1, 10)):
+            lines.append('    Body of the commit message: reasons and details of the change.\n')
+        lines.append('    \n')
+        lines.append('    Signed-off-by: John Smith <jsmith@example.com>\n')
+        lines.append('\n')
+
+        files = ['dir%s/file%s.c' % (rnd.randint(0, 50), rnd.randint(0, 500))
+                 for _ in range(rnd.randint(1, nfiles))]
+        files = sorted(set(files))
+
+        colons = '::' if is_merge else ':'
+        modes = '100644 100644 100644' if is_merge else '100644 100644'
+        indexes = 'e69de29... 58a6c75... 58a6c75...' if is_merge else 'e69de29... 58a6c75...'
+
+        stats = []
+        for filename in files:
+            if not is_merge and rnd.random() < RENAME_FILE_RATIO:
+                lines.append('%s%s %s R100\t%s\t%s.renamed\n' % (colons, modes, indexes, filename, filename))
+                stats.append('0\t0\t%s => %s.renamed\n' % (filename, filename))
+            else:
+                lines.append('%s%s %s M\t%s\n' % (colons, modes, indexes, filename))
+                stats.append('%s\t%s\t%s\n' % (rnd.randint(0, 100), rnd.randint(0, 100), filename))
+        lines.extend(stats)
+        lines.append('\n')
+
+    return lines
+
+
+def run(lines, fast, repeat):
+    """Parse the log `repeat` times, returning the best time and the commits"""
+
+    best = None
+    commits = None
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        commits = [commit for commit in GitParser(iter(lines), fast=fast).parse()]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best, commits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GitParser benchmark")
+    parser.add_argument('--commits', type=int, default=20000,
+                        help="number of commits of the log")
+    parser.add_argument('--files', type=int, default=10,
+                        help="max number of files modified by commit")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="number of runs of each mode")
+    args = parser.parse_args()
+
+    lines = generate_log(args.commits, args.files)
+    print("Log: %s commits, %s lines" % (args.commits, len(lines)))
+
+    default_time, default_commits = run(lines, False, args.repeat)
+    fast_time, fast_commits = run(lines, True, args.repeat)
+
+    if fast_commits != default_commits:
+        print("Error: parsers generated different commits")
+        return 1
+
+    print("default mode: %.3fs (%.0f commits/s)" % (default_time, args.commits / default_time))
+    print("   fast mode: %.3fs (%.0f commits/s)" % (fast_time, args.commits / fast_time))
+    print("     speedup: %.2fx" % (default_time / fast_time))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
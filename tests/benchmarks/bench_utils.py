@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+"""Micro-benchmarks of the hot paths of `perceval.utils`.
+
+Each benchmark runs a function on a large input several times and
+reports the best time. Results can be saved to a file and used as
+the baseline of further runs; the script fails when a benchmark is
+slower than its baseline by more than the given tolerance.
+
+Usage:
+    python bench_utils.py [--repeat N] [--save FILE] [--baseline FILE]
+                          [--tolerance FACTOR]
+"""
+
+import argparse
+import email
+import json
+import os
+import sys
+import timeit
+
+from perceval.utils import (message_to_dict,
+                            remove_invalid_xml_chars,
+                            xml_iterparse,
+                            xml_to_dict)
+
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'utils')
+
+# Number of times the data files are replicated to build the inputs
+XML_BUGS = 500
+MESSAGES = 500
+
+
+def read_file(filename, mode='r'):
+    with open(os.path.join(DATA_PATH, filename), mode) as f:
+        return f.read()
+
+
+def bugzilla_xml(nbugs):
+    """Build a Bugzilla XML document with `nbugs` bugs"""
+
+    raw_xml = read_file('bugzilla_bug.xml')
+
+    start = raw_xml.index('<bug>')
+    end = raw_xml.index('</bug>') + len('</bug>')
+
+    return raw_xml[:start] + raw_xml[start:end] * nbugs + raw_xml[end:]
+
+
+def setup_benchmarks():
+    """Return the list of benchmarks as (name, function) tuples"""
+
+    raw_xml = bugzilla_xml(XML_BUGS)
+    invalid_xml = read_file('bugzilla_bugs_invalid_chars.xml') * XML_BUGS
+    invalid_xml_bytes = invalid_xml.encode('utf-8')
+    messages = [email.message_from_string(read_file(filename))
+                for filename in ['email_single.txt',
+                                 'email_multipart_encoding.txt',
+                                 'email_multipart_no_encoding.txt']] * MESSAGES
+
+    benchmarks = [
+        ('xml_to_dict', lambda: xml_to_dict(raw_xml)),
+        ('xml_iterparse', lambda: [bug for bug in xml_iterparse(raw_xml, 'bug')]),
+        ('remove_invalid_xml_chars[str]', lambda: remove_invalid_xml_chars(invalid_xml)),
+        ('remove_invalid_xml_chars[bytes]', lambda: remove_invalid_xml_chars(invalid_xml_bytes)),
+        ('message_to_dict', lambda: [message_to_dict(msg) for msg in messages])
+    ]
+
+    return benchmarks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="perceval.utils benchmarks")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="number of runs of each benchmark")
+    parser.add_argument('--save', dest='save_path',
+                        help="save the results to this file")
+    parser.add_argument('--baseline', dest='baseline_path',
+                        help="compare the results with the ones stored in this file")
+    parser.add_argument('--tolerance', type=float, default=1.5,
+                        help="max slowdown factor allowed against the baseline")
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline_path:
+        with open(args.baseline_path, 'r') as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+
+    for name, func in setup_benchmarks():
+        best = min(timeit.repeat(func, number=1, repeat=args.repeat))
+        results[name] = best
+
+        line = "%-32s %8.4fs" % (name, best)
+
+        if name in baseline:
+            factor = best / baseline[name]
+            line += "  (%.2fx baseline)" % factor
+
+            if factor > args.tolerance:
+                regressions.append(name)
+        print(line)
+
+    if args.save_path:
+        with open(args.save_path, 'w') as f:
+            json.dump(results, f, indent=4, sort_keys=True)
+
+    if regressions:
+        print("Regressions found: %s" % ', '.join(regressions))
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -190,7 +190,7 @@ class TestArchive(unittest.TestCase):
         ds = data_stored[0]
         dr = data_requests[0]
         self.assertEqual(ds[0], '0fa4ce047340780f08efca92f22027514263521d')
-        self.assertEqual(pickle.loads(ds[1]).url, responses[0].url)
+        self.assertEqual(Archive.decode_data(ds[1]).url, responses[0].url)
         self.assertEqual(ds[2], dr[0])
         self.assertEqual(pickle.loads(ds[3]), dr[1])
         self.assertEqual(pickle.loads(ds[4]), dr[2])
@@ -198,7 +198,7 @@ class TestArchive(unittest.TestCase):
         ds = data_stored[1]
         dr = data_requests[1]
         self.assertEqual(ds[0], '3879a6f12828b7ac3a88b7167333e86168f2f5d2')
-        self.assertEqual(pickle.loads(ds[1]).url, responses[1].url)
+        self.assertEqual(Archive.decode_data(ds[1]).url, responses[1].url)
         self.assertEqual(ds[2], dr[0])
         self.assertEqual(pickle.loads(ds[3]), dr[1])
         self.assertEqual(pickle.loads(ds[4]), dr[2])
@@ -206,7 +206,7 @@ class TestArchive(unittest.TestCase):
         ds = data_stored[2]
         dr = data_requests[2]
         self.assertEqual(ds[0], 'ef38f574a0745b63a056e7befdb7a06e7cf1549b')
-        self.assertEqual(pickle.loads(ds[1]).url, responses[2].url)
+        self.assertEqual(Archive.decode_data(ds[1]).url, responses[2].url)
         self.assertEqual(ds[2], dr[0])
         self.assertEqual(pickle.loads(ds[3]), dr[1])
         self.assertEqual(pickle.loads(ds[4]), dr[2])
@@ -234,6 +234,103 @@ class TestArchive(unittest.TestCase):
         with self.assertRaisesRegex(ArchiveError, "duplicated entry"):
             archive.store(url, payload, headers, response)
 
+    def test_store_buffered(self):
+        """Test whether entries are committed in batches when writes are buffered"""
+
+        archive_path = os.path.join(self.test_path, 'myarchive')
+        archive = Archive.create(archive_path, batch_size=3)
+
+        self.assertTrue(archive.is_buffered)
+
+        archive.store("https://example.com/", {'id': 1}, {}, {'id': 1})
+        archive.store("https://example.com/", {'id': 2}, {}, {'id': 2})
+
+        # Entries are staged, not written
+        nrows = count_number_rows(archive_path, Archive.ARCHIVE_TABLE)
+        self.assertEqual(nrows, 0)
+
+        archive.store("https://example.com/", {'id': 3}, {}, {'id': 3})
+
+        # The batch is full, so it was committed
+        nrows = count_number_rows(archive_path, Archive.ARCHIVE_TABLE)
+        self.assertEqual(nrows, 3)
+
+        archive.store("https://example.com/", {'id': 4}, {}, {'id': 4})
+        nrows = count_number_rows(archive_path, Archive.ARCHIVE_TABLE)
+        self.assertEqual(nrows, 3)
+
+        archive.flush()
+        nrows = count_number_rows(archive_path, Archive.ARCHIVE_TABLE)
+        self.assertEqual(nrows, 4)
+
+        # Buffered archives use WAL journaling
+        cursor = archive._db.cursor()
+        cursor.execute("PRAGMA journal_mode")
+        self.assertEqual(cursor.fetchone()[0], 'wal')
+        cursor.close()
+
+    @unittest.mock.patch('time.monotonic')
+    def test_store_buffered_interval(self, mock_monotonic):
+        """Test whether staged entries are committed when the interval expires"""
+
+        mock_monotonic.return_value = 100.0
+
+        archive_path = os.path.join(self.test_path, 'myarchive')
+        archive = Archive.create(archive_path, batch_size=100, batch_interval=5)
+
+        archive.store("https://example.com/", {'id': 1}, {}, {'id': 1})
+        nrows = count_number_rows(archive_path, Archive.ARCHIVE_TABLE)
+        self.assertEqual(nrows, 0)
+
+        mock_monotonic.return_value = 105.0
+
+        archive.store("https://example.com/", {'id': 2}, {}, {'id': 2})
+        nrows = count_number_rows(archive_path, Archive.ARCHIVE_TABLE)
+        self.assertEqual(nrows, 2)
+
+    def test_store_buffered_duplicate(self):
+        """Test whether duplicated entries are detected when writes are buffered"""
+
+        archive_path = os.path.join(self.test_path, 'myarchive')
+        archive = Archive.create(archive_path, batch_size=10)
+
+        archive.store("https://example.com/", {'id': 1}, {}, {'id': 1})
+
+        # Duplicated within the staged entries
+        with self.assertRaisesRegex(ArchiveError, "duplicated entry"):
+            archive.store("https://example.com/", {'id': 1}, {}, {'id': 1})
+
+        archive.flush()
+
+        # Duplicated with an entry already written; the rest
+        # of the batch is committed anyway
+        archive.store("https://example.com/", {'id': 1}, {}, {'id': 1})
+        archive.store("https://example.com/", {'id': 2}, {}, {'id': 2})
+
+        with self.assertRaisesRegex(ArchiveError, "duplicated entry"):
+            archive.flush()
+
+        nrows = count_number_rows(archive_path, Archive.ARCHIVE_TABLE)
+        self.assertEqual(nrows, 2)
+
+    def test_retrieve_buffered(self):
+        """Test whether staged entries are written before retrieving data"""
+
+        archive_path = os.path.join(self.test_path, 'myarchive')
+        archive = Archive.create(archive_path, batch_size=10)
+        archive.store("https://example.com/", {'id': 1}, {}, {'id': 1})
+
+        data = archive.retrieve("https://example.com/", {'id': 1}, {})
+        self.assertDictEqual(data, {'id': 1})
+
+    def test_invalid_batch_size(self):
+        """Test whether an exception is raised when the batch size is not valid"""
+
+        archive_path = os.path.join(self.test_path, 'myarchive')
+
+        with self.assertRaisesRegex(ArchiveError, "batch size must be greater than 0"):
+            _ = Archive.create(archive_path, batch_size=0)
+
     @httpretty.activate
     def test_retrieve(self):
         """Test whether data is properly retrieved from the archive"""
@@ -256,6 +353,121 @@ class TestArchive(unittest.TestCase):
 
         self.assertEqual(data.url, response.url)
 
+    @httpretty.activate
+    def test_codec_response(self):
+        """Test whether responses are encoded and decoded by the archive codec"""
+
+        url = "https://example.com/tasks"
+        body = '{"task": "my task", "owner": "Ñandú"}'
+
+        httpretty.register_uri(httpretty.GET,
+                               url,
+                               body=body,
+                               status=200,
+                               adding_headers={'Link': '<https://example.com/tasks?page=2>; rel="next"'})
+        response = requests.get(url, params={'task_id': 10})
+        response.encoding = 'utf-8'
+
+        data_dump = Archive.encode_data(response)
+        self.assertTrue(data_dump.startswith(Archive.CODEC_MAGIC))
+
+        decoded = Archive.decode_data(data_dump)
+        self.assertIsInstance(decoded, requests.Response)
+        self.assertEqual(decoded.status_code, 200)
+        self.assertEqual(decoded.reason, response.reason)
+        self.assertEqual(decoded.url, response.url)
+        self.assertEqual(decoded.encoding, 'utf-8')
+        self.assertEqual(decoded.content, response.content)
+        self.assertEqual(decoded.text, body)
+        self.assertDictEqual(decoded.json(), response.json())
+        self.assertEqual(decoded.headers['link'], response.headers['Link'])
+        self.assertEqual(decoded.links['next']['url'], 'https://example.com/tasks?page=2')
+
+    @httpretty.activate
+    def test_codec_error(self):
+        """Test whether HTTP errors are encoded and decoded by the archive codec"""
+
+        url = "https://example.com/tasks"
+
+        httpretty.register_uri(httpretty.GET,
+                               url,
+                               body='Not found',
+                               status=404)
+        response = requests.get(url)
+
+        with self.assertRaises(requests.exceptions.HTTPError) as ctx:
+            response.raise_for_status()
+
+        data_dump = Archive.encode_data(ctx.exception)
+        decoded = Archive.decode_data(data_dump)
+
+        self.assertIsInstance(decoded, requests.exceptions.HTTPError)
+        self.assertEqual(str(decoded), str(ctx.exception))
+        self.assertEqual(decoded.response.status_code, 404)
+        self.assertEqual(decoded.response.text, 'Not found')
+
+    def test_codec_object(self):
+        """Test whether other objects are encoded and decoded by the archive codec"""
+
+        data = {'article': ['line 1', 'line 2'], 'number': 1}
+
+        data_dump = Archive.encode_data(data)
+        self.assertTrue(data_dump.startswith(Archive.CODEC_MAGIC))
+
+        decoded = Archive.decode_data(data_dump)
+        self.assertDictEqual(decoded, data)
+
+    def test_codec_legacy(self):
+        """Test whether data pickled with protocol 0 is decoded"""
+
+        data = {'article': ['line 1', 'line 2'], 'number': 1}
+        decoded = Archive.decode_data(pickle.dumps(data, 0))
+        self.assertDictEqual(decoded, data)
+
+    def test_codec_unsupported_version(self):
+        """Test whether an exception is raised when the codec version is not supported"""
+
+        data_dump = bytearray(Archive.encode_data('data'))
+        data_dump[len(Archive.CODEC_MAGIC)] = Archive.CODEC_VERSION + 1
+
+        with self.assertRaisesRegex(ArchiveError, "unsupported archive codec version"):
+            _ = Archive.decode_data(bytes(data_dump))
+
+    def test_compact(self):
+        """Test whether legacy entries are rewritten with the current codec"""
+
+        archive_path = os.path.join(self.test_path, 'myarchive')
+        archive = Archive.create(archive_path)
+
+        # Store some entries using the legacy format
+        data = 'x' * 10000
+        db = sqlite3.connect(archive_path)
+        cursor = db.cursor()
+        for i in range(5):
+            hashcode = Archive.make_hashcode(str(i), {}, {})
+            cursor.execute("INSERT INTO archive (id, hashcode, uri, payload, headers, data) "
+                           "VALUES (?, ?, ?, ?, ?, ?)",
+                           (None, hashcode, str(i), pickle.dumps({}, 0),
+                            pickle.dumps({}, 0), pickle.dumps(data, 0)))
+        db.commit()
+        cursor.close()
+        db.close()
+
+        archive.store('5', {}, {}, data)
+
+        size_before = os.path.getsize(archive_path)
+
+        nrewritten = archive.compact()
+        self.assertEqual(nrewritten, 5)
+        self.assertLess(os.path.getsize(archive_path), size_before)
+
+        for i in range(6):
+            self.assertEqual(archive.retrieve(str(i), {}, {}), data)
+
+        # Entries are not rewritten twice
+        nrewritten = archive.compact()
+        self.assertEqual(nrewritten, 0)
+
     def test_retrieve_missing(self):
         """Test whether the retrieval of non archived data throws an error
 
@@ -354,6 +566,25 @@ class TestArchiveManager(unittest.TestCase):
         manager.remove_archive(archive.archive_path)
         self.assertEqual(os.path.exists(archive.archive_path), False)
 
+    def test_remove_buffered_archive(self):
+        """Test if an archive and its journal files are removed"""
+
+        archive_mng_path = os.path.join(self.test_path, ARCHIVE_TEST_DIR)
+        manager = ArchiveManager(archive_mng_path, batch_size=10)
+
+        archive = manager.create_archive()
+        self.assertEqual(archive.batch_size, 10)
+        archive.init_metadata('marvel.com', 'marvel-comics-backend', '0.1.0',
+                              'issue', {})
+        archive.store("https://example.com/", {'id': 1}, {}, {'id': 1})
+        archive.flush()
+        self.assertEqual(os.path.exists(archive.archive_path + '-wal'), True)
+
+        manager.remove_archive(archive.archive_path)
+        self.assertEqual(os.path.exists(archive.archive_path), False)
+        self.assertEqual(os.path.exists(archive.archive_path + '-wal'), False)
+        self.assertEqual(os.path.exists(archive.archive_path + '-shm'), False)
+
     def test_remove_archive_not_found(self):
         """Test if an exception is raised when the archive is not found"""
 
@@ -363,6 +594,51 @@ class TestArchiveManager(unittest.TestCase):
         with self.assertRaisesRegex(ArchiveManagerError, 'archive mockarchive does not exist'):
             manager.remove_archive('mockarchive')
 
+    def test_compact_archives(self):
+        """Test if the archives are compacted by the archive manager"""
+
+        archive_mng_path = os.path.join(self.test_path, ARCHIVE_TEST_DIR)
+        manager = ArchiveManager(archive_mng_path)
+
+        archive_paths = []
+        for _ in range(2):
+            archive = manager.create_archive()
+            archive.init_metadata('marvel.com', 'marvel-comics-backend', '0.1.0',
+                                  'issue', {})
+            archive_paths.append(archive.archive_path)
+
+            db = sqlite3.connect(archive.archive_path)
+            cursor = db.cursor()
+            cursor.execute("INSERT INTO archive (id, hashcode, uri, payload, headers, data) "
+                           "VALUES (?, ?, ?, ?, ?, ?)",
+                           (None, Archive.make_hashcode('uri', {}, {}), 'uri',
+                            pickle.dumps({}, 0), pickle.dumps({}, 0),
+                            pickle.dumps({'data': 1}, 0)))
+            db.commit()
+            cursor.close()
+            db.close()
+
+        # Invalid archives are ignored
+        invalid_path = os.path.join(archive_mng_path, 'invalid.sqlite3')
+        with open(invalid_path, 'w') as fd:
+            fd.write("Invalid archive file")
+
+        nrewritten = manager.compact_archives()
+        self.assertEqual(nrewritten, 2)
+
+        for archive_path in archive_paths:
+            archive = Archive(archive_path)
+            self.assertDictEqual(archive.retrieve('uri', {}, {}), {'data': 1})
+
+    def test_compact_archive_not_found(self):
+        """Test if an exception is raised when the archive to compact is not found"""
+
+        archive_mng_path = os.path.join(self.test_path, ARCHIVE_TEST_DIR)
+        manager = ArchiveManager(archive_mng_path)
+
+        with self.assertRaisesRegex(ArchiveManagerError, 'archive mockarchive does not exist'):
+            manager.compact_archive('mockarchive')
+
     def test_search(self):
         """Test if a set of archives is found based on the given criteria"""
 
@@ -515,6 +791,93 @@ class TestArchiveManager(unittest.TestCase):
         archives = manager.search('https://example.com', 'bugzilla', 'commit', dt)
         self.assertListEqual(archives, [])
 
+    def test_search_catalog(self):
+        """Check if archives are searched using the catalog"""
+
+        archive_mng_path = os.path.join(self.test_path, ARCHIVE_TEST_DIR)
+        manager = ArchiveManager(archive_mng_path)
+
+        dt = datetime_utcnow()
+        archive = manager.create_archive()
+        archive.init_metadata('https://example.com', 'git', '0.8', 'commit', {})
+
+        # The first search reads the metadata of the new archive
+        archives = manager.search('https://example.com', 'git', 'commit', dt)
+        self.assertListEqual(archives, [archive.archive_path])
+
+        # Next searches do not open any archive
+        with unittest.mock.patch('perceval.archive.Archive') as mock_archive:
+            archives = manager.search('https://example.com', 'git', 'commit', dt)
+            self.assertListEqual(archives, [archive.archive_path])
+            mock_archive.assert_not_called()
+
+        self.assertEqual(os.path.exists(os.path.join(archive_mng_path,
+                                                     ArchiveManager.CATALOG_NAME)), True)
+
+    def test_catalog_remove_archive(self):
+        """Check if removed archives are deleted from the catalog"""
+
+        archive_mng_path = os.path.join(self.test_path, ARCHIVE_TEST_DIR)
+        manager = ArchiveManager(archive_mng_path)
+
+        dt = datetime_utcnow()
+        archive_a = manager.create_archive()
+        archive_a.init_metadata('https://example.com', 'git', '0.8', 'commit', {})
+        archive_b = manager.create_archive()
+        archive_b.init_metadata('https://example.com', 'git', '0.8', 'commit', {})
+
+        manager.remove_archive(archive_a.archive_path)
+
+        archives = manager.search('https://example.com', 'git', 'commit', dt)
+        self.assertListEqual(archives, [archive_b.archive_path])
+
+        # Archives removed from the disk by other means are ignored
+        os.remove(archive_b.archive_path)
+
+        archives = manager.search('https://example.com', 'git', 'commit', dt)
+        self.assertListEqual(archives, [])
+
+    def test_rebuild_catalog(self):
+        """Check if the catalog is rebuilt from the archives on disk"""
+
+        archive_mng_path = os.path.join(self.test_path, ARCHIVE_TEST_DIR)
+        manager = ArchiveManager(archive_mng_path)
+
+        dt = datetime_utcnow()
+        archive_a = manager.create_archive()
+        archive_a.init_metadata('https://example.com', 'git', '0.8', 'commit', {})
+
+        # Archive not registered in the catalog
+        archive_path = os.path.join(archive_mng_path, 'ff', 'myarchive.sqlite3')
+        os.makedirs(os.path.dirname(archive_path))
+        archive_b = Archive.create(archive_path)
+        archive_b.init_metadata('https://example.com', 'git', '0.8', 'commit', {})
+
+        archives = manager.search('https://example.com', 'git', 'commit', dt)
+        self.assertListEqual(archives, [archive_a.archive_path])
+
+        narchives = manager.rebuild_catalog()
+        self.assertEqual(narchives, 2)
+
+        archives = manager.search('https://example.com', 'git', 'commit', dt)
+        self.assertListEqual(archives, [archive_a.archive_path, archive_b.archive_path])
+
+    def test_catalog_created_from_disk(self):
+        """Check if a new catalog is filled with the archives already stored"""
+
+        archive_mng_path = os.path.join(self.test_path, ARCHIVE_TEST_DIR)
+        manager = ArchiveManager(archive_mng_path)
+
+        dt = datetime_utcnow()
+        archive = manager.create_archive()
+        archive.init_metadata('https://example.com', 'git', '0.8', 'commit', {})
+
+        os.remove(os.path.join(archive_mng_path, ArchiveManager.CATALOG_NAME))
+
+        manager = ArchiveManager(archive_mng_path)
+        archives = manager.search('https://example.com', 'git', 'commit', dt)
+        self.assertListEqual(archives, [archive.archive_path])
+
 
 if __name__ == "__main__":
     unittest.main()
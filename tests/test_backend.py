@@ -1082,6 +1082,39 @@ class TestBackendCommandArgumentParser(unittest.TestCase):
         self.assertEqual(parsed_args.fetch_archive, True)
         self.assertEqual(parsed_args.no_archive, False)
         self.assertEqual(parsed_args.archived_since, expected_dt)
+        self.assertEqual(parsed_args.rebuild_archive_catalog, False)
+        self.assertEqual(parsed_args.archive_batch_size, 1)
+        self.assertEqual(parsed_args.archive_batch_interval, None)
+        self.assertEqual(parsed_args.archive_workers, None)
+        self.assertEqual(parsed_args.archive_ordered, True)
+
+    def test_parse_archive_workers_args(self):
+        """Test if parallel archive replay arguments are parsed"""
+
+        args = ['--fetch-archive', '--category', 'mocked',
+                '--archive-workers', '4',
+                '--archive-unordered']
+
+        parser = BackendCommandArgumentParser(MockedBackendCommand.BACKEND,
+                                              archive=True)
+        parsed_args = parser.parse(*args)
+
+        self.assertEqual(parsed_args.archive_workers, 4)
+        self.assertEqual(parsed_args.archive_ordered, False)
+
+    def test_parse_archive_batch_args(self):
+        """Test if archive buffering arguments are parsed"""
+
+        args = ['--archive-path', '/tmp/archive',
+                '--archive-batch-size', '100',
+                '--archive-batch-interval', '2.5']
+
+        parser = BackendCommandArgumentParser(MockedBackendCommand.BACKEND,
+                                              archive=True)
+        parsed_args = parser.parse(*args)
+
+        self.assertEqual(parsed_args.archive_batch_size, 100)
+        self.assertEqual(parsed_args.archive_batch_interval, 2.5)
 
     def test_incompatible_fetch_archive_and_no_archive(self):
         """Test if fetch-archive and no-archive arguments are incompatible"""
@@ -1093,6 +1126,23 @@ class TestBackendCommandArgumentParser(unittest.TestCase):
         with self.assertRaises(AttributeError):
             _ = parser.parse(*args)
 
+    def test_parse_rebuild_archive_catalog_args(self):
+        """Test if the argument to rebuild the catalog of archives is parsed"""
+
+        args = ['--archive-path', '/tmp/archive',
+                '--rebuild-archive-catalog']
+
+        parser = BackendCommandArgumentParser(MockedBackendCommand.BACKEND,
+                                              archive=True)
+        parsed_args = parser.parse(*args)
+
+        self.assertEqual(parsed_args.rebuild_archive_catalog, True)
+
+        args = ['--rebuild-archive-catalog', '--no-archive']
+
+        with self.assertRaises(AttributeError):
+            _ = parser.parse(*args)
+
     def test_fetch_archive_needs_category(self):
         """Test if fetch-archive needs a category"""
 
@@ -1381,6 +1431,54 @@ class TestBackendCommand(unittest.TestCase):
             self.assertEqual(item['tag'], 'test')
             self.assertEqual(item['classified_fields_filtered'], None)
 
+    def test_run_fetch_from_archive_rebuild_catalog(self):
+        """Test whether archives not registered in the catalog are found when it is rebuilt"""
+
+        archives_path = os.path.join(self.test_path, 'archives')
+        copies_path = os.path.join(self.test_path, 'copies')
+
+        args = ['--archive-path', archives_path,
+                '--from-date', '2015-01-01', '--tag', 'test',
+                '--category', 'mock_item',
+                '--subtype', 'mocksubtype',
+                '--output', self.fout_path, 'http://example.com/']
+
+        cmd = MockedBackendCommand(*args)
+        cmd.run()
+        cmd.outfile.close()
+
+        # The catalog of the copies does not know the copied archive
+        manager = ArchiveManager(copies_path)
+        self.assertEqual(manager.rebuild_catalog(), 0)
+
+        for filepath in ArchiveManager(archives_path)._search_files():
+            target_path = os.path.join(copies_path, os.path.relpath(filepath, archives_path))
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            shutil.copy(filepath, target_path)
+
+        args = ['--archive-path', copies_path, '--fetch-archive',
+                '--from-date', '2015-01-01', '--tag', 'test', '--category', 'mock_item',
+                '--subtype', 'mocksubtype',
+                '--output', self.fout_path, 'http://example.com/']
+
+        cmd = MockedBackendCommand(*args)
+        filepaths = cmd.archive_manager.search('http://example.com/', MockedBackendCommand.BACKEND.__name__,
+                                               'mock_item', str_to_datetime('1970-01-01'))
+        cmd.outfile.close()
+
+        self.assertListEqual(filepaths, [])
+
+        cmd = MockedBackendCommand(*(args + ['--rebuild-archive-catalog']))
+        cmd.run()
+        cmd.outfile.close()
+
+        items = [item for item in convert_cmd_output_to_json(self.fout_path)]
+        self.assertEqual(len(items), 5)
+
+        for x in range(5):
+            self.assertEqual(items[x]['data']['item'], x)
+            self.assertEqual(items[x]['data']['archive'], True)
+
     def test_run_no_archive(self):
         """Test whether the command runs when archive is not set"""
 
@@ -1647,6 +1745,42 @@ class TestBackendItemsGenerator(unittest.TestCase):
                 self.assertEqual(item['tag'], 'test')
                 self.assertEqual(item['classified_fields_filtered'], None)
 
+    def test_init_items_from_archive_parallel(self):
+        """Test whether items are fetched from the archives using several workers"""
+
+        manager = ArchiveManager(self.test_path)
+
+        category = 'mock_item'
+        args = {
+            'origin': 'http://example.com/',
+            'tag': 'test',
+            'subtype': 'mocksubtype',
+            'from-date': str_to_datetime('2015-01-01')
+        }
+
+        for _ in range(3):
+            with BackendItemsGenerator(CommandBackend, args, category, manager=manager) as big:
+                items = [item for item in big.items]
+                self.assertEqual(len(items), 5)
+
+        with BackendItemsGenerator(CommandBackend, args, category,
+                                   manager=manager, fetch_archive=True,
+                                   archived_after=str_to_datetime('1970-01-01'),
+                                   archive_workers=2) as big:
+            items = [item for item in big.items]
+            self.assertEqual(big.summary.fetched, 15)
+
+        self.assertEqual(len(items), 15)
+
+        for x in range(3):
+            for y in range(5):
+                item = items[y + (x * 5)]
+                expected_uuid = uuid('http://example.com/', str(y))
+
+                self.assertEqual(item['data']['item'], y)
+                self.assertEqual(item['data']['archive'], True)
+                self.assertEqual(item['uuid'], expected_uuid)
+
     def test_init_items_from_archive_after(self):
         """Test if only those items archived after a date are returned"""
 
@@ -2170,6 +2304,32 @@ class TestFetch(unittest.TestCase):
         archive = Archive(filepaths[0])
         self.assertEqual(archive._count_table_rows('archive'), 5)
 
+    def test_items_storing_buffered_archive(self):
+        """Test whether staged items are written when the fetch ends"""
+
+        manager = ArchiveManager(self.test_path, batch_size=100)
+
+        category = 'mock_item'
+        args = {
+            'origin': 'http://example.com/',
+            'tag': 'test',
+            'subtype': 'mocksubtype',
+            'from-date': str_to_datetime('2015-01-01')
+        }
+
+        items = fetch(CommandBackend, args, category, manager=manager)
+        items = [item for item in items]
+
+        self.assertEqual(len(items), 5)
+
+        filepaths = manager.search('http://example.com/', 'CommandBackend',
+                                   'mock_item', str_to_datetime('1970-01-01'))
+
+        self.assertEqual(len(filepaths), 1)
+
+        archive = Archive(filepaths[0])
+        self.assertEqual(archive._count_table_rows('archive'), 5)
+
     def test_filter_classified_fields(self):
         """Test whether classified fields are removed from the items"""
 
@@ -2400,6 +2560,177 @@ class TestFetchFromArchive(unittest.TestCase):
             self.assertEqual(item['tag'], 'test')
             self.assertEqual(item['classified_fields_filtered'], None)
 
+    def test_archive_parallel(self):
+        """Test whether items are fetched from the archives using several workers"""
+
+        manager = ArchiveManager(self.test_path)
+
+        category = 'mock_item'
+        args = {
+            'origin': 'http://example.com/',
+            'tag': 'test',
+            'subtype': 'mocksubtype',
+            'from-date': str_to_datetime('2015-01-01')
+        }
+
+        for _ in range(4):
+            items = fetch(CommandBackend, args, category, manager=manager)
+            items = [item for item in items]
+            self.assertEqual(len(items), 5)
+
+        expected = fetch_from_archive(CommandBackend, args, manager,
+                                      category, str_to_datetime('1970-01-01'))
+        expected = [(item['uuid'], item['data']) for item in expected]
+
+        # Items keep the same order than fetching them sequentially
+        items = fetch_from_archive(CommandBackend, args, manager,
+                                   category, str_to_datetime('1970-01-01'),
+                                   workers=2)
+        items = [(item['uuid'], item['data']) for item in items]
+
+        self.assertEqual(len(items), 20)
+        self.assertListEqual(items, expected)
+
+    def test_archive_parallel_unordered(self):
+        """Test whether items are fetched from the archives in unordered mode"""
+
+        manager = ArchiveManager(self.test_path)
+
+        category = 'mock_item'
+        args = {
+            'origin': 'http://example.com/',
+            'tag': 'test',
+            'subtype': 'mocksubtype',
+            'from-date': str_to_datetime('2015-01-01')
+        }
+
+        for _ in range(3):
+            items = fetch(CommandBackend, args, category, manager=manager)
+            items = [item for item in items]
+            self.assertEqual(len(items), 5)
+
+        items = fetch_from_archive(CommandBackend, args, manager,
+                                   category, str_to_datetime('1970-01-01'),
+                                   workers=2, ordered=False)
+        items = [item['data']['item'] for item in items]
+
+        self.assertEqual(len(items), 15)
+        self.assertListEqual(sorted(items), sorted(list(range(5)) * 3))
+
+    def test_ignore_corrupted_archive_parallel(self):
+        """Check if a corrupted archive is ignored while fetching with several workers"""
+
+        def delete_rows(db, table_name):
+            conn = sqlite3.connect(db)
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM " + table_name)
+            cursor.close()
+            conn.commit()
+
+        manager = ArchiveManager(self.test_path)
+
+        category = 'mock_item'
+        args = {
+            'origin': 'http://example.com/',
+            'tag': 'test',
+            'subtype': 'mocksubtype',
+            'from-date': str_to_datetime('2015-01-01')
+        }
+
+        for _ in range(2):
+            items = fetch(CommandBackend, args, category, manager=manager)
+            items = [item for item in items]
+            self.assertEqual(len(items), 5)
+
+        filepaths = manager.search('http://example.com/', 'CommandBackend',
+                                   category, str_to_datetime('1970-01-01'))
+        self.assertEqual(len(filepaths), 2)
+
+        delete_rows(filepaths[0], 'archive')
+
+        with self.assertLogs(logger='perceval.backend', level='WARNING') as cm:
+            items = fetch_from_archive(CommandBackend, args, manager,
+                                       category, str_to_datetime('1970-01-01'),
+                                       workers=2)
+            items = [item for item in items]
+
+        self.assertEqual(len(items), 5)
+        self.assertRegex(cm.output[0], 'Ignoring %s archive' % filepaths[0])
+
+        for x in range(5):
+            item = items[x]
+            self.assertEqual(item['data']['item'], x)
+            self.assertEqual(item['data']['archive'], True)
+
+    def test_archive_parallel_close(self):
+        """Test whether the workers stop when the items are not consumed"""
+
+        manager = ArchiveManager(self.test_path)
+
+        category = 'mock_item'
+        args = {
+            'origin': 'http://example.com/',
+            'tag': 'test',
+            'subtype': 'mocksubtype',
+            'from-date': str_to_datetime('2015-01-01')
+        }
+
+        with unittest.mock.patch.object(MockedBackend, 'ITEMS', 3000):
+            for _ in range(3):
+                items = fetch(CommandBackend, args, category, manager=manager)
+                items = [item for item in items]
+                self.assertEqual(len(items), 3000)
+
+            # The queues of the workers are full when the generator is closed
+            items = fetch_from_archive(CommandBackend, args, manager,
+                                       category, str_to_datetime('1970-01-01'),
+                                       workers=2)
+            item = next(items)
+            items.close()
+
+        self.assertEqual(item['data']['item'], 0)
+
+    def test_archive_parallel_failure(self):
+        """Test whether a failing worker stops the others while they are producing items"""
+
+        def delete_rows(db, table_name):
+            conn = sqlite3.connect(db)
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM " + table_name)
+            cursor.close()
+            conn.commit()
+
+        manager = ArchiveManager(self.test_path)
+
+        category = 'mock_item'
+        args = {
+            'origin': 'http://example.com/',
+            'tag': 'test',
+            'subtype': 'mocksubtype',
+            'from-date': str_to_datetime('2015-01-01')
+        }
+
+        with unittest.mock.patch.object(MockedBackend, 'ITEMS', 3000):
+            for _ in range(3):
+                items = fetch(CommandBackend, args, category, manager=manager)
+                items = [item for item in items]
+                self.assertEqual(len(items), 3000)
+
+            filepaths = manager.search('http://example.com/', 'CommandBackend',
+                                       category, str_to_datetime('1970-01-01'))
+            self.assertEqual(len(filepaths), 3)
+
+            # Archives without metadata cannot be opened
+            delete_rows(filepaths[1], 'metadata')
+
+            for ordered in [True, False]:
+                items = fetch_from_archive(CommandBackend, args, manager,
+                                           category, str_to_datetime('1970-01-01'),
+                                           workers=2, ordered=ordered)
+
+                with self.assertRaises(TypeError):
+                    _ = [item for item in items]
+
 
 class TestFindBackends(unittest.TestCase):
     """Unit tests for find_backends function"""
@@ -59,6 +59,51 @@ def read_file(filename, mode='r'):
     return content
 
 
+def setup_http_server_by_bug_id():
+    """Setup a mock HTTP server that returns the activity of each bug by its id"""
+
+    bodies_csv = [read_file('data/bugzilla/bugzilla_buglist.csv'),
+                  read_file('data/bugzilla/bugzilla_buglist_next.csv'),
+                  ""]
+    bodies_xml = [read_file('data/bugzilla/bugzilla_version.xml', mode='rb'),
+                  read_file('data/bugzilla/bugzilla_bugs_details.xml', mode='rb'),
+                  read_file('data/bugzilla/bugzilla_bugs_details_next.xml', mode='rb')]
+    body_activity = read_file('data/bugzilla/bugzilla_bug_activity.html', mode='rb')
+    body_activity_empty = read_file('data/bugzilla/bugzilla_bug_activity_empty.html', mode='rb')
+
+    def request_callback(request, uri, headers):
+        if uri.startswith(BUGZILLA_BUGLIST_URL):
+            body = bodies_csv.pop(0)
+        elif uri.startswith(BUGZILLA_BUG_URL):
+            body = bodies_xml.pop(0)
+        elif request.querystring['id'][0] in ('18', '888'):
+            body = body_activity
+        else:
+            body = body_activity_empty
+
+        return (200, headers, body)
+
+    httpretty.register_uri(httpretty.POST,
+                           BUGZILLA_LOGIN_URL,
+                           body="index.cgi?logout=1",
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           BUGZILLA_BUGLIST_URL,
+                           responses=[
+                               httpretty.Response(body=request_callback)
+                               for _ in range(3)
+                           ])
+    httpretty.register_uri(httpretty.GET,
+                           BUGZILLA_BUG_URL,
+                           responses=[
+                               httpretty.Response(body=request_callback)
+                               for _ in range(3)
+                           ])
+    httpretty.register_uri(httpretty.GET,
+                           BUGZILLA_BUG_ACTIVITY_URL,
+                           body=request_callback)
+
+
 class TestBugzillaBackend(unittest.TestCase):
     """Bugzilla backend tests"""
 
@@ -72,6 +117,7 @@ class TestBugzillaBackend(unittest.TestCase):
         self.assertEqual(bg.origin, BUGZILLA_SERVER_URL)
         self.assertEqual(bg.tag, 'test')
         self.assertEqual(bg.max_bugs, 5)
+        self.assertEqual(bg.max_workers, 1)
         self.assertIsNone(bg.client)
         self.assertTrue(bg.ssl_verify)
 
@@ -88,6 +134,9 @@ class TestBugzillaBackend(unittest.TestCase):
         self.assertEqual(bg.tag, BUGZILLA_SERVER_URL)
         self.assertFalse(bg.ssl_verify)
 
+        bg = Bugzilla(BUGZILLA_SERVER_URL, max_workers=4)
+        self.assertEqual(bg.max_workers, 4)
+
     def test_has_archiving(self):
         """Test if it returns True when has_archiving is called"""
 
@@ -176,18 +225,6 @@ class TestBugzillaBackend(unittest.TestCase):
                 'order': ['changeddate'],
                 'chfieldfrom': ['1970-01-01 00:00:00']
             },
-            {
-                'ctype': ['csv'],
-                'limit': ['500'],
-                'order': ['changeddate'],
-                'chfieldfrom': ['2009-07-30 11:35:33']
-            },
-            {
-                'ctype': ['csv'],
-                'limit': ['500'],
-                'order': ['changeddate'],
-                'chfieldfrom': ['2015-08-12 18:32:11']
-            },
             {
                 'ctype': ['xml'],
                 'id': ['15', '18', '17', '20', '19'],
@@ -208,6 +245,18 @@ class TestBugzillaBackend(unittest.TestCase):
             {
                 'id': ['19']
             },
+            {
+                'ctype': ['csv'],
+                'limit': ['500'],
+                'order': ['changeddate'],
+                'chfieldfrom': ['2009-07-30 11:35:33']
+            },
+            {
+                'ctype': ['csv'],
+                'limit': ['500'],
+                'order': ['changeddate'],
+                'chfieldfrom': ['2015-08-12 18:32:11']
+            },
             {
                 'ctype': ['xml'],
                 'id': ['30', '888'],
@@ -226,6 +275,29 @@ class TestBugzillaBackend(unittest.TestCase):
         for i in range(len(expected)):
             self.assertDictEqual(requests[i].querystring, expected[i])
 
+    @httpretty.activate
+    def test_fetch_concurrent(self):
+        """Test whether bugs are returned in order when the activity is fetched concurrently"""
+
+        setup_http_server_by_bug_id()
+
+        bg = Bugzilla(BUGZILLA_SERVER_URL,
+                      max_bugs=5, max_bugs_csv=500,
+                      max_workers=4)
+        bugs = [bug for bug in bg.fetch()]
+
+        self.assertEqual(len(bugs), 7)
+
+        expected = [('15', 0), ('18', 14), ('17', 0), ('20', 0),
+                    ('19', 0), ('30', 0), ('888', 14)]
+
+        for bug, (bug_id, nactivity) in zip(bugs, expected):
+            self.assertEqual(bug['data']['bug_id'][0]['__text__'], bug_id)
+            self.assertEqual(len(bug['data']['activity']), nactivity)
+
+        self.assertEqual(bugs[6]['uuid'], 'b4009442d38f4241a4e22e3e61b7cd8ef5ced35c')
+        self.assertEqual(bugs[6]['updated_on'], 1439404330.0)
+
     @httpretty.activate
     def test_search_fields(self):
         """Test whether the search_fields is properly set"""
@@ -643,6 +715,16 @@ class TestBugzillaBackendArchive(TestCaseBackendArchive):
 
         self._test_fetch_from_archive(from_date=None)
 
+    @httpretty.activate
+    def test_fetch_concurrent_from_archive(self):
+        """Test whether the bugs fetched concurrently are returned from the archive"""
+
+        setup_http_server_by_bug_id()
+
+        self.backend_write_archive.max_workers = 4
+        self.backend_read_archive.max_workers = 4
+        self._test_fetch_from_archive(from_date=None)
+
     @httpretty.activate
     def test_fetch_from_date_from_archive(self):
         """Test whether a list of bugs is returned from a given date from archive"""
@@ -812,6 +894,72 @@ class TestBugzillaBackendParsers(unittest.TestCase):
             activity = Bugzilla.parse_bug_activity(raw_html)
             _ = [event for event in activity]
 
+    def test_parse_activity_inline_tags(self):
+        """Test whether the text of links and inline tags is joined on each field"""
+
+        raw_html = """
+            <table><tr><td>Layout</td></tr></table>
+            <table>
+              <tr><th>Who</th><th>When</th><th>What</th><th>Removed</th><th>Added</th></tr>
+              <tr>
+                <td rowspan="2">jsmith&#64;example.com</td>
+                <td rowspan="2">2020-01-01 10:00:00 CET</td>
+                <td><a href="attachment.cgi?id=1">Attachment <i>#1</i></a> is obsolete</td>
+                <td>0</td><td>1</td>
+              </tr>
+              <tr>
+                <td>Blocks</td>
+                <td></td>
+                <td><span><a href="show_bug.cgi?id=354">354</a>, 349</span><br>&lt;none&gt;</td>
+              </tr>
+            </table>
+        """
+
+        activity = Bugzilla.parse_bug_activity(raw_html)
+        result = [event for event in activity]
+
+        expected = [
+            {
+                'Who': 'jsmith@example.com',
+                'When': '2020-01-01 10:00:00 CET',
+                'What': 'Attachment #1 is obsolete',
+                'Removed': '0',
+                'Added': '1'
+            },
+            {
+                'Who': 'jsmith@example.com',
+                'When': '2020-01-01 10:00:00 CET',
+                'What': 'Blocks',
+                'Removed': '',
+                'Added': '354, 349 <none>'
+            }
+        ]
+        self.assertListEqual(result, expected)
+
+    def test_parse_activity_truncated(self):
+        """Test if it raises an exception when the activity table is truncated"""
+
+        raw_html = """
+            <table>
+              <tr><th>Who</th><th>When</th><th>What</th><th>Removed</th><th>Added</th></tr>
+              <tr>
+                <td rowspan="2">jsmith&#64;example.com</td>
+                <td rowspan="2">2020-01-01 10:00:00 CET</td>
+                <td>Priority</td><td>medium</td><td>high</td>
+              </tr>
+            </table>
+        """
+
+        with self.assertRaisesRegex(ParseError, "truncated"):
+            activity = Bugzilla.parse_bug_activity(raw_html)
+            _ = [event for event in activity]
+
+        raw_html = raw_html.replace('rowspan="2"', '')
+
+        with self.assertRaisesRegex(ParseError, "Invalid number of changes"):
+            activity = Bugzilla.parse_bug_activity(raw_html)
+            _ = [event for event in activity]
+
 
 class TestBugzillaCommand(unittest.TestCase):
     """BugzillaCommand unit tests"""
@@ -841,6 +989,7 @@ class TestBugzillaCommand(unittest.TestCase):
         self.assertEqual(parsed_args.password, '1234')
         self.assertEqual(parsed_args.max_bugs, 10)
         self.assertEqual(parsed_args.max_bugs_csv, 5)
+        self.assertEqual(parsed_args.max_workers, 1)
         self.assertEqual(parsed_args.tag, 'test')
         self.assertTrue(parsed_args.no_archive)
         self.assertTrue(parsed_args.ssl_verify)
@@ -850,6 +999,7 @@ class TestBugzillaCommand(unittest.TestCase):
         args = ['--backend-user', 'jsmith@example.com',
                 '--backend-password', '1234',
                 '--max-bugs', '10', '--max-bugs-csv', '5',
+                '--max-workers', '4',
                 '--tag', 'test',
                 '--from-date', '1970-01-01',
                 '--no-ssl-verify',
@@ -860,6 +1010,7 @@ class TestBugzillaCommand(unittest.TestCase):
         self.assertEqual(parsed_args.password, '1234')
         self.assertEqual(parsed_args.max_bugs, 10)
         self.assertEqual(parsed_args.max_bugs_csv, 5)
+        self.assertEqual(parsed_args.max_workers, 4)
         self.assertEqual(parsed_args.tag, 'test')
         self.assertFalse(parsed_args.ssl_verify)
         self.assertEqual(parsed_args.url, BUGZILLA_SERVER_URL)
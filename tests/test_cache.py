@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Bitergia
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import unittest.mock
+
+from perceval.cache import DiskCache, LRUCache
+from perceval.errors import CacheError
+
+
+class TestLRUCache(unittest.TestCase):
+    """LRUCache tests"""
+
+    def test_initialization(self):
+        """Test whether attributes are initialized"""
+
+        cache = LRUCache()
+        self.assertEqual(cache.max_size, LRUCache.DEFAULT_MAX_SIZE)
+        self.assertIsNone(cache.store)
+        self.assertEqual(len(cache), 0)
+        self.assertDictEqual(cache.stats, {'hits': 0, 'misses': 0})
+
+        cache = LRUCache(max_size=None)
+        self.assertIsNone(cache.max_size)
+
+    def test_invalid_max_size(self):
+        """Test whether an exception is raised when the size is not valid"""
+
+        with self.assertRaisesRegex(CacheError, "invalid cache size"):
+            LRUCache(max_size=0)
+
+    def test_get_set(self):
+        """Test whether entries are set and retrieved counting hits and misses"""
+
+        cache = LRUCache()
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('a', default='-'), '-')
+
+        cache.set('a', 'A')
+        self.assertIn('a', cache)
+        self.assertEqual(cache.get('a'), 'A')
+        self.assertDictEqual(cache.stats, {'hits': 1, 'misses': 2})
+
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertDictEqual(cache.stats, {'hits': 0, 'misses': 0})
+
+    def test_eviction(self):
+        """Test whether the least recently used entry is evicted"""
+
+        cache = LRUCache(max_size=2)
+        cache.set('a', 'A')
+        cache.set('b', 'B')
+        cache.get('a')
+        cache.set('c', 'C')
+
+        self.assertEqual(len(cache), 2)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+
+    def test_store(self):
+        """Test whether entries are read from and written to the store"""
+
+        store = {'b': 'B'}
+        mock_store = unittest.mock.Mock()
+        mock_store.get.side_effect = store.get
+        mock_store.set.side_effect = store.__setitem__
+
+        cache = LRUCache(max_size=1, store=mock_store)
+        cache.set('a', 'A')
+        self.assertEqual(store['a'], 'A')
+
+        # Entries found in the store are kept in memory
+        self.assertEqual(cache.get('b'), 'B')
+        self.assertIn('b', cache)
+        self.assertNotIn('a', cache)
+
+        self.assertEqual(cache.get('a'), 'A')
+        self.assertIsNone(cache.get('c'))
+        self.assertDictEqual(cache.stats, {'hits': 2, 'misses': 1})
+
+
+class TestDiskCache(unittest.TestCase):
+    """DiskCache tests"""
+
+    def setUp(self):
+        self.test_path = tempfile.mkdtemp(prefix='perceval_')
+        self.cache_path = os.path.join(self.test_path, 'cache.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_path)
+
+    def test_get_set(self):
+        """Test whether entries are stored and shared between instances"""
+
+        cache = DiskCache(self.cache_path)
+        self.assertEqual(cache.namespace, 'default')
+        self.assertEqual(cache.ttl, DiskCache.DEFAULT_TTL)
+        self.assertIsNone(cache.get('a'))
+
+        cache.set('a', 'A')
+        cache.set('a', 'AA')
+        self.assertEqual(cache.get('a'), 'AA')
+
+        other = DiskCache(self.cache_path)
+        self.assertEqual(other.get('a'), 'AA')
+
+        cache.close()
+        other.close()
+
+    def test_set_many(self):
+        """Test whether several entries are stored at once"""
+
+        cache = DiskCache(self.cache_path)
+        cache.set('a', 'A')
+
+        nentries = cache.set_many((key, key.upper() * 2) for key in ['a', 'b', 'c'])
+        self.assertEqual(nentries, 3)
+
+        self.assertEqual(cache.get('a'), 'AA')
+        self.assertEqual(cache.get('b'), 'BB')
+        self.assertEqual(cache.get('c'), 'CC')
+
+        self.assertEqual(cache.set_many([]), 0)
+
+        cache.close()
+
+    def test_namespaces(self):
+        """Test whether entries of different namespaces are isolated"""
+
+        users = DiskCache(self.cache_path, namespace='users')
+        orgs = DiskCache(self.cache_path, namespace='orgs')
+
+        users.set('a', 'user')
+        orgs.set('a', 'org')
+
+        self.assertEqual(users.get('a'), 'user')
+        self.assertEqual(orgs.get('a'), 'org')
+
+    def test_expiration(self):
+        """Test whether expired entries are not returned"""
+
+        cache = DiskCache(self.cache_path, ttl=60)
+        cache.set('a', 'A')
+        cache.set('b', 'B')
+
+        with unittest.mock.patch('perceval.cache.time.time', return_value=time.time() + 120):
+            self.assertEqual(cache.get('a', default='-'), '-')
+            self.assertEqual(cache.purge(), 1)
+
+        self.assertIsNone(cache.get('b'))
+
+        cache = DiskCache(self.cache_path, ttl=None)
+        cache.set('a', 'A')
+
+        with unittest.mock.patch('perceval.cache.time.time', return_value=time.time() + 120):
+            self.assertEqual(cache.get('a'), 'A')
+            self.assertEqual(cache.purge(), 0)
+
+    def test_invalid_cache(self):
+        """Test whether an exception is raised when the database is not valid"""
+
+        with open(self.cache_path, 'w') as fd:
+            fd.write("not a database")
+
+        with self.assertRaisesRegex(CacheError, "cannot be opened"):
+            DiskCache(self.cache_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -23,6 +23,7 @@
 #     Miguel Ángel Fernández <mafesan@bitergia.com>
 #
 
+import pickle
 import unittest
 
 import perceval.errors as errors
@@ -64,6 +65,19 @@ class TestBaseError(unittest.TestCase):
         kwargs = {'code': 1, 'error': 'Fatal error'}
         self.assertRaises(KeyError, MockErrorArgs, **kwargs)
 
+    def test_pickle(self):
+        """Check whether errors can be sent between processes"""
+
+        e = pickle.loads(pickle.dumps(MockErrorArgs(code=1, msg='Fatal error')))
+
+        self.assertIsInstance(e, MockErrorArgs)
+        self.assertEqual("Mock error with args. Error: 1 Fatal error",
+                         str(e))
+
+        e = pickle.loads(pickle.dumps(errors.RateLimitError(cause="client rate exhausted",
+                                                            seconds_to_reset=10)))
+        self.assertEqual(e.seconds_to_reset, 10)
+
 
 class TestArchiveError(unittest.TestCase):
 
@@ -137,5 +151,14 @@ class TestBackendCommandArgumentParserError(unittest.TestCase):
         self.assertEqual('mock error on backend command argument parser', str(e))
 
 
+class TestCacheError(unittest.TestCase):
+
+    def test_message(self):
+        """Make sure that prints the correct error"""
+
+        e = errors.CacheError(cause='cache entry cannot be stored')
+        self.assertEqual('cache entry cannot be stored', str(e))
+
+
 if __name__ == "__main__":
     unittest.main()
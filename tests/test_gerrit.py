@@ -24,7 +24,9 @@
 #
 
 import datetime
+import io
 import os
+import re
 import shutil
 import unittest.mock
 
@@ -90,6 +92,47 @@ def mock_check_ouput(*args, **kwargs):
     return data
 
 
+CONTROL_OPTS_REGEX = re.compile(r"-o ControlMaster=auto -o ControlPath=\S+ -o ControlPersist=\d+ ")
+
+
+def mock_check_output_multiplexing(*args, **kwargs):
+    """Mock subprocess.check_output for commands sharing the SSH connection"""
+
+    cmd = CONTROL_OPTS_REGEX.sub('', args[0])
+
+    return read_file(RESPONSES[cmd], 'rb')
+
+
+class MockPopen:
+    """Mock subprocess.Popen returning the output of a command line by line"""
+
+    commands = []
+    returncodes = []
+
+    def __init__(self, cmd, *args, **kwargs):
+        MockPopen.commands.append(cmd)
+
+        cmd = CONTROL_OPTS_REGEX.sub('', cmd)
+        self.stdout = io.BytesIO(read_file(RESPONSES[cmd], 'rb'))
+        self.returncode = None
+        self.exit_code = MockPopen.returncodes.pop(0) if MockPopen.returncodes else 0
+
+        # A failed command only outputs its first line
+        if self.exit_code:
+            self.stdout = io.BytesIO(self.stdout.readline())
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self):
+        if self.returncode is None:
+            self.returncode = self.exit_code
+        return self.returncode
+
+    def kill(self):
+        self.returncode = -9
+
+
 def mock_check_ouput_version_unknown(*args, **kwargs):
     """Mock subprocess.check_output"""
 
@@ -188,6 +231,40 @@ class TestGerritBackend(unittest.TestCase):
         self.assertEqual(review['data']['owner']['username'], "jayprakash12345")
         self.assertEqual(len(review['data']['patchSets']), 3)
 
+    @unittest.mock.patch('subprocess.call')
+    @unittest.mock.patch('subprocess.Popen', MockPopen)
+    @unittest.mock.patch('subprocess.check_output', mock_check_output_multiplexing)
+    def test_fetch_ssh_multiplexing(self, mock_call):
+        """Test whether reviews are fetched sharing the SSH connection"""
+
+        MockPopen.commands = []
+
+        gerrit = Gerrit(GERRIT_REPO, user=GERRIT_USER, port=29418, max_reviews=2,
+                        ssh_multiplexing=True)
+        self.assertTrue(gerrit.ssh_multiplexing)
+
+        reviews = [review for review in gerrit.fetch(from_date=None)]
+
+        self.assertEqual(len(reviews), 5)
+        self.assertEqual(reviews[0]['data']['owner']['username'], 'gehel')
+        self.assertEqual(reviews[1]['data']['owner']['username'], "lucaswerkmeister-wmde")
+        self.assertEqual(reviews[2]['data']['owner']['username'], "jayprakash12345")
+        self.assertEqual(reviews[3]['data']['owner']['username'], "elukey")
+        self.assertEqual(reviews[4]['data']['owner']['username'], "jayprakash12345")
+
+        # All the queries use the same connection
+        self.assertEqual(len(MockPopen.commands), 3)
+
+        control_paths = {re.search(r"ControlPath=(\S+)", cmd).group(1) for cmd in MockPopen.commands}
+        self.assertEqual(len(control_paths), 1)
+
+        # The connection is closed at the end
+        control_path = control_paths.pop()
+        exit_cmd = mock_call.call_args[0][0]
+        self.assertEqual(exit_cmd,
+                         "ssh -o ControlPath=%s -O exit  -p 29418 user@example.org" % control_path)
+        self.assertFalse(os.path.exists(os.path.dirname(control_path)))
+
     @unittest.mock.patch('subprocess.check_output', mock_check_ouput)
     def test_serch_fields(self):
         """Test whether the search_fields is properly set"""
@@ -290,6 +367,19 @@ class TestGerritBackend(unittest.TestCase):
         self.assertEqual(review['owner']['username'], "lucaswerkmeister-wmde")
         self.assertEqual(len(review['patchSets']), 1)
 
+    def test_parse_review(self):
+        """Test whether reviews are parsed line by line"""
+
+        raw_lines = read_file('data/gerrit/gerrit_reviews_page_1').split('\n')
+
+        review = Gerrit.parse_review(raw_lines[0])
+        self.assertEqual(review['owner']['username'], 'gehel')
+        self.assertEqual(len(review['patchSets']), 2)
+
+        # Stats and empty lines are not reviews
+        self.assertIsNone(Gerrit.parse_review(raw_lines[2]))
+        self.assertIsNone(Gerrit.parse_review(''))
+
 
 class TestGerritBackendArchive(TestCaseBackendArchive):
     """Gerrit backend tests using an archive"""
@@ -333,6 +423,16 @@ class TestGerritBackendArchive(TestCaseBackendArchive):
         from_date = datetime.datetime(2100, 3, 5)
         self._test_fetch_from_archive(from_date=from_date)
 
+    @unittest.mock.patch('subprocess.call')
+    @unittest.mock.patch('subprocess.Popen', MockPopen)
+    @unittest.mock.patch('subprocess.check_output', mock_check_output_multiplexing)
+    def test_fetch_ssh_multiplexing_from_archive(self, mock_call):
+        """Test whether the reviews read while they are received are returned from the archive"""
+
+        self.backend_write_archive.ssh_multiplexing = True
+        from_date = datetime.datetime(2018, 3, 5)
+        self._test_fetch_from_archive(from_date=from_date)
+
 
 class TestGerritClient(unittest.TestCase):
     """ Gerrit API client tests """
@@ -391,6 +491,59 @@ class TestGerritClient(unittest.TestCase):
 
         self.assertEqual(result_raw, expected_raw)
 
+    @unittest.mock.patch('subprocess.call')
+    @unittest.mock.patch('subprocess.Popen', MockPopen)
+    @unittest.mock.patch('subprocess.check_output', mock_check_output_multiplexing)
+    def test_reviews_lines(self, mock_call):
+        """Test whether the output of a query is returned line by line"""
+
+        MockPopen.commands = []
+        MockPopen.returncodes = []
+
+        expected = read_file('data/gerrit/gerrit_reviews_page_1').split('\n')[:-1]
+
+        client = GerritClient(GERRIT_REPO, GERRIT_USER, max_reviews=2)
+        lines = [line.rstrip('\n') for line in client.reviews_lines(0)]
+        self.assertListEqual(lines, expected)
+        self.assertListEqual(MockPopen.commands, [])
+
+        client = GerritClient(GERRIT_REPO, GERRIT_USER, max_reviews=2,
+                              ssh_multiplexing=True)
+        self.assertTrue(client.ssh_multiplexing)
+
+        lines = [line.rstrip('\n') for line in client.reviews_lines(0)]
+        self.assertListEqual(lines, expected)
+        self.assertEqual(len(MockPopen.commands), 1)
+        self.assertRegex(MockPopen.commands[0], "^ssh -o ControlMaster=auto -o ControlPath=")
+
+        client.close()
+
+    @unittest.mock.patch('subprocess.call')
+    @unittest.mock.patch('subprocess.Popen', MockPopen)
+    @unittest.mock.patch('subprocess.check_output', mock_check_output_multiplexing)
+    def test_reviews_lines_retry(self, mock_call):
+        """Test whether lines are not repeated when a command is run again"""
+
+        MockPopen.commands = []
+        MockPopen.returncodes = [255]
+
+        expected = read_file('data/gerrit/gerrit_reviews_page_1').split('\n')[:-1]
+
+        client = GerritClient(GERRIT_REPO, GERRIT_USER, max_reviews=2,
+                              ssh_multiplexing=True)
+        client.RETRY_WAIT = 0
+
+        lines = [line.rstrip('\n') for line in client.reviews_lines(0)]
+        self.assertListEqual(lines, expected)
+        self.assertEqual(len(MockPopen.commands), 2)
+
+        MockPopen.returncodes = [255, 255, 255]
+
+        with self.assertRaises(RuntimeError):
+            _ = [line for line in client.reviews_lines(0)]
+
+        client.close()
+
     @unittest.mock.patch('subprocess.check_output', mock_check_ouput_empty_review)
     def test_empty_review(self):
         """Test whether an excepti on is thrown when no data is returned"""
@@ -468,6 +621,7 @@ class TestGerritCommand(unittest.TestCase):
         self.assertEqual(parsed_args.from_date, DEFAULT_DATETIME)
         self.assertEqual(parsed_args.no_archive, True)
         self.assertEqual(parsed_args.port, 1000)
+        self.assertFalse(parsed_args.ssh_multiplexing)
         self.assertListEqual(parsed_args.blacklist_ids, [''])
 
         args = [GERRIT_REPO,
@@ -476,6 +630,7 @@ class TestGerritCommand(unittest.TestCase):
                 '--blacklist-ids', 'willy', 'wolly', 'wally',
                 '--disable-host-key-check',
                 '--ssh-port', '1000',
+                '--ssh-multiplexing',
                 '--tag', 'test', '--no-archive']
 
         parsed_args = parser.parse(*args)
@@ -486,6 +641,7 @@ class TestGerritCommand(unittest.TestCase):
         self.assertEqual(parsed_args.from_date, DEFAULT_DATETIME)
         self.assertEqual(parsed_args.no_archive, True)
         self.assertEqual(parsed_args.port, 1000)
+        self.assertTrue(parsed_args.ssh_multiplexing)
         self.assertListEqual(parsed_args.blacklist_ids, ['willy', 'wolly', 'wally'])
 
 
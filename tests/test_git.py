@@ -41,7 +41,7 @@ import pkg_resources
 pkg_resources.declare_namespace('perceval.backends')
 
 from perceval.backend import BackendCommandArgumentParser, uuid
-from perceval.errors import RepositoryError
+from perceval.errors import ParseError, RepositoryError
 from perceval.utils import DEFAULT_DATETIME, DEFAULT_LAST_DATETIME
 from perceval.backends.core.git import (EmptyRepositoryError,
                                         Git,
@@ -109,6 +109,7 @@ class TestGitBackend(TestCaseGit):
         self.assertEqual(git.gitpath, self.git_path)
         self.assertEqual(git.origin, 'http://example.com')
         self.assertEqual(git.tag, 'test')
+        self.assertEqual(git.max_workers, 1)
 
         # When tag is empty or None it will be set to
         # the value in uri
@@ -179,6 +180,38 @@ class TestGitBackend(TestCaseGit):
 
         shutil.rmtree(new_path)
 
+    @unittest.mock.patch('perceval.backends.core.git.SHARD_SIZE', 2)
+    def test_fetch_sharded(self):
+        """Test whether commits fetched in shards are the same as fetched by a single process"""
+
+        new_path = os.path.join(self.tmp_path, 'shardgit')
+
+        git = Git(self.git_path, new_path)
+        expected = [commit['data'] for commit in git.fetch()]
+
+        git = Git(self.git_path, new_path, max_workers=2)
+        commits = [commit['data'] for commit in git.fetch()]
+
+        self.assertEqual(len(commits), 9)
+        self.assertListEqual(commits, expected)
+
+        # Fetch from a branch and a range of dates
+        from_date = datetime.datetime(2012, 8, 14, 17, 30, 0)
+        to_date = datetime.datetime(2014, 2, 12, 6, 9, 0)
+
+        git = Git(self.git_path, new_path)
+        expected = [commit['data'] for commit in git.fetch(from_date=from_date, to_date=to_date,
+                                                           branches=['lzp'])]
+
+        git = Git(self.git_path, new_path, max_workers=2)
+        commits = [commit['data'] for commit in git.fetch(from_date=from_date, to_date=to_date,
+                                                          branches=['lzp'])]
+
+        self.assertEqual(len(commits), 6)
+        self.assertListEqual(commits, expected)
+
+        shutil.rmtree(new_path)
+
     def test_search_fields(self):
         """Test whether the search_fields is properly set"""
 
@@ -846,16 +879,19 @@ class TestGitCommand(TestCaseGit):
         self.assertEqual(parsed_args.to_date, DEFAULT_LAST_DATETIME)
         self.assertEqual(parsed_args.branches, None)
         self.assertTrue(parsed_args.no_update)
+        self.assertEqual(parsed_args.max_workers, 1)
 
         args = ['http://example.com/',
                 '--git-path', '/tmp/gitpath',
-                '--branches', 'master', 'testing']
+                '--branches', 'master', 'testing',
+                '--max-workers', '4']
 
         parsed_args = parser.parse(*args)
         self.assertEqual(parsed_args.git_path, '/tmp/gitpath')
         self.assertEqual(parsed_args.uri, 'http://example.com/')
         self.assertEqual(parsed_args.branches, ['master', 'testing'])
         self.assertFalse(parsed_args.no_update)
+        self.assertEqual(parsed_args.max_workers, 4)
 
     def test_mutual_exclusive_update(self):
         """Test whether an exception is thrown when no-update and latest-items flags are set"""
@@ -1088,6 +1124,60 @@ class TestGitParser(TestCaseGit):
 
         self.assertListEqual(commits, [])
 
+    def test_parser_fast_mode(self):
+        """Test if the fast mode generates the same commits"""
+
+        logs = ['git_log.txt', 'git_log_empty.txt', 'git_log_incompleted.txt',
+                'git_log_merge.txt', 'git_log_trailers.txt']
+
+        for log in logs:
+            filepath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data/git/", log)
+
+            with open(filepath, 'r') as f:
+                parser = GitParser(f)
+                expected = [commit for commit in parser.parse()]
+
+            with open(filepath, 'r') as f:
+                parser = GitParser(f, fast=True)
+                commits = [commit for commit in parser.parse()]
+
+            self.assertEqual(len(commits), len(expected))
+            for commit, expected_commit in zip(commits, expected):
+                self.assertListEqual(list(commit.items()), list(expected_commit.items()))
+
+    def test_parser_fast_mode_invalid_log(self):
+        """Test if the fast mode raises the same errors"""
+
+        log = [
+            "commit 456a68ee1407a77f3e804a30dff245bb6c6b872f",
+            "Author:     John Smith <jsmith@example.com>",
+            "",
+            "    Message",
+            "",
+            "0\t0\taaa/otherthing",
+            "invalid commit line"
+        ]
+
+        parser = GitParser(iter(log), fast=True)
+        commits = parser.parse()
+
+        commit = next(commits)
+        self.assertEqual(commit['commit'], '456a68ee1407a77f3e804a30dff245bb6c6b872f')
+        self.assertEqual(commit['message'], 'Message')
+        self.assertListEqual(commit['files'], [{'file': 'aaa/otherthing', 'added': '0', 'removed': '0'}])
+
+        with self.assertRaisesRegex(ParseError, "commit expected on line 7"):
+            next(commits)
+
+        log = [
+            "commit 456a68ee1407a77f3e804a30dff245bb6c6b872f",
+            "Invalid header"
+        ]
+
+        parser = GitParser(iter(log), fast=True)
+        with self.assertRaisesRegex(ParseError, "invalid header format on line 2"):
+            _ = [commit for commit in parser.parse()]
+
     def test_commit_pattern(self):
         """Test commit pattern"""
 
@@ -1641,6 +1731,32 @@ class TestGitRepository(TestCaseGit):
 
         shutil.rmtree(new_path)
 
+    def test_rev_list_reverse_dates(self):
+        """Test whether the rev-list command returns the commits within some dates in reverse order"""
+
+        new_path = os.path.join(self.tmp_path, 'newgit')
+
+        repo = GitRepository.clone(self.git_path, new_path)
+
+        from_date = datetime.datetime(2012, 8, 14, 17, 30, 0,
+                                      tzinfo=dateutil.tz.tzutc())
+        to_date = datetime.datetime(2014, 2, 12, 6, 9, 0,
+                                    tzinfo=dateutil.tz.tzutc())
+        gitrev = repo.rev_list(branches=['lzp'], from_date=from_date, to_date=to_date,
+                               reverse=True)
+        gitrev = [line for line in gitrev]
+
+        expected = ['bc57a9209f096a130dcc5ba7089a8663f758a703',
+                    '87783129c3f00d2c81a3a8e585eb86a47e39891a',
+                    '7debcf8a2f57f86663809c58b5c07a398be7674c',
+                    'c0d66f92a95e31c77be08dc9d0f11a16715d1885',
+                    'c6ba8f7a1058db3e6b4bc6f1090e932b107605fb',
+                    '589bb080f059834829a2a5955bebfd7c2baa110a']
+
+        self.assertListEqual(gitrev, expected)
+
+        shutil.rmtree(new_path)
+
     def test_rev_list_no_branch(self):
         """Test whether the rev-list command returns an empty list when no branch is given"""
 
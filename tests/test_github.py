@@ -34,6 +34,9 @@
 import datetime
 import dateutil
 import os
+import shutil
+import sqlite3
+import tempfile
 import time
 import unittest
 import unittest.mock
@@ -45,6 +48,7 @@ import requests
 pkg_resources.declare_namespace('perceval.backends')
 
 from grimoirelab_toolkit.datetime import datetime_utcnow
+from perceval.archive import Archive
 from perceval.backend import BackendCommandArgumentParser
 from perceval.client import RateLimitHandler
 from perceval.errors import RateLimitError
@@ -52,10 +56,13 @@ from perceval.utils import (DEFAULT_DATETIME, DEFAULT_LAST_DATETIME)
 from perceval.backends.core.github import (logger, GitHub,
                                            GitHubCommand,
                                            GitHubClient,
+                                           GitHubTokenPool,
                                            CATEGORY_ISSUE,
                                            CATEGORY_PULL_REQUEST,
                                            CATEGORY_REPO,
-                                           MAX_CATEGORY_ITEMS_PER_PAGE)
+                                           MAX_CATEGORY_ITEMS_PER_PAGE,
+                                           TOKEN_RESET_WAIT,
+                                           USER_LOCK_STRIPES)
 from base import TestCaseBackendArchive
 
 
@@ -105,6 +112,18 @@ GITHUB_ENTREPRISE_PULL_REQUEST_1_COMMENTS_2_REACTIONS = GITHUB_ENTERPRISE_PULL_R
 GITHUB_ENTREPRISE_REQUEST_REQUESTED_REVIEWERS_URL = GITHUB_ENTREPRISE_PULL_REQUEST_1_URL + "/requested_reviewers"
 
 
+def release_tokens(pool, rate_limits):
+    """Set the rate limits of the first tokens of a pool.
+
+    The tokens are acquired before their points are known,
+    so they are handed out following their order.
+    """
+    tokens = [pool.acquire() for _ in rate_limits]
+
+    for token, (remaining, reset_ts) in zip(tokens, rate_limits):
+        pool.release(token, remaining=remaining, reset_ts=reset_ts)
+
+
 def read_file(filename, mode='r'):
     with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), filename), mode) as f:
         content = f.read()
@@ -135,6 +154,10 @@ class TestGitHubBackend(unittest.TestCase):
         self.assertEqual(github.origin, 'https://github.com/zhquan_example/repo')
         self.assertEqual(github.tag, 'test')
         self.assertEqual(github.max_items, MAX_CATEGORY_ITEMS_PER_PAGE)
+        self.assertEqual(github.max_workers, 1)
+        self.assertEqual(github.user_cache_size, 10000)
+        self.assertIsNone(github.user_cache_path)
+        self.assertEqual(github.user_cache_ttl, 86400)
         self.assertFalse(github.exclude_user_data)
         self.assertEqual(github.categories, [CATEGORY_ISSUE, CATEGORY_PULL_REQUEST, CATEGORY_REPO])
         self.assertTrue(github.ssl_verify)
@@ -268,6 +291,15 @@ class TestGitHubBackend(unittest.TestCase):
                          issue['data']['comments_data'][0]['reactions']['total_count'])
         self.assertEqual(issue['data']['comments_data'][0]['reactions_data'][0]['user_data']['login'], 'zhquan_example')
 
+        expected = {
+            'users': {'hits': 5, 'misses': 1},
+            'users_orgs': {'hits': 5, 'misses': 1}
+        }
+        self.assertDictEqual(github.summary.extras['user_cache'], expected)
+
+        expected = [{'requests': 5, 'remaining': 20, 'reset': 15}]
+        self.assertListEqual(github.summary.extras['tokens'], expected)
+
     @httpretty.activate
     def test_fetch_issues_no_user_data(self):
         """Test whether a list of issues is returned without user data"""
@@ -2689,7 +2721,6 @@ class TestGitHubBackend(unittest.TestCase):
                                })
 
         # Check that 404 exception getting user orgs is managed
-        GitHubClient._users_orgs.clear()  # clean cache to get orgs using the API
         httpretty.register_uri(httpretty.GET,
                                GITHUB_ORGS_URL,
                                body=orgs, status=404,
@@ -2701,7 +2732,6 @@ class TestGitHubBackend(unittest.TestCase):
         _ = [issues for issues in github.fetch()]
 
         # Check that a no 402 exception getting user orgs is raised
-        GitHubClient._users_orgs.clear()
         httpretty.register_uri(httpretty.GET,
                                GITHUB_ORGS_URL,
                                body=orgs, status=402,
@@ -3039,6 +3069,16 @@ class TestGitHubBackendArchive(TestCaseBackendArchive):
         self._test_fetch_from_archive()
 
 
+class TestGitHubBackendArchiveConcurrent(TestGitHubBackendArchive):
+    """GitHub backend tests using an archive written by several threads"""
+
+    def setUp(self):
+        super().setUp()
+        self.backend_write_archive = GitHub("zhquan_example", "repo", ["aaa"], archive=self.archive,
+                                            max_workers=4)
+        self.backend_read_archive = GitHub("zhquan_example", "repo", ["aaa"], archive=self.archive)
+
+
 class TestGitHubClient(unittest.TestCase):
     """GitHub API client tests"""
 
@@ -3072,7 +3112,6 @@ class TestGitHubClient(unittest.TestCase):
         self.assertEqual(client.repository, 'repo')
         self.assertEqual(client.tokens, ['aaa'])
         self.assertEqual(client.n_tokens, 1)
-        self.assertEqual(client.current_token, 'aaa')
         self.assertEqual(client.base_url, GITHUB_API_URL)
         self.assertFalse(client.sleep_for_rate)
         self.assertEqual(client.min_rate_to_sleep, 3)
@@ -3082,6 +3121,10 @@ class TestGitHubClient(unittest.TestCase):
         self.assertIsNone(client.archive)
         self.assertFalse(client.from_archive)
         self.assertFalse(client.ssl_verify)
+        self.assertEqual(client.max_workers, 1)
+
+        client = GitHubClient('zhquan_example', 'repo', ['aaa'], max_workers=4)
+        self.assertEqual(client.max_workers, 4)
 
         client = GitHubClient('zhquan_example', 'repo', ['aaa'], min_rate_to_sleep=RateLimitHandler.MAX_RATE_LIMIT + 1)
         self.assertEqual(client.min_rate_to_sleep, RateLimitHandler.MAX_RATE_LIMIT)
@@ -3092,7 +3135,6 @@ class TestGitHubClient(unittest.TestCase):
         client = GitHubClient('zhquan_example', 'repo', ['aaa'])
         self.assertEqual(client.tokens, ['aaa'])
         self.assertEqual(client.n_tokens, 1)
-        self.assertEqual(client.current_token, 'aaa')
 
         client = GitHubClient('zhquan_example', 'repo', ['aaa', 'bbb'])
         self.assertEqual(client.tokens, ['aaa', 'bbb'])
@@ -3100,7 +3142,6 @@ class TestGitHubClient(unittest.TestCase):
 
         client = GitHubClient('zhquan_example', 'repo', [])
         self.assertEqual(client.tokens, [])
-        self.assertEqual(client.current_token, None)
         self.assertEqual(client.n_tokens, 0)
 
     @httpretty.activate
@@ -3511,6 +3552,212 @@ class TestGitHubClient(unittest.TestCase):
         self.assertDictEqual(httpretty.last_request().querystring, expected)
         self.assertEqual(httpretty.last_request().headers["Authorization"], "token aaa")
 
+    @httpretty.activate
+    def test_get_page_issues_prefetch(self):
+        """Test whether pages are requested in advance using the last page link"""
+
+        rate_limit = read_file('data/github/rate_limit')
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_RATE_LIMIT,
+                               body=rate_limit,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+
+        def request_callback(request, uri, headers):
+            page = int(request.querystring.get('page', ['1'])[0])
+
+            if page < 5:
+                headers['Link'] = '<' + GITHUB_ISSUES_URL + '/?&page=' + str(page + 1) + '>; rel="next", <' + \
+                                  GITHUB_ISSUES_URL + '/?&page=5>; rel="last"'
+
+            return 200, headers, '[{"page": %s}]' % page
+
+        for url in [GITHUB_ISSUES_URL, GITHUB_ISSUES_URL + '/']:
+            httpretty.register_uri(httpretty.GET,
+                                   url,
+                                   responses=[httpretty.Response(body=request_callback,
+                                                                 forcing_headers={
+                                                                     'X-RateLimit-Remaining': '20',
+                                                                     'X-RateLimit-Reset': '15'
+                                                                 })])
+
+        client = GitHubClient("zhquan_example", "repo", ["aaa"], max_workers=3)
+
+        issues = [issues for issues in client.issues()]
+
+        self.assertListEqual(issues, ['[{"page": %s}]' % page for page in range(1, 6)])
+
+        pages = [request.querystring.get('page', ['1'])[0]
+                 for request in httpretty.latest_requests()
+                 if request.path.startswith('/repos/zhquan_example/repo/issues')]
+        self.assertListEqual(sorted(pages), ['1', '2', '3', '4', '5'])
+
+        # Prefetched pages after the last one linked are discarded
+        client = GitHubClient("zhquan_example", "repo", ["aaa"], max_workers=3)
+
+        issues = client.issues()
+        self.assertEqual(next(issues), '[{"page": 1}]')
+        self.assertEqual(next(issues), '[{"page": 2}]')
+        issues.close()
+
+    @httpretty.activate
+    def test_get_page_issues_prefetch_archive(self):
+        """Test whether only the prefetched pages returned are archived"""
+
+        rate_limit = read_file('data/github/rate_limit')
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_RATE_LIMIT,
+                               body=rate_limit,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+
+        def request_callback(request, uri, headers):
+            page = int(request.querystring.get('page', ['1'])[0])
+
+            if page < 5:
+                headers['Link'] = '<' + GITHUB_ISSUES_URL + '/?&page=' + str(page + 1) + '>; rel="next", <' + \
+                                  GITHUB_ISSUES_URL + '/?&page=5>; rel="last"'
+
+            return 200, headers, '[{"page": %s}]' % page
+
+        for url in [GITHUB_ISSUES_URL, GITHUB_ISSUES_URL + '/']:
+            httpretty.register_uri(httpretty.GET,
+                                   url,
+                                   responses=[httpretty.Response(body=request_callback,
+                                                                 forcing_headers={
+                                                                     'X-RateLimit-Remaining': '20',
+                                                                     'X-RateLimit-Reset': '15'
+                                                                 })])
+
+        tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        archive_path = os.path.join(tmp_path, 'archive')
+
+        try:
+            archive = Archive.create(archive_path)
+            archive.init_metadata('https://github.com/zhquan_example/repo', 'GitHub', '0.1.0',
+                                  'issue', {})
+            client = GitHubClient("zhquan_example", "repo", ["aaa"], max_workers=3,
+                                  archive=archive)
+
+            issues = client.issues()
+            self.assertEqual(next(issues), '[{"page": 1}]')
+            self.assertEqual(next(issues), '[{"page": 2}]')
+            issues.close()
+
+            with sqlite3.connect(archive_path) as db:
+                uris = [row[0] for row in db.execute("SELECT uri FROM archive")]
+            pages = sorted(uri for uri in uris if uri.startswith(GITHUB_ISSUES_URL))
+            self.assertListEqual(pages, [GITHUB_ISSUES_URL, GITHUB_ISSUES_URL + '/?&page=2'])
+
+            # The archived pages are read using the prefetcher too
+            client = GitHubClient("zhquan_example", "repo", ["aaa"], max_workers=3,
+                                  archive=Archive(archive_path), from_archive=True)
+
+            issues = client.issues()
+            self.assertEqual(next(issues), '[{"page": 1}]')
+            self.assertEqual(next(issues), '[{"page": 2}]')
+            issues.close()
+        finally:
+            shutil.rmtree(tmp_path)
+
+    @httpretty.activate
+    def test_get_page_issues_prefetch_not_linked(self):
+        """Test whether pages not linked by the previous one are not returned"""
+
+        issue_1 = read_file('data/github/github_issue_1')
+        issue_2 = read_file('data/github/github_issue_2')
+        rate_limit = read_file('data/github/rate_limit')
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_RATE_LIMIT,
+                               body=rate_limit,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_ISSUES_URL,
+                               body=issue_1,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15',
+                                   'Link': '<' + GITHUB_ISSUES_URL + '/?&page=2>; rel="next", <' +
+                                           GITHUB_ISSUES_URL + '/?&page=3>; rel="last"'
+                               })
+
+        def request_callback(request, uri, headers):
+            # The second page does not link to the last one
+            if request.querystring['page'][0] == '2':
+                return 200, headers, issue_2
+            return 200, headers, '[]'
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_ISSUES_URL + '/',
+                               responses=[httpretty.Response(body=request_callback,
+                                                             forcing_headers={
+                                                                 'X-RateLimit-Remaining': '20',
+                                                                 'X-RateLimit-Reset': '15'
+                                                             })])
+
+        client = GitHubClient("zhquan_example", "repo", ["aaa"], max_workers=2)
+
+        issues = [issues for issues in client.issues()]
+
+        self.assertEqual(len(issues), 2)
+        self.assertEqual(issues[0], issue_1)
+        self.assertEqual(issues[1], issue_2)
+
+        pages = [request.querystring['page'][0]
+                 for request in httpretty.latest_requests()
+                 if 'page' in request.querystring]
+        self.assertListEqual(sorted(pages), ['2', '3'])
+
+    @httpretty.activate
+    def test_max_prefetched_pages(self):
+        """Test whether the pages requested in advance are limited by the rate limit"""
+
+        rate_limit = read_file('data/github/rate_limit')
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_RATE_LIMIT,
+                               body=rate_limit,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+
+        client = GitHubClient("zhquan_example", "repo", ["aaa", "bbb"], min_rate_to_sleep=10, max_workers=4)
+        self.assertEqual(client._max_prefetched_pages(), 4)
+
+        release_tokens(client._token_pool, [(11, None), (11, None)])
+        self.assertEqual(client._max_prefetched_pages(), 2)
+
+        client = GitHubClient("zhquan_example", "repo", ["aaa", "bbb"], min_rate_to_sleep=10, max_workers=4)
+        release_tokens(client._token_pool, [(11, None), (5, None)])
+        self.assertEqual(client._max_prefetched_pages(), 1)
+
+        client = GitHubClient("zhquan_example", "repo", ["aaa", "bbb"], min_rate_to_sleep=10, max_workers=4)
+        release_tokens(client._token_pool, [(11, None), (100, None)])
+        self.assertEqual(client._max_prefetched_pages(), 4)
+
+        # Without tokens, the rate limit of the last response is used
+        client = GitHubClient("zhquan_example", "repo", [], min_rate_to_sleep=10, max_workers=4)
+        self.assertEqual(client._max_prefetched_pages(), 4)
+
+        client.rate_limit = 12
+        self.assertEqual(client._max_prefetched_pages(), 2)
+
     @httpretty.activate
     def test_pull_requested_reviewers(self):
         """Test pull requested reviewers API call"""
@@ -3791,6 +4038,96 @@ class TestGitHubClient(unittest.TestCase):
 
         self.assertEqual(response, orgs)
 
+    @httpretty.activate
+    def test_get_user_cached(self):
+        """Test whether users are requested only once"""
+
+        login = read_file('data/github/github_login')
+        rate_limit = read_file('data/github/rate_limit')
+
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_RATE_LIMIT,
+                               body=rate_limit,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_USER_URL,
+                               body=login, status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+
+        tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        cache_path = os.path.join(tmp_path, 'users.db')
+
+        try:
+            client = GitHubClient("zhquan_example", "repo", ["aaa"], None,
+                                  user_cache_path=cache_path)
+            self.assertEqual(client.user("zhquan_example"), login)
+            self.assertEqual(client.user("zhquan_example"), login)
+            self.assertEqual(len(httpretty.latest_requests()), 1)
+            self.assertDictEqual(client.user_cache_stats['users'], {'hits': 1, 'misses': 1})
+
+            # Users are read from the database on other executions
+            client = GitHubClient("zhquan_example", "repo", ["aaa"], None,
+                                  user_cache_path=cache_path)
+            self.assertEqual(client.user("zhquan_example"), login)
+            self.assertEqual(len(httpretty.latest_requests()), 1)
+            self.assertDictEqual(client.user_cache_stats['users'], {'hits': 1, 'misses': 0})
+
+            # Users are requested when they expired
+            client = GitHubClient("zhquan_example", "repo", ["aaa"], None,
+                                  user_cache_path=cache_path, user_cache_ttl=0)
+            with unittest.mock.patch('perceval.cache.time.time', return_value=time.time() + 10):
+                self.assertEqual(client.user("zhquan_example"), login)
+            self.assertEqual(len(httpretty.latest_requests()), 2)
+            self.assertDictEqual(client.user_cache_stats['users'], {'hits': 0, 'misses': 1})
+        finally:
+            shutil.rmtree(tmp_path)
+
+    @httpretty.activate
+    def test_user_locks(self):
+        """Test whether users share a fixed number of locks"""
+
+        rate_limit = read_file('data/github/rate_limit')
+        httpretty.register_uri(httpretty.GET,
+                               GITHUB_RATE_LIMIT,
+                               body=rate_limit,
+                               status=200,
+                               forcing_headers={
+                                   'X-RateLimit-Remaining': '20',
+                                   'X-RateLimit-Reset': '15'
+                               })
+
+        client = GitHubClient("zhquan_example", "repo", ["aaa"], None)
+
+        locks = {client._get_lock(('user', 'user%s' % i)) for i in range(USER_LOCK_STRIPES * 4)}
+        self.assertLessEqual(len(locks), USER_LOCK_STRIPES)
+        self.assertEqual(len(client._locks), USER_LOCK_STRIPES)
+        self.assertIs(client._get_lock(('user', 'user0')), client._get_lock(('user', 'user0')))
+
+    def test_user_cache_not_used_with_archives(self):
+        """Test whether the users database is ignored when archiving"""
+
+        tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        cache_path = os.path.join(tmp_path, 'users.db')
+        archive = Archive.create(os.path.join(tmp_path, 'archive'))
+
+        try:
+            client = GitHubClient("zhquan_example", "repo", ["aaa"], None,
+                                  archive=archive, from_archive=True,
+                                  user_cache_size=10, user_cache_path=cache_path)
+            self.assertEqual(client._users.max_size, 10)
+            self.assertIsNone(client._users.store)
+            self.assertIsNone(client._users_orgs.store)
+            self.assertFalse(os.path.exists(cache_path))
+        finally:
+            shutil.rmtree(tmp_path)
+
     @httpretty.activate
     def test_http_wrong_status(self):
         """Test if a error is raised when the http status was not 200"""
@@ -3864,123 +4201,107 @@ class TestGitHubClient(unittest.TestCase):
             _ = [issues for issues in client.issues()]
 
     @httpretty.activate
-    def test_choose_best_token_on_init(self):
+    def test_choose_best_token(self):
         """Test if the client chooses the best token when there are several available"""
 
         # Token selection is based on the headers returned
         # by the server to each request made with different tokens
-        forcing_headers_aaa = {
-            'X-RateLimit-Remaining': '10',
-            'X-RateLimit-Reset': '15'
-        }
-        forcing_headers_bbb = {
-            'X-RateLimit-Remaining': '20',
-            'X-RateLimit-Reset': '15'
-        }
-        forcing_headers_bbb_updated = {
-            'X-RateLimit-Remaining': '19',
-            'X-RateLimit-Reset': '15'
+        remainings = {
+            'token aaa': '10',
+            'token bbb': '20'
         }
 
-        # Body of the response is ignored. Rate limit is got
-        # from the headers
-        rate_limit_body_aaa = read_file('data/github/rate_limit_aaa')
-        rate_limit_body_bbb = read_file('data/github/rate_limit_bbb')
+        repo_body = read_file('data/github/github_repo')
+
+        def request_callback(request, uri, headers):
+            headers['X-RateLimit-Remaining'] = remainings[request.headers['Authorization']]
+            headers['X-RateLimit-Reset'] = '15'
+            return 200, headers, repo_body
 
-        # The client request the rate limit for tokens 'aaa' and 'bbb'.
-        # Once it has selected the best token, it makes a new request
-        # with that token to update the rate limit
         httpretty.register_uri(httpretty.GET,
-                               GITHUB_RATE_LIMIT,
-                               responses=[
-                                   httpretty.Response(rate_limit_body_aaa, forcing_headers=forcing_headers_aaa),
-                                   httpretty.Response(rate_limit_body_bbb, forcing_headers=forcing_headers_bbb),
-                                   httpretty.Response(rate_limit_body_bbb, forcing_headers=forcing_headers_bbb_updated)
-                               ])
+                               GITHUB_REPO_URL,
+                               body=request_callback)
 
         client = GitHubClient("zhquan_example", "repo", ["aaa", "bbb"],
-                              sleep_for_rate=True)
-        self.assertEqual(client.current_token, 'bbb')
-        self.assertEqual(client.rate_limit, 19)
+                              sleep_for_rate=True, min_rate_to_sleep=5)
+
+        # The rate limits of the tokens are not requested
+        self.assertEqual(len(httpretty.latest_requests()), 0)
+        self.assertIsNone(client.rate_limit)
+
+        expected = [
+            {'requests': 0, 'remaining': None, 'reset': None},
+            {'requests': 0, 'remaining': None, 'reset': None}
+        ]
+        self.assertListEqual(client.tokens_stats, expected)
+
+        # Tokens whose rate limit is not known are used first
+        client.repo()
+        client.repo()
+        self.assertEqual(client.rate_limit, 20)
+
+        client.repo()
+
+        requests = httpretty.latest_requests()
+        self.assertEqual(len(requests), 3)
+        self.assertListEqual([request.headers['Authorization'] for request in requests],
+                             ['token aaa', 'token bbb', 'token bbb'])
+
+        expected = [
+            {'requests': 1, 'remaining': 10, 'reset': 15},
+            {'requests': 2, 'remaining': 20, 'reset': 15}
+        ]
+        self.assertListEqual(client.tokens_stats, expected)
 
     @httpretty.activate
     def test_choose_best_token_when_approaching_limit(self):
-        """Test if the client chooses the best token when the current one approaches the limit"""
-
-        # The process will be as follows. The client request the rate limit
-        # for tokens 'aaa', 'bbb' and 'ccc'. Once it has selected the best token,
-        # in this case 'bbb', it makes a new request with that token to update
-        # the rate limit.
-        #
-        # When it performs a query to get user data, first checks whether the
-        # token is reaching to its limit. In this case it is, so it asks for
-        # new tokens. Tokens 'aaa' and 'ccc' are refreshed so it gets the best
-        # one, in this case 'aaa'.
+        """Test if the client uses other tokens when the current one approaches the limit"""
 
-        # Token selection is based on the headers returned
-        # by the server to each request made with different tokens
-        forcing_headers_aaa_init = {
-            'X-RateLimit-Remaining': '10',
-            'X-RateLimit-Reset': '15'
-        }
-        forcing_headers_bbb_init = {
-            'X-RateLimit-Remaining': '20',
-            'X-RateLimit-Reset': '15'
-        }
-        forcing_headers_ccc_init = {
-            'X-RateLimit-Remaining': '0',
-            'X-RateLimit-Reset': '15'
-        }
-        forcing_headers_bbb_updated = {
-            'X-RateLimit-Remaining': '19',
-            'X-RateLimit-Reset': '15'
-        }
-        forcing_headers_aaa_reset = {
-            'X-RateLimit-Remaining': '200',
-            'X-RateLimit-Reset': '15'
-        }
-        forcing_headers_ccc_reset = {
-            'X-RateLimit-Remaining': '100',
-            'X-RateLimit-Reset': '15'
-        }
-        forcing_headers_user = {
-            'X-RateLimit-Remaining': '199',
-            'X-RateLimit-Reset': '15'
+        # The rate limits are updated with the headers
+        # of the responses to each token
+        remainings = {
+            'token aaa': iter(['30', '19', '17']),
+            'token bbb': iter(['20', '5'])
         }
 
-        # Body of the response is ignored. Rate limit is got
-        # from the headers
-        rate_limit_body_aaa = read_file('data/github/rate_limit_aaa')
-        rate_limit_body_bbb = read_file('data/github/rate_limit_bbb')
         repo_body = read_file('data/github/github_repo')
 
-        httpretty.register_uri(httpretty.GET,
-                               GITHUB_RATE_LIMIT,
-                               responses=[
-                                   httpretty.Response(rate_limit_body_aaa, forcing_headers=forcing_headers_aaa_init),
-                                   httpretty.Response(rate_limit_body_bbb, forcing_headers=forcing_headers_bbb_init),
-                                   httpretty.Response(rate_limit_body_bbb, forcing_headers=forcing_headers_ccc_init),
-                                   httpretty.Response(rate_limit_body_bbb, forcing_headers=forcing_headers_bbb_updated),
-                                   httpretty.Response(rate_limit_body_aaa, forcing_headers=forcing_headers_aaa_reset),
-                                   httpretty.Response(rate_limit_body_bbb, forcing_headers=forcing_headers_bbb_updated),
-                                   httpretty.Response(rate_limit_body_aaa, forcing_headers=forcing_headers_ccc_reset),
-                                   httpretty.Response(rate_limit_body_aaa, forcing_headers=forcing_headers_aaa_reset),
-                               ])
+        def request_callback(request, uri, headers):
+            headers['X-RateLimit-Remaining'] = next(remainings[request.headers['Authorization']])
+            headers['X-RateLimit-Reset'] = '15'
+            return 200, headers, repo_body
+
         httpretty.register_uri(httpretty.GET,
                                GITHUB_REPO_URL,
-                               body=repo_body, status=200,
-                               forcing_headers=forcing_headers_user)
+                               body=request_callback)
 
-        client = GitHubClient("zhquan_example", "repo", ["aaa", "bbb", "ccc"],
+        client = GitHubClient("zhquan_example", "repo", ["aaa", "bbb"],
                               sleep_for_rate=True, min_rate_to_sleep=18)
 
-        self.assertEqual(client.current_token, 'bbb')
+        client.repo()
+        client.repo()
+
+        client.repo()
         self.assertEqual(client.rate_limit, 19)
 
+        # 'aaa' has less points left than 'bbb'
         client.repo()
+        self.assertEqual(client.rate_limit, 5)
 
-        self.assertEqual(client.current_token, 'aaa')
-        self.assertEqual(client.rate_limit, 200)
+        # 'bbb' is under the limit
+        client.repo()
+        self.assertEqual(client.rate_limit, 17)
+
+        requests = httpretty.latest_requests()
+        self.assertEqual(len(requests), 5)
+        self.assertListEqual([request.headers['Authorization'] for request in requests],
+                             ['token aaa', 'token bbb', 'token aaa', 'token bbb', 'token aaa'])
+
+        expected = [
+            {'requests': 3, 'remaining': 17, 'reset': 15},
+            {'requests': 2, 'remaining': 5, 'reset': 15}
+        ]
+        self.assertListEqual(client.tokens_stats, expected)
 
     @httpretty.activate
     def test_calculate_time_to_reset(self):
@@ -3997,6 +4318,7 @@ class TestGitHubClient(unittest.TestCase):
                                })
 
         client = GitHubClient("zhquan_example", "repo", ["aaa"], sleep_for_rate=True)
+        client.fetch(GITHUB_RATE_LIMIT)
         time_to_reset = client.calculate_time_to_reset()
 
         self.assertEqual(time_to_reset, 0)
@@ -4106,6 +4428,127 @@ class TestGitHubClient(unittest.TestCase):
         self.assertEqual(httpretty.last_request().headers["Authorization"], "token aaa")
 
 
+class TestGitHubTokenPool(unittest.TestCase):
+    """GitHubTokenPool tests"""
+
+    def test_init(self):
+        """Test whether attributes are initialized"""
+
+        pool = GitHubTokenPool(['aaa', 'bbb'], 10)
+
+        self.assertListEqual(pool.tokens, ['aaa', 'bbb'])
+        self.assertEqual(pool.min_rate_to_sleep, 10)
+        self.assertFalse(pool.sleep_for_rate)
+        self.assertIsNone(pool.budget)
+
+        expected = [
+            {'requests': 0, 'remaining': None, 'reset': None},
+            {'requests': 0, 'remaining': None, 'reset': None}
+        ]
+        self.assertListEqual(pool.stats, expected)
+
+    def test_acquire(self):
+        """Test whether tokens are handed out by their points left"""
+
+        pool = GitHubTokenPool(['aaa', 'bbb', 'ccc'], 10)
+        release_tokens(pool, [(100, 15), (101, 15), (5, 15)])
+
+        self.assertEqual(pool.budget, 90 + 91)
+
+        # Requests in process are spread among the tokens
+        self.assertEqual(pool.acquire(), 'bbb')
+        self.assertEqual(pool.acquire(), 'aaa')
+        self.assertEqual(pool.acquire(), 'bbb')
+        self.assertEqual(pool.budget, 90 + 91 - 3)
+
+        pool.release('bbb', remaining=50, reset_ts=20)
+        pool.release('bbb')
+        pool.release('aaa', remaining=99)
+
+        self.assertEqual(pool.acquire(), 'aaa')
+
+        expected = [
+            {'requests': 3, 'remaining': 99, 'reset': 15},
+            {'requests': 3, 'remaining': 50, 'reset': 20},
+            {'requests': 1, 'remaining': 5, 'reset': 15}
+        ]
+        self.assertListEqual(pool.stats, expected)
+
+    def test_acquire_unknown_rate_limit(self):
+        """Test whether tokens with unknown points are handed out first"""
+
+        pool = GitHubTokenPool(['aaa', 'bbb', 'ccc'], 10)
+        release_tokens(pool, [(100, 15)])
+
+        self.assertEqual(pool.acquire(), 'bbb')
+        self.assertEqual(pool.acquire(), 'ccc')
+        self.assertEqual(pool.acquire(), 'bbb')
+        self.assertEqual(pool.acquire(), 'ccc')
+
+    def test_acquire_exhausted(self):
+        """Test whether an exception is raised when every token is exhausted"""
+
+        pool = GitHubTokenPool(['aaa', 'bbb'], 10)
+        release_tokens(pool, [(10, 0), (11, 0)])
+
+        self.assertEqual(pool.acquire(), 'bbb')
+        self.assertEqual(pool.budget, 0)
+
+        with self.assertRaises(RateLimitError):
+            pool.acquire()
+
+    @unittest.mock.patch('perceval.backends.core.github.time.sleep')
+    @unittest.mock.patch('perceval.backends.core.github.datetime_utcnow')
+    def test_acquire_sleep(self, mock_utcnow, mock_sleep):
+        """Test whether the pool sleeps until the first token is reset"""
+
+        mock_utcnow.return_value = datetime.datetime(2020, 1, 1, tzinfo=dateutil.tz.tzutc())
+        now = int(mock_utcnow.return_value.timestamp())
+
+        pool = GitHubTokenPool(['aaa', 'bbb'], 10, sleep_for_rate=True)
+        release_tokens(pool, [(0, now + 60), (0, now + 30)])
+
+        self.assertEqual(pool.acquire(), 'bbb')
+        mock_sleep.assert_called_once_with(29)
+
+        expected = [
+            {'requests': 1, 'remaining': 0, 'reset': now + 60},
+            {'requests': 2, 'remaining': None, 'reset': now + 30}
+        ]
+        self.assertListEqual(pool.stats, expected)
+
+    @unittest.mock.patch('perceval.backends.core.github.time.sleep')
+    @unittest.mock.patch('perceval.backends.core.github.datetime_utcnow')
+    def test_acquire_sleep_unknown_reset(self, mock_utcnow, mock_sleep):
+        """Test whether the pool only waits for the known reset times"""
+
+        mock_utcnow.return_value = datetime.datetime(2020, 1, 1, tzinfo=dateutil.tz.tzutc())
+        now = int(mock_utcnow.return_value.timestamp())
+
+        pool = GitHubTokenPool(['aaa', 'bbb'], 10, sleep_for_rate=True)
+        release_tokens(pool, [(0, None), (0, now + 30)])
+
+        self.assertEqual(pool.acquire(), 'aaa')
+        mock_sleep.assert_called_once_with(29)
+
+        # Without reset times, the pool waits a fixed time
+        mock_sleep.reset_mock()
+
+        pool = GitHubTokenPool(['aaa', 'bbb'], 10, sleep_for_rate=True)
+        release_tokens(pool, [(0, None), (0, None)])
+
+        self.assertEqual(pool.acquire(), 'aaa')
+        mock_sleep.assert_called_once_with(TOKEN_RESET_WAIT)
+
+        pool = GitHubTokenPool(['aaa', 'bbb'], 10)
+        release_tokens(pool, [(0, None), (0, None)])
+
+        with self.assertRaises(RateLimitError) as ctx:
+            pool.acquire()
+
+        self.assertEqual(ctx.exception.seconds_to_reset, TOKEN_RESET_WAIT)
+
+
 class TestGitHubCommand(unittest.TestCase):
     """GitHubCommand unit tests"""
 
@@ -4147,6 +4590,10 @@ class TestGitHubCommand(unittest.TestCase):
         self.assertTrue(parsed_args.no_archive)
         self.assertTrue(parsed_args.ssl_verify)
         self.assertEqual(parsed_args.api_token, ['abcdefgh', 'ijklmnop'])
+        self.assertEqual(parsed_args.max_workers, 1)
+        self.assertEqual(parsed_args.user_cache_size, 10000)
+        self.assertIsNone(parsed_args.user_cache_path)
+        self.assertEqual(parsed_args.user_cache_ttl, 86400)
 
         args = ['--sleep-for-rate',
                 '--min-rate-to-sleep', '1',
@@ -4158,6 +4605,10 @@ class TestGitHubCommand(unittest.TestCase):
                 '--from-date', '1970-01-01',
                 '--to-date', '2100-01-01',
                 '--no-ssl-verify',
+                '--max-workers', '4',
+                '--user-cache-size', '100',
+                '--user-cache-path', '/tmp/users.db',
+                '--user-cache-ttl', '3600',
                 '--enterprise-url', 'https://example.com',
                 'zhquan_example', 'repo']
 
@@ -4175,6 +4626,10 @@ class TestGitHubCommand(unittest.TestCase):
         self.assertTrue(parsed_args.no_archive)
         self.assertFalse(parsed_args.ssl_verify)
         self.assertEqual(parsed_args.api_token, ['abcdefgh', 'ijklmnop'])
+        self.assertEqual(parsed_args.max_workers, 4)
+        self.assertEqual(parsed_args.user_cache_size, 100)
+        self.assertEqual(parsed_args.user_cache_path, '/tmp/users.db')
+        self.assertEqual(parsed_args.user_cache_ttl, 3600)
 
 
 if __name__ == "__main__":
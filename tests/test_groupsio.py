@@ -134,6 +134,10 @@ class TestGroupsioBackend(unittest.TestCase):
         self.assertEqual(backend.origin, 'https://groups.io/g/beta+api')
         self.assertEqual(backend.tag, 'https://groups.io/g/beta+api')
         self.assertFalse(backend.ssl_verify)
+        self.assertEqual(backend.parse_workers, 1)
+
+        backend = Groupsio('beta+api', self.tmp_path, 'jsmith@example.com', 'aaaaa', parse_workers=2)
+        self.assertEqual(backend.parse_workers, 2)
 
     def test_has_archiving(self):
         """Test if it returns False when has_archiving is called"""
@@ -33,6 +33,7 @@ import unittest.mock
 import dateutil.tz
 import httpretty
 import pkg_resources
+import requests
 
 pkg_resources.declare_namespace('perceval.backends')
 
@@ -73,6 +74,11 @@ class TestHyperKittyList(unittest.TestCase):
         self.assertEqual(hkls.uri, HYPERKITTY_URL)
         self.assertEqual(hkls.dirpath, self.tmp_path)
         self.assertEqual(hkls.client.base_url, HYPERKITTY_URL)
+        self.assertEqual(hkls.downloader.client, hkls.client)
+        self.assertEqual(hkls.downloader.max_workers, 1)
+
+        hkls = HyperKittyList(HYPERKITTY_URL, self.tmp_path, max_workers=2)
+        self.assertEqual(hkls.downloader.max_workers, 2)
 
     @httpretty.activate
     @unittest.mock.patch('perceval.backends.core.hyperkitty.datetime_utcnow')
@@ -112,6 +118,84 @@ class TestHyperKittyList(unittest.TestCase):
         self.assertEqual(mboxes[0].filepath, os.path.join(self.tmp_path, '2016-03.mbox.gz'))
         self.assertEqual(mboxes[1].filepath, os.path.join(self.tmp_path, '2016-04.mbox.gz'))
 
+    @httpretty.activate
+    @unittest.mock.patch('perceval.backends.core.hyperkitty.datetime_utcnow')
+    def test_fetch_http_error(self, mock_utcnow):
+        """Test whether HTTP errors are raised when archives are fetched"""
+
+        mock_utcnow.return_value = datetime.datetime(2016, 4, 10,
+                                                     tzinfo=dateutil.tz.tzutc())
+
+        httpretty.register_uri(httpretty.GET,
+                               HYPERKITTY_URL,
+                               body="")
+        httpretty.register_uri(httpretty.GET,
+                               HYPERKITTY_URL + 'export/2016-04.mbox.gz',
+                               body="",
+                               status=500)
+
+        from_date = datetime.datetime(2016, 4, 1)
+
+        hkls = HyperKittyList(HYPERKITTY_URL, self.tmp_path)
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            hkls.fetch(from_date=from_date)
+
+    @httpretty.activate
+    @unittest.mock.patch('perceval.backends.core.hyperkitty.datetime_utcnow')
+    def test_fetch_unchanged(self, mock_utcnow):
+        """Test whether archives that did not change are not downloaded again"""
+
+        mock_utcnow.return_value = datetime.datetime(2016, 4, 10,
+                                                     tzinfo=dateutil.tz.tzutc())
+
+        mboxes = {
+            '2016-03.mbox.gz': read_file('data/hyperkitty/hyperkitty_2016_march.mbox'),
+            '2016-04.mbox.gz': read_file('data/hyperkitty/hyperkitty_2016_april.mbox')
+        }
+        last_modified = {
+            '2016-03.mbox.gz': 'Thu, 31 Mar 2016 23:59:59 GMT',
+            '2016-04.mbox.gz': 'Sun, 10 Apr 2016 00:00:00 GMT'
+        }
+
+        def request_callback(request, uri, headers):
+            filename = uri.split('?')[0].split('/')[-1]
+            headers['Last-Modified'] = last_modified[filename]
+
+            if request.headers.get('If-Modified-Since') == last_modified[filename]:
+                return 304, headers, ''
+            else:
+                return 200, headers, mboxes[filename]
+
+        httpretty.register_uri(httpretty.GET,
+                               HYPERKITTY_URL,
+                               body="")
+        httpretty.register_uri(httpretty.GET,
+                               HYPERKITTY_URL + 'export/2016-03.mbox.gz',
+                               body=request_callback)
+        httpretty.register_uri(httpretty.GET,
+                               HYPERKITTY_URL + 'export/2016-04.mbox.gz',
+                               body=request_callback)
+
+        from_date = datetime.datetime(2016, 3, 10)
+
+        hkls = HyperKittyList(HYPERKITTY_URL, self.tmp_path, max_workers=2)
+        fetched = hkls.fetch(from_date=from_date)
+        self.assertEqual(len(fetched), 2)
+
+        # New messages were sent during the current month
+        last_modified['2016-04.mbox.gz'] = 'Sun, 10 Apr 2016 10:00:00 GMT'
+
+        hkls = HyperKittyList(HYPERKITTY_URL, self.tmp_path, max_workers=2)
+        fetched = hkls.fetch(from_date=from_date)
+
+        self.assertEqual(len(fetched), 1)
+        self.assertEqual(fetched[0][0], HYPERKITTY_URL + 'export/2016-04.mbox.gz')
+        self.assertEqual(fetched[0][1], os.path.join(self.tmp_path, '2016-04.mbox.gz'))
+
+        mboxes = hkls.mboxes
+        self.assertEqual(len(mboxes), 2)
+
     @httpretty.activate
     @unittest.mock.patch('perceval.backends.core.hyperkitty.datetime_utcnow')
     def test_fetch_from_date_after_current_day(self, mock_utcnow):
@@ -180,6 +264,13 @@ class TestHyperKittyBackend(unittest.TestCase):
         backend = HyperKitty('http://example.com/', self.tmp_path, tag='')
         self.assertEqual(backend.origin, 'http://example.com/')
         self.assertEqual(backend.tag, 'http://example.com/')
+        self.assertEqual(backend.max_workers, 1)
+
+        self.assertEqual(backend.parse_workers, 1)
+
+        backend = HyperKitty('http://example.com/', self.tmp_path, max_workers=4, parse_workers=2)
+        self.assertEqual(backend.max_workers, 4)
+        self.assertEqual(backend.parse_workers, 2)
 
     def test_has_archiving(self):
         """Test if it returns False when has_archiving is called"""
@@ -354,11 +445,15 @@ class TestHyperKittyCommand(unittest.TestCase):
         self.assertEqual(parsed_args.tag, 'test')
         self.assertEqual(parsed_args.from_date, DEFAULT_DATETIME)
         self.assertTrue(parsed_args.ssl_verify)
+        self.assertEqual(parsed_args.max_workers, 1)
+        self.assertEqual(parsed_args.parse_workers, 1)
 
         args = ['http://example.com/archives/list/test@example.com/',
                 '--mboxes-path', '/tmp/perceval/',
                 '--tag', 'test', '--no-ssl-verify',
-                '--from-date', '1970-01-01']
+                '--from-date', '1970-01-01',
+                '--max-workers', '4',
+                '--parse-workers', '2']
 
         parsed_args = parser.parse(*args)
         self.assertEqual(parsed_args.url, 'http://example.com/archives/list/test@example.com/')
@@ -366,6 +461,8 @@ class TestHyperKittyCommand(unittest.TestCase):
         self.assertEqual(parsed_args.tag, 'test')
         self.assertEqual(parsed_args.from_date, DEFAULT_DATETIME)
         self.assertFalse(parsed_args.ssl_verify)
+        self.assertEqual(parsed_args.max_workers, 4)
+        self.assertEqual(parsed_args.parse_workers, 2)
 
 
 if __name__ == "__main__":
@@ -62,6 +62,41 @@ def read_file(filename, mode='r'):
     return content
 
 
+def setup_http_server_by_start_at():
+    """Setup a mock HTTP server that returns the pages of issues by its offset"""
+
+    bodies_json = {
+        '0': read_file('data/jira/jira_issues_page_1.json'),
+        '2': read_file('data/jira/jira_issues_page_2.json')
+    }
+    comment_json = read_file('data/jira/jira_comments_issue_page_2.json')
+    empty_comment = read_file('data/jira/jira_comments_issue_empty.json')
+    body = read_file('data/jira/jira_fields.json')
+
+    def request_callback(request, uri, headers):
+        body = bodies_json[request.querystring['startAt'][0]]
+        return 200, headers, body
+
+    httpretty.register_uri(httpretty.GET,
+                           JIRA_SEARCH_URL,
+                           body=request_callback)
+    httpretty.register_uri(httpretty.GET,
+                           JIRA_ISSUE_1_COMMENTS_URL,
+                           body=empty_comment,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           JIRA_ISSUE_2_COMMENTS_URL,
+                           body=comment_json,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           JIRA_ISSUE_3_COMMENTS_URL,
+                           body=empty_comment,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           JIRA_FIELDS_URL,
+                           body=body, status=200)
+
+
 class TestJiraCustomFields(unittest.TestCase):
 
     def test_map_custom_field(self):
@@ -149,6 +184,7 @@ class TestJiraBackend(unittest.TestCase):
         self.assertEqual(jira.origin, JIRA_SERVER_URL)
         self.assertEqual(jira.tag, 'test')
         self.assertEqual(jira.max_results, 5)
+        self.assertEqual(jira.max_workers, 1)
         self.assertIsNone(jira.client)
         self.assertTrue(jira.ssl_verify)
 
@@ -165,6 +201,9 @@ class TestJiraBackend(unittest.TestCase):
         self.assertEqual(jira.tag, JIRA_SERVER_URL)
         self.assertFalse(jira.ssl_verify)
 
+        jira = Jira(JIRA_SERVER_URL, max_workers=4)
+        self.assertEqual(jira.max_workers, 4)
+
     def test_has_archiving(self):
         """Test if it returns True when has_archiving is called"""
 
@@ -336,6 +375,29 @@ class TestJiraBackend(unittest.TestCase):
                          custom_fields['customfield_10603']['name'])
         self.assertEqual(issue['data']['comments_data'], [])
 
+    @httpretty.activate
+    def test_fetch_concurrent(self):
+        """Test whether issues are returned in order when pages and comments are fetched concurrently"""
+
+        setup_http_server_by_start_at()
+
+        jira = Jira(JIRA_SERVER_URL, max_workers=4)
+        issues = [issue for issue in jira.fetch()]
+
+        self.assertEqual(len(issues), 3)
+
+        self.assertEqual(issues[0]['data']['key'], 'HELP-6043')
+        self.assertEqual(issues[0]['data']['comments_data'], [])
+        self.assertEqual(issues[0]['data']['fields']['customfield_10301']['name'], 'Sender Email')
+
+        self.assertEqual(issues[1]['data']['key'], 'HELP-6042')
+        self.assertEqual(len(issues[1]['data']['comments_data']), 2)
+        self.assertEqual(issues[1]['data']['comments_data'][0]['author']['displayName'], 'Tim Monks')
+        self.assertEqual(issues[1]['data']['comments_data'][1]['author']['displayName'], 'Scott Monks')
+
+        self.assertEqual(issues[2]['data']['key'], 'HELP-6041')
+        self.assertEqual(issues[2]['data']['comments_data'], [])
+
     @httpretty.activate
     def test_search_fields(self):
         """Test whether the search_fields is properly set"""
@@ -577,6 +639,16 @@ class TestJiraBackendArchive(TestCaseBackendArchive):
         self.assertEqual(("test", "test"), self.backend_write_archive.client.session.auth)
         self.assertIsNone(self.backend_read_archive.client.session.auth)
 
+    @httpretty.activate
+    def test_fetch_concurrent_from_archive(self):
+        """Test whether the issues fetched concurrently are returned from an archive"""
+
+        setup_http_server_by_start_at()
+
+        self.backend_write_archive.max_workers = 4
+        self.backend_read_archive.max_workers = 4
+        self._test_fetch_from_archive(from_date=None)
+
     @httpretty.activate
     def test_fetch_from_date_from_archive(self):
         """Test whether a list of issues is returned from a given date from archive"""
@@ -743,6 +815,50 @@ class TestJiraClient(unittest.TestCase):
         self.assertEqual(pages[0], bodies_json[0])
         self.assertEqual(pages[1], bodies_json[1])
 
+    @httpretty.activate
+    def test_get_issues_prefetch(self):
+        """Test whether pages are requested concurrently and returned in order"""
+
+        from_date = str_to_datetime('2015-01-01')
+
+        def request_callback(request, uri, headers):
+            start_at = int(request.querystring['startAt'][0])
+            body = {
+                'startAt': start_at,
+                'maxResults': 2,
+                'total': 7,
+                'issues': [{'id': str(n)} for n in range(start_at, min(start_at + 2, 7))]
+            }
+            return 200, headers, json.dumps(body)
+
+        httpretty.register_uri(httpretty.GET,
+                               JIRA_SEARCH_URL,
+                               body=request_callback)
+
+        client = JiraClient(url='http://example.com', project='perceval',
+                            user='user', password='password',
+                            ssl_verify=False, cert=None, max_results=2,
+                            max_workers=3)
+        self.assertEqual(client.max_workers, 3)
+
+        pages = [json.loads(page) for page in client.get_issues(from_date)]
+
+        self.assertListEqual([page['startAt'] for page in pages], [0, 2, 4, 6])
+
+        issues = [issue['id'] for page in pages for issue in page['issues']]
+        self.assertListEqual(issues, ['0', '1', '2', '3', '4', '5', '6'])
+
+        requests = httpretty.HTTPretty.latest_requests
+        self.assertEqual(len(requests), 4)
+        self.assertEqual(requests[0].querystring['startAt'], ['0'])
+
+        offsets = sorted([int(request.querystring['startAt'][0]) for request in requests])
+        self.assertListEqual(offsets, [0, 2, 4, 6])
+
+        # Pages can be returned already decoded
+        decoded_pages = [page for page in client.get_issues(from_date, decode=True)]
+        self.assertListEqual(decoded_pages, pages)
+
     @httpretty.activate
     def test_get_comments(self):
         """Test get comments API call"""
@@ -882,6 +998,7 @@ class TestJiraCommand(unittest.TestCase):
         self.assertTrue(parsed_args.ssl_verify)
         self.assertEqual(parsed_args.cert, 'aaaa')
         self.assertEqual(parsed_args.max_results, 1)
+        self.assertEqual(parsed_args.max_workers, 1)
         self.assertEqual(parsed_args.tag, 'test')
         self.assertTrue(parsed_args.no_archive)
         self.assertEqual(parsed_args.from_date, DEFAULT_DATETIME)
@@ -893,6 +1010,7 @@ class TestJiraCommand(unittest.TestCase):
                 '--no-ssl-verify',
                 '--cert', 'aaaa',
                 '--max-results', '1',
+                '--max-workers', '4',
                 '--tag', 'test',
                 '--no-archive',
                 '--from-date', '1970-01-01',
@@ -905,6 +1023,7 @@ class TestJiraCommand(unittest.TestCase):
         self.assertFalse(parsed_args.ssl_verify)
         self.assertEqual(parsed_args.cert, 'aaaa')
         self.assertEqual(parsed_args.max_results, 1)
+        self.assertEqual(parsed_args.max_workers, 4)
         self.assertEqual(parsed_args.tag, 'test')
         self.assertTrue(parsed_args.no_archive)
         self.assertEqual(parsed_args.from_date, DEFAULT_DATETIME)
@@ -29,6 +29,8 @@ import json
 import os
 import pkg_resources
 import requests
+import threading
+import time
 import unittest
 
 pkg_resources.declare_namespace('perceval.backends')
@@ -37,8 +39,10 @@ from perceval.backend import BackendCommandArgumentParser
 from perceval.backends.core.launchpad import (Launchpad,
                                               LaunchpadClient,
                                               LaunchpadCommand,
+                                              DEFAULT_MAX_WORKERS,
                                               ITEMS_PER_PAGE,
-                                              SLEEP_TIME)
+                                              SLEEP_TIME,
+                                              USER_LOCK_STRIPES)
 from perceval.utils import DEFAULT_DATETIME
 from base import TestCaseBackendArchive
 
@@ -57,6 +61,125 @@ def read_file(filename, mode='r'):
     return content
 
 
+def setup_http_server():
+    """Setup a mock HTTP server"""
+
+    issues_page_1 = read_file('data/launchpad/launchpad_issues_page_1')
+    issues_page_2 = read_file('data/launchpad/launchpad_issues_page_2')
+    issues_page_3 = read_file('data/launchpad/launchpad_issues_page_3')
+
+    issue_1 = read_file('data/launchpad/launchpad_issue_1')
+    issue_2 = read_file('data/launchpad/launchpad_issue_2')
+    issue_3 = read_file('data/launchpad/launchpad_issue_3')
+
+    issue_1_comments = read_file('data/launchpad/launchpad_issue_1_comments')
+    issue_1_attachments = read_file('data/launchpad/launchpad_issue_1_attachments')
+    issue_1_activities = read_file('data/launchpad/launchpad_issue_1_activities')
+
+    issue_2_activities = read_file('data/launchpad/launchpad_issue_2_activities')
+    issue_2_comments = read_file('data/launchpad/launchpad_issue_2_comments')
+
+    user_1 = read_file('data/launchpad/launchpad_user_1')
+
+    empty_issue_comments = read_file('data/launchpad/launchpad_empty_issue_comments')
+    empty_issue_attachments = read_file('data/launchpad/launchpad_empty_issue_attachments')
+    empty_issue_activities = read_file('data/launchpad/launchpad_empty_issue_activities')
+
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_PACKAGE_PROJECT_URL +
+                           "?modified_since=1970-01-01T00%3A00%3A00%2B00%3A00&ws.op=searchTasks"
+                           "&omit_duplicates=false&order_by=date_last_updated&status=Confirmed&status=Expired"
+                           "&status=Fix+Committed&status=Fix+Released"
+                           "&status=In+Progress&status=Incomplete&status=Incomplete+%28with+response%29"
+                           "&status=Incomplete+%28without+response%29"
+                           "&status=Invalid&status=New&status=Opinion&status=Triaged"
+                           "&status=Won%27t+Fix"
+                           "&ws.size=1&memo=2&ws.start=2",
+                           body=issues_page_3,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_PACKAGE_PROJECT_URL +
+                           "?modified_since=1970-01-01T00%3A00%3A00%2B00%3A00&ws.op=searchTasks"
+                           "&omit_duplicates=false&order_by=date_last_updated&status=Confirmed&status=Expired"
+                           "&status=Fix+Committed&status=Fix+Released"
+                           "&status=In+Progress&status=Incomplete&status=Incomplete+%28with+response%29"
+                           "&status=Incomplete+%28without+response%29"
+                           "&status=Invalid&status=New&status=Opinion&status=Triaged"
+                           "&status=Won%27t+Fix"
+                           "&ws.size=1&memo=1&ws.start=1",
+                           body=issues_page_2,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_PACKAGE_PROJECT_URL +
+                           "?modified_since=1970-01-01T00%3A00%3A00%2B00%3A00&ws.op=searchTasks"
+                           "&omit_duplicates=false&order_by=date_last_updated&status=Confirmed&status=Expired"
+                           "&status=Fix+Committed&status=Fix+Released"
+                           "&status=In+Progress&status=Incomplete&status=Incomplete+%28with+response%29"
+                           "&status=Incomplete+%28without+response%29"
+                           "&status=Invalid&status=New&status=Opinion&status=Triaged"
+                           "&status=Won%27t+Fix"
+                           "&ws.size=1",
+                           body=issues_page_1,
+                           status=200)
+
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/1",
+                           body=issue_1,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/2",
+                           body=issue_2,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/3",
+                           body=issue_3,
+                           status=200)
+
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/1/messages",
+                           body=issue_1_comments,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/2/messages",
+                           body=issue_2_comments,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/3/messages",
+                           body=empty_issue_comments,
+                           status=200)
+
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/1/attachments",
+                           body=issue_1_attachments,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/2/attachments",
+                           body=empty_issue_attachments,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/3/attachments",
+                           body=empty_issue_attachments,
+                           status=200)
+
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/1/activity",
+                           body=issue_1_activities,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/2/activity",
+                           body=issue_2_activities,
+                           status=200)
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/bugs/3/activity",
+                           body=empty_issue_activities,
+                           status=200)
+
+    httpretty.register_uri(httpretty.GET,
+                           LAUNCHPAD_API_URL + "/~user",
+                           body=user_1,
+                           status=200)
+
+
 class TestLaunchpadBackend(unittest.TestCase):
     """Launchpad backend tests"""
 
@@ -70,6 +193,7 @@ class TestLaunchpadBackend(unittest.TestCase):
         self.assertEqual(launchpad.tag, 'test')
         self.assertIsNone(launchpad.client)
         self.assertTrue(launchpad.ssl_verify)
+        self.assertEqual(launchpad.max_workers, DEFAULT_MAX_WORKERS)
 
         launchpad = Launchpad('mydistribution', tag='test', package="mypackage", ssl_verify=False)
         self.assertEqual(launchpad.distribution, 'mydistribution')
@@ -78,6 +202,12 @@ class TestLaunchpadBackend(unittest.TestCase):
         self.assertEqual(launchpad.tag, 'test')
         self.assertFalse(launchpad.ssl_verify)
 
+        launchpad = Launchpad('mydistribution', max_workers=4)
+        self.assertEqual(launchpad.max_workers, 4)
+
+        launchpad = Launchpad('mydistribution', max_workers=0)
+        self.assertEqual(launchpad.max_workers, 1)
+
         # When tag is empty or None it will be set to
         # the value in origin
         launchpad = Launchpad('mydistribution', tag=None)
@@ -104,125 +234,12 @@ class TestLaunchpadBackend(unittest.TestCase):
     def test_fetch(self):
         """Test whether a list of issues is returned"""
 
-        issues_page_1 = read_file('data/launchpad/launchpad_issues_page_1')
-        issues_page_2 = read_file('data/launchpad/launchpad_issues_page_2')
-        issues_page_3 = read_file('data/launchpad/launchpad_issues_page_3')
-
-        issue_1 = read_file('data/launchpad/launchpad_issue_1')
-        issue_2 = read_file('data/launchpad/launchpad_issue_2')
-        issue_3 = read_file('data/launchpad/launchpad_issue_3')
-
-        issue_1_comments = read_file('data/launchpad/launchpad_issue_1_comments')
-        issue_1_attachments = read_file('data/launchpad/launchpad_issue_1_attachments')
-        issue_1_activities = read_file('data/launchpad/launchpad_issue_1_activities')
-
-        issue_2_activities = read_file('data/launchpad/launchpad_issue_2_activities')
-        issue_2_comments = read_file('data/launchpad/launchpad_issue_2_comments')
-
-        user_1 = read_file('data/launchpad/launchpad_user_1')
-
-        empty_issue_comments = read_file('data/launchpad/launchpad_empty_issue_comments')
-        empty_issue_attachments = read_file('data/launchpad/launchpad_empty_issue_attachments')
-        empty_issue_activities = read_file('data/launchpad/launchpad_empty_issue_activities')
+        setup_http_server()
 
         issue_1_expected = read_file('data/launchpad/launchpad_issue_1_expected')
         issue_2_expected = read_file('data/launchpad/launchpad_issue_2_expected')
         issue_3_expected = read_file('data/launchpad/launchpad_issue_3_expected')
 
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_PACKAGE_PROJECT_URL +
-                               "?modified_since=1970-01-01T00%3A00%3A00%2B00%3A00&ws.op=searchTasks"
-                               "&omit_duplicates=false&order_by=date_last_updated&status=Confirmed&status=Expired"
-                               "&status=Fix+Committed&status=Fix+Released"
-                               "&status=In+Progress&status=Incomplete&status=Incomplete+%28with+response%29"
-                               "&status=Incomplete+%28without+response%29"
-                               "&status=Invalid&status=New&status=Opinion&status=Triaged"
-                               "&status=Won%27t+Fix"
-                               "&ws.size=1&memo=2&ws.start=2",
-                               body=issues_page_3,
-                               status=200)
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_PACKAGE_PROJECT_URL +
-                               "?modified_since=1970-01-01T00%3A00%3A00%2B00%3A00&ws.op=searchTasks"
-                               "&omit_duplicates=false&order_by=date_last_updated&status=Confirmed&status=Expired"
-                               "&status=Fix+Committed&status=Fix+Released"
-                               "&status=In+Progress&status=Incomplete&status=Incomplete+%28with+response%29"
-                               "&status=Incomplete+%28without+response%29"
-                               "&status=Invalid&status=New&status=Opinion&status=Triaged"
-                               "&status=Won%27t+Fix"
-                               "&ws.size=1&memo=1&ws.start=1",
-                               body=issues_page_2,
-                               status=200)
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_PACKAGE_PROJECT_URL +
-                               "?modified_since=1970-01-01T00%3A00%3A00%2B00%3A00&ws.op=searchTasks"
-                               "&omit_duplicates=false&order_by=date_last_updated&status=Confirmed&status=Expired"
-                               "&status=Fix+Committed&status=Fix+Released"
-                               "&status=In+Progress&status=Incomplete&status=Incomplete+%28with+response%29"
-                               "&status=Incomplete+%28without+response%29"
-                               "&status=Invalid&status=New&status=Opinion&status=Triaged"
-                               "&status=Won%27t+Fix"
-                               "&ws.size=1",
-                               body=issues_page_1,
-                               status=200)
-
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/1",
-                               body=issue_1,
-                               status=200)
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/2",
-                               body=issue_2,
-                               status=200)
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/3",
-                               body=issue_3,
-                               status=200)
-
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/1/messages",
-                               body=issue_1_comments,
-                               status=200)
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/2/messages",
-                               body=issue_2_comments,
-                               status=200)
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/3/messages",
-                               body=empty_issue_comments,
-                               status=200)
-
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/1/attachments",
-                               body=issue_1_attachments,
-                               status=200)
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/2/attachments",
-                               body=empty_issue_attachments,
-                               status=200)
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/3/attachments",
-                               body=empty_issue_attachments,
-                               status=200)
-
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/1/activity",
-                               body=issue_1_activities,
-                               status=200)
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/2/activity",
-                               body=issue_2_activities,
-                               status=200)
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/bugs/3/activity",
-                               body=empty_issue_activities,
-                               status=200)
-
-        httpretty.register_uri(httpretty.GET,
-                               LAUNCHPAD_API_URL + "/~user",
-                               body=user_1,
-                               status=200)
-
         launchpad = Launchpad('mydistribution', package="mypackage",
                               items_per_page=2)
         issues = [issues for issues in launchpad.fetch(from_date=None)]
@@ -256,6 +273,50 @@ class TestLaunchpadBackend(unittest.TestCase):
         self.assertListEqual(issues[2]['data']['messages_data'], issue_3_expected['messages_data'])
         self.assertDictEqual(issues[2]['data'], issue_3_expected)
 
+    @httpretty.activate
+    def test_fetch_parallel(self):
+        """Test whether the issues of a page are fetched concurrently keeping their order"""
+
+        setup_http_server()
+
+        # Put the issues of the three pages in a single one
+        page = json.loads(read_file('data/launchpad/launchpad_issues_page_1'))
+        page.pop('next_collection_link')
+        page['entries'] = [json.loads(read_file('data/launchpad/launchpad_issues_page_%s' % n))['entries'][0]
+                           for n in range(1, 4)]
+
+        issue_1 = read_file('data/launchpad/launchpad_issue_1')
+
+        def slow_issue_callback(method, uri, headers):
+            time.sleep(0.1)
+            return (200, headers, issue_1)
+
+        httpretty.register_uri(httpretty.GET,
+                               LAUNCHPAD_PACKAGE_PROJECT_URL +
+                               "?modified_since=1970-01-01T00%3A00%3A00%2B00%3A00&ws.op=searchTasks"
+                               "&omit_duplicates=false&order_by=date_last_updated&status=Confirmed&status=Expired"
+                               "&status=Fix+Committed&status=Fix+Released"
+                               "&status=In+Progress&status=Incomplete&status=Incomplete+%28with+response%29"
+                               "&status=Incomplete+%28without+response%29"
+                               "&status=Invalid&status=New&status=Opinion&status=Triaged"
+                               "&status=Won%27t+Fix"
+                               "&ws.size=1",
+                               body=json.dumps(page),
+                               status=200)
+        httpretty.register_uri(httpretty.GET,
+                               LAUNCHPAD_API_URL + "/bugs/1",
+                               body=slow_issue_callback)
+
+        launchpad = Launchpad('mydistribution', package="mypackage",
+                              items_per_page=2, max_workers=3)
+        issues = [issues for issues in launchpad.fetch(from_date=None)]
+
+        self.assertEqual(len(issues), 3)
+
+        for n in range(1, 4):
+            expected = json.loads(read_file('data/launchpad/launchpad_issue_%s_expected' % n))
+            self.assertDictEqual(issues[n - 1]['data'], expected)
+
     @httpretty.activate
     def test_search_fields(self):
         """Test whether the search_fields is properly set"""
@@ -950,6 +1011,47 @@ class TestLaunchpadClient(unittest.TestCase):
 
         self.assertDictEqual(json.loads(user_retrieved), json.loads(user))
 
+    @httpretty.activate
+    def test_user_concurrent(self):
+        """Test whether a user is requested once when several threads ask for it"""
+
+        user = read_file('data/launchpad/launchpad_user_1')
+
+        def slow_user_callback(method, uri, headers):
+            time.sleep(0.1)
+            return (200, headers, user)
+
+        httpretty.register_uri(httpretty.GET,
+                               LAUNCHPAD_API_URL + "/~user-concurrent",
+                               body=slow_user_callback)
+
+        client = LaunchpadClient("mydistribution", package="mypackage")
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(client.user("user-concurrent")))
+                   for _ in range(4)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertListEqual(results, [user] * 4)
+
+        requests_users = [req for req in httpretty.latest_requests()
+                          if req.path == '/1.0/~user-concurrent']
+        self.assertEqual(len(requests_users), 1)
+
+    def test_user_locks(self):
+        """Test whether users share a fixed number of locks"""
+
+        client = LaunchpadClient("mydistribution", package="mypackage")
+
+        locks = {client._get_lock('user%s' % i) for i in range(USER_LOCK_STRIPES * 4)}
+        self.assertLessEqual(len(locks), USER_LOCK_STRIPES)
+        self.assertEqual(len(client._locks), USER_LOCK_STRIPES)
+        self.assertIs(client._get_lock('user0'), client._get_lock('user0'))
+
     @httpretty.activate
     def test_user_not_retrieved(self):
         """Test user API call"""
@@ -1020,11 +1122,13 @@ class TestLaunchpadCommand(unittest.TestCase):
         self.assertEqual(parsed_args.items_per_page, '75')
         self.assertEqual(parsed_args.sleep_time, '600')
         self.assertTrue(parsed_args.ssl_verify)
+        self.assertEqual(parsed_args.max_workers, DEFAULT_MAX_WORKERS)
 
         args = ['--tag', 'test', '--no-archive',
                 '--from-date', '1970-01-01',
                 '--items-per-page', '75',
                 '--sleep-time', '600',
+                '--max-workers', '8',
                 '--no-ssl-verify',
                 'mydistribution']
 
@@ -1035,6 +1139,7 @@ class TestLaunchpadCommand(unittest.TestCase):
         self.assertTrue(parsed_args.no_archive)
         self.assertEqual(parsed_args.items_per_page, '75')
         self.assertEqual(parsed_args.sleep_time, '600')
+        self.assertEqual(parsed_args.max_workers, 8)
         self.assertFalse(parsed_args.ssl_verify)
 
 
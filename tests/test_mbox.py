@@ -43,7 +43,10 @@ from perceval.backends.core.mbox import (logger,
                                          MBox,
                                          MBoxCommand,
                                          MBoxArchive,
-                                         MailingList)
+                                         MBoxIndex,
+                                         MailingList,
+                                         MBOX_INDEX_FILE,
+                                         MBOX_METADATA_DIR)
 
 
 class TestBaseMBox(unittest.TestCase):
@@ -181,6 +184,157 @@ class TestMBoxArchive(TestBaseMBox):
             self.assertEqual(cm.output[0], 'ERROR:perceval.backends.core.mbox:Zip %s contains more than one file, '
                                            'only the first uncompressed' % mbox.filepath)
 
+    def test_messages(self):
+        """Test whether the messages of plain and compressed archives are read"""
+
+        for filepath in [self.files['single'], self.cfiles['bz2'],
+                         self.cfiles['gz'], self.cfiles['zip']]:
+            mbox = MBoxArchive(filepath)
+            messages = [msg for msg in mbox.messages()]
+
+            self.assertEqual(len(messages), 1)
+            self.assertEqual(messages[0]['Message-ID'], '<4CF64D10.9020206@domain.com>')
+            self.assertEqual(messages[0].get_from(), 'goran at domain.com  Wed Dec  1 08:26:40 2010')
+
+    def test_messages_chunks(self):
+        """Test whether messages split between several chunks are read"""
+
+        filepath = os.path.join(self.tmp_path, 'complex.gz')
+
+        with open(self.files['complex'], 'rb') as f_in:
+            with gzip.open(filepath, 'wb') as f_out:
+                shutil.copyfileobj(f_in, f_out)
+
+        expected = [msg.as_bytes() for msg in MBoxArchive(self.files['complex']).messages()]
+        self.assertEqual(len(expected), 2)
+
+        with unittest.mock.patch('perceval.backends.core.mbox.READ_CHUNK_SIZE', 5):
+            messages = [msg.as_bytes() for msg in MBoxArchive(filepath).messages()]
+
+        self.assertListEqual(messages, expected)
+
+    def test_messages_empty(self):
+        """Test whether no messages are read from an empty archive"""
+
+        filepath = os.path.join(self.tmp_path, 'empty.mbox')
+
+        with open(filepath, 'wb'):
+            pass
+
+        mbox = MBoxArchive(filepath)
+        messages = [msg for msg in mbox.messages()]
+        self.assertListEqual(messages, [])
+
+    def test_read_messages(self):
+        """Test whether raw messages are read together with their offsets"""
+
+        with open(self.files['complex'], 'rb') as fd:
+            data = fd.read()
+
+        mbox = MBoxArchive(self.files['complex'])
+        messages = [msg for msg in mbox.read_messages()]
+
+        self.assertEqual(len(messages), 2)
+        self.assertEqual(messages[0][0], 0)
+        self.assertTrue(messages[1][1].startswith(b'From danilo@adsl-236-193.eunet.yu'))
+
+        for offset, raw_message in messages:
+            self.assertEqual(data[offset:offset + len(raw_message)], raw_message)
+
+        # Only the messages on the given ranges are read
+        ranges = [(messages[1][0], len(messages[1][1]))]
+        self.assertListEqual([msg for msg in mbox.read_messages(ranges=ranges)],
+                             [messages[1]])
+        self.assertListEqual([msg for msg in mbox.read_messages(ranges=[])], [])
+
+    def test_read_messages_compressed(self):
+        """Test whether offsets of compressed archives match the plain ones"""
+
+        filepath = os.path.join(self.tmp_path, 'complex.bz2')
+
+        with open(self.files['complex'], 'rb') as f_in:
+            with bz2.open(filepath, 'wb') as f_out:
+                shutil.copyfileobj(f_in, f_out)
+
+        expected = [msg for msg in MBoxArchive(self.files['complex']).read_messages()]
+
+        mbox = MBoxArchive(filepath)
+
+        with unittest.mock.patch('perceval.backends.core.mbox.READ_CHUNK_SIZE', 5):
+            messages = [msg for msg in mbox.read_messages()]
+
+        self.assertListEqual(messages, expected)
+
+        ranges = [(expected[1][0], len(expected[1][1]))]
+        self.assertListEqual([msg for msg in mbox.read_messages(ranges=ranges)],
+                             [expected[1]])
+
+
+class TestMBoxIndex(TestBaseMBox):
+    """Tests for MBoxIndex class"""
+
+    def tearDown(self):
+        shutil.rmtree(os.path.join(self.tmp_path, MBOX_METADATA_DIR), ignore_errors=True)
+
+    def test_index_path(self):
+        """Test whether the index is stored within the mboxes directory"""
+
+        index = MBoxIndex(self.tmp_path + '/')
+        self.assertEqual(index.index_path, os.path.join(self.tmp_path, '.perceval', 'index.json'))
+
+        index = MBoxIndex('.')
+        self.assertEqual(index.index_path, os.path.join('.', '.perceval', 'index.json'))
+
+        # Indexes of mbox files are stored in their directories
+        index = MBoxIndex(self.files['single'])
+        self.assertEqual(index.index_path, os.path.join(self.tmp_path, '.perceval', 'index.json'))
+
+    def test_update(self):
+        """Test whether entries are only returned while mboxes do not change"""
+
+        mbox = MBoxArchive(self.files['single'])
+        entries = [[0, 10, '<msg@example.com>', 1291210000.0]]
+
+        index = MBoxIndex(self.tmp_path)
+        signature = index.signature(mbox)
+
+        self.assertEqual(signature[0], os.path.getsize(self.files['single']))
+        self.assertIsNone(index.get(mbox, signature))
+
+        index.update(mbox, signature, entries)
+        self.assertListEqual(index.get(mbox, signature), entries)
+        self.assertIsNone(index.get(mbox, [signature[0] + 1, signature[1]]))
+
+        index.save()
+
+        index = MBoxIndex(self.tmp_path)
+        index.load()
+        self.assertListEqual(index.get(mbox, signature), entries)
+
+    def test_save_not_modified(self):
+        """Test whether the index is not written when it was not modified"""
+
+        index = MBoxIndex(self.tmp_path)
+        index.load()
+        index.save()
+
+        self.assertFalse(os.path.exists(index.index_path))
+
+    def test_load_invalid(self):
+        """Test whether invalid index files are ignored"""
+
+        index = MBoxIndex(self.tmp_path)
+
+        os.makedirs(os.path.dirname(index.index_path))
+        with open(index.index_path, 'w') as fd:
+            fd.write('{invalid')
+
+        with self.assertLogs(logger, level='WARNING') as cm:
+            index.load()
+            self.assertRegex(cm.output[-1], 'Ignoring .* index file')
+
+        self.assertDictEqual(index.mboxes, {})
+
 
 class TestMailingList(TestBaseMBox):
     """Tests for MailingList class"""
@@ -210,6 +364,25 @@ class TestMailingList(TestBaseMBox):
         self.assertEqual(mboxes[7].filepath, self.files['unknown'])
         self.assertEqual(mboxes[8].filepath, self.cfiles['zip'])
 
+    def test_mboxes_metadata(self):
+        """Check whether the metadata of the mboxes is not returned as a mbox"""
+
+        metadata_path = os.path.join(self.tmp_path, MBOX_METADATA_DIR)
+        os.makedirs(metadata_path)
+
+        try:
+            with open(os.path.join(metadata_path, MBOX_INDEX_FILE), 'w') as fd:
+                fd.write('{}')
+
+            mls = MailingList('test', self.tmp_path)
+
+            mboxes = mls.mboxes
+            self.assertEqual(len(mboxes), 9)
+            self.assertNotIn(MBOX_METADATA_DIR, [os.path.basename(os.path.dirname(mbox.filepath))
+                                                 for mbox in mboxes])
+        finally:
+            shutil.rmtree(metadata_path)
+
     @unittest.mock.patch('perceval.backends.core.mbox.check_compressed_file_type')
     def test_mboxes_error(self, mock_check_compressed_file_type):
         """Check whether OSError exceptions are properly handled"""
@@ -255,6 +428,13 @@ class TestMBoxBackend(TestBaseMBox):
         self.assertEqual(backend.origin, 'http://example.com/')
         self.assertEqual(backend.tag, 'http://example.com/')
         self.assertFalse(backend.ssl_verify)
+        self.assertEqual(backend.parse_workers, 1)
+
+        backend = MBox('http://example.com/', self.tmp_path, parse_workers=4)
+        self.assertEqual(backend.parse_workers, 4)
+
+        backend = MBox('http://example.com/', self.tmp_path, parse_workers=0)
+        self.assertEqual(backend.parse_workers, 1)
 
     def test_has_archiving(self):
         """Test if it returns False when has_archiving is called"""
@@ -336,6 +516,138 @@ class TestMBoxBackend(TestBaseMBox):
             self.assertEqual(message['category'], 'message')
             self.assertEqual(message['tag'], 'http://example.com/')
 
+    def test_fetch_parallel(self):
+        """Test whether messages are parsed by a pool of processes"""
+
+        from_date = datetime.datetime(2008, 1, 1)
+
+        backend = MBox('http://example.com/', self.tmp_path)
+        expected = [m for m in backend.fetch(from_date=from_date)]
+
+        backend = MBox('http://example.com/', self.tmp_path, parse_workers=2)
+        messages = [m for m in backend.fetch(from_date=from_date)]
+
+        self.assertEqual(len(messages), 8)
+
+        for message, expected_message in zip(messages, expected):
+            self.assertEqual(message['uuid'], expected_message['uuid'])
+            self.assertDictEqual(message['data'], expected_message['data'])
+
+    @unittest.mock.patch('perceval.backends.core.mbox.PARSE_BATCH_SIZE', 1)
+    def test_fetch_parallel_ignore_messages(self):
+        """Test if the pool of processes ignores messages without mandatory fields"""
+
+        backend = MBox('http://example.com/', self.tmp_error_path, parse_workers=2)
+        messages = [m for m in backend.fetch()]
+
+        self.assertEqual(len(messages), 2)
+        self.assertEqual(messages[0]['data']['Message-ID'], '<4CF64D10.9020206@domain.com>')
+        self.assertEqual(messages[1]['data']['Message-ID'], '<4CF64D10.9020206@domain.com>')
+
+    def test_fetch_index(self):
+        """Test whether messages before from_date are skipped using the index"""
+
+        tmp_path_idx = tempfile.mkdtemp(prefix='perceval_')
+        mbox_path = os.path.join(tmp_path_idx, 'mbox_complex.mbox')
+
+        shutil.copy(self.files['complex'], tmp_path_idx)
+        shutil.copy(self.files['single'], tmp_path_idx)
+
+        # The first time, all the messages are parsed and indexed
+        backend = MBox('http://example.com/', tmp_path_idx)
+        messages = [m for m in backend.fetch()]
+        self.assertEqual(len(messages), 3)
+
+        index = MBoxIndex(tmp_path_idx)
+        index.load()
+
+        entries = index.get(MBoxArchive(mbox_path), index.signature(MBoxArchive(mbox_path)))
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(entries[0][0], 0)
+        self.assertEqual(entries[0][2], '<BAY12-DAV6Dhd2stb2e0000c0ce@hotmail.com>')
+        self.assertEqual(entries[0][3], 1095843820.0)
+        self.assertEqual(entries[1][3], 1205746505.0)
+
+        # Messages sent before the given date are not parsed
+        from_date = datetime.datetime(2008, 1, 1)
+        expected = [m for m in messages if m['updated_on'] >= from_date.timestamp()]
+
+        parse_raw_message = MBox._parse_raw_message
+
+        with unittest.mock.patch('perceval.backends.core.mbox.MBox._parse_raw_message',
+                                 side_effect=parse_raw_message) as mock_parse:
+            backend = MBox('http://example.com/', tmp_path_idx)
+            messages = [m for m in backend.fetch(from_date=from_date)]
+            self.assertEqual(mock_parse.call_count, 2)
+
+        self.assertEqual(len(messages), 2)
+        self.assertListEqual([m['uuid'] for m in messages],
+                             [m['uuid'] for m in expected])
+        self.assertDictEqual(messages[0]['data'], expected[0]['data'])
+
+        # Modified mboxes are indexed again
+        with open(self.files['single'], 'rb') as f_in:
+            with open(mbox_path, 'ab') as f_out:
+                f_out.write(b'\n')
+                shutil.copyfileobj(f_in, f_out)
+
+        with unittest.mock.patch('perceval.backends.core.mbox.MBox._parse_raw_message',
+                                 side_effect=parse_raw_message) as mock_parse:
+            backend = MBox('http://example.com/', tmp_path_idx)
+            messages = [m for m in backend.fetch(from_date=from_date)]
+            self.assertEqual(mock_parse.call_count, 4)
+
+        self.assertEqual(len(messages), 3)
+
+        shutil.rmtree(tmp_path_idx)
+
+    def test_fetch_index_relative_path(self):
+        """Test whether the index of a relative directory is stored within it"""
+
+        tmp_path_rel = tempfile.mkdtemp(prefix='perceval_')
+        mboxes_path = os.path.join(tmp_path_rel, 'mboxes')
+        os.makedirs(mboxes_path)
+
+        shutil.copy(self.files['complex'], mboxes_path)
+        shutil.copy(self.files['single'], mboxes_path)
+
+        cwd = os.getcwd()
+
+        try:
+            os.chdir(mboxes_path)
+
+            backend = MBox('http://example.com/', '.')
+            messages = [m for m in backend.fetch()]
+            self.assertEqual(len(messages), 3)
+
+            # The index is not read as a mbox on the next fetches
+            backend = MBox('http://example.com/', '.')
+            messages = [m for m in backend.fetch()]
+            self.assertEqual(len(messages), 3)
+            self.assertEqual(backend.summary.skipped, 0)
+
+            self.assertListEqual(sorted(os.listdir('.')),
+                                 ['.perceval', 'mbox_complex.mbox', 'mbox_single.mbox'])
+            self.assertListEqual(os.listdir('.perceval'), ['index.json'])
+            self.assertListEqual(os.listdir(tmp_path_rel), ['mboxes'])
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(tmp_path_rel)
+
+    def test_fetch_index_invalid_messages(self):
+        """Test whether invalid messages are indexed and ignored"""
+
+        backend = MBox('http://example.com/', self.tmp_error_path)
+        messages = [m for m in backend.fetch()]
+        self.assertEqual(len(messages), 2)
+
+        with unittest.mock.patch('perceval.backends.core.mbox.MBox._parse_raw_message') as mock_parse:
+            backend = MBox('http://example.com/', self.tmp_error_path)
+            messages = [m for m in backend.fetch(from_date=datetime.datetime(2020, 1, 1))]
+            mock_parse.assert_not_called()
+
+        self.assertListEqual(messages, [])
+
     @unittest.mock.patch('perceval.backends.core.mbox.str_to_datetime')
     def test_fetch_exception(self, mock_str_to_datetime):
         """Test whether an exception is thrown when the the fetch_items method fails"""
@@ -382,33 +694,29 @@ class TestMBoxBackend(TestBaseMBox):
 
         tmp_path_ign = tempfile.mkdtemp(prefix='perceval_')
 
-        def copy_mbox_side_effect(*args, **kwargs):
-            """Copy a mbox archive or raise IO error for 'mbox_multipart.mbox' archive"""
+        read_messages = MBoxArchive.read_messages
+
+        def read_messages_side_effect(mbox, ranges=None):
+            """Read a mbox archive or raise IO error for 'mbox_multipart.mbox' archive"""
 
             error_file = os.path.join(tmp_path_ign, 'mbox_multipart.mbox')
-            mbox = args[0]
 
             if mbox.filepath == error_file:
                 raise OSError('Mock error')
 
-            tmp_path = tempfile.mktemp(prefix='perceval_')
-
-            with mbox.container as f_in:
-                with open(tmp_path, mode='wb') as f_out:
-                    for l in f_in:
-                        f_out.write(l)
-            return tmp_path
+            return read_messages(mbox, ranges=ranges)
 
         shutil.copy(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data/mbox/mbox_single.mbox'),
                     tmp_path_ign)
         shutil.copy(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data/mbox/mbox_multipart.mbox'),
                     tmp_path_ign)
 
-        # Mock 'copy_mbox' method for forcing to raise an OSError
+        # Mock 'read_messages' method for forcing to raise an OSError
         # with file 'data/mbox/mbox_multipart.mbox' to check if
         # the code ignores this file
-        with unittest.mock.patch('perceval.backends.core.mbox.MBox._copy_mbox') as mock_copy_mbox:
-            mock_copy_mbox.side_effect = copy_mbox_side_effect
+        with unittest.mock.patch('perceval.backends.core.mbox.MBoxArchive.read_messages',
+                                 autospec=True) as mock_read_messages:
+            mock_read_messages.side_effect = read_messages_side_effect
 
             backend = MBox('http://example.com/', tmp_path_ign)
             messages = [m for m in backend.fetch()]
@@ -582,11 +890,13 @@ class TestMBoxCommand(unittest.TestCase):
         self.assertEqual(parsed_args.tag, 'test')
         self.assertEqual(parsed_args.from_date, DEFAULT_DATETIME)
         self.assertTrue(parsed_args.ssl_verify)
+        self.assertEqual(parsed_args.parse_workers, 1)
 
         args = ['http://example.com/', '/tmp/perceval/',
                 '--tag', 'test',
                 '--from-date', '1970-01-01',
-                '--no-ssl-verify']
+                '--no-ssl-verify',
+                '--parse-workers', '4']
 
         parsed_args = parser.parse(*args)
         self.assertEqual(parsed_args.uri, 'http://example.com/')
@@ -594,6 +904,7 @@ class TestMBoxCommand(unittest.TestCase):
         self.assertEqual(parsed_args.tag, 'test')
         self.assertEqual(parsed_args.from_date, DEFAULT_DATETIME)
         self.assertFalse(parsed_args.ssl_verify)
+        self.assertEqual(parsed_args.parse_workers, 4)
 
 
 if __name__ == "__main__":
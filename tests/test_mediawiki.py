@@ -29,6 +29,7 @@
 import datetime
 import dateutil
 import httpretty
+import json
 import os
 import pkg_resources
 import unittest
@@ -67,7 +68,7 @@ class HTTPServer():
     requests_http = []  # requests done to the server
 
     @classmethod
-    def routes(cls, version="1.28", empty=False, response_num=200):
+    def routes(cls, version="1.28", empty=False, response_num=200, rvcontinue=False):
         """Configure in http the routes to be served"""
 
         assert(version in TESTED_VERSIONS)
@@ -96,6 +97,31 @@ class HTTPServer():
         mediawiki_page_476589 = read_file('data/mediawiki/mediawiki_page_476589_revisions.json')
         mediawiki_page_476590 = read_file('data/mediawiki/mediawiki_page_476590_revisions.json')
 
+        def last_revisions(raw_page, revisions=None):
+            # Last response of the revisions of a page
+            page_json = json.loads(raw_page)
+            page_json.pop('continue', None)
+            for page in page_json['query']['pages'].values():
+                page.pop('revisions', None)
+                if revisions:
+                    page['revisions'] = revisions
+            return json.dumps(page_json)
+
+        mediawiki_page_476583_next = last_revisions(mediawiki_page_476583)
+        mediawiki_page_592384_next = last_revisions(mediawiki_page_592384)
+        mediawiki_page_476589_next = last_revisions(mediawiki_page_476589)
+        mediawiki_page_476590_next = last_revisions(mediawiki_page_476590)
+
+        # Split the revisions of a page in two responses
+        if rvcontinue:
+            page_json = json.loads(mediawiki_page_592384)
+            revisions = page_json['query']['pages']['592384']['revisions']
+            page_json['query']['pages']['592384']['revisions'] = revisions[:1]
+            page_json['continue'] = {'rvcontinue': '20160622|%s' % revisions[1]['revid'],
+                                     'continue': '||'}
+            mediawiki_page_592384 = json.dumps(page_json)
+            mediawiki_page_592384_next = last_revisions(mediawiki_page_592384, revisions[1:])
+
         def request_callback(method, uri, headers):
             params = urllib.parse.parse_qs(urllib.parse.urlparse(uri).query)
             if 'meta' in params and 'siteinfo' in params['meta']:
@@ -109,6 +135,15 @@ class HTTPServer():
                     body = mediawiki_pages_recent_changes
                 elif 'allrevisions' in params['list']:
                     body = mediawiki_pages_allrevisions
+            elif 'pageids' in params and 'rvcontinue' in params:
+                if params['pageids'][0] == '476583':
+                    body = mediawiki_page_476583_next
+                elif params['pageids'][0] == '592384':
+                    body = mediawiki_page_592384_next
+                elif params['pageids'][0] == '476589':
+                    body = mediawiki_page_476589_next
+                elif params['pageids'][0] == '476590':
+                    body = mediawiki_page_476590_next
             elif 'pageids' in params:
                 if params['pageids'][0] == '476583':
                     body = mediawiki_page_476583
@@ -164,6 +199,7 @@ class TestMediaWikiBackend(unittest.TestCase):
         self.assertEqual(mediawiki.tag, 'test')
         self.assertIsNone(mediawiki.client)
         self.assertTrue(mediawiki.ssl_verify)
+        self.assertEqual(mediawiki.max_workers, 1)
 
         # When tag is empty or None it will be set to
         # the value in url
@@ -178,6 +214,12 @@ class TestMediaWikiBackend(unittest.TestCase):
         self.assertEqual(mediawiki.origin, MEDIAWIKI_SERVER_URL)
         self.assertEqual(mediawiki.tag, MEDIAWIKI_SERVER_URL)
 
+        mediawiki = MediaWiki(MEDIAWIKI_SERVER_URL, max_workers=4)
+        self.assertEqual(mediawiki.max_workers, 4)
+
+        mediawiki = MediaWiki(MEDIAWIKI_SERVER_URL, max_workers=0)
+        self.assertEqual(mediawiki.max_workers, 1)
+
     def test_has_archiving(self):
         """Test if it returns True when has_archiving is called"""
 
@@ -224,16 +266,17 @@ class TestMediaWikiBackend(unittest.TestCase):
 
     @httpretty.activate
     @unittest.mock.patch('perceval.backends.core.mediawiki.datetime_utcnow')
-    def _test_fetch_version(self, version, mock_utcnow, from_date=None, reviews_api=False):
+    def _test_fetch_version(self, version, mock_utcnow, from_date=None, reviews_api=False,
+                            max_workers=1, rvcontinue=False):
         """Test whether the pages with their reviews are returned"""
 
-        HTTPServer.routes(version)
+        HTTPServer.routes(version, rvcontinue=rvcontinue)
 
         mock_utcnow.return_value = datetime.datetime(2016, 6, 10,
                                                      tzinfo=dateutil.tz.tzutc())
 
         # Test fetch pages with their reviews
-        mediawiki = MediaWiki(MEDIAWIKI_SERVER_URL)
+        mediawiki = MediaWiki(MEDIAWIKI_SERVER_URL, max_workers=max_workers)
 
         if from_date:
             # Set flag to ignore MAX_RECENT_DAYS exception
@@ -280,10 +323,10 @@ class TestMediaWikiBackend_1_23(TestMediaWikiBackend):
 
         with self.assertLogs(logger, level='WARNING') as cm:
             self._test_fetch_version("1.23", from_date=from_date)
-            self.assertEqual(cm.output[0],
+            self.assertIn('WARNING:perceval.backends.core.mediawiki:Missing pageid in page', cm.output[0])
+            self.assertEqual(cm.output[1],
                              'WARNING:perceval.backends.core.mediawiki:Revisions not found in OldEditor:Test '
                              '[page id: 476589], page skipped')
-            self.assertIn('WARNING:perceval.backends.core.mediawiki:Missing pageid in page', cm.output[1])
 
     @httpretty.activate
     def test_fetch_empty(self):
@@ -321,10 +364,10 @@ class TestMediaWikiBackend_1_28(TestMediaWikiBackend):
 
         with self.assertLogs(logger, level='WARNING') as cm:
             self._test_fetch_version("1.28", from_date=from_date)
-            self.assertEqual(cm.output[0],
+            self.assertIn('WARNING:perceval.backends.core.mediawiki:Missing pageid in page', cm.output[0])
+            self.assertEqual(cm.output[1],
                              'WARNING:perceval.backends.core.mediawiki:Revisions not found in OldEditor:Test '
                              '[page id: 476589], page skipped')
-            self.assertIn('WARNING:perceval.backends.core.mediawiki:Missing pageid in page', cm.output[1])
 
         with self.assertLogs(logger, level='WARNING') as cm:
             self._test_fetch_version("1.28", from_date=from_date, reviews_api=True)
@@ -343,6 +386,33 @@ class TestMediaWikiBackend_1_28(TestMediaWikiBackend):
 
         self.assertEqual(len(pages), 0)
 
+    def test_fetch_parallel(self):
+        """Test whether the pages are returned in order when revisions are fetched concurrently"""
+
+        with self.assertLogs(logger, level='WARNING') as cm:
+            self._test_fetch_version("1.28", max_workers=4)
+            self.assertIn('WARNING:perceval.backends.core.mediawiki:Revisions not found in NewEditor:Test '
+                          '[page id: 476589], page skipped', cm.output)
+
+        with self.assertLogs(logger, level='WARNING') as cm:
+            self._test_fetch_version("1.28", reviews_api=True, max_workers=4)
+            self.assertIn('WARNING:perceval.backends.core.mediawiki:Revisions not found in NewEditor:Test '
+                          '[page id: 476589], page skipped', cm.output)
+
+    def test_fetch_rvcontinue(self):
+        """Test whether the revisions of a page split in several responses are merged"""
+
+        with self.assertLogs(logger, level='WARNING'):
+            self._test_fetch_version("1.28", rvcontinue=True)
+
+        with self.assertLogs(logger, level='WARNING'):
+            self._test_fetch_version("1.28", reviews_api=True, rvcontinue=True)
+
+        rvcontinue_requests = [req for req in HTTPServer.requests_http
+                               if req.querystring.get('pageids', None) == ['592384'] and
+                               'rvcontinue' in req.querystring]
+        self.assertEqual(len(rvcontinue_requests), 2)
+
 
 class TestMediaWikiBackendArchive(TestCaseBackendArchive):
     """MediaWiki backend tests using an archive"""
@@ -375,10 +445,10 @@ class TestMediaWikiBackendArchive1_23(TestMediaWikiBackendArchive):
 
         with self.assertLogs(logger, level='WARNING') as cm:
             self._test_version("1.23")
-            self.assertEqual(cm.output[0],
+            self.assertIn('WARNING:perceval.backends.core.mediawiki:Missing pageid in page', cm.output[0])
+            self.assertEqual(cm.output[1],
                              'WARNING:perceval.backends.core.mediawiki:Revisions not found in OldEditor:Test '
                              '[page id: 476589], page skipped')
-            self.assertIn('WARNING:perceval.backends.core.mediawiki:Missing pageid in page', cm.output[1])
 
 
 class TestMediaWikiBackendArchive1_28(TestMediaWikiBackendArchive):
@@ -390,10 +460,10 @@ class TestMediaWikiBackendArchive1_28(TestMediaWikiBackendArchive):
 
         with self.assertLogs(logger, level='WARNING') as cm:
             self._test_version("1.28")
-            self.assertEqual(cm.output[0],
+            self.assertIn('WARNING:perceval.backends.core.mediawiki:Missing pageid in page', cm.output[0])
+            self.assertEqual(cm.output[1],
                              'WARNING:perceval.backends.core.mediawiki:Revisions not found in OldEditor:Test '
                              '[page id: 476589], page skipped')
-            self.assertIn('WARNING:perceval.backends.core.mediawiki:Missing pageid in page', cm.output[1])
 
     @httpretty.activate
     def test_fetch_from_archive_reviews(self):
@@ -603,6 +673,29 @@ class TestMediaWikiClient(unittest.TestCase):
         }
         self.assertDictEqual(req.querystring, expected)
 
+    @httpretty.activate
+    def test_get_revisions_rvcontinue(self):
+        HTTPServer.routes()
+        client = MediaWikiClient(MEDIAWIKI_SERVER_URL)
+
+        dt = str_to_datetime('2016-01-01 00:00')
+        response = client.get_revisions(476583, last_date=dt, rvcontinue='20160622|2000')
+        req = HTTPServer.requests_http[-1]
+        self.assertNotIn('continue', json.loads(response))
+        self.assertEqual(req.method, 'GET')
+        self.assertRegex(req.path, '/api.php')
+        # Check request params
+        expected = {
+            'action': ['query'],
+            'prop': ['revisions'],
+            'pageids': ['476583'],
+            'format': ['json'],
+            'rvlimit': ['max'],
+            'rvdir': ['newer'],
+            'rvcontinue': ['20160622|2000']
+        }
+        self.assertDictEqual(req.querystring, expected)
+
     @httpretty.activate
     def test_get_pages_from_allrevisions(self):
         HTTPServer.routes()
@@ -719,6 +812,13 @@ class TestMediaWikiCommand(unittest.TestCase):
         self.assertTrue(parsed_args.no_archive)
         self.assertFalse(parsed_args.ssl_verify)
         self.assertEqual(parsed_args.from_date, DEFAULT_DATETIME)
+        self.assertEqual(parsed_args.max_workers, 1)
+
+        args = ['--max-workers', '4', MEDIAWIKI_SERVER_URL]
+
+        parsed_args = parser.parse(*args)
+        self.assertEqual(parsed_args.url, MEDIAWIKI_SERVER_URL)
+        self.assertEqual(parsed_args.max_workers, 4)
 
 
 if __name__ == "__main__":
@@ -70,6 +70,8 @@ class MockNNTPLib:
             4: ('<mailman.5377.1312994002.4544.community-arab-world@lists.example.com>',
                 os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data/nntp/nntp_parsing_error.txt'))
         }
+        self.selected_group = None
+        self.closed = False
 
     def __enter__(self):
         return self
@@ -78,6 +80,7 @@ class MockNNTPLib:
         pass
 
     def group(self, name):
+        self.selected_group = name
         return None, None, 1, 4, None
 
     def over(self, message_spec):
@@ -99,7 +102,7 @@ class MockNNTPLib:
         return None, MockArticleInfo(article_id, message_id, lines)
 
     def quit(self):
-        pass
+        self.closed = True
 
 
 class TestNNTPBackend(unittest.TestCase):
@@ -115,6 +118,7 @@ class TestNNTPBackend(unittest.TestCase):
         self.assertEqual(nntp.group, NNTP_GROUP)
         self.assertEqual(nntp.origin, expected_origin)
         self.assertEqual(nntp.tag, 'test')
+        self.assertEqual(nntp.max_workers, 1)
         self.assertIsNone(nntp.client)
 
         # When tag is empty or None it will be set to
@@ -133,6 +137,12 @@ class TestNNTPBackend(unittest.TestCase):
         self.assertEqual(nntp.tag, expected_origin)
         self.assertIsNone(nntp.client)
 
+        nntp = NNTP(NNTP_SERVER, NNTP_GROUP, max_workers=4)
+        self.assertEqual(nntp.max_workers, 4)
+
+        nntp = NNTP(NNTP_SERVER, NNTP_GROUP, max_workers=0)
+        self.assertEqual(nntp.max_workers, 1)
+
     def test_has_archiving(self):
         """Test if it returns True when has_archiving is called"""
 
@@ -175,6 +185,45 @@ class TestNNTPBackend(unittest.TestCase):
             self.assertEqual(article['category'], 'article')
             self.assertEqual(article['tag'], expected_origin)
 
+    @unittest.mock.patch('nntplib.NNTP')
+    def test_fetch_concurrent(self, mock_nntp):
+        """Test whether articles fetched by several workers are returned in order"""
+
+        connections = []
+
+        def new_connection(host):
+            conn = MockNNTPLib()
+            connections.append(conn)
+            return conn
+
+        mock_nntp.side_effect = new_connection
+
+        nntp = NNTP(NNTP_SERVER, NNTP_GROUP)
+        expected = [article for article in nntp.fetch(offset=None)]
+
+        connections.clear()
+
+        nntp = NNTP(NNTP_SERVER, NNTP_GROUP, max_workers=3)
+        articles = [article for article in nntp.fetch(offset=None)]
+
+        self.assertEqual(len(articles), 2)
+        self.assertListEqual([article['offset'] for article in articles], [1, 2])
+        self.assertListEqual([article['uuid'] for article in articles],
+                             [article['uuid'] for article in expected])
+        self.assertListEqual([article['data'] for article in articles],
+                             [article['data'] for article in expected])
+
+        # Workers use their own connections with the group selected
+        self.assertGreater(len(connections), 1)
+
+        for conn in connections:
+            self.assertEqual(conn.selected_group, NNTP_GROUP)
+
+        nntp.client.quit()
+
+        for conn in connections:
+            self.assertTrue(conn.closed)
+
     @unittest.mock.patch('nntplib.NNTP')
     def test_search_fields(self, mock_nntp):
         """Test whether the search_fields is properly set"""
@@ -295,6 +344,18 @@ class TestNNTPBackendArchive(TestCaseBackendArchive):
         mock_nntp.return_value = MockNNTPLib()
         self._test_fetch_from_archive(offset=3)
 
+    @unittest.mock.patch('nntplib.NNTP')
+    def test_fetch_concurrent_from_archive(self, mock_nntp):
+        """Test whether articles fetched by several workers are read from the archive"""
+
+        mock_nntp.side_effect = lambda host: MockNNTPLib()
+
+        self.backend_write_archive = NNTP(NNTP_SERVER, NNTP_GROUP, archive=self.archive,
+                                          max_workers=3)
+        self.backend_read_archive = NNTP(NNTP_SERVER, NNTP_GROUP, archive=self.archive,
+                                         max_workers=3)
+        self._test_fetch_from_archive()
+
 
 class TestNNTPClient(unittest.TestCase):
     """Tests for NNTPCommand client"""
@@ -395,6 +456,44 @@ class TestNNTPClient(unittest.TestCase):
 
         self.assertEqual(data, archived_data)
 
+    @unittest.mock.patch('nntplib.NNTP')
+    def test_article_batch_archive(self, mock_nntp):
+        """Test whether the entries of buffered archives are written in batches with several workers"""
+
+        mock_nntp.side_effect = lambda host: MockNNTPLib()
+
+        archive = Archive.create(os.path.join(self.test_path, 'mybufferedarchive'), batch_size=3)
+
+        client = NNTTPClient(NNTP_SERVER, archive=archive, from_archive=False,
+                             max_workers=2)
+        self.assertEqual(client.max_workers, 2)
+
+        reader = NNTTPClient(NNTP_SERVER, archive=Archive(archive.archive_path), from_archive=True)
+
+        client.group("example.dev.project-link")
+        article = client.article(1)
+
+        # Entries are not written until the batch is full
+        with self.assertRaises(ArchiveError):
+            reader.article(1)
+
+        with self.assertRaises(nntplib.NNTPTemporaryError):
+            client.article(3)
+
+        self.assertEqual(reader.article(1), article)
+
+        with self.assertRaises(nntplib.NNTPTemporaryError):
+            reader.article(3)
+
+        # Remaining entries are written when flushing
+        article = client.article(2)
+
+        with self.assertRaises(ArchiveError):
+            reader.article(2)
+
+        archive.flush()
+        self.assertEqual(reader.article(2), article)
+
     @unittest.mock.patch('nntplib.NNTP')
     def test_archive_not_provided(self, mock_nntp):
         """Test whether an exception is thrown if the archive is not provided"""
@@ -485,6 +584,14 @@ class TestNNTPCommand(unittest.TestCase):
         self.assertEqual(parsed_args.tag, 'test')
         self.assertEqual(parsed_args.no_archive, True)
         self.assertEqual(parsed_args.offset, 6)
+        self.assertEqual(parsed_args.max_workers, 1)
+
+        args = ['nntp.example.com',
+                'example.dev.project-link',
+                '--max-workers', '4']
+
+        parsed_args = parser.parse(*args)
+        self.assertEqual(parsed_args.max_workers, 4)
 
 
 if __name__ == "__main__":
@@ -31,14 +31,19 @@ import json
 import os
 import pkg_resources
 import requests
+import shutil
+import tempfile
 import unittest
 
 pkg_resources.declare_namespace('perceval.backends')
 
 from perceval.backend import BackendCommandArgumentParser
 from perceval.utils import DEFAULT_DATETIME
-from perceval.backends.core.phabricator import (DEFAULT_SLEEP_TIME,
+from perceval.backends.core.phabricator import (DEFAULT_PHIDS_CACHE_SIZE,
+                                                DEFAULT_PHIDS_CACHE_TTL,
+                                                DEFAULT_SLEEP_TIME,
                                                 MAX_RETRIES,
+                                                PHIDS_CHUNK_SIZE,
                                                 Phabricator,
                                                 PhabricatorCommand,
                                                 ConduitClient,
@@ -71,13 +76,11 @@ def setup_http_server():
     tasks_empty_body = read_file('data/phabricator/phabricator_tasks_empty.json')
     tasks_trans_body = read_file('data/phabricator/phabricator_transactions.json', 'rb')
     tasks_trans_next_body = read_file('data/phabricator/phabricator_transactions_next.json', 'rb')
-    users_body = read_file('data/phabricator/phabricator_users.json', 'rb')
     jane_body = read_file('data/phabricator/phabricator_user_jane.json', 'rb')
     janes_body = read_file('data/phabricator/phabricator_user_janesmith.json', 'rb')
     jdoe_body = read_file('data/phabricator/phabricator_user_jdoe.json', 'rb')
     jrae_body = read_file('data/phabricator/phabricator_user_jrae.json', 'rb')
     jsmith_body = read_file('data/phabricator/phabricator_user_jsmith.json', 'rb')
-    phids_body = read_file('data/phabricator/phabricator_phids.json', 'rb')
     herald_body = read_file('data/phabricator/phabricator_phid_herald.json', 'rb')
     bugreport_body = read_file('data/phabricator/phabricator_project_bugreport.json', 'rb')
     teamdevel_body = read_file('data/phabricator/phabricator_project_devel.json', 'rb')
@@ -96,6 +99,19 @@ def setup_http_server():
         'PHID-PROJ-zi2ndtoy3fh5pnbqzfdo': teamdevel_body
     }
 
+    def compose_users_body(users_ids):
+        result = []
+        for user_id in users_ids:
+            result.extend(json.loads(phids_users[user_id])['result'])
+        return json.dumps({'result': result, 'error_code': None, 'error_info': None})
+
+    def compose_phids_body(phids_ids):
+        result = {}
+        for phid in phids_ids:
+            if phid in phids:
+                result.update(json.loads(phids[phid])['result'])
+        return json.dumps({'result': result, 'error_code': None, 'error_info': None})
+
     def request_callback(method, uri, headers):
         last_request = httpretty.last_request()
         params = json.loads(last_request.parsed_body['params'][0])
@@ -115,15 +131,9 @@ def setup_http_server():
             else:
                 body = tasks_trans_next_body
         elif uri == PHABRICATOR_USERS_URL:
-            if len(params['phids']) == 4:
-                body = users_body
-            else:
-                body = phids_users[params['phids'][0]]
+            body = compose_users_body(params['phids'])
         elif uri == PHABRICATOR_PHIDS_URL:
-            if len(params['phids']) == 2:
-                body = phids_body
-            else:
-                body = phids[params['phids'][0]]
+            body = compose_phids_body(params['phids'])
         elif uri == PHABRICATOR_API_ERROR_URL:
             body = error_body
         else:
@@ -190,6 +200,10 @@ class TestPhabricatorBackend(unittest.TestCase):
         self.assertEqual(phab.max_retries, MAX_RETRIES)
         self.assertEqual(phab.sleep_time, DEFAULT_SLEEP_TIME)
         self.assertFalse(phab.ssl_verify)
+        self.assertEqual(phab.phids_chunk_size, PHIDS_CHUNK_SIZE)
+        self.assertEqual(phab.phids_cache_size, DEFAULT_PHIDS_CACHE_SIZE)
+        self.assertIsNone(phab.phids_cache_path)
+        self.assertEqual(phab.phids_cache_ttl, DEFAULT_PHIDS_CACHE_TTL)
 
         phab = Phabricator(PHABRICATOR_URL, 'AAAA', None, None, 3, 25)
         self.assertEqual(phab.url, PHABRICATOR_URL)
@@ -205,6 +219,14 @@ class TestPhabricatorBackend(unittest.TestCase):
         self.assertEqual(phab.max_retries, 3)
         self.assertEqual(phab.sleep_time, 25)
 
+        phab = Phabricator(PHABRICATOR_URL, 'AAAA', phids_chunk_size=0,
+                           phids_cache_size=10, phids_cache_path='/tmp/phids.db',
+                           phids_cache_ttl=60)
+        self.assertEqual(phab.phids_chunk_size, 1)
+        self.assertEqual(phab.phids_cache_size, 10)
+        self.assertEqual(phab.phids_cache_path, '/tmp/phids.db')
+        self.assertEqual(phab.phids_cache_ttl, 60)
+
     def test_has_archiving(self):
         """Test if it returns True when has_archiving is called"""
 
@@ -338,31 +360,12 @@ class TestPhabricatorBackend(unittest.TestCase):
                 'output': ['json'],
                 'params': {
                     '__conduit__': {'token': 'AAAA'},
-                    'phids': ['PHID-USER-2uk52xorcqb6sjvp467y']
-                }
-            },
-            {
-                '__conduit__': ['True'],
-                'output': ['json'],
-                'params': {
-                    '__conduit__': {'token': 'AAAA'},
-                    'phids': ['PHID-PROJ-zi2ndtoy3fh5pnbqzfdo']
-                }
-            },
-            {
-                '__conduit__': ['True'],
-                'output': ['json'],
-                'params': {
-                    '__conduit__': {'token': 'AAAA'},
-                    'phids': ['PHID-PROJ-2qnt6thbrd7qnx5bitzy']
-                }
-            },
-            {
-                '__conduit__': ['True'],
-                'output': ['json'],
-                'params': {
-                    '__conduit__': {'token': 'AAAA'},
-                    'phids': ['PHID-USER-bjxhrstz5fb5gkrojmev']
+                    'phids': [
+                        'PHID-USER-2uk52xorcqb6sjvp467y',
+                        'PHID-USER-mjr7pnwpg6slsnjcqki7',
+                        'PHID-USER-bjxhrstz5fb5gkrojmev',
+                        'PHID-USER-ojtcpympsmwenszuef7p'
+                    ]
                 }
             },
             {
@@ -370,7 +373,10 @@ class TestPhabricatorBackend(unittest.TestCase):
                 'output': ['json'],
                 'params': {
                     '__conduit__': {'token': 'AAAA'},
-                    'phids': ['PHID-USER-mjr7pnwpg6slsnjcqki7']
+                    'phids': [
+                        'PHID-PROJ-2qnt6thbrd7qnx5bitzy',
+                        'PHID-PROJ-zi2ndtoy3fh5pnbqzfdo'
+                    ]
                 }
             },
             {
@@ -400,14 +406,6 @@ class TestPhabricatorBackend(unittest.TestCase):
                     'phids': ['PHID-USER-pr5fcxy4xk5ofqsfqcfc']
                 }
             },
-            {
-                '__conduit__': ['True'],
-                'output': ['json'],
-                'params': {
-                    '__conduit__': {'token': 'AAAA'},
-                    'phids': ['PHID-USER-ojtcpympsmwenszuef7p']
-                }
-            },
             {
                 '__conduit__': ['True'],
                 'output': ['json'],
@@ -425,6 +423,69 @@ class TestPhabricatorBackend(unittest.TestCase):
             rparams['params'] = json.loads(rparams['params'][0])
             self.assertIn(rparams, expected)
 
+    @httpretty.activate
+    def test_fetch_phids_chunks(self):
+        """Test whether users and projects are requested in chunks"""
+
+        http_requests = setup_http_server()
+
+        phab = Phabricator(PHABRICATOR_URL, 'AAAA', phids_chunk_size=3)
+        tasks = [task for task in phab.fetch()]
+
+        self.assertEqual(len(tasks), 4)
+        self.assertEqual(tasks[0]['data']['fields']['authorData']['userName'], 'jdoe')
+        self.assertEqual(tasks[1]['data']['fields']['ownerData']['userName'], 'janesmith')
+        self.assertEqual(tasks[3]['data']['projects'][0]['name'], 'Team: Devel')
+
+        requested = [(req.path, json.loads(req.parsed_body['params'][0])['phids'])
+                     for req in http_requests if 'phids' in req.parsed_body['params'][0]]
+
+        expected = [
+            ('/api/user.query', ['PHID-USER-2uk52xorcqb6sjvp467y',
+                                 'PHID-USER-mjr7pnwpg6slsnjcqki7',
+                                 'PHID-USER-bjxhrstz5fb5gkrojmev']),
+            ('/api/user.query', ['PHID-USER-ojtcpympsmwenszuef7p']),
+            ('/api/phid.query', ['PHID-PROJ-2qnt6thbrd7qnx5bitzy',
+                                 'PHID-PROJ-zi2ndtoy3fh5pnbqzfdo']),
+            ('/api/user.query', ['PHID-USER-pr5fcxy4xk5ofqsfqcfc']),
+            ('/api/phid.query', ['PHID-APPS-PhabricatorHeraldApplication'])
+        ]
+        self.assertListEqual(requested, expected)
+
+    @httpretty.activate
+    def test_fetch_phids_cache_path(self):
+        """Test whether users and projects are stored between executions"""
+
+        http_requests = setup_http_server()
+
+        tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        cache_path = os.path.join(tmp_path, 'phids.db')
+
+        try:
+            phab = Phabricator(PHABRICATOR_URL, 'AAAA', phids_cache_path=cache_path)
+            tasks = [task for task in phab.fetch()]
+            self.assertEqual(len(http_requests), 8)
+
+            http_requests.clear()
+
+            phab = Phabricator(PHABRICATOR_URL, 'AAAA', phids_cache_path=cache_path)
+            cached_tasks = [task for task in phab.fetch()]
+
+            # Only tasks and transactions are requested
+            self.assertEqual(len(http_requests), 4)
+            self.assertListEqual([task['data'] for task in cached_tasks],
+                                 [task['data'] for task in tasks])
+
+            http_requests.clear()
+
+            # Expired entries are requested again
+            phab = Phabricator(PHABRICATOR_URL, 'AAAA', phids_cache_path=cache_path,
+                               phids_cache_ttl=-1)
+            _ = [task for task in phab.fetch()]
+            self.assertEqual(len(http_requests), 8)
+        finally:
+            shutil.rmtree(tmp_path)
+
     @httpretty.activate
     def test_search_fields(self):
         """Test whether the search_fields is properly set"""
@@ -503,31 +564,11 @@ class TestPhabricatorBackend(unittest.TestCase):
                 'output': ['json'],
                 'params': {
                     '__conduit__': {'token': 'AAAA'},
-                    'phids': ['PHID-USER-2uk52xorcqb6sjvp467y']
-                }
-            },
-            {
-                '__conduit__': ['True'],
-                'output': ['json'],
-                'params': {
-                    '__conduit__': {'token': 'AAAA'},
-                    'phids': ['PHID-PROJ-zi2ndtoy3fh5pnbqzfdo']
-                }
-            },
-            {
-                '__conduit__': ['True'],
-                'output': ['json'],
-                'params': {
-                    '__conduit__': {'token': 'AAAA'},
-                    'phids': ['PHID-USER-ojtcpympsmwenszuef7p']
-                }
-            },
-            {
-                '__conduit__': ['True'],
-                'output': ['json'],
-                'params': {
-                    '__conduit__': {'token': 'AAAA'},
-                    'phids': ['PHID-APPS-PhabricatorHeraldApplication']
+                    'phids': [
+                        'PHID-USER-ojtcpympsmwenszuef7p',
+                        'PHID-USER-pr5fcxy4xk5ofqsfqcfc',
+                        'PHID-USER-2uk52xorcqb6sjvp467y'
+                    ]
                 }
             },
             {
@@ -535,15 +576,11 @@ class TestPhabricatorBackend(unittest.TestCase):
                 'output': ['json'],
                 'params': {
                     '__conduit__': {'token': 'AAAA'},
-                    'phids': ['PHID-USER-pr5fcxy4xk5ofqsfqcfc']
-                }
-            },
-            {
-                '__conduit__': ['True'],
-                'output': ['json'],
-                'params': {
-                    "__conduit__": {"token": "AAAA"},
-                    "phids": ["PHID-PROJ-2qnt6thbrd7qnx5bitzy"]
+                    'phids': [
+                        'PHID-APPS-PhabricatorHeraldApplication',
+                        'PHID-PROJ-zi2ndtoy3fh5pnbqzfdo',
+                        'PHID-PROJ-2qnt6thbrd7qnx5bitzy'
+                    ]
                 }
             }
         ]
@@ -680,6 +717,18 @@ class TestPhabricatorBackendArchive(TestCaseBackendArchive):
         from_date = datetime.datetime(2017, 1, 1, 0, 0, 0)
         self._test_fetch_from_archive(from_date=from_date)
 
+    @httpretty.activate
+    def test_fetch_from_archive_phids_cache_size(self):
+        """Test whether the size of the PHIDs cache does not change the archived requests"""
+
+        setup_http_server()
+
+        self.backend_write_archive = Phabricator(PHABRICATOR_URL, 'AAAA', archive=self.archive,
+                                                 phids_cache_size=1)
+        self.backend_read_archive = Phabricator(PHABRICATOR_URL, 'BBBB', archive=self.archive,
+                                                phids_cache_size=1)
+        self._test_fetch_from_archive()
+
 
 class TestConduitClient(unittest.TestCase):
     """Confluence client unit tests.
@@ -982,6 +1031,10 @@ class TestPhabricatorCommand(unittest.TestCase):
         self.assertEqual(parsed_args.from_date, DEFAULT_DATETIME)
         self.assertEqual(parsed_args.max_retries, MAX_RETRIES)
         self.assertEqual(parsed_args.sleep_time, DEFAULT_SLEEP_TIME)
+        self.assertEqual(parsed_args.phids_chunk_size, PHIDS_CHUNK_SIZE)
+        self.assertEqual(parsed_args.phids_cache_size, DEFAULT_PHIDS_CACHE_SIZE)
+        self.assertIsNone(parsed_args.phids_cache_path)
+        self.assertEqual(parsed_args.phids_cache_ttl, DEFAULT_PHIDS_CACHE_TTL)
 
         args = ['http://example.com',
                 '--api-token', '12345678',
@@ -990,6 +1043,10 @@ class TestPhabricatorCommand(unittest.TestCase):
                 '--from-date', '1970-01-01',
                 '--max-retries', '7',
                 '--sleep-time', '43',
+                '--phids-chunk-size', '20',
+                '--phids-cache-size', '50',
+                '--phids-cache-path', '/tmp/phids.db',
+                '--phids-cache-ttl', '60',
                 '--no-ssl-verify']
 
         parsed_args = parser.parse(*args)
@@ -1000,6 +1057,10 @@ class TestPhabricatorCommand(unittest.TestCase):
         self.assertEqual(parsed_args.from_date, DEFAULT_DATETIME)
         self.assertEqual(parsed_args.max_retries, 7)
         self.assertEqual(parsed_args.sleep_time, 43)
+        self.assertEqual(parsed_args.phids_chunk_size, 20)
+        self.assertEqual(parsed_args.phids_cache_size, 50)
+        self.assertEqual(parsed_args.phids_cache_path, '/tmp/phids.db')
+        self.assertEqual(parsed_args.phids_cache_ttl, 60)
         self.assertFalse(parsed_args.ssl_verify)
 
 
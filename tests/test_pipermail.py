@@ -39,7 +39,9 @@ pkg_resources.declare_namespace('perceval.backends')
 
 from perceval.backend import BackendCommandArgumentParser
 from perceval.utils import DEFAULT_DATETIME
-from perceval.backends.core.mbox import MailingList
+from perceval.backends.core.mbox import (MailingList,
+                                         MBOX_DOWNLOADS_FILE,
+                                         MBOX_METADATA_DIR)
 from perceval.backends.core.pipermail import (Pipermail,
                                               PipermailCommand,
                                               PipermailList)
@@ -80,14 +82,19 @@ class TestPipermailList(unittest.TestCase):
         self.assertEqual(pmls.dirpath, self.tmp_path)
         self.assertEqual(pmls.url, PIPERMAIL_URL)
         self.assertTrue(pmls.ssl_verify)
+        self.assertEqual(pmls.client.base_url, PIPERMAIL_URL)
+        self.assertEqual(pmls.downloader.dirpath, self.tmp_path)
+        self.assertEqual(pmls.downloader.max_workers, 1)
 
-        pmls = PipermailList(PIPERMAIL_URL, self.tmp_path, ssl_verify=False)
+        pmls = PipermailList(PIPERMAIL_URL, self.tmp_path, ssl_verify=False, max_workers=4)
 
         self.assertIsInstance(pmls, MailingList)
         self.assertEqual(pmls.uri, PIPERMAIL_URL)
         self.assertEqual(pmls.dirpath, self.tmp_path)
         self.assertEqual(pmls.url, PIPERMAIL_URL)
         self.assertFalse(pmls.ssl_verify)
+        self.assertFalse(pmls.client.ssl_verify)
+        self.assertEqual(pmls.downloader.max_workers, 4)
 
     @httpretty.activate
     def test_fetch(self):
@@ -128,6 +135,137 @@ class TestPipermailList(unittest.TestCase):
         self.assertEqual(mboxes[1].filepath, os.path.join(self.tmp_path, '2016-March.txt'))
         self.assertEqual(mboxes[2].filepath, os.path.join(self.tmp_path, '2016-April.txt'))
 
+    @httpretty.activate
+    def test_fetch_unchanged(self):
+        """Test whether archives that did not change are not downloaded again"""
+
+        pipermail_index = read_file('data/pipermail/pipermail_index.html')
+        mboxes = {
+            '2015-November.txt.gz': read_file('data/pipermail/pipermail_2015_november.mbox'),
+            '2016-March.txt': read_file('data/pipermail/pipermail_2016_march.mbox'),
+            '2016-April.txt': read_file('data/pipermail/pipermail_2016_april.mbox')
+        }
+        etags = {filename: '"v1"' for filename in mboxes}
+
+        def request_callback(request, uri, headers):
+            filename = uri.split('/')[-1]
+            headers['ETag'] = etags[filename]
+
+            if request.headers.get('If-None-Match') == etags[filename]:
+                return 304, headers, ''
+            else:
+                return 200, headers, mboxes[filename]
+
+        httpretty.register_uri(httpretty.GET,
+                               PIPERMAIL_URL,
+                               body=pipermail_index)
+        for filename in mboxes:
+            httpretty.register_uri(httpretty.GET,
+                                   PIPERMAIL_URL + filename,
+                                   body=request_callback)
+
+        pmls = PipermailList(PIPERMAIL_URL, self.tmp_path)
+        links = pmls.fetch()
+        self.assertEqual(len(links), 3)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_path, MBOX_METADATA_DIR, MBOX_DOWNLOADS_FILE)))
+
+        # Validators are sent on the next requests
+        pmls = PipermailList(PIPERMAIL_URL, self.tmp_path)
+        links = pmls.fetch()
+        self.assertEqual(len(links), 0)
+        self.assertEqual(httpretty.last_request().headers['If-None-Match'], '"v1"')
+
+        # Only the modified archives are downloaded
+        etags['2016-April.txt'] = '"v2"'
+        mboxes['2016-April.txt'] = mboxes['2016-March.txt']
+
+        links = pmls.fetch()
+        self.assertEqual(len(links), 1)
+        self.assertEqual(links[0][0], PIPERMAIL_URL + '2016-April.txt')
+        self.assertEqual(read_file(links[0][1]), mboxes['2016-March.txt'])
+
+        # Archives removed from the local directory are downloaded again
+        os.remove(os.path.join(self.tmp_path, '2015-November.txt.gz'))
+
+        links = pmls.fetch()
+        self.assertEqual(len(links), 1)
+        self.assertEqual(links[0][0], PIPERMAIL_URL + '2015-November.txt.gz')
+        self.assertEqual(len(pmls.mboxes), 3)
+
+    @httpretty.activate
+    def test_fetch_unchanged_content_length(self):
+        """Test whether archives are compared by size when the server does not send validators"""
+
+        pipermail_index = read_file('data/pipermail/pipermail_index.html')
+        mbox_nov = read_file('data/pipermail/pipermail_2015_november.mbox')
+        mbox_march = read_file('data/pipermail/pipermail_2016_march.mbox')
+        mbox_april = read_file('data/pipermail/pipermail_2016_april.mbox')
+
+        httpretty.register_uri(httpretty.GET,
+                               PIPERMAIL_URL,
+                               body=pipermail_index)
+        httpretty.register_uri(httpretty.GET,
+                               PIPERMAIL_URL + '2015-November.txt.gz',
+                               body=mbox_nov)
+        httpretty.register_uri(httpretty.GET,
+                               PIPERMAIL_URL + '2016-March.txt',
+                               body=mbox_march)
+        httpretty.register_uri(httpretty.GET,
+                               PIPERMAIL_URL + '2016-April.txt',
+                               body=mbox_april)
+
+        pmls = PipermailList(PIPERMAIL_URL, self.tmp_path)
+        links = pmls.fetch()
+        self.assertEqual(len(links), 3)
+
+        links = pmls.fetch()
+        self.assertEqual(len(links), 0)
+
+        httpretty.register_uri(httpretty.GET,
+                               PIPERMAIL_URL + '2016-April.txt',
+                               body=mbox_april + mbox_march)
+
+        links = pmls.fetch()
+        self.assertEqual(len(links), 1)
+        self.assertEqual(links[0][0], PIPERMAIL_URL + '2016-April.txt')
+
+    @httpretty.activate
+    def test_fetch_concurrent(self):
+        """Test whether archives are downloaded by several workers"""
+
+        pipermail_index = read_file('data/pipermail/pipermail_index.html')
+        mbox_nov = read_file('data/pipermail/pipermail_2015_november.mbox')
+        mbox_march = read_file('data/pipermail/pipermail_2016_march.mbox')
+        mbox_april = read_file('data/pipermail/pipermail_2016_april.mbox')
+
+        httpretty.register_uri(httpretty.GET,
+                               PIPERMAIL_URL,
+                               body=pipermail_index)
+        httpretty.register_uri(httpretty.GET,
+                               PIPERMAIL_URL + '2015-November.txt.gz',
+                               body=mbox_nov)
+        httpretty.register_uri(httpretty.GET,
+                               PIPERMAIL_URL + '2016-March.txt',
+                               body=mbox_march)
+        httpretty.register_uri(httpretty.GET,
+                               PIPERMAIL_URL + '2016-April.txt',
+                               body=mbox_april)
+
+        pmls = PipermailList(PIPERMAIL_URL, self.tmp_path, max_workers=3)
+        links = pmls.fetch()
+
+        self.assertListEqual(links,
+                             [(PIPERMAIL_URL + '2016-April.txt',
+                               os.path.join(self.tmp_path, '2016-April.txt')),
+                              (PIPERMAIL_URL + '2016-March.txt',
+                               os.path.join(self.tmp_path, '2016-March.txt')),
+                              (PIPERMAIL_URL + '2015-November.txt.gz',
+                               os.path.join(self.tmp_path, '2015-November.txt.gz'))])
+
+        self.assertEqual(read_file(links[0][1]), mbox_april)
+        self.assertEqual(read_file(links[1][1]), mbox_march)
+        self.assertEqual(read_file(links[2][1]), mbox_nov)
+
     def test_search_fields(self):
         """Test whether the search_fields is properly set"""
 
@@ -336,6 +474,13 @@ class TestPipermailBackend(unittest.TestCase):
         self.assertEqual(backend.origin, 'http://example.com/')
         self.assertEqual(backend.tag, 'http://example.com/')
         self.assertTrue(backend.ssl_verify)
+        self.assertEqual(backend.max_workers, 1)
+
+        self.assertEqual(backend.parse_workers, 1)
+
+        backend = Pipermail('http://example.com/', self.tmp_path, max_workers=4, parse_workers=2)
+        self.assertEqual(backend.max_workers, 4)
+        self.assertEqual(backend.parse_workers, 2)
 
     def test_has_archiving(self):
         """Test if it returns False when has_archiving is called"""
@@ -483,7 +628,9 @@ class TestPipermailBackend(unittest.TestCase):
         # For this test, mboxes from March and April should be downloaded.
         expected_downloads = []
 
-        for root, _, files in os.walk(self.tmp_path):
+        for root, dirs, files in os.walk(self.tmp_path):
+            dirs[:] = [d for d in dirs if d != MBOX_METADATA_DIR]
+
             for filename in sorted(files):
                 location = os.path.join(root, filename)
                 expected_downloads.append(location)
@@ -592,12 +739,16 @@ class TestPipermailCommand(unittest.TestCase):
         self.assertEqual(parsed_args.tag, 'test')
         self.assertEqual(parsed_args.from_date, DEFAULT_DATETIME)
         self.assertTrue(parsed_args.ssl_verify)
+        self.assertEqual(parsed_args.max_workers, 1)
+        self.assertEqual(parsed_args.parse_workers, 1)
 
         args = ['http://example.com/',
                 '--mboxes-path', '/tmp/perceval/',
                 '--tag', 'test',
                 '--from-date', '1970-01-01',
-                '--no-ssl-verify']
+                '--no-ssl-verify',
+                '--max-workers', '4',
+                '--parse-workers', '2']
 
         parsed_args = parser.parse(*args)
         self.assertEqual(parsed_args.url, 'http://example.com/')
@@ -605,6 +756,8 @@ class TestPipermailCommand(unittest.TestCase):
         self.assertEqual(parsed_args.tag, 'test')
         self.assertEqual(parsed_args.from_date, DEFAULT_DATETIME)
         self.assertFalse(parsed_args.ssl_verify)
+        self.assertEqual(parsed_args.max_workers, 4)
+        self.assertEqual(parsed_args.parse_workers, 2)
 
 
 if __name__ == "__main__":
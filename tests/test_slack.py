@@ -29,18 +29,29 @@ import dateutil
 import httpretty
 import os
 import pkg_resources
+import queue
+import shutil
+import tempfile
+import threading
+import time
 import unittest
 import unittest.mock
+import urllib.parse
 
 pkg_resources.declare_namespace('perceval.backends')
 
+from perceval.archive import Archive
 from perceval.backend import BackendCommandArgumentParser
 from perceval.utils import DEFAULT_DATETIME
 from perceval.backends.core.slack import (logger,
                                           Slack,
+                                          SlackChannels,
                                           SlackClient,
                                           SlackClientError,
-                                          SlackCommand)
+                                          SlackCommand,
+                                          SlackRateGovernor,
+                                          SlackUsers,
+                                          USER_LOCK_STRIPES)
 from base import TestCaseBackendArchive
 
 
@@ -49,6 +60,7 @@ SLACK_CHANNEL_INFO_URL = SLACK_API_URL + '/channels.info'
 SLACK_CHANNEL_HISTORY_URL = SLACK_API_URL + '/channels.history'
 SLACK_CONVERSATION_MEMBERS = SLACK_API_URL + '/conversations.members'
 SLACK_USER_INFO_URL = SLACK_API_URL + '/users.info'
+SLACK_USERS_LIST_URL = SLACK_API_URL + '/users.list'
 
 
 def read_file(filename, mode='r'):
@@ -78,10 +90,12 @@ def setup_http_server(archived_channel=False):
     user_U0001 = read_file('data/slack/slack_user_U0001.json', 'rb')
     user_U0002 = read_file('data/slack/slack_user_U0002.json', 'rb')
     user_U0003 = read_file('data/slack/slack_user_U0003.json', 'rb')
+    users_list_1 = read_file('data/slack/slack_users_list1.json', 'rb')
+    users_list_2 = read_file('data/slack/slack_users_list2.json', 'rb')
 
     def request_callback(method, uri, headers):
         last_request = httpretty.last_request()
-        params = last_request.querystring
+        params = urllib.parse.parse_qs(urllib.parse.urlparse(uri).query)
 
         status = 200
 
@@ -116,6 +130,11 @@ def setup_http_server(archived_channel=False):
                 body = user_U0002
             else:
                 body = user_U0003
+        elif uri.startswith(SLACK_USERS_LIST_URL):
+            if 'cursor' not in params:
+                body = users_list_1
+            else:
+                body = users_list_2
         elif uri.startswith(SLACK_CONVERSATION_MEMBERS):
             if 'cursor' not in params:
                 body = conversation_members_1
@@ -147,6 +166,12 @@ def setup_http_server(archived_channel=False):
                                httpretty.Response(body=request_callback)
                            ])
 
+    httpretty.register_uri(httpretty.GET,
+                           SLACK_USERS_LIST_URL,
+                           responses=[
+                               httpretty.Response(body=request_callback)
+                           ])
+
     httpretty.register_uri(httpretty.GET,
                            SLACK_CONVERSATION_MEMBERS,
                            responses=[
@@ -170,6 +195,8 @@ class TestSlackBackend(unittest.TestCase):
         self.assertEqual(slack.max_items, 5)
         self.assertIsNone(slack.client)
         self.assertTrue(slack.ssl_verify)
+        self.assertIsNone(slack.user_cache_path)
+        self.assertEqual(slack.user_cache_ttl, 86400)
 
         # When tag is empty or None it will be set to
         # the value in URL
@@ -182,6 +209,10 @@ class TestSlackBackend(unittest.TestCase):
         self.assertEqual(slack.origin, 'https://slack.com/C011DUKE8')
         self.assertEqual(slack.tag, 'https://slack.com/C011DUKE8')
 
+        slack = Slack('C011DUKE8', 'aaaa', user_cache_path='/tmp/users.db', user_cache_ttl=60)
+        self.assertEqual(slack.user_cache_path, '/tmp/users.db')
+        self.assertEqual(slack.user_cache_ttl, 60)
+
     def test_has_archiving(self):
         """Test if it returns True when has_archiving is called"""
 
@@ -297,6 +328,125 @@ class TestSlackBackend(unittest.TestCase):
             self.assertIn((SlackClient.AUTHORIZATION_HEADER, 'Bearer aaaa'), http_requests[i].headers._headers)
             self.assertDictEqual(http_requests[i].querystring, expected[i])
 
+    @httpretty.activate
+    @unittest.mock.patch('perceval.backends.core.slack.datetime_utcnow')
+    def test_fetch_prefetch_users(self, mock_utcnow):
+        """Test if the users directory is loaded before fetching the messages"""
+
+        mock_utcnow.return_value = datetime.datetime(2017, 1, 1,
+                                                     tzinfo=dateutil.tz.tzutc())
+
+        http_requests = setup_http_server()
+
+        slack = Slack('C011DUKE8', 'aaaa', max_items=5)
+        messages = [msg for msg in slack.fetch(from_date=None, prefetch_users=True)]
+
+        expected = ['dizquierdo@example.com', None, 'dizquierdo@example.com',
+                    'jsmanrique@example.com', 'jsmanrique@example.com',
+                    'acs@example.com', 'acs@example.com',
+                    'jsmanrique@example.com', 'acs@example.com']
+
+        self.assertEqual(len(messages), len(expected))
+
+        for message, email in zip(messages, expected):
+            if email:
+                self.assertEqual(message['data']['user_data']['profile']['email'], email)
+            else:
+                self.assertNotIn('user_data', message['data'])
+
+        # Users are not requested one by one
+        expected = [
+            {
+                'limit': ['5']
+            },
+            {
+                'limit': ['5'],
+                'cursor': ['dXNlcjpVMDAwMw==']
+            }
+        ]
+
+        users_requests = [req for req in http_requests if req.path.startswith('/api/users')]
+        self.assertEqual(len(users_requests), len(expected))
+
+        for i in range(len(expected)):
+            self.assertRegex(users_requests[i].path, '/users.list')
+            self.assertDictEqual(users_requests[i].querystring, expected[i])
+
+    @httpretty.activate
+    @unittest.mock.patch('perceval.backends.core.slack.datetime_utcnow')
+    def test_fetch_user_cache(self, mock_utcnow):
+        """Test if users are stored in a database shared between executions"""
+
+        mock_utcnow.return_value = datetime.datetime(2017, 1, 1,
+                                                     tzinfo=dateutil.tz.tzutc())
+
+        http_requests = setup_http_server()
+
+        tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        cache_path = os.path.join(tmp_path, 'users.db')
+
+        def count_users_requests(resource):
+            return len([req for req in http_requests if req.path.startswith('/api/' + resource)])
+
+        try:
+            slack = Slack('C011DUKE8', 'aaaa', max_items=5, user_cache_path=cache_path)
+            messages = [msg for msg in slack.fetch(from_date=None)]
+            self.assertEqual(len(messages), 9)
+            self.assertEqual(count_users_requests('users.info'), 3)
+
+            # Users are read from the database on other executions
+            slack = Slack('C011DUKE8', 'aaaa', max_items=5, user_cache_path=cache_path)
+            messages = [msg for msg in slack.fetch(from_date=None)]
+            self.assertEqual(len(messages), 9)
+            self.assertEqual(messages[0]['data']['user_data']['profile']['email'], 'dizquierdo@example.com')
+            self.assertEqual(count_users_requests('users.info'), 3)
+
+            # The users directory is stored too, so it is requested only once
+            slack = Slack('C011DUKE8', 'aaaa', max_items=5, user_cache_path=cache_path)
+            messages = [msg for msg in slack.fetch(from_date=None, prefetch_users=True)]
+            self.assertEqual(len(messages), 9)
+            self.assertEqual(count_users_requests('users.list'), 2)
+
+            slack = Slack('C011DUKE8', 'aaaa', max_items=5, user_cache_path=cache_path)
+            messages = [msg for msg in slack.fetch(from_date=None, prefetch_users=True)]
+            self.assertEqual(len(messages), 9)
+            self.assertEqual(count_users_requests('users.list'), 2)
+            self.assertEqual(count_users_requests('users.info'), 3)
+
+            # Users and the directory are requested again when they expired
+            slack = Slack('C011DUKE8', 'aaaa', max_items=5, user_cache_path=cache_path,
+                          user_cache_ttl=0)
+            with unittest.mock.patch('perceval.cache.time.time', return_value=time.time() + 10):
+                messages = [msg for msg in slack.fetch(from_date=None, prefetch_users=True)]
+            self.assertEqual(len(messages), 9)
+            self.assertEqual(count_users_requests('users.list'), 4)
+            self.assertEqual(count_users_requests('users.info'), 3)
+        finally:
+            shutil.rmtree(tmp_path)
+
+    @httpretty.activate
+    @unittest.mock.patch('perceval.backends.core.slack.datetime_utcnow')
+    def test_user_cache_not_used_with_archives(self, mock_utcnow):
+        """Test whether the users database is ignored when archiving"""
+
+        mock_utcnow.return_value = datetime.datetime(2017, 1, 1,
+                                                     tzinfo=dateutil.tz.tzutc())
+
+        setup_http_server()
+
+        tmp_path = tempfile.mkdtemp(prefix='perceval_')
+        cache_path = os.path.join(tmp_path, 'users.db')
+        archive = Archive.create(os.path.join(tmp_path, 'archive'))
+
+        try:
+            slack = Slack('C011DUKE8', 'aaaa', max_items=5, archive=archive,
+                          user_cache_path=cache_path)
+            messages = [msg for msg in slack.fetch(from_date=None, prefetch_users=True)]
+            self.assertEqual(len(messages), 9)
+            self.assertFalse(os.path.exists(cache_path))
+        finally:
+            shutil.rmtree(tmp_path)
+
     @httpretty.activate
     @unittest.mock.patch('perceval.backends.core.slack.datetime_utcnow')
     def test_search_fields(self, mock_utcnow):
@@ -609,6 +759,18 @@ class TestSlackBackend(unittest.TestCase):
         self.assertEqual(user['name'], 'acs')
         self.assertEqual(user['profile']['email'], 'acs@example.com')
 
+    def test_parse_users(self):
+        """Test if it parses a users list JSON stream"""
+
+        raw_json = read_file('data/slack/slack_users_list1.json')
+
+        users = Slack.parse_users(raw_json)
+
+        self.assertEqual(len(users), 2)
+        self.assertEqual(users[0]['id'], 'U0001')
+        self.assertEqual(users[0]['profile']['email'], 'acs@example.com')
+        self.assertEqual(users[1]['id'], 'U0002')
+
 
 class TestSlackBackendArchive(TestCaseBackendArchive):
     """Slack backend tests using an archive"""
@@ -629,6 +791,17 @@ class TestSlackBackendArchive(TestCaseBackendArchive):
         setup_http_server()
         self._test_fetch_from_archive(from_date=None)
 
+    @httpretty.activate
+    @unittest.mock.patch('perceval.backends.core.slack.datetime_utcnow')
+    def test_fetch_prefetch_users_from_archive(self, mock_utcnow):
+        """Test if it fetches a list of messages prefetching the users from archive"""
+
+        mock_utcnow.return_value = datetime.datetime(2017, 1, 1,
+                                                     tzinfo=dateutil.tz.tzutc())
+
+        setup_http_server()
+        self._test_fetch_from_archive(from_date=None, prefetch_users=True)
+
     @httpretty.activate
     @unittest.mock.patch('perceval.backends.core.slack.datetime_utcnow')
     def test_fetch_from_date_from_archive(self, mock_utcnow):
@@ -658,6 +831,210 @@ class TestSlackBackendArchive(TestCaseBackendArchive):
         self._test_fetch_from_archive(from_date=from_date)
 
 
+class TestSlackChannels(unittest.TestCase):
+    """SlackChannels tests"""
+
+    def test_initialization(self):
+        """Test whether attributes are initializated"""
+
+        governor = SlackRateGovernor()
+        slack = SlackChannels(['C0001', 'C0002'], 'aaaa', max_items=5, tag='test',
+                              max_workers=4, governor=governor)
+
+        self.assertListEqual(slack.channels, ['C0001', 'C0002'])
+        self.assertEqual(slack.api_token, 'aaaa')
+        self.assertEqual(slack.max_items, 5)
+        self.assertEqual(slack.tag, 'test')
+        self.assertTrue(slack.ssl_verify)
+        self.assertIsNone(slack.user_cache_path)
+        self.assertEqual(slack.user_cache_ttl, 86400)
+        self.assertEqual(slack.max_workers, 4)
+        self.assertIs(slack.governor, governor)
+        self.assertDictEqual(slack.summaries, {})
+
+        slack = SlackChannels(['C0001'], 'aaaa', max_workers=0)
+        self.assertEqual(slack.max_workers, 1)
+        self.assertIsInstance(slack.governor, SlackRateGovernor)
+
+    @httpretty.activate
+    @unittest.mock.patch('perceval.backends.core.slack.datetime_utcnow')
+    def test_fetch(self, mock_utcnow):
+        """Test if it fetches the messages of several channels"""
+
+        mock_utcnow.return_value = datetime.datetime(2017, 1, 1,
+                                                     tzinfo=dateutil.tz.tzutc())
+
+        setup_http_server()
+
+        expected = [msg for msg in Slack('C011DUKE8', 'aaaa', max_items=5).fetch(from_date=None)]
+        self.assertEqual(len(expected), 9)
+        httpretty.reset()
+        setup_http_server()
+
+        slack = SlackChannels(['C011DUKE8', 'CH0', 'C011DUKE8'], 'aaaa', max_items=5, max_workers=2)
+
+        with self.assertLogs(logger, level='WARNING') as cm:
+            messages = [msg for msg in slack.fetch(from_date=None)]
+            self.assertEqual(cm.output[-1],
+                             'WARNING:perceval.backends.core.slack:Ignoring channel CH0 '
+                             'due to: channel_not_found')
+
+        # Items of each channel are returned together and in order
+        self.assertEqual(len(messages), 18)
+
+        for message, expc in zip(messages, expected + expected):
+            self.assertEqual(message['uuid'], expc['uuid'])
+            self.assertEqual(message['origin'], 'https://slack.com/C011DUKE8')
+            self.assertEqual(message['tag'], 'https://slack.com/C011DUKE8')
+            self.assertDictEqual(message['data'], expc['data'])
+
+        self.assertListEqual(sorted(slack.summaries.keys()), ['C011DUKE8', 'CH0'])
+        self.assertEqual(slack.summaries['C011DUKE8'].fetched, 9)
+
+        # Users are requested once for all the channels
+        users_requests = [req for req in httpretty.latest_requests()
+                          if req.path.startswith('/api/users.info')]
+        self.assertEqual(len(users_requests), 3)
+
+    @httpretty.activate
+    @unittest.mock.patch('perceval.backends.core.slack.datetime_utcnow')
+    def test_fetch_prefetch_users(self, mock_utcnow):
+        """Test if the users directory is loaded once for all the channels"""
+
+        mock_utcnow.return_value = datetime.datetime(2017, 1, 1,
+                                                     tzinfo=dateutil.tz.tzutc())
+
+        setup_http_server()
+
+        slack = SlackChannels(['C011DUKE8', 'C011DUKE8'], 'aaaa', max_items=5, tag='test',
+                              max_workers=2)
+        messages = [msg for msg in slack.fetch(from_date=None, prefetch_users=True)]
+
+        self.assertEqual(len(messages), 18)
+        self.assertEqual(messages[0]['tag'], 'test')
+        self.assertEqual(messages[0]['data']['user_data']['profile']['email'], 'dizquierdo@example.com')
+
+        requests = httpretty.latest_requests()
+        self.assertEqual(len([req for req in requests if req.path.startswith('/api/users.list')]), 2)
+        self.assertEqual(len([req for req in requests if req.path.startswith('/api/users.info')]), 0)
+
+    @httpretty.activate
+    @unittest.mock.patch('perceval.backends.core.slack.datetime_utcnow')
+    def test_fetch_worker_finished(self, mock_utcnow):
+        """Test if the last messages of a finished worker are read"""
+
+        mock_utcnow.return_value = datetime.datetime(2017, 1, 1,
+                                                     tzinfo=dateutil.tz.tzutc())
+
+        setup_http_server()
+
+        class FinishedQueue(queue.Queue):
+            """Queue that times out once the worker has finished"""
+
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.done = threading.Event()
+                self.timed_out = False
+
+            def put(self, item, *args, **kwargs):
+                super().put(item, *args, **kwargs)
+                if item[0] == 'done':
+                    self.done.set()
+
+            def get(self, *args, **kwargs):
+                if not self.timed_out:
+                    self.timed_out = True
+                    self.done.wait()
+                    time.sleep(0.1)
+                    raise queue.Empty
+                return super().get(*args, **kwargs)
+
+        slack = SlackChannels(['C011DUKE8'], 'aaaa', max_items=5)
+
+        with unittest.mock.patch('perceval.backends.core.slack.queue.Queue', FinishedQueue):
+            messages = [msg for msg in slack.fetch(from_date=None)]
+
+        self.assertEqual(len(messages), 9)
+        self.assertEqual(slack.summaries['C011DUKE8'].fetched, 9)
+
+    @httpretty.activate
+    @unittest.mock.patch('perceval.backends.core.slack.datetime_utcnow')
+    def test_fetch_governor(self, mock_utcnow):
+        """Test if the requests are throttled by the governor"""
+
+        mock_utcnow.return_value = datetime.datetime(2017, 1, 1,
+                                                     tzinfo=dateutil.tz.tzutc())
+
+        setup_http_server()
+
+        governor = unittest.mock.Mock(wraps=SlackRateGovernor())
+        slack = SlackChannels(['C011DUKE8'], 'aaaa', max_items=5, governor=governor)
+        messages = [msg for msg in slack.fetch(from_date=None)]
+
+        self.assertEqual(len(messages), 9)
+
+        methods = [call[0][0] for call in governor.acquire.call_args_list]
+        self.assertListEqual(methods, ['channels.info', 'conversations.members', 'conversations.members',
+                                       'channels.history', 'users.info', 'users.info', 'users.info',
+                                       'channels.history'])
+
+
+class TestSlackUsers(unittest.TestCase):
+    """SlackUsers tests"""
+
+    def test_user_locks(self):
+        """Test whether users share a fixed number of locks"""
+
+        users = SlackUsers(SlackClient('aaaa'))
+
+        locks = {users._get_lock('U%s' % i) for i in range(USER_LOCK_STRIPES * 4)}
+        self.assertLessEqual(len(locks), USER_LOCK_STRIPES)
+        self.assertEqual(len(users._locks), USER_LOCK_STRIPES)
+        self.assertIs(users._get_lock('U0'), users._get_lock('U0'))
+
+
+class TestSlackRateGovernor(unittest.TestCase):
+    """SlackRateGovernor tests"""
+
+    def test_rates(self):
+        """Test whether the rates of the methods are set by their tiers"""
+
+        governor = SlackRateGovernor()
+        self.assertEqual(governor.rate('channels.history'), 50)
+        self.assertEqual(governor.rate('conversations.members'), 100)
+        self.assertEqual(governor.rate('users.info'), 100)
+        self.assertEqual(governor.rate('users.list'), 20)
+        self.assertEqual(governor.rate('unknown.method'), 50)
+
+        governor = SlackRateGovernor(rates={'users.list': 5, 'unknown.method': 1})
+        self.assertEqual(governor.rate('users.list'), 5)
+        self.assertEqual(governor.rate('unknown.method'), 1)
+
+    @unittest.mock.patch('perceval.backends.core.slack.time')
+    def test_acquire(self, mock_time):
+        """Test whether it waits when the rate of a method is exhausted"""
+
+        mock_time.monotonic.return_value = 100.0
+
+        governor = SlackRateGovernor(rates={'users.info': 2})
+
+        self.assertEqual(governor.acquire('users.info'), 0)
+        self.assertEqual(governor.acquire('users.info'), 0)
+        mock_time.sleep.assert_not_called()
+
+        # Other methods have their own buckets
+        self.assertEqual(governor.acquire('users.list'), 0)
+
+        self.assertEqual(governor.acquire('users.info'), 30)
+        mock_time.sleep.assert_called_once_with(30)
+
+        # Tokens are refilled with time
+        mock_time.monotonic.return_value = 190.0
+        self.assertEqual(governor.acquire('users.info'), 0)
+        self.assertEqual(governor.acquire('users.info'), 0)
+        self.assertEqual(governor.acquire('users.info'), 30)
+
+
 class TestSlackClient(unittest.TestCase):
     """Slack API client tests.
 
@@ -678,6 +1055,11 @@ class TestSlackClient(unittest.TestCase):
         self.assertEqual(client.api_token, 'aaaa')
         self.assertEqual(client.max_items, 5)
         self.assertFalse(client.ssl_verify)
+        self.assertIsNone(client.governor)
+
+        governor = SlackRateGovernor()
+        client = SlackClient('aaaa', governor=governor)
+        self.assertIs(client.governor, governor)
 
     @httpretty.activate
     def test_conversation_members(self):
@@ -808,6 +1190,37 @@ class TestSlackClient(unittest.TestCase):
         self.assertDictEqual(req.querystring, expected)
         self.assertIn((SlackClient.AUTHORIZATION_HEADER, 'Bearer aaaa'), req.headers._headers)
 
+    @httpretty.activate
+    def test_users(self):
+        """Test users list API call"""
+
+        http_requests = setup_http_server()
+
+        client = SlackClient('aaaa', max_items=5)
+
+        # Call API
+        pages = [page for page in client.users()]
+        self.assertEqual(len(pages), 2)
+
+        expected = [
+            {
+                'limit': ['5']
+            },
+            {
+                'limit': ['5'],
+                'cursor': ['dXNlcjpVMDAwMw==']
+            }
+        ]
+
+        self.assertEqual(len(http_requests), 2)
+
+        for i in range(len(expected)):
+            req = http_requests[i]
+            self.assertEqual(req.method, 'GET')
+            self.assertRegex(req.path, '/users.list')
+            self.assertDictEqual(req.querystring, expected[i])
+            self.assertIn((SlackClient.AUTHORIZATION_HEADER, 'Bearer aaaa'), req.headers._headers)
+
     @httpretty.activate
     def test_slack_error(self):
         """Test if an exception is raised when an error is returned by the server"""
@@ -867,6 +1280,9 @@ class TestSlackCommand(unittest.TestCase):
         self.assertTrue(parsed_args.ssl_verify)
         self.assertEqual(parsed_args.api_token, 'abcdefgh')
         self.assertEqual(parsed_args.max_items, 10)
+        self.assertFalse(parsed_args.prefetch_users)
+        self.assertIsNone(parsed_args.user_cache_path)
+        self.assertEqual(parsed_args.user_cache_ttl, 86400)
 
         args = ['--tag', 'test', '--no-ssl-verify',
                 '--api-token', 'abcdefgh',
@@ -882,6 +1298,18 @@ class TestSlackCommand(unittest.TestCase):
         self.assertEqual(parsed_args.api_token, 'abcdefgh')
         self.assertEqual(parsed_args.max_items, 10)
 
+        args = ['--api-token', 'abcdefgh',
+                '--prefetch-users',
+                '--user-cache-path', '/tmp/users.db',
+                '--user-cache-ttl', '3600',
+                'C001']
+
+        parsed_args = parser.parse(*args)
+        self.assertEqual(parsed_args.channel, 'C001')
+        self.assertTrue(parsed_args.prefetch_users)
+        self.assertEqual(parsed_args.user_cache_path, '/tmp/users.db')
+        self.assertEqual(parsed_args.user_cache_ttl, 3600)
+
 
 if __name__ == "__main__":
     unittest.main(warnings='ignore')
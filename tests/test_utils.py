@@ -24,12 +24,15 @@
 #
 
 import bz2
+import concurrent.futures
 import datetime
 import email
 import gzip
 import os
 import shutil
 import tempfile
+import threading
+import time
 import unittest
 import zipfile
 
@@ -37,7 +40,9 @@ from perceval.errors import ParseError
 from perceval.utils import (check_compressed_file_type,
                             message_to_dict,
                             months_range,
+                            ordered_futures,
                             remove_invalid_xml_chars,
+                            xml_iterparse,
                             xml_to_dict)
 
 
@@ -143,6 +148,104 @@ class TestMonthsRange(unittest.TestCase):
         self.assertListEqual(result, [])
 
 
+class TestOrderedFutures(unittest.TestCase):
+    """Unit tests for ordered_futures function"""
+
+    def test_order(self):
+        """Check if the results are returned in the order of the items"""
+
+        def func(item):
+            time.sleep((10 - item) * 0.001)
+            return item * 2
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+            result = [(item, future.result())
+                      for item, future in ordered_futures(executor, func, range(10), 4)]
+
+        expected = [(item, item * 2) for item in range(10)]
+        self.assertListEqual(result, expected)
+
+    def test_window(self):
+        """Test if no more than `window` items are in flight"""
+
+        read = []
+
+        def items():
+            for item in range(10):
+                read.append(item)
+                yield item
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            futures = ordered_futures(executor, lambda item: item, items(), 3)
+
+            for item, future in futures:
+                # The item returned plus those still pending
+                self.assertLessEqual(len(read) - item, 3)
+                self.assertEqual(future.result(), item)
+
+        self.assertEqual(len(read), 10)
+
+    def test_error(self):
+        """Test if the errors of the function are raised by the futures"""
+
+        def func(item):
+            if item == 1:
+                raise ValueError(item)
+            return item
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            result = list(ordered_futures(executor, func, range(3), 2))
+
+        self.assertEqual([item for item, _ in result], [0, 1, 2])
+        self.assertEqual(result[0][1].result(), 0)
+        self.assertRaises(ValueError, result[1][1].result)
+        self.assertEqual(result[2][1].result(), 2)
+
+    def test_iterable_error(self):
+        """Test if the items read before an iterable error are returned"""
+
+        def items():
+            yield 0
+            yield 1
+            raise OSError("iterable error")
+
+        result = []
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            with self.assertRaises(OSError):
+                for item, future in ordered_futures(executor, lambda item: item, items(), 4):
+                    result.append(future.result())
+
+        self.assertListEqual(result, [0, 1])
+
+    def test_close(self):
+        """Test if pending futures are cancelled when the generator is closed"""
+
+        done = []
+        event = threading.Event()
+
+        def func(item):
+            if item > 0:
+                event.wait()
+            done.append(item)
+            return item
+
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        futures = ordered_futures(executor, func, range(4), 4)
+
+        item, future = next(futures)
+        self.assertEqual(future.result(), 0)
+
+        futures.close()
+        event.set()
+        executor.shutdown(wait=True)
+
+        # Item 1 might be running when the generator was closed
+        self.assertEqual(done[0], 0)
+        self.assertNotIn(2, done)
+        self.assertNotIn(3, done)
+
+
 class TestMessagetoDict(unittest.TestCase):
     """Unit tests for message_to_dict"""
 
@@ -229,6 +332,25 @@ class TestRemoveInvalidXMLChars(unittest.TestCase):
         self.assertNotEqual(purged_xml, raw_xml)
         self.assertEqual(len(purged_xml), len(raw_xml))
 
+    def test_remove_chars_bytes(self):
+        """Check whether it removes invalid characters from UTF-8 encoded streams"""
+
+        raw_xml = read_file('data/utils/bugzilla_bugs_invalid_chars.xml')
+        purged_xml = remove_invalid_xml_chars(raw_xml.encode('utf-8'))
+
+        self.assertIsInstance(purged_xml, bytes)
+        self.assertEqual(purged_xml, remove_invalid_xml_chars(raw_xml).encode('utf-8'))
+
+    def test_remove_chars_ranges(self):
+        """Check whether only the invalid ranges of chars are removed"""
+
+        raw_xml = 'a\x00\x08\t\n\r\x0b\x1f \x7f\x84\x85\x86\x9f\xa0ñ'
+        expected = 'a  \t\n      \x85  \xa0ñ'
+
+        self.assertEqual(remove_invalid_xml_chars(raw_xml), expected)
+        self.assertEqual(remove_invalid_xml_chars(raw_xml.encode('utf-8')),
+                         expected.encode('utf-8'))
+
 
 class TestXMLtoDict(unittest.TestCase):
     """Unit tests for xml_to_dict"""
@@ -277,5 +399,44 @@ class TestXMLtoDict(unittest.TestCase):
         self.assertRaises(ParseError, xml_to_dict, raw_xml)
 
 
+class TestXMLIterparse(unittest.TestCase):
+    """Unit tests for xml_iterparse"""
+
+    def test_xml_iterparse(self):
+        """Check whether it converts the elements of a XML file to dicts"""
+
+        raw_xml = read_file('data/utils/bugzilla_bugs_invalid_chars.xml')
+        expected = xml_to_dict(raw_xml)['bug']
+
+        bugs = [bug for bug in xml_iterparse(raw_xml, 'bug')]
+        self.assertListEqual(bugs, expected)
+
+        raw_xml = read_file('data/utils/bugzilla_bug.xml')
+        expected = xml_to_dict(raw_xml)['bug'][0]['long_desc']
+
+        long_descs = [desc for desc in xml_iterparse(raw_xml, 'long_desc')]
+        self.assertListEqual(long_descs, expected)
+
+    def test_nested_elements(self):
+        """Check whether nested elements are returned within the outer ones"""
+
+        raw_xml = '<root><a id="1"><a id="2">text</a></a><b/><a id="3"/></root>'
+
+        elements = [e for e in xml_iterparse(raw_xml, 'a')]
+        expected = [
+            {'id': '1', 'a': [{'id': '2', '__text__': 'text'}]},
+            {'id': '3'}
+        ]
+        self.assertListEqual(elements, expected)
+
+    def test_invalid_xml(self):
+        """Check whether it raises an exception when the XML is invalid"""
+
+        raw_xml = read_file('data/utils/xml_invalid.xml')
+
+        with self.assertRaises(ParseError):
+            _ = [e for e in xml_iterparse(raw_xml, 'bug')]
+
+
 if __name__ == "__main__":
     unittest.main()